@@ -2,32 +2,77 @@ import sys
 import sqlite3
 import os
 import shutil
-import win32print
 import base64
-from datetime import date, datetime
+import bisect
+import csv
+import hashlib
+import re
+import json
+import gzip
+import uuid
+import time
+import argparse
+import multiprocessing
+import heapq
+import threading
+from collections import OrderedDict
+import asyncio
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import pathname2url
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QFormLayout, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
     QComboBox, QMessageBox, QDialog, QListWidget, QInputDialog,
     QDateEdit, QHeaderView, QFrame, QGridLayout, QStyle,
-    QFileDialog, QCheckBox, QStackedWidget, QSizePolicy, QCompleter, QMenu, QGraphicsColorizeEffect, QListWidgetItem
+    QFileDialog, QCheckBox, QStackedWidget, QSizePolicy, QCompleter, QMenu, QGraphicsColorizeEffect, QListWidgetItem,
+    QSystemTrayIcon
 )
-from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtPrintSupport import QPrinter, QPrintPreviewDialog
 from PyQt6.QtGui import (
-    QKeySequence, QShortcut, QFont, QTextDocument, QPageSize, QPageLayout, QIcon, QColor, QPixmap,
+    QImageReader, QKeySequence, QShortcut, QFont, QTextDocument, QPageSize, QPageLayout, QIcon, QColor, QPixmap,
+    QPdfWriter, QGuiApplication, QPainter, QImage, QFontMetricsF, QPen,
 )
-from PyQt6.QtCore import Qt, QDate, QSizeF, QMarginsF, QPoint, pyqtSignal, QEventLoop
+from PyQt6.QtCore import Qt, QDate, QSizeF, QMarginsF, QPoint, QRectF, QPointF, pyqtSignal, QThread, QObject, QTimer
 
 
 DB_NAME = "nbs.db"
+SQLITE_BUSY_TIMEOUT = 15  # seconds to wait for another connection's lock before failing
 ENTRY_TYPES = ["Income", "Expense", "Capital"]
 INCOME_CATEGORIES = ["Sales", "Services"]
 PAYROLL_TYPES = ["Salary Payment", "Advance"]
 
+# Money is stored as integer fils (1 AED = 100 fils) so sums and balances are exact.
+MONEY_SCALE = 100
+MONEY_COLUMNS = {
+    "daily_expense": ("amount",),
+    "daily_income": ("amount",),
+    "daily_capital": ("amount",),
+    "vendors": ("opening_balance",),
+    "vendor_transactions": ("amount",),
+    "cheques": ("amount",),
+    "employees": ("salary", "loan_balance"),
+    "employee_payroll": ("amount", "debit", "credit", "balance"),
+}
+SCHEMA_VERSION_FILS = 1
+SCHEMA_VERSION_LINKS = 2
+
 def get_conn():
-    return sqlite3.connect(DB_NAME)
+    return sqlite3.connect(DB_NAME, timeout=SQLITE_BUSY_TIMEOUT)
+
+def get_readonly_conn(db_path=None):
+    path = os.path.abspath(db_path or DB_NAME)
+    conn = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True, timeout=SQLITE_BUSY_TIMEOUT)
+    # marks the connection for is_readonly_conn; mode=ro itself cannot be queried
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def is_readonly_conn(conn):
+    return bool(conn.execute("PRAGMA query_only").fetchone()[0])
 
 def column_exists(conn, table, column):
     cur = conn.execute(f"PRAGMA table_info({table})")
@@ -46,25 +91,26 @@ def init_db():
         ('''CREATE TABLE IF NOT EXISTS daily_expense (
             id INTEGER PRIMARY KEY,
             date TEXT,
-            amount REAL,
+            amount INTEGER,
             category_id INTEGER,
             description TEXT,
             vendor_transaction_id INTEGER,
             notes TEXT,
+            payroll_id INTEGER,
             FOREIGN KEY(category_id) REFERENCES expense_categories(id)
         )''', None),
         ('''CREATE TABLE IF NOT EXISTS vendors (
             id INTEGER PRIMARY KEY,
             name TEXT UNIQUE,
             contact TEXT,
-            opening_balance REAL DEFAULT 0
+            opening_balance INTEGER DEFAULT 0
         )''', None),
         ('''CREATE TABLE IF NOT EXISTS vendor_transactions (
             id INTEGER PRIMARY KEY,
             vendor_id INTEGER,
             date TEXT,
             type TEXT,
-            amount REAL,
+            amount INTEGER,
             note TEXT,
             due_date TEXT,
             invoice_no TEXT,
@@ -79,7 +125,7 @@ def init_db():
         ('''CREATE TABLE IF NOT EXISTS daily_income (
             id INTEGER PRIMARY KEY,
             date TEXT,
-            amount REAL,
+            amount INTEGER,
             category_id INTEGER,
             description TEXT,
             notes TEXT,
@@ -91,7 +137,7 @@ def init_db():
             company_name TEXT,
             bank_name TEXT,
             due_date TEXT,
-            amount REAL,
+            amount INTEGER,
             is_paid INTEGER DEFAULT 0,
             vendor_transaction_id INTEGER
         )''', None),
@@ -99,9 +145,9 @@ def init_db():
             id INTEGER PRIMARY KEY,
             name TEXT NOT NULL,
             designation TEXT,
-            salary REAL DEFAULT 0,
+            salary INTEGER DEFAULT 0,
             joining_date TEXT,
-            loan_balance REAL DEFAULT 0,
+            loan_balance INTEGER DEFAULT 0,
             photo_path TEXT
          )''', None),
          ('''CREATE TABLE IF NOT EXISTS employee_payroll (
@@ -109,17 +155,17 @@ def init_db():
             employee_id INTEGER,
             date TEXT,
             type TEXT,
-            amount REAL,
-            debit REAL,
-            credit REAL,
-            balance REAL,
+            amount INTEGER,
+            debit INTEGER,
+            credit INTEGER,
+            balance INTEGER,
             notes TEXT,
             FOREIGN KEY(employee_id) REFERENCES employees(id)
           )''', None),
         ('''CREATE TABLE IF NOT EXISTS daily_capital (
             id INTEGER PRIMARY KEY,
             date TEXT,
-            amount REAL,
+            amount INTEGER,
             category TEXT,
             description TEXT,
             notes TEXT
@@ -130,20 +176,70 @@ def init_db():
 
     for stmt, _ in tables:
         c.execute(stmt)
+    migrate_money_to_fils(conn)
+    ensure_table_versions(conn)
+    ensure_indexes(conn)
+    ensure_vendor_checkpoints_schema(conn)
+    ensure_expense_links(conn)
+    ensure_change_log(conn)
+    ensure_fiscal_archives(conn)
+    ensure_bank_reconciliation(conn)
+    conn.close()
     ensure_default_income_categories()
 
+def migrate_money_to_fils(conn):
+    """
+    One-time upgrade of databases that still keep REAL amounts in AED.
+    Each affected table is rebuilt with INTEGER money columns (SQLite cannot
+    change a column type in place) and its values are scaled to fils.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION_FILS:
+        return
+    c = conn.cursor()
+    c.execute("BEGIN")
+    for table, money_cols in MONEY_COLUMNS.items():
+        row = c.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+        if not row:
+            continue
+        cols = [info[1] for info in c.execute(f"PRAGMA table_info({table})")]
+        money_cols = [col for col in money_cols if col in cols]
+        create_sql = row[0]
+        for col in money_cols:
+            create_sql = re.sub(rf"\b{col}\s+REAL\b", f"{col} INTEGER", create_sql, flags=re.IGNORECASE)
+        create_sql = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?\"?{table}\"?", f"CREATE TABLE {table}_fils",
+                            create_sql, count=1, flags=re.IGNORECASE)
+        select_cols = ", ".join(
+            f"CAST(ROUND({col} * {MONEY_SCALE}) AS INTEGER)" if col in money_cols else col for col in cols
+        )
+        c.execute(create_sql)
+        c.execute(f"INSERT INTO {table}_fils ({', '.join(cols)}) SELECT {select_cols} FROM {table}")
+        c.execute(f"DROP TABLE {table}")
+        c.execute(f"ALTER TABLE {table}_fils RENAME TO {table}")
+    c.execute(f"PRAGMA user_version={SCHEMA_VERSION_FILS}")
+    conn.commit()
+
 # --- Helper functions ---
 def get_income_categories():
-    with get_conn() as conn:
-        return conn.execute("SELECT id, name FROM income_categories").fetchall()
+    return REF_CACHE.get("income_categories")
 
 def get_expense_categories():
-    with get_conn() as conn:
-        return conn.execute("SELECT id, name FROM expense_categories").fetchall()
+    return REF_CACHE.get("expense_categories")
 
 def get_vendor_names():
-    with get_conn() as conn:
-        return [row[0] for row in conn.execute("SELECT name FROM vendors ORDER BY name COLLATE NOCASE ASC").fetchall()]
+    return [name for _, name in REF_CACHE.get("vendors")]
+
+def get_expense_category_id(conn, name, create=True):
+    """Id of the expense category called `name` (case-insensitive), added through `conn` when missing."""
+    for cid, cat_name in REF_CACHE.get("expense_categories"):
+        if cat_name.lower() == name.lower():
+            return cid
+    # the cache may not see a category added earlier in this same transaction
+    row = conn.execute("SELECT id FROM expense_categories WHERE lower(name)=?", (name.lower(),)).fetchone()
+    if row:
+        return row[0]
+    if not create:
+        return None
+    return conn.execute("INSERT INTO expense_categories (name) VALUES (?)", (name,)).lastrowid
 
 def to_ddmmyyyy(iso):
     try:
@@ -164,1047 +260,4093 @@ def to_iso_date(ddmmyyyy):
         return ddmmyyyy
 
 def get_all_descriptions():
-    with get_conn() as conn:
-        income_descs = [row[0] for row in conn.execute("SELECT DISTINCT description FROM daily_income WHERE description IS NOT NULL AND description <> ''")]
-        expense_descs = [row[0] for row in conn.execute("SELECT DISTINCT description FROM daily_expense WHERE description IS NOT NULL AND description <> ''")]
-    return list(set(income_descs + expense_descs))
+    return REF_CACHE.get("descriptions")
 
 def parse_amount(text):
     """
-    Attempts to parse a float amount from the given text.
+    Parses an AED amount typed by the user into integer fils.
     Returns 0 if the text is empty, invalid, or cannot be parsed.
     """
     try:
-        return float(text.strip())
-    except Exception:
+        return to_fils(text)
+    except (InvalidOperation, ValueError, TypeError):
         return 0
 
-def ensure_default_income_categories():
-    conn = get_conn()
-    c = conn.cursor()
-    for name in INCOME_CATEGORIES:
-        c.execute("INSERT OR IGNORE INTO income_categories (name) VALUES (?)", (name,))
-    conn.commit()
-    conn.close()
+def to_fils(value):
+    """Converts an AED amount (text, int, float or Decimal) to integer fils, rounding half up."""
+    if value is None:
+        return 0
+    text = str(value).replace(",", "").replace("AED", "").strip()
+    if not text:
+        return 0
+    return int((Decimal(text) * MONEY_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
 
+def from_fils(fils):
+    """AED as a float, for ratios and display maths only; never write this back to the database."""
+    return (fils or 0) / MONEY_SCALE
 
-DARK_STYLESHEET = """
-QMainWindow, QWidget {
-    background: #181A1B;
-    color: #F1F3F4;
-    font-family: 'Segoe UI', 'Arial', sans-serif;
-}
-QLabel { color: #F1F3F4; font-size: 15px; }
-QTabWidget::pane {
-    border: none;
-    border-top: 2px solid #5a3a12;
-    background: #181A1B;
-    border-radius: 0px 0px 0 0;
-    margin: 10px 6px 6px 6px; /* top right bottom left */
-}
-QTabBar::tab {
-    background: #232627;
-    color: #cfcfcf;
-    border-radius: 5px 5px 0 0;
-    padding: 8px 14px;
-    margin-left: 10px;
-    margin-top: 6px;
-    font-size: 15px;
-    min-width: 100px;
-}
-QTabBar::tab:selected {
-    background: #26292A;
-    color: #fff;
-    font-weight: bold;
-    border: 2px solid #fb700e;
-    border-radius: 5px 5px 0 0;
-}
-QLineEdit, QComboBox, QDateEdit, QTextEdit {
-    background: #232627;
-    color: #F1F3F4;
-    border: 1.3px solid #35393A;
-    border-radius: 5px;
-    padding: 8px;
-    font-size: 15px;
-}
-QLineEdit:focus, QComboBox:focus, QDateEdit:focus, QTextEdit:focus {
-    border: 1.7px solid #6C7A89;
-}
-QPushButton {
-    background: #232627;
-    color: #F1F3F4;
-    border-radius: 5px;
-    padding: 8px 20px;
-    font-size: 15px;
-    border: 1px solid #35393A;
-}
-QPushButton:pressed { background: #35393A; }
-QPushButton:disabled { background: #232627; color: #555; }
-QTableWidget {
-    background: #181A1B;
-    color: #F1F3F4;
-    gridline-color: #232627;
-    font-size: 15px;
-}
-QHeaderView::section {
-    background-color: #2A2C2E;
-    color: #F1F3F4;
-    font-weight: bold;
-    font-size: 15px;
-    border: none;
-    border-radius: 0;
-    padding: 4px;
-}
-QTableWidget QTableCornerButton::section { background: #232627; }
-QFrame#totalsbox { background: #232627; border-radius: 12px; color: #F1F3F4; }
-QListWidget {
-    background: #232627;
-    color: #F1F3F4;
-    border-radius: 5px;
-    padding: 5px;
-}
-QScrollBar:vertical, QScrollBar:horizontal {
-    background: #232627;
-    width: 12px;
-    margin: 0px;
-    border-radius: 5px;
-}
-QScrollBar::handle:vertical, QScrollBar::handle:horizontal {
-    background: #35393A;
-    border-radius: 5px;
-}
-QToolTip {
-    background: #35393A;
-    color: #F1F3F4;
-    border: 1px solid #6C7A89;
-}
-QComboBox {
-    background: #232627;
-    padding: 8px 14px;
-    min-width: 120px;
-    border-radius: 1px;
-}
-QTabWidget#mainTabs QTabBar::tab:selected {
-    color: #fb700e;
-}
-QTabWidget#vendorsSubTabs QTabBar::tab:selected {
-    color: #fff;
-    border: 2px solid #35393A;
-}
-QTabWidget#vendorsSubTabs::pane {
-    border: none;
-}
+def fmt_money(fils, grouping=False):
+    """Formats integer fils as AED with two decimals without going through float."""
+    fils = int(fils or 0)
+    units, cents = divmod(abs(fils), MONEY_SCALE)
+    units = f"{units:,}" if grouping else str(units)
+    return f"{'-' if fils < 0 else ''}{units}.{cents:02}"
 
-"""
+class Record:
+    """
+    Base for compact row records kept in memory by the tabs: fields live in
+    __slots__ (no per-row dict), a record unpacks and indexes like the tuple it
+    replaces, and record["field"] reads or sets a field by name for code written
+    against dict rows. Values are stored raw; formatting happens when displayed.
+    """
+    __slots__ = ()
 
-DIALOG_STYLESHEET = """
-QDialog { background: #181A1B; }
-QLabel { font-size: 15px; font-weight: 600; color: #F1F3F4; }
-QLineEdit, QComboBox, QDateEdit {
-    border-radius: 5px; padding: 8px; font-size: 14px;
-    border: 1.3px solid #35393A; background: #232627; color: #F1F3F4;
-}
-QPushButton {
-    border-radius: 5px; padding: 9px 18px; font-size: 14px;
-    background: #26292A; color: #F1F3F4; font-weight: bold;
-}
-QPushButton:pressed { background: #35393A; }
-QLineEdit:focus, QComboBox:focus, QDateEdit:focus { border: 2px solid #fb700e; }
-"""
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes {len(self.__slots__)} values, got {len(values)}")
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
 
-# You may define more as needed, e.g.:
-FORM_STYLESHEET = """
-QFormLayout QLabel { color: #F1F3F4; }
-"""
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(*row) for row in rows]
 
-# ---------------- Dialog and Tab Classes ----------------
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
 
-class EntryEditDialog(QDialog):
-    def __init__(self, entry_type, entry_id, date, cat_id, amount, desc, notes='', parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Edit Entry")
-        self.entry_type = entry_type
-        self.entry_id = entry_id
-        self.setMinimumWidth(390)
-        self.setStyleSheet(DIALOG_STYLESHEET)
-        self.layout = QVBoxLayout(self)
-        form = QFormLayout()
-        self.date_input = QDateEdit()
-        self.date_input.setDisplayFormat("dd-MM-yyyy")
-        self.date_input.setCalendarPopup(True)
-        try:
-            dt = datetime.strptime(date, "%Y-%m-%d")
-            self.date_input.setDate(QDate(dt.year, dt.month, dt.day))
-        except Exception:
-            self.date_input.setDate(QDate.currentDate())
-        form.addRow("Date:", self.date_input)
-        self.cat_combo = QComboBox()
-        if entry_type == "Income":
-            for cid, name in get_income_categories():
-                self.cat_combo.addItem(name, cid)
-        else:
-            for cid, name in get_expense_categories():
-                self.cat_combo.addItem(name, cid)
-        idx = self.cat_combo.findData(cat_id)
-        if idx != -1:
-            self.cat_combo.setCurrentIndex(idx)
-        form.addRow("Category:", self.cat_combo)
-        self.desc_input = QLineEdit(desc or "")
-        form.addRow("Description:", self.desc_input)
-        self.amount_input = QLineEdit(str(amount))
-        self.amount_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        form.addRow("Amount (AED):", self.amount_input)
-        self.notes_input = QLineEdit(notes or "")
-        self.notes_input.setPlaceholderText("Notes (optional)")
-        form.addRow("Notes:", self.notes_input)
-        self.layout.addLayout(form)
+    def __len__(self):
+        return len(self.__slots__)
 
-        btn_row = QHBoxLayout()
-        self.save_btn = QPushButton("Save")
-        self.save_btn.clicked.connect(self.accept)
-        self.delete_btn = QPushButton("Delete")
-        self.delete_btn.clicked.connect(self.delete_entry)
-        self.clear_btn = QPushButton("Clear")
-        self.clear_btn.clicked.connect(self.clear_form)
-        for b in [self.save_btn, self.delete_btn, self.clear_btn]:
-            btn_row.addWidget(b)
-        self.layout.addLayout(btn_row)
-        self.deleted = False
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self.__slots__:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple(self)[key]
 
-    def get_values(self):
-        date_iso = self.date_input.date().toString("yyyy-MM-dd")
-        return (
-            date_iso,
-            self.cat_combo.currentData(),
-            parse_amount(self.amount_input.text()),
-            self.desc_input.text(),
-            self.notes_input.text()
-        )
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
 
-    def delete_entry(self):
-        self.deleted = True
-        self.accept()
+    def __eq__(self, other):
+        return type(other) is type(self) and tuple(self) == tuple(other)
 
-    def clear_form(self):
-        self.date_input.setDate(QDate.currentDate())
-        self.cat_combo.setCurrentIndex(0)
-        self.desc_input.clear()
-        self.amount_input.clear()
+    __hash__ = None
 
-class IncomeExpenseEntryDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Add Transaction")
-        self.setMinimumWidth(450)
-        self.setMaximumWidth(500)
-        self.setStyleSheet(DIALOG_STYLESHEET)
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{n}={getattr(self, n)!r}' for n in self.__slots__)})"
 
-        layout = QVBoxLayout(self)
-        layout.setSpacing(10)
+class VendorRecord(Record):
+    """A vendor with its current balance (fils), as held by VendorIndex."""
+    __slots__ = ("id", "name", "contact", "opening_balance", "balance")
 
-        title = QLabel("Add Income / Expense / Capital")
-        title.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        title.setStyleSheet("font-size:17px; font-weight:600; margin-bottom:8px;")
-        layout.addWidget(title)
+class StatementRow(Record):
+    """One vendor statement line: ISO dates (None on the opening row), display type, amounts in fils."""
+    __slots__ = ("date", "type", "debit", "credit", "balance", "due")
 
-        form = QFormLayout()
-        form.setLabelAlignment(Qt.AlignmentFlag.AlignLeft)
-        form.setFormAlignment(Qt.AlignmentFlag.AlignLeft)
-        form.setSpacing(8)
-        form.setFieldGrowthPolicy(QFormLayout.FieldGrowthPolicy.AllNonFixedFieldsGrow)
+    def cells(self):
+        """The display strings of the line, in field order."""
+        return (
+            to_ddmmyyyy(self.date) if self.date else "",
+            self.type,
+            fmt_money(self.debit) if self.debit else "",
+            fmt_money(self.credit) if self.credit else "",
+            fmt_money(self.balance),
+            to_ddmmyyyy(self.due) if self.due else "",
+        )
 
-        # Date
-        self.date_input = QDateEdit()
-        self.date_input.setDisplayFormat("dd-MM-yyyy")
-        self.date_input.setCalendarPopup(True)
-        self.date_input.setDate(QDate.currentDate())
-        self.date_input.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        form.addRow("Date", self.date_input)
+    def formatted(self):
+        """The display strings keyed by field name, as the statement templates expect."""
+        return dict(zip(self.__slots__, self.cells()))
 
-        # Type
-        self.type_input = QComboBox()
-        self.type_input.addItems(ENTRY_TYPES)
-        form.addRow("Type", self.type_input)
+class ChequeRow(Record):
+    """Where a cheque sits in ChequesTab's table, plus what the day-change updates need."""
+    __slots__ = ("row", "due_date", "amount", "is_paid")
 
-        # Category
-        self.category_input = QComboBox()
-        form.addRow("Category", self.category_input)
+class DocumentRecord(Record):
+    """A tracked document; expiry_date is dd/MM/yyyy as stored in documents.csv."""
+    __slots__ = ("description", "category", "expiry_date")
 
-        # Description
-        self.description_input = QLineEdit()
-        self.description_input.setPlaceholderText("Description")
-        self.description_input.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        desc_completer = QCompleter(get_all_descriptions())
-        desc_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.description_input.setCompleter(desc_completer)
-        form.addRow("Description", self.description_input)
-
-        # Notes
-        self.notes_input = QLineEdit()
-        self.notes_input.setPlaceholderText("Notes (optional)")
-        self.notes_input.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        form.addRow("Notes", self.notes_input)
+VERSIONED_TABLES = (
+    "daily_income", "daily_expense", "daily_capital", "vendor_transactions", "vendors",
+    "cheques", "employees", "employee_payroll", "income_categories", "expense_categories",
+)
 
-        layout.addLayout(form)
+def ensure_table_versions(conn):
+    """
+    Keeps a change counter per table, bumped by triggers on every write, so
+    caches can tell whether the rows behind them changed.
+    """
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    for table in VERSIONED_TABLES:
+        c.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (table,))
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            c.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{op.lower()}
+                AFTER {op} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+    conn.commit()
 
-        # Amount (centered, bold, larger)
-        amount_row = QHBoxLayout()
-        amount_row.addStretch()
-        self.amount_input = QLineEdit()
-        self.amount_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.amount_input.setPlaceholderText("Amount (AED)")
-        afont = QFont()
-        afont.setPointSize(20)
-        afont.setBold(True)
-        self.amount_input.setFont(afont)
-        self.amount_input.setFixedWidth(220)
-        amount_row.addWidget(self.amount_input)
-        amount_row.addStretch()
-        layout.addLayout(amount_row)
+def ensure_indexes(conn):
+    # (vendor_id, date, id) serves the statement's keyset seek and its carried-forward sum
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendor_transactions_vendor_date ON vendor_transactions (vendor_id, date, id)")
+    # due-date order for the A/P aging pass; rows without a due date fall due on their date
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vendor_transactions_vendor_due ON vendor_transactions (vendor_id, COALESCE(due_date, date), id)")
+    # unpaid cheques by due date for the due-date scheduler
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cheques_paid_due ON cheques (is_paid, due_date)")
+    # supplier invoice numbers per vendor, compared trimmed and case-insensitively, for the duplicate check
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_vendor_transactions_invoice ON vendor_transactions "
+                 f"(vendor_id, {INVOICE_KEY_SQL}) WHERE {INVOICE_WHERE_SQL}")
+    conn.commit()
 
-        # Button row (centered)
-        btn_row = QHBoxLayout()
-        btn_row.setSpacing(5)
-        btn_row.addStretch()
-        self.save_btn = QPushButton("Save")
-        self.save_btn.clicked.connect(self.accept)
-        self.delete_btn = QPushButton("Delete")
-        self.delete_btn.clicked.connect(self.delete_entry)
-        self.clear_btn = QPushButton("Clear")
-        self.clear_btn.clicked.connect(self.clear_form)
-        for b in [self.save_btn, self.delete_btn, self.clear_btn]:
-            btn_row.addWidget(b)
-        btn_row.addStretch()
-        layout.addLayout(btn_row)
-        self.deleted = False
+def ensure_vendor_checkpoints_schema(conn):
+    """
+    Month-end running totals per vendor (opening balance excluded). A write to
+    vendor_transactions drops the checkpoints from its month onwards; they are
+    rebuilt lazily by update_vendor_checkpoints.
+    """
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS vendor_balance_checkpoints (
+            vendor_id INTEGER,
+            period TEXT,
+            cumulative INTEGER,
+            PRIMARY KEY (vendor_id, period)
+        )
+    """)
+    for op, rows in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+        body = "".join(
+            f"DELETE FROM vendor_balance_checkpoints WHERE vendor_id = {r}.vendor_id AND period >= substr({r}.date, 1, 7);"
+            for r in rows
+        )
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_vendor_transactions_checkpoint_{op.lower()}
+            AFTER {op} ON vendor_transactions
+            BEGIN {body} END
+        """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vendors_checkpoint_delete
+        AFTER DELETE ON vendors
+        BEGIN DELETE FROM vendor_balance_checkpoints WHERE vendor_id = OLD.id; END
+    """)
+    conn.commit()
 
-        self.type_input.currentTextChanged.connect(self.update_category_options)
-        self.category_input.currentIndexChanged.connect(self.handle_category_change)
-        self.type_input.currentTextChanged.connect(self.update_amount_placeholder_color)
-        self.update_category_options()
-        self.update_amount_placeholder_color(self.type_input.currentText())
+def ensure_expense_links(conn):
+    """
+    Mirrored cashflow rows point at their source: daily_expense.vendor_transaction_id
+    for vendor payments and daily_expense.payroll_id for salary/advance entries.
+    Deleting the source removes its mirror (and a purchase's cheque) via triggers;
+    deleting a whole vendor keeps its payments in the cashflow, unlinked, since
+    that money was still paid out. Older databases get their existing mirrors linked once by matching the old
+    date/amount/description/notes pattern.
+    """
+    c = conn.cursor()
+    for table, column in (("daily_expense", "vendor_transaction_id"), ("daily_expense", "payroll_id"),
+                          ("cheques", "vendor_transaction_id")):
+        if not column_exists(conn, table, column):
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION_LINKS:
+        backfill_expense_links(conn)
+        c.execute(f"PRAGMA user_version={SCHEMA_VERSION_LINKS}")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_daily_expense_vendor_transaction ON daily_expense (vendor_transaction_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_daily_expense_payroll ON daily_expense (payroll_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_cheques_vendor_transaction ON cheques (vendor_transaction_id)")
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vendor_transactions_cascade_delete
+        AFTER DELETE ON vendor_transactions
+        BEGIN
+            DELETE FROM daily_expense WHERE vendor_transaction_id = OLD.id;
+            DELETE FROM cheques WHERE vendor_transaction_id = OLD.id;
+        END
+    """)
+    c.execute("DROP TRIGGER IF EXISTS trg_vendors_cascade_delete")
+    c.execute("""
+        CREATE TRIGGER trg_vendors_cascade_delete
+        AFTER DELETE ON vendors
+        BEGIN
+            UPDATE daily_expense SET vendor_transaction_id = NULL
+            WHERE vendor_transaction_id IN (SELECT id FROM vendor_transactions WHERE vendor_id = OLD.id);
+            DELETE FROM vendor_transactions WHERE vendor_id = OLD.id;
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_employee_payroll_cascade_delete
+        AFTER DELETE ON employee_payroll
+        BEGIN DELETE FROM daily_expense WHERE payroll_id = OLD.id; END
+    """)
+    conn.commit()
 
-    def update_category_options(self, *_):
-        t = self.type_input.currentText()
-        self.category_input.blockSignals(True)
-        self.category_input.clear()
-        if t == ENTRY_TYPES[0]:
-            for cid, name in get_income_categories():
-                self.category_input.addItem(name, cid)
-        elif t == ENTRY_TYPES[1]:
-            for cid, name in get_expense_categories():
-                if name.strip().lower() == "vendors":
-                    continue
-                self.category_input.addItem(name, cid)
-        elif t == ENTRY_TYPES[2]:
-            self.category_input.addItem("Additional Capital", "additional_capital")
-        self.category_input.blockSignals(False)
+def backfill_expense_links(conn):
+    c = conn.cursor()
+    linked = {row[0] for row in c.execute(
+        "SELECT vendor_transaction_id FROM daily_expense WHERE vendor_transaction_id IS NOT NULL")}
+    unlinked = c.execute("""
+        SELECT de.id, de.date, de.amount, de.description
+        FROM daily_expense de JOIN expense_categories ec ON de.category_id = ec.id
+        WHERE ec.name = 'Vendors' AND de.vendor_transaction_id IS NULL
+        ORDER BY de.id
+    """).fetchall()
+    for exp_id, exp_date, amount, description in unlinked:
+        # descriptions were either the vendor name or "<vendor> Payment (<amount> AED)"
+        candidates = c.execute("""
+            SELECT vt.id FROM vendor_transactions vt JOIN vendors v ON vt.vendor_id = v.id
+            WHERE vt.type = 'payment' AND vt.date = ? AND vt.amount = ?
+              AND (v.name = ? OR ? LIKE v.name || ' Payment (%')
+            ORDER BY vt.id
+        """, (exp_date, amount, description, description)).fetchall()
+        for (trans_id,) in candidates:
+            if trans_id not in linked:
+                linked.add(trans_id)
+                c.execute("UPDATE daily_expense SET vendor_transaction_id=? WHERE id=?", (trans_id, exp_id))
+                break
+
+    linked = {row[0] for row in c.execute("SELECT payroll_id FROM daily_expense WHERE payroll_id IS NOT NULL")}
+    unlinked = c.execute("""
+        SELECT de.id, de.date, de.amount, de.description, de.notes
+        FROM daily_expense de JOIN expense_categories ec ON de.category_id = ec.id
+        WHERE lower(ec.name) = 'salary' AND de.payroll_id IS NULL AND de.notes LIKE 'Payroll - %'
+        ORDER BY de.id
+    """).fetchall()
+    for exp_id, exp_date, amount, description, notes in unlinked:
+        candidates = c.execute("""
+            SELECT ep.id FROM employee_payroll ep JOIN employees e ON ep.employee_id = e.id
+            WHERE ep.date = ? AND ep.debit = ? AND e.name = ? AND ep.type = ?
+            ORDER BY ep.id
+        """, (exp_date, amount, description, notes[len("Payroll - "):])).fetchall()
+        for (payroll_id,) in candidates:
+            if payroll_id not in linked:
+                linked.add(payroll_id)
+                c.execute("UPDATE daily_expense SET payroll_id=? WHERE id=?", (payroll_id, exp_id))
+                break
+    conn.commit()
 
-    def handle_category_change(self):
-        pass
+def get_table_versions(conn, tables=VERSIONED_TABLES):
+    """Returns {table: version}, or None for databases without table_versions."""
+    try:
+        rows = conn.execute(
+            f"SELECT name, version FROM table_versions WHERE name IN ({','.join('?' * len(tables))})",
+            tuple(tables)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
 
-    def update_amount_placeholder_color(self, t):
-        color = "#43a047" if t == "Income" else "#e53935"
-        if t == "Capital":
-            color = "#1976d2"
-        self.amount_input.setStyleSheet(
-            f"""
-            QLineEdit {{
-                background: #232627;
-                color: #F1F3F4;
-                border-radius: 10px;
-                border: 1.3px solid #35393A;
-                font-size: 20px;
-                font-weight:bold;
-            }}
-            QLineEdit::placeholder {{
-                color: {color};
-                font-weight: bold;
-                letter-spacing: 1px;
-            }}
-            """
-        )
+CHANGE_LOG_TABLES = VERSIONED_TABLES
+DELTA_PACK_FORMAT = 2  # 2: a closed fiscal year travels as one "C" change
+AUTO_BACKUP_FULL_EVERY_DAYS = 7
 
-    def clear_form(self):
-        self.date_input.setDate(QDate.currentDate())
-        self.type_input.setCurrentIndex(0)
-        self.category_input.setCurrentIndex(0)
-        self.description_input.clear()
-        self.amount_input.clear()
-        self.notes_input.clear()
+def get_app_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM app_meta WHERE key=?", (key,)).fetchone()
+    return row[0] if row else default
 
-    def delete_entry(self):
-        self.deleted = True
-        self.accept()
+def set_app_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, str(value)))
 
-    def get_values(self):
-        date_iso = self.date_input.date().toString("yyyy-MM-dd")
-        desc = self.description_input.text()
-        notes = self.notes_input.text()
-        return (
-            date_iso,
-            self.type_input.currentText(),
-            self.category_input.currentData(),
-            self.amount_input.text(),
-            desc,
-            notes
+def ensure_change_log(conn):
+    """
+    Append-only change_log filled by triggers on every ledger table: one row per
+    insert/update/delete with the table, the row id, the operation and (except
+    for deletes) the new row as JSON. seq only ever grows, so "everything after
+    seq N" is a delta that can be exported and applied to another copy.
+    Triggers are recreated on every start so the row image follows added columns.
+    """
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            pk INTEGER,
+            op TEXT NOT NULL,
+            row_json TEXT
         )
+    """)
+    c.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('node_id', ?)", (uuid.uuid4().hex,))
+    for table in CHANGE_LOG_TABLES:
+        columns = [info[1] for info in c.execute(f"PRAGMA table_info({table})")]
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            if op == "DELETE":
+                ref, image = "OLD", "NULL"
+            else:
+                ref, image = "NEW", "json_object(" + ", ".join(f"'{col}', NEW.{col}" for col in columns) + ")"
+            c.execute(f"DROP TRIGGER IF EXISTS trg_{table}_changelog_{op.lower()}")
+            c.execute(f"""
+                CREATE TRIGGER trg_{table}_changelog_{op.lower()}
+                AFTER {op} ON {table}
+                WHEN (SELECT value FROM app_meta WHERE key = 'applying_delta') IS NULL
+                BEGIN
+                    INSERT INTO change_log (table_name, pk, op, row_json)
+                    VALUES ('{table}', {ref}.id, '{op[0]}', {image});
+                END
+            """)
+    conn.commit()
 
-class FilterWidget(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        vbox = QVBoxLayout(self)
-        filter_layout = QHBoxLayout()
-        self.setStyleSheet(DIALOG_STYLESHEET)
-
-        # --- Month Combo ---
-        self.month_combo = QComboBox()
-        self.month_combo.addItem("All Months", None)
-        for m in range(1, 13):
-            self.month_combo.addItem(QDate(2000, m, 1).toString("MMMM"), m)
-        current_month = QDate.currentDate().month()
-        self.month_combo.setCurrentIndex(current_month)  # Default to current month
-        self.month_combo.currentIndexChanged.connect(self.on_month_selected)
-        
+def get_change_seq(conn):
+    # from sqlite_sequence, so the number keeps growing after exported rows are pruned
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='change_log'").fetchone()
+    return row[0] if row else 0
 
-        self.date_from = QDateEdit()
-        self.date_from.setDisplayFormat("dd-MM-yyyy")
-        self.date_from.setCalendarPopup(True)
-        self.date_from.setMinimumWidth(120) 
+def prune_change_log(conn):
+    """
+    Drops the change_log rows that both the delta export and the auto backup
+    have already written out. Does not commit.
+    """
+    marks = [get_app_meta(conn, key) for key in ("delta_export_seq", "backup_seq")]
+    marks = [int(mark) for mark in marks if mark is not None]
+    if not marks:
+        return 0
+    upto = min(marks)
+    if upto > int(get_app_meta(conn, "change_log_pruned_seq", 0)):
+        conn.execute("DELETE FROM change_log WHERE seq <= ?", (upto,))
+        set_app_meta(conn, "change_log_pruned_seq", upto)
+    return upto
+
+def export_delta_pack(conn, out_path, since=0):
+    """Writes the changes after `since` to a gzipped JSON pack. Returns (last seq, number of changes)."""
+    pruned = int(get_app_meta(conn, "change_log_pruned_seq", 0))
+    if since < pruned:
+        raise ValueError(f"Changes up to {pruned} have already been exported and pruned; "
+                         "start the other copy from a full backup instead.")
+    rows = conn.execute(
+        "SELECT seq, table_name, pk, op, row_json FROM change_log WHERE seq > ? ORDER BY seq", (since,)
+    ).fetchall()
+    until = rows[-1][0] if rows else since
+    pack = {
+        "format": DELTA_PACK_FORMAT,
+        "source": get_app_meta(conn, "node_id"),
+        "since": since,
+        "until": until,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "changes": [[seq, table, pk, op, json.loads(row_json) if row_json else None]
+                    for seq, table, pk, op, row_json in rows],
+    }
+    with gzip.open(out_path, "wt", encoding="utf-8") as f:
+        json.dump(pack, f)
+    return until, len(rows)
+
+def apply_delta_pack(conn, pack_path):
+    """
+    Replays a delta pack in one transaction: inserts/updates are upserts by id,
+    deletes remove by id. A closed fiscal year is replayed by closing the same
+    year here, between the changes before and after it. The last applied seq is kept per source database, so
+    packs must be applied in order and re-applying one is a no-op. Replication
+    is one-way (a primary exports, copies apply); applied rows are not logged again.
+    Returns the number of changes applied.
+    """
+    with gzip.open(pack_path, "rt", encoding="utf-8") as f:
+        pack = json.load(f)
+    if pack.get("format") not in (1, DELTA_PACK_FORMAT):
+        raise ValueError("Unsupported delta pack format.")
+    source = pack["source"]
+    applied_key = f"applied:{source}"
+    applied = get_app_meta(conn, applied_key)
+    if applied is not None:
+        applied = int(applied)
+    elif source == get_app_meta(conn, "node_id"):
+        # restoring a backup of this database: the copy already holds its own log
+        applied = get_change_seq(conn)
+    else:
+        applied = 0
+    if pack["since"] > applied:
+        raise ValueError(
+            f"This pack starts after change {pack['since']}, but only changes up to {applied} "
+            "from that database have been applied. Apply the earlier packs first."
+        )
+    db_path = next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main")
+    columns = {}
+    count = 0
+    batch = []
+    for change in pack["changes"]:
+        seq, table, pk, op, row = change
+        if seq <= applied:
+            continue
+        if op != "C":
+            batch.append(change)
+            continue
+        # a year close attaches its archive file, which cannot happen inside the batch transaction
+        count += _apply_delta_changes(conn, batch, columns, applied_key, seq - 1)
+        batch = []
+        closed = get_closed_through(conn)
+        if closed is None or pk > closed:
+            _close_one_year(conn, db_path, pk, log_change=False)
+        with conn:
+            set_app_meta(conn, applied_key, seq)
+        count += 1
+    count += _apply_delta_changes(conn, batch, columns, applied_key, max(applied, pack["until"]))
+    return count
+
+def _apply_delta_changes(conn, changes, columns, applied_key, until):
+    with conn:
+        set_app_meta(conn, "applying_delta", 1)
+        for seq, table, pk, op, row in changes:
+            if table not in CHANGE_LOG_TABLES:
+                raise ValueError(f"Unknown table in delta pack: {table}")
+            if op == "D":
+                conn.execute(f"DELETE FROM {table} WHERE id=?", (pk,))
+            else:
+                if table not in columns:
+                    columns[table] = {info[1] for info in conn.execute(f"PRAGMA table_info({table})")}
+                keys = [k for k in row if k in columns[table]]
+                updates = ", ".join(f"{k}=excluded.{k}" for k in keys if k != "id")
+                conn.execute(
+                    f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({', '.join('?' * len(keys))}) "
+                    f"ON CONFLICT(id) DO {'UPDATE SET ' + updates if updates else 'NOTHING'}",
+                    [row[k] for k in keys]
+                )
+        conn.execute("DELETE FROM app_meta WHERE key='applying_delta'")
+        set_app_meta(conn, applied_key, until)
+    return len(changes)
 
-        self.date_to = QDateEdit()
-        self.date_to.setDisplayFormat("dd-MM-yyyy")
-        self.date_to.setCalendarPopup(True)
-        self.date_to.setMinimumWidth(120) 
+def write_auto_backup(db_path, backup_dir, event):
+    """
+    Takes a full copy when there is no base from the last AUTO_BACKUP_FULL_EVERY_DAYS
+    days, otherwise only a delta pack of the changes since the previous auto
+    backup (nothing at all when nothing changed). To restore, copy the newest
+    auto_full_*.db and apply the auto_*.delta.json.gz files written after it, in order.
+    A full copy takes the closed-year archive files along. Returns the file written, or None.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    conn = sqlite3.connect(db_path)
+    try:
+        last_seq = get_change_seq(conn)
+        full_at = get_app_meta(conn, "backup_full_at")
+        backup_seq = get_app_meta(conn, "backup_seq")
+        if (full_at is None or backup_seq is None
+                or (date.today() - date.fromisoformat(full_at)).days >= AUTO_BACKUP_FULL_EVERY_DAYS):
+            backup_file = os.path.join(backup_dir, f"auto_full_{event}_{timestamp}.db")
+            dest = sqlite3.connect(backup_file)
+            conn.backup(dest)
+            dest.close()
+            copy_archive_files(db_path, backup_dir)
+            set_app_meta(conn, "backup_full_at", date.today().isoformat())
+        elif last_seq > int(backup_seq):
+            backup_file = os.path.join(backup_dir, f"auto_{event}_{timestamp}.delta.json.gz")
+            export_delta_pack(conn, backup_file, int(backup_seq))
+        else:
+            return None
+        set_app_meta(conn, "backup_seq", last_seq)
+        prune_change_log(conn)
+        conn.commit()
+        return backup_file
+    finally:
+        conn.close()
 
-        today = QDate.currentDate()
-        first_of_month = QDate(today.year(), today.month(), 1)
-        self.date_from.setDate(first_of_month)
-        self.date_to.setDate(today)
+def delta_cli(argv):
+    parser = argparse.ArgumentParser(
+        prog="NBS --delta",
+        description="Export the changes since a sequence number to a delta pack, or apply a pack to this database."
+    )
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--export", metavar="PACK", help="write a delta pack (.json.gz)")
+    group.add_argument("--apply", metavar="PACK", help="apply a delta pack")
+    parser.add_argument("--since", type=int, default=None,
+                        help="export changes after this sequence number (default: after the last export)")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        ensure_change_log(conn)
+        if args.export:
+            since = args.since if args.since is not None else int(get_app_meta(conn, "delta_export_seq", 0))
+            try:
+                until, count = export_delta_pack(conn, args.export, since)
+            except ValueError as e:
+                print(f"Could not export: {e}", file=sys.stderr)
+                return 1
+            set_app_meta(conn, "delta_export_seq", until)
+            prune_change_log(conn)
+            conn.commit()
+            print(f"{count} changes ({since + 1 if count else since}..{until}) written to {args.export}")
+        else:
+            try:
+                count = apply_delta_pack(conn, args.apply)
+            except (ValueError, sqlite3.Error) as e:
+                print(f"Could not apply {args.apply}: {e}", file=sys.stderr)
+                return 1
+            print(f"{count} changes applied from {args.apply}")
+    finally:
+        conn.close()
+    return 0
 
-        self.category_input = QComboBox()
-        self.category_input.addItem("All", None)
+class RefCache:
+    """
+    Process-wide copy of the small lookup lists behind combos and completers.
+    One long-lived read connection watches PRAGMA data_version, which moves
+    whenever any other connection commits; only then are table_versions read,
+    and only the lists whose tables changed are reloaded.
+    """
+    SOURCES = {
+        "income_categories": (("income_categories",), "SELECT id, name FROM income_categories"),
+        "expense_categories": (("expense_categories",), "SELECT id, name FROM expense_categories"),
+        "vendors": (("vendors",), "SELECT id, name FROM vendors ORDER BY name COLLATE NOCASE ASC"),
+        "employees": (("employees",), "SELECT id, name FROM employees"),
+        "descriptions": (("daily_income", "daily_expense"), """
+            SELECT description FROM daily_income WHERE description IS NOT NULL AND description <> ''
+            UNION
+            SELECT description FROM daily_expense WHERE description IS NOT NULL AND description <> ''
+        """),
+    }
 
-        self.description_input = QLineEdit()
-        self.description_input.setPlaceholderText("Description contains...")
-        # Auto-complete for Description
-        desc_completer = QCompleter(get_all_descriptions())
-        desc_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.description_input.setCompleter(desc_completer)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = None
+        self._db_path = None
+        self._entries = {}  # name -> (data_version, table versions or None, rows)
+
+    def _connection(self):
+        path = os.path.abspath(DB_NAME)
+        if self._conn is None or self._db_path != path:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._db_path = path
+            self._entries.clear()
+        return self._conn
+
+    def get(self, name):
+        tables, sql = self.SOURCES[name]
+        with self._lock:
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == data_version:
+                return entry[2]
+            versions = get_table_versions(conn, tables)
+            if entry is not None and versions is not None and entry[1] == versions:
+                rows = entry[2]
+            else:
+                rows = conn.execute(sql).fetchall()
+                if name == "descriptions":
+                    rows = [row[0] for row in rows]
+            self._entries[name] = (data_version, versions, rows)
+            return rows
 
-        filter_layout.addWidget(QLabel("Month:"))
-        filter_layout.addWidget(self.month_combo)
+REF_CACHE = RefCache()
 
-        filter_layout.addWidget(QLabel("From:"))
-        filter_layout.addWidget(self.date_from)
-        filter_layout.addWidget(QLabel("To:"))
-        filter_layout.addWidget(self.date_to)
-        filter_layout.addWidget(QLabel("Category:"))
-        filter_layout.addWidget(self.category_input)
-        filter_layout.addWidget(self.description_input)
+QUERY_CACHE_SIZE = 256
 
-        self.clear_button = QPushButton("Clear All Filters")
-        filter_layout.addWidget(self.clear_button)
-        self.clear_button.clicked.connect(self.clear_all_filters)
+class QueryCache:
+    """
+    Read-through cache of query results keyed on (database file, SQL, params)
+    and tagged with the tables the query reads. An entry stays valid while the
+    table_versions counters of those tables (bumped by triggers) and their
+    process-local generations (bumped by invalidate(), for tables without
+    triggers) are unchanged. The least recently used entries are dropped past
+    `capacity`. Cached rows are shared between callers: do not modify them.
+    Queries without tables, in-memory databases and databases without
+    table_versions are never cached.
+    """
 
-        vbox.addLayout(filter_layout)
-        self.refresh_categories()
+    def __init__(self, capacity=QUERY_CACHE_SIZE):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stamp, rows)
+        self._generations = {}
+        self.hits = self.misses = self.evictions = 0
+
+    def _stamp(self, conn, tables):
+        versions = get_table_versions(conn, tables)
+        if versions is None:
+            return None
+        with self._lock:
+            return tuple((t, versions[t], self._generations.get(t, 0)) for t in tables)
+
+    def fetchall(self, conn, sql, params=(), tables=()):
+        tables = tuple(sorted(set(tables)))
+        db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+        stamp = self._stamp(conn, tables) if tables and db_file else None
+        key = (db_file, sql, tuple(params))
+        with self._lock:
+            entry = self._entries.get(key) if stamp is not None else None
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # The stamp was taken before the read, so a write in between only makes the entry stale sooner
+        rows = conn.execute(sql, params).fetchall()
+        if stamp is not None:
+            with self._lock:
+                self._entries[key] = (stamp, rows)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return rows
+
+    def fetchone(self, conn, sql, params=(), tables=()):
+        rows = self.fetchall(conn, sql, params, tables)
+        return rows[0] if rows else None
+
+    def scalar(self, conn, sql, params=(), tables=()):
+        row = self.fetchone(conn, sql, params, tables)
+        return row[0] if row else None
 
-    def refresh_categories(self):
-        self.category_input.clear()
-        self.category_input.addItem("All", None)
-        for cid, name in get_income_categories():
-            self.category_input.addItem(f"Income: {name}", f"inc:{cid}")
-        for cid, name in get_expense_categories():
-            self.category_input.addItem(f"Expense: {name}", f"exp:{cid}")
-        self.category_input.addItem("Capital: Additional Capital", "capital:additional_capital")
+    def invalidate(self, *tables):
+        """Marks entries reading any of `tables` stale; with no tables, empties the cache."""
+        with self._lock:
+            if not tables:
+                self._entries.clear()
+                return
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries), "capacity": self.capacity, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
 
-    def clear_all_filters(self):
-        today = QDate.currentDate()
-        first_of_month = QDate(today.year(), today.month(), 1)
-        self.date_from.setDate(first_of_month)
-        self.date_to.setDate(today)
-        self.month_combo.setCurrentIndex(QDate.currentDate().month())  # selects current month
-        self.category_input.setCurrentIndex(0)
-        self.description_input.clear()
+QUERY_CACHE = QueryCache()
 
-    def on_month_selected(self):
-        month = self.month_combo.currentData()
-        today = QDate.currentDate()
-        year = today.year()
-        if month is None:
-            first = QDate(year, 1, 1)
-            last = QDate(year, 12, 31)
-            self.date_from.setDate(first)
-            self.date_to.setDate(last)
-        else:
-            first = QDate(year, month, 1)
-            last = first.addMonths(1).addDays(-1)
-            self.date_from.setDate(first)
-            if month == today.month() and year == today.year():
-                self.date_to.setDate(today)
-            else:
-                self.date_to.setDate(last)
+class VendorIndex:
+    """
+    In-memory vendor list behind the vendor search boxes: vendors sorted by
+    name, a trigram -> positions map for substring search, and every vendor's
+    current balance, all loaded by one grouped query. refresh() reloads only
+    when vendors or vendor_transactions changed; search() never touches the
+    database.
+    """
 
-class DashboardTab(QWidget):
     def __init__(self):
-        super().__init__()
-        self.selected_month = date.today().month
-        self.selected_year = date.today().year
-        self.setStyleSheet(DIALOG_STYLESHEET)
-        self.layout = QVBoxLayout(self)
+        self.versions = None
+        self.vendors = []  # VendorRecord, sorted by name
+        self.lower_names = []
+        self.trigrams = {}
+        self.balances = {}
+        self.total_payable = 0
+
+    def refresh(self, conn=None):
+        own_conn = conn is None
+        if own_conn:
+            conn = get_conn()
+        try:
+            versions = get_table_versions(conn, ("vendors", "vendor_transactions"))
+            if versions is not None and versions == self.versions:
+                return False
+            rows = conn.execute(f"""
+                SELECT v.id, v.name, v.contact, COALESCE(v.opening_balance, 0),
+                       COALESCE(v.opening_balance, 0) + COALESCE(SUM({VENDOR_SIGNED_AMOUNT_SQL}), 0)
+                FROM vendors v
+                LEFT JOIN vendor_transactions vt ON vt.vendor_id = v.id
+                GROUP BY v.id
+                ORDER BY v.name COLLATE NOCASE ASC
+            """).fetchall()
+        finally:
+            if own_conn:
+                conn.close()
+        self.versions = versions
+        self.vendors = VendorRecord.from_rows(rows)
+        self.lower_names = [(vendor.name or "").lower() for vendor in self.vendors]
+        self.trigrams = {}
+        for pos, name in enumerate(self.lower_names):
+            for i in range(len(name) - 2):
+                self.trigrams.setdefault(name[i:i + 3], set()).add(pos)
+        self.balances = {vendor.id: vendor.balance for vendor in self.vendors}
+        self.total_payable = sum(balance for balance in self.balances.values() if balance > 0)
+        return True
+
+    def search(self, text):
+        """Positions in self.vendors whose name contains `text` (case-insensitive), in name order."""
+        text = text.strip().lower()
+        if not text:
+            return list(range(len(self.vendors)))
+        if len(text) < 3:
+            return [pos for pos, name in enumerate(self.lower_names) if text in name]
+        postings = [self.trigrams.get(text[i:i + 3]) for i in range(len(text) - 2)]
+        if not all(postings):
+            return []
+        candidates = min(postings, key=len)
+        return sorted(pos for pos in candidates if text in self.lower_names[pos])
 
-        # Header
-        title = QLabel("Dashboard", self)
-        title.setObjectName("dashboardTitle")
-        title.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.layout.addWidget(title)
-        subtitle = QLabel("Quick snapshot of your business finances", self)
-        subtitle.setObjectName("dashboardSubtitle")
-        subtitle.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        self.layout.addWidget(subtitle)
-
-        # Month/Year Picker Row
-        self.topRow = QHBoxLayout()
-        self.month_combo = QComboBox()
-        for m in range(1, 13):
-            self.month_combo.addItem(QDate(2000, m, 1).toString("MMMM"), m)
-        self.month_combo.setCurrentIndex(self.selected_month - 1)
-        self.month_combo.currentIndexChanged.connect(self.set_month)
-
-        self.year_combo = QComboBox()
-        for y in range(date.today().year, 1999, -1):
-            self.year_combo.addItem(str(y), y)
-        self.year_combo.setCurrentText(str(self.selected_year))
-        self.year_combo.currentIndexChanged.connect(self.set_month)
-
-        self.export_pdf_btn = QPushButton("Export PDF")
-        self.export_pdf_btn.setIcon(QIcon.fromTheme("document-save"))
-        self.export_pdf_btn.setStyleSheet("""
-            QPushButton {
-                background: #fb700e;
-                color: #fff;
-                border-radius: 12px;
-                font-weight: 600;
-                padding: 8px 18px;
-                font-size: 16px;
-                letter-spacing: 0.5px;
-            }
-            QPushButton:hover {
-                background: #ff9800;
-            }
-        """)
-        self.export_pdf_btn.clicked.connect(self.export_monthly_report_pdf)
+def ensure_default_income_categories():
+    conn = get_conn()
+    c = conn.cursor()
+    for name in INCOME_CATEGORIES:
+        c.execute("INSERT OR IGNORE INTO income_categories (name) VALUES (?)", (name,))
+    conn.commit()
+    conn.close()
 
-        self.topRow.addWidget(QLabel("Month:", self))
-        self.topRow.addWidget(self.month_combo)
-        self.topRow.addWidget(QLabel("Year:", self))
-        self.topRow.addWidget(self.year_combo)
-        self.topRow.addStretch()
-        self.topRow.addWidget(self.export_pdf_btn)
-        self.layout.addLayout(self.topRow)
+# --- Report data (shared by the UI exports and the batch runner) ---
+def fetch_monthly_report(conn, month, year):
+    """
+    Collects the per-day Sales/Services/Expenses figures for one month.
+    Only days that have at least one income or expense entry are listed.
+    """
+    date_from = f"{year}-{month:02}-01"
+    date_to = f"{year}-{month:02}-31"
+    income_src = ledger_source(conn, "daily_income", ("date", "amount", "category_id"), date_from, date_to)
+    expense_src = ledger_source(conn, "daily_expense", ("date", "amount"), date_from, date_to)
+    capital_src = ledger_source(conn, "daily_capital", ("date", "amount", "category"), date_from, date_to)
+    income_rows = QUERY_CACHE.fetchall(conn, f"""
+        SELECT di.date,
+               COALESCE(SUM(CASE WHEN ic.name='Sales' THEN di.amount END), 0),
+               COALESCE(SUM(CASE WHEN ic.name='Services' THEN di.amount END), 0)
+        FROM {income_src} di
+        LEFT JOIN income_categories ic ON di.category_id=ic.id
+        WHERE di.date BETWEEN ? AND ?
+        GROUP BY di.date
+    """, (date_from, date_to), ("daily_income", "income_categories"))
+    income_by_day = {d: (sales, services) for d, sales, services in income_rows}
+    expenses_by_day = dict(QUERY_CACHE.fetchall(
+        conn, f"SELECT date, COALESCE(SUM(amount), 0) FROM {expense_src} WHERE date BETWEEN ? AND ? GROUP BY date",
+        (date_from, date_to), ("daily_expense",)
+    ))
+
+    report = {
+        "rows": [],
+        "total_sales": 0, "total_services": 0, "total_income": 0,
+        "total_expenses": 0, "total_balance": 0,
+    }
+    for day in sorted(set(income_by_day) | set(expenses_by_day)):
+        sales, services = income_by_day.get(day, (0, 0))
+        daily_income = sales + services
+        expenses = expenses_by_day.get(day, 0)
+        balance = daily_income - expenses
+        report["rows"].append((day, sales, services, daily_income, expenses, balance))
+        report["total_sales"] += sales
+        report["total_services"] += services
+        report["total_income"] += daily_income
+        report["total_expenses"] += expenses
+        report["total_balance"] += balance
+
+    report["additional_capital"] = QUERY_CACHE.scalar(
+        conn, f"SELECT COALESCE(SUM(amount),0) FROM {capital_src} WHERE date BETWEEN ? AND ? AND category='Additional Capital'",
+        (date_from, date_to), ("daily_capital",)
+    ) or 0
+    report["available_cash"] = report["total_income"] - report["total_expenses"] + report["additional_capital"]
+    report["profit_percent"] = (report["total_balance"] / report["total_income"] * 100) if report["total_income"] else 0
+    return report
+
+# Effect of a vendor transaction on the amount we owe the vendor
+VENDOR_SIGNED_AMOUNT_SQL = ("CASE type WHEN 'purchase' THEN amount WHEN 'payment' THEN -amount WHEN 'return' THEN -amount "
+                            "WHEN 'carry_forward' THEN amount ELSE 0 END")
+STATEMENT_PAGE_SIZE = 200
+
+def get_vendor_opening_balance(conn, vendor_id):
+    row = conn.execute("SELECT opening_balance FROM vendors WHERE id=?", (vendor_id,)).fetchone()
+    return (row[0] or 0) if row else 0
+
+def fetch_vendor_statement(conn, vendor_id):
+    """Returns (opening balance, [(date, type, amount, due_date, running balance)]) for the whole history."""
+    opening_balance = get_vendor_opening_balance(conn, vendor_id)
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT date, type, amount, due_date,
+               ? + SUM({VENDOR_SIGNED_AMOUNT_SQL}) OVER (ORDER BY date, id ROWS UNBOUNDED PRECEDING)
+        FROM vendor_transactions
+        WHERE vendor_id=?
+        ORDER BY date ASC, id ASC
+    ''', (opening_balance, vendor_id))
+    return opening_balance, c.fetchall()
+
+def update_vendor_checkpoints(conn, vendor_id):
+    """
+    Adds the missing month-end checkpoints for one vendor, continuing from the
+    latest valid one, and commits them. Does nothing on a read-only connection
+    or one with a transaction open, which is the caller's to end.
+    """
+    if conn.in_transaction or is_readonly_conn(conn):
+        return
+    c = conn.cursor()
+    last = c.execute(
+        "SELECT period, cumulative FROM vendor_balance_checkpoints WHERE vendor_id=? ORDER BY period DESC LIMIT 1",
+        (vendor_id,)
+    ).fetchone()
+    last_period, cumulative = last if last else ("", 0)
+    c.execute(f"""
+        SELECT substr(date, 1, 7) AS period, SUM({VENDOR_SIGNED_AMOUNT_SQL})
+        FROM vendor_transactions
+        WHERE vendor_id=? AND date > ?
+        GROUP BY period
+        ORDER BY period
+    """, (vendor_id, f"{last_period}-99" if last_period else ""))
+    new_rows = []
+    for period, total in c.fetchall():
+        cumulative += total or 0
+        new_rows.append((vendor_id, period, cumulative))
+    if new_rows:
+        c.executemany("INSERT OR REPLACE INTO vendor_balance_checkpoints (vendor_id, period, cumulative) VALUES (?, ?, ?)", new_rows)
+        conn.commit()
 
-        # Modern Rectangle KPI Cards Section in a grid
-        self.kpiGrid = QGridLayout()
-        self.kpiGrid.setSpacing(18)
-        self.layout.addSpacing(18)
-        self.layout.addLayout(self.kpiGrid)
+def vendor_balance_as_of(conn, vendor_id, as_of_iso):
+    """
+    What we owed the vendor at the end of `as_of_iso` (YYYY-MM-DD): opening
+    balance + the last checkpoint before that month + the rows after it up to
+    the date. Dates in a closed year are read from that year's archive.
+    """
+    opening_balance = get_vendor_opening_balance(conn, vendor_id)
+    closed = get_closed_through(conn)
+    if closed is not None and as_of_iso <= f"{closed}-12-31":
+        # the first archive holding the date also holds the carry-forward of the close before it
+        year = conn.execute(
+            "SELECT MIN(year) FROM main.fiscal_archives WHERE year >= ?", (int(as_of_iso[:4]),)
+        ).fetchone()[0]
+        src = ledger_source(conn, "vendor_transactions", ("vendor_id", "date", "type", "amount"),
+                            f"{year}-12-31", f"{year}-12-31")
+        # the live file's carry-forward of that year restates what the archive already holds
+        row = conn.execute(
+            f"SELECT COALESCE(SUM({VENDOR_SIGNED_AMOUNT_SQL}), 0) FROM {src} WHERE vendor_id=? AND date <= ? "
+            f"AND NOT (type = 'carry_forward' AND date = ?)",
+            (vendor_id, as_of_iso, f"{year}-12-31")
+        ).fetchone()
+        return opening_balance + row[0]
+    update_vendor_checkpoints(conn, vendor_id)
+    # when the update was skipped the checkpoints may stop short; the sum covers the gap
+    row = conn.execute(
+        "SELECT period, cumulative FROM vendor_balance_checkpoints WHERE vendor_id=? AND period < ? ORDER BY period DESC LIMIT 1",
+        (vendor_id, as_of_iso[:7])
+    ).fetchone()
+    after, checkpoint = (f"{row[0]}-99", row[1]) if row else ("", 0)
+    row = conn.execute(
+        f"SELECT COALESCE(SUM({VENDOR_SIGNED_AMOUNT_SQL}), 0) FROM vendor_transactions WHERE vendor_id=? AND date > ? AND date <= ?",
+        (vendor_id, after, as_of_iso)
+    ).fetchone()
+    return opening_balance + checkpoint + row[0]
+
+AP_AGING_BUCKETS = ("Current", "1-30 Days", "31-60 Days", "61-90 Days", "90+ Days")
+
+# Purchases still open per vendor: payments, returns and credits settle the
+# oldest debits first (the opening balance, then by due date). Parameters:
+# (cutoff, cutoff) to consider only transactions dated up to cutoff, or (None, None).
+AP_OPEN_ITEMS_CTE = """
+    WITH ledger AS (
+        SELECT id AS vendor_id, '0001-01-01' AS due, 0 AS tid,
+               MAX(COALESCE(opening_balance, 0), 0) AS debit,
+               MAX(-COALESCE(opening_balance, 0), 0) AS credit
+        FROM vendors
+        UNION ALL
+        SELECT vendor_id, COALESCE(due_date, date), id,
+               CASE WHEN type='purchase' THEN amount WHEN type='carry_forward' THEN MAX(amount, 0) ELSE 0 END,
+               CASE WHEN type IN ('payment', 'return') THEN amount WHEN type='carry_forward' THEN MAX(-amount, 0) ELSE 0 END
+        FROM vendor_transactions
+        WHERE ? IS NULL OR date <= ?
+    ),
+    fifo AS (
+        SELECT vendor_id, due, tid, debit,
+               SUM(debit) OVER (PARTITION BY vendor_id ORDER BY due, tid ROWS UNBOUNDED PRECEDING) AS settled_upto,
+               SUM(credit) OVER (PARTITION BY vendor_id) AS total_credit
+        FROM ledger
+    ),
+    open_items AS (
+        SELECT vendor_id, due, tid, MIN(debit, settled_upto - total_credit) AS open_amount
+        FROM fifo
+        WHERE debit > 0 AND settled_upto > total_credit
+    )
+"""
 
-        self.layout.addStretch(1)
-        self.refresh()
+def fetch_ap_aging(conn, as_of_iso=None):
+    """
+    Open payables per vendor split into AP_AGING_BUCKETS by days past due:
+    {vendor_id: [current, 1-30, 31-60, 61-90, 90+]} in fils. Payments and
+    returns settle the oldest purchases first; a positive opening balance is
+    the oldest item (90+), a negative one is a credit. The query result is cached
+    in QUERY_CACHE until vendors or vendor_transactions change.
+    """
+    # a given date also cuts off the later purchases and payments; without one everything counts
+    cutoff = as_of_iso
+    as_of_iso = as_of_iso or date.today().isoformat()
+    rows = QUERY_CACHE.fetchall(conn, AP_OPEN_ITEMS_CTE + """
+        SELECT vendor_id,
+               SUM(CASE WHEN age <= 0 THEN open_amount ELSE 0 END),
+               SUM(CASE WHEN age BETWEEN 1 AND 30 THEN open_amount ELSE 0 END),
+               SUM(CASE WHEN age BETWEEN 31 AND 60 THEN open_amount ELSE 0 END),
+               SUM(CASE WHEN age BETWEEN 61 AND 90 THEN open_amount ELSE 0 END),
+               SUM(CASE WHEN age > 90 THEN open_amount ELSE 0 END)
+        FROM (
+            SELECT vendor_id, open_amount, COALESCE(CAST(julianday(?) - julianday(due) AS INTEGER), 0) AS age
+            FROM open_items
+        )
+        GROUP BY vendor_id
+    """, (cutoff, cutoff, as_of_iso), ("vendors", "vendor_transactions"))
+    return {row[0]: list(row[1:]) for row in rows}
 
-    def set_month(self):
-        self.selected_month = self.month_combo.currentData()
-        self.selected_year = self.year_combo.currentData()
-        self.refresh()
+def ap_aging_totals(aging):
+    return [sum(buckets[i] for buckets in aging.values()) for i in range(len(AP_AGING_BUCKETS))]
 
-    def get_total_accounts_payable(self):
-        conn = get_conn()
-        c = conn.cursor()
-        total_payable = 0.0
-        c.execute("SELECT id, opening_balance FROM vendors")
-        vendors = c.fetchall()
-        for vid, opening_balance in vendors:
-            c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='purchase'", (vid,))
-            purchases = c.fetchone()[0] or 0
-            c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='payment'", (vid,))
-            payments = c.fetchone()[0] or 0
-            c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='return'", (vid,))
-            returns = c.fetchone()[0] or 0
-            balance = opening_balance + purchases - payments - returns
-            if balance > 0:
-                total_payable += balance
-        conn.close()
-        return total_payable
+# Both must match idx_vendor_transactions_invoice word for word for SQLite to use it
+INVOICE_KEY_SQL = "UPPER(TRIM(invoice_no))"
+INVOICE_WHERE_SQL = "type = 'purchase' AND invoice_no <> ''"
 
-    def kpi_card_rect(self, icon, title, amount, color, bg="#232627"):
-        box = QFrame()
-        box.setStyleSheet(
-            f"""
-                QFrame {{
-                    background: {bg};
-                    border-radius: 5px;
-                    padding: 0px 0px;
-                    /* Remove border for no outline */
-                }}
-            """
+def invoice_source(conn):
+    """
+    vendor_transactions together with the archives of the last
+    ARCHIVE_ATTACH_LIMIT closed years, for the duplicate-invoice checks. The
+    archives are attached on first use, so a connection that checks inside a
+    transaction has to call this once before it begins.
+    """
+    closed = get_closed_through(conn)
+    if closed is None:
+        return "vendor_transactions"
+    return ledger_source(conn, "vendor_transactions", ("id", "vendor_id", "date", "type", "amount", "invoice_no"),
+                         f"{closed - ARCHIVE_ATTACH_LIMIT + 1}-01-01", f"{closed}-12-31")
+
+def find_duplicate_invoices(conn, vendor_id, invoice_no, exclude_id=None):
+    """Earlier purchases from the vendor with the same invoice number, closed years included, as [(id, date, amount)]."""
+    key = (invoice_no or "").strip().upper()
+    if not key:
+        return []
+    rows = conn.execute(
+        f"SELECT id, date, amount FROM {invoice_source(conn)} "
+        f"WHERE vendor_id = ? AND {INVOICE_KEY_SQL} = ? AND {INVOICE_WHERE_SQL}",
+        (vendor_id, key)
+    ).fetchall()
+    # sorted here: an ORDER BY date would steer the planner onto the (vendor_id, date) index
+    return sorted((row for row in rows if row[0] != exclude_id), key=lambda r: (r[1] or "", r[0]))
+
+def scan_duplicate_invoices(conn):
+    """
+    Every invoice number entered more than once for the same vendor, closed
+    years included, found with one grouped pass over the invoice index.
+    Returns [{"vendor_id", "vendor", "invoice_no", "count", "total",
+    "entries": [(id, date, amount)]}].
+    """
+    rows = conn.execute(f"""
+        SELECT vendor_id, COALESCE(v.name, ''), MIN(invoice_no), COUNT(*), SUM(amount),
+               GROUP_CONCAT(t.id || '|' || COALESCE(date, '') || '|' || amount, ';')
+        FROM {invoice_source(conn)} t LEFT JOIN vendors v ON v.id = vendor_id
+        WHERE {INVOICE_WHERE_SQL}
+        GROUP BY vendor_id, {INVOICE_KEY_SQL}
+        HAVING COUNT(*) > 1
+        ORDER BY LOWER(v.name), 3
+    """).fetchall()
+    duplicates = []
+    for vendor_id, vendor, invoice_no, count, total, packed in rows:
+        entries = []
+        for part in packed.split(";"):
+            entry_id, entry_date, amount = part.split("|")
+            entries.append((int(entry_id), entry_date, int(amount)))
+        entries.sort(key=lambda e: (e[1], e[0]))
+        duplicates.append({"vendor_id": vendor_id, "vendor": vendor, "invoice_no": invoice_no.strip(),
+                           "count": count, "total": total, "entries": entries})
+    return duplicates
+
+def fetch_vendor_statement_page(conn, vendor_id, before=None, page_size=STATEMENT_PAGE_SIZE):
+    """
+    One page of a vendor statement, seeking backwards from the (date, id) cursor
+    `before` (None = latest page). Rows come back oldest first as
+    (id, date, invoice_no, type, amount, due_date, payment_mode, note, balance);
+    the running balance includes the opening balance and every earlier row.
+    """
+    opening_balance = get_vendor_opening_balance(conn, vendor_id)
+    before_date, before_id = before if before else (None, None)
+    c = conn.cursor()
+    c.execute(f'''
+        WITH page AS (
+            SELECT id, date, invoice_no, type, amount, due_date, payment_mode, note,
+                   {VENDOR_SIGNED_AMOUNT_SQL} AS signed
+            FROM vendor_transactions
+            WHERE vendor_id=? AND (? IS NULL OR (date, id) < (?, ?))
+            ORDER BY date DESC, id DESC
+            LIMIT ?
         )
-        h = QHBoxLayout(box)
-        h.setContentsMargins(8, 4, 8, 4)
-        h.setSpacing(4)
-        icon_label = QLabel(icon)
-        icon_label.setStyleSheet(f"font-size:38px; color:{color};")
-        icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        h.addWidget(icon_label, 0, Qt.AlignmentFlag.AlignVCenter)
-        right = QVBoxLayout()
-        right.setContentsMargins(0, 0, 0, 0)
-        title_label = QLabel(title)
-        title_label.setStyleSheet("font-size:16px;color:#bcbcbc; font-weight:700; margin-bottom:0px;")
-        right.addWidget(title_label)
-        amount_label = QLabel(amount)
-        amount_label.setStyleSheet(
-            f"font-size:24px;font-weight:700;color:{color};margin-top:2px;letter-spacing:1px;"
+        SELECT id, date, invoice_no, type, amount, due_date, payment_mode, note,
+               SUM(signed) OVER (ORDER BY date, id ROWS UNBOUNDED PRECEDING)
+        FROM page
+        ORDER BY date ASC, id ASC
+    ''', (vendor_id, before_date, before_date, before_id, page_size))
+    rows = c.fetchall()
+    if not rows:
+        return {"rows": [], "cursor": before, "has_more": False,
+                "carried_forward": opening_balance, "closing_balance": opening_balance}
+    first_id, first_date = rows[0][0], rows[0][1]
+    c.execute(f'''
+        SELECT COALESCE(SUM({VENDOR_SIGNED_AMOUNT_SQL}), 0), COUNT(*)
+        FROM vendor_transactions
+        WHERE vendor_id=? AND (date, id) < (?, ?)
+    ''', (vendor_id, first_date, first_id))
+    earlier_sum, earlier_count = c.fetchone()
+    carried_forward = opening_balance + earlier_sum
+    return {
+        "rows": [row[:8] + (carried_forward + row[8],) for row in rows],
+        "cursor": (first_date, first_id),
+        "has_more": earlier_count > 0,
+        "carried_forward": carried_forward,
+        "closing_balance": carried_forward + rows[-1][8],
+    }
+
+# --- Fiscal-year archives ---
+# Closing a year moves its rows into <db name>_<year>.db next to the live file;
+# vendor and employee balances continue from carry-forward rows dated 31 December.
+ARCHIVE_TABLES = ("daily_income", "daily_expense", "daily_capital", "vendor_transactions", "employee_payroll")
+ARCHIVE_LOOKUP_TABLES = ("income_categories", "expense_categories", "vendors", "employees")
+ARCHIVE_ATTACH_LIMIT = 8  # SQLite allows 10 attached databases per connection by default
+
+def ensure_fiscal_archives(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fiscal_archives (
+            year INTEGER PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            closed_at TEXT,
+            row_count INTEGER
         )
-        right.addWidget(amount_label)
-        right.addStretch()
-        h.addLayout(right)
-        return box
-
-    def refresh(self):
-        # Remove old KPI cards
-        for i in reversed(range(self.kpiGrid.count())):
-            w = self.kpiGrid.itemAt(i).widget()
-            if w:
-                self.kpiGrid.removeWidget(w)
-                w.deleteLater()
-
-        conn = get_conn()
-        c = conn.cursor()
-        q_month = f"{self.selected_month:02}"
-        q_year = str(self.selected_year)
-        c.execute("SELECT SUM(amount) FROM daily_income WHERE strftime('%m', date)=? AND strftime('%Y', date)=?", (q_month, q_year))
-        income = c.fetchone()[0] or 0
-        c.execute("SELECT SUM(amount) FROM daily_expense WHERE strftime('%m', date)=? AND strftime('%Y', date)=?", (q_month, q_year))
-        expenses = c.fetchone()[0] or 0
-        balance = income - expenses
-        profit_percent = (balance / income * 100) if income > 0 else 0
-        total_payable = self.get_total_accounts_payable()
+    """)
+    conn.commit()
 
-        card_data = [
-            ("\U0001F4B0", "Total Income", f"{income:,.2f} AED", "#43a047"),
-            ("\U0001F4B8", "Total Expenses", f"{expenses:,.2f} AED", "#e53935"),
-            ("\U0001F4B5", "Balance", f"{balance:,.2f} AED", "#fbc02d" if balance >= 0 else "#e53935"),
-            ("\U0001F4C8", "Profit %", f"{profit_percent:,.2f} %", "#43a047" if profit_percent >= 0 else "#e53935"),
-            ("\U0001F4B3", "A/P Vendors", f"{total_payable:,.2f} AED", "#fb700e"),
-            
-            ]
-        
+def get_closed_through(conn):
+    """Last closed fiscal year, or None."""
+    try:
+        return conn.execute("SELECT MAX(year) FROM main.fiscal_archives").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
 
-        # Arrange cards in a grid: 3 in first row, 2 in second row
-        num_columns = 3
-        for idx, data in enumerate(card_data):
-            row = idx // num_columns
-            col = idx % num_columns
-            self.kpiGrid.addWidget(self.kpi_card_rect(*data), row, col)
+def check_open_period(conn, date_iso):
+    closed = get_closed_through(conn)
+    if closed is not None and (date_iso or "") <= f"{closed}-12-31":
+        raise ValueError(f"{closed} and earlier years are closed; entries dated "
+                         f"{to_ddmmyyyy(date_iso)} can no longer be added or changed.")
 
-        conn.close()
+def archive_file_path(db_path, file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), file_name)
 
-    def export_monthly_report_pdf(self):
-        month = self.selected_month
-        year = self.selected_year
-        q_month = f"{month:02}"
-        q_year = str(year)
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("""
-            SELECT DISTINCT date FROM (
-                SELECT date FROM daily_income
-                UNION
-                SELECT date FROM daily_expense
-            ) WHERE strftime('%m', date)=? AND strftime('%Y', date)=?
-            ORDER BY date
-        """, (q_month, q_year))
-        days = [row[0] for row in c.fetchall()]
+class MissingArchiveError(ValueError):
+    """An archive recorded in fiscal_archives is not next to the database any more."""
 
-        rows = []
-        total_sales = 0
-        total_services = 0
-        total_income = 0
-        total_expenses = 0
-        total_balance = 0
-
-        for day in days:
-            c.execute("""
-                SELECT SUM(amount) FROM daily_income di
-                LEFT JOIN income_categories ic ON di.category_id=ic.id
-                WHERE di.date=? AND ic.name='Sales'
-            """, (day,))
-            sales = c.fetchone()[0] or 0
-
-            c.execute("""
-                SELECT SUM(amount) FROM daily_income di
-                LEFT JOIN income_categories ic ON di.category_id=ic.id
-                WHERE di.date=? AND ic.name='Services'
-            """, (day,))
-            services = c.fetchone()[0] or 0
-
-            daily_income = sales + services
-
-            c.execute("SELECT SUM(amount) FROM daily_expense WHERE date=?", (day,))
-            expenses = c.fetchone()[0] or 0
-
-            balance = daily_income - expenses
-            profit_percent = (balance / daily_income * 100) if daily_income > 0 else 0
-
-            rows.append((to_ddmmyyyy(day), sales, services, daily_income, expenses, balance, profit_percent))
-
-            total_sales += sales
-            total_services += services
-            total_income += daily_income
-            total_expenses += expenses
-            total_balance += balance
-
-        total_profit_percent = (total_balance / total_income * 100) if total_income > 0 else 0
-
-        html = f"""
-        <div style='font-family: Arial, sans-serif;'>
-        <h2 style='text-align:center; margin-bottom:20px; font-size:28px;'>Monthly Report - {QDate(year, month, 1).toString('MMMM yyyy')}</h2>
-        <table border='1' cellspacing='0' cellpadding='12' width='100%' style='font-size:22px; border-collapse:collapse; text-align:center;'>
-            <tr style='background:#232627; color:#fff; font-size:22px;'>
-                <th>Date</th>
-                <th>Income (Sales)</th>
-                <th>Income (Services)</th>
-                <th>Total Income</th>
-                <th>Expenses</th>
-                <th>Balance</th>
-                <th>Profit %</th>
-            </tr>
-        """
-        for d, sales, services, income, expenses, balance, profit in rows:
-            html += f"""
-            <tr>
-                <td>{d}</td>
-                <td>{sales:.2f}</td>
-                <td>{services:.2f}</td>
-                <td>{income:.2f}</td>
-                <td>{expenses:.2f}</td>
-                <td>{balance:.2f}</td>
-                <td>{profit:.2f}</td>
-            </tr>
-            """
-        html += f"""
-            <tr style='font-weight:bold; background:#e0e0e0; color:#000; font-size:23px;'>
-                <td>Totals</td>
-                <td>{total_sales:.2f}</td>
-                <td>{total_services:.2f}</td>
-                <td>{total_income:.2f}</td>
-                <td>{total_expenses:.2f}</td>
-                <td>{total_balance:.2f}</td>
-                <td>{total_profit_percent:.2f}</td>
-            </tr>
-        </table>
-        </div>
-        """
+    def __init__(self, year, path):
+        super().__init__(f"The archive of {year} was not found at {path}. "
+                         f"Put the file back (or restore it from a backup) to read {year}.")
+        self.year = year
+        self.path = path
 
-        doc = QTextDocument()
-        doc.setHtml(html)
+def ledger_source(conn, table, columns, date_from, date_to, skip_missing=False):
+    """
+    FROM-clause text for `table` over [date_from, date_to]: the table itself while
+    the range stays in open years, otherwise a UNION ALL with the archives of the
+    closed years it reaches, attached to `conn` on first use (so `conn` must not
+    be inside a transaction). Raises MissingArchiveError for an archive file that
+    has been moved away, unless `skip_missing` leaves its year out.
+    """
+    archives = conn.execute(
+        "SELECT year, file_name FROM main.fiscal_archives WHERE year BETWEEN ? AND ? ORDER BY year",
+        (int(date_from[:4]), int(date_to[:4]))
+    ).fetchall() if get_closed_through(conn) is not None else []
+    if not archives:
+        return table
+    if len(archives) > ARCHIVE_ATTACH_LIMIT:
+        raise ValueError(f"The date range reaches into {len(archives)} closed years; "
+                         f"at most {ARCHIVE_ATTACH_LIMIT} can be read at once.")
+    attached = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+    parts = [f"SELECT {', '.join(columns)} FROM main.{table}"]
+    for year, file_name in archives:
+        schema = f"archive_{year}"
+        if schema not in attached:
+            path = archive_file_path(attached["main"], file_name)
+            if not os.path.exists(path):
+                if skip_missing:
+                    continue
+                raise MissingArchiveError(year, path)
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        present = {info[1] for info in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+        if present:
+            select = ", ".join(col if col in present else f"NULL AS {col}" for col in columns)
+            parts.append(f"SELECT {select} FROM {schema}.{table}")
+    if len(parts) == 1:
+        return table
+    return "(" + " UNION ALL ".join(parts) + ")"
+
+_reported_missing_archives = set()
+
+def warn_missing_archive(parent, error):
+    """Shows a MissingArchiveError once per file and session."""
+    if error.path not in _reported_missing_archives:
+        _reported_missing_archives.add(error.path)
+        QMessageBox.warning(parent, "Archive Missing", str(error))
+
+def view_ledger_source(parent, conn, table, columns, date_from, date_to):
+    """ledger_source for on-screen views: a missing archive is reported, then its year is left out."""
+    try:
+        return ledger_source(conn, table, columns, date_from, date_to)
+    except MissingArchiveError as e:
+        warn_missing_archive(parent, e)
+        return ledger_source(conn, table, columns, date_from, date_to, skip_missing=True)
 
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
-        printer.setPageMargins(QMarginsF(10, 10, 10, 10), QPageLayout.Unit.Millimeter)
-        printer.setPageOrientation(QPageLayout.Orientation.Portrait)
+def copy_archive_files(db_path, dest_dir):
+    """
+    Copies the archive files recorded in the database at `db_path` into
+    `dest_dir` under their recorded names, so a copy of the database placed
+    there still reads its closed years. Returns the names that were not found.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        names = ([row[0] for row in conn.execute("SELECT file_name FROM fiscal_archives ORDER BY year")]
+                 if get_closed_through(conn) is not None else [])
+    finally:
+        conn.close()
+    missing = []
+    for name in names:
+        src = archive_file_path(db_path, name)
+        dest = os.path.join(dest_dir, name)
+        if not os.path.exists(src):
+            missing.append(name)
+        elif os.path.abspath(src) != os.path.abspath(dest) and (
+                not os.path.exists(dest) or os.path.getsize(dest) != os.path.getsize(src)):
+            # archives do not change once written, so a file of the same size is already the copy
+            shutil.copyfile(src, dest)
+    return missing
+
+def _create_archive_table(conn, table, create_sql):
+    create_sql = re.sub(rf'^CREATE TABLE\s+(IF NOT EXISTS\s+)?"?{table}"?', f'CREATE TABLE IF NOT EXISTS archive."{table}"',
+                        create_sql, count=1, flags=re.IGNORECASE)
+    conn.execute(create_sql)
+    main_cols = [info[1] for info in conn.execute(f"PRAGMA main.table_info({table})")]
+    archive_cols = {info[1] for info in conn.execute(f"PRAGMA archive.table_info({table})")}
+    return ", ".join(col for col in main_cols if col in archive_cols)
+
+def _close_one_year(conn, db_path, year, log_change=True):
+    end = f"{year}-12-31"
+    file_name = f"{os.path.splitext(os.path.basename(db_path))[0]}_{year}.db"
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_file_path(db_path, file_name),))
+    try:
+        create_sql = dict(conn.execute("SELECT name, sql FROM main.sqlite_master WHERE type='table'"))
+        columns = {table: _create_archive_table(conn, table, create_sql[table])
+                   for table in ARCHIVE_TABLES + ARCHIVE_LOOKUP_TABLES}
+        conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_vendor_transactions_invoice ON vendor_transactions "
+                     f"(vendor_id, {INVOICE_KEY_SQL}) WHERE {INVOICE_WHERE_SQL}")
+        closed_at = datetime.now().isoformat(timespec="seconds")
+        with conn:
+            # the moves below are not logged row by row; the close is logged as one "C" change instead
+            set_app_meta(conn, "applying_delta", 1)
+            for table in ARCHIVE_LOOKUP_TABLES:
+                conn.execute(f"INSERT OR REPLACE INTO archive.{table} ({columns[table]}) "
+                             f"SELECT {columns[table]} FROM main.{table}")
+            # entries made for this year after earlier years were closed land here too
+            row_count = 0
+            for table in ARCHIVE_TABLES:
+                row_count += conn.execute(f"INSERT INTO archive.{table} ({columns[table]}) "
+                                          f"SELECT {columns[table]} FROM main.{table} WHERE date <= ?", (end,)).rowcount
+
+            # carry-forward rows, worked out before anything is removed
+            open_items = conn.execute(AP_OPEN_ITEMS_CTE + """
+                SELECT vendor_id, due, open_amount FROM open_items WHERE tid > 0 ORDER BY vendor_id, due, tid
+            """, (end, end)).fetchall()
+            vendor_nets = conn.execute(f"""
+                SELECT vendor_id, SUM({VENDOR_SIGNED_AMOUNT_SQL}) FROM main.vendor_transactions
+                WHERE date <= ? GROUP BY vendor_id
+            """, (end,)).fetchall()
+            payroll_nets = conn.execute("""
+                SELECT employee_id,
+                       COALESCE(SUM(CASE WHEN type IN ('Advance', 'Carry Forward') THEN debit END), 0)
+                       - COALESCE(SUM(CASE WHEN type IN ('Deduction', 'Carry Forward') THEN credit END), 0),
+                       (SELECT balance FROM main.employee_payroll lp
+                        WHERE lp.employee_id = ep.employee_id AND lp.date <= ?
+                        ORDER BY lp.date DESC, lp.id DESC LIMIT 1)
+                FROM main.employee_payroll ep WHERE date <= ? GROUP BY employee_id
+            """, (end, end)).fetchall()
+
+            # rows that stay live keep working once their (archived) source is gone
+            conn.execute("""
+                UPDATE main.daily_expense SET vendor_transaction_id = NULL WHERE date > ?
+                AND vendor_transaction_id IN (SELECT id FROM main.vendor_transactions WHERE date <= ?)
+            """, (end, end))
+            conn.execute("""
+                UPDATE main.daily_expense SET payroll_id = NULL WHERE date > ?
+                AND payroll_id IN (SELECT id FROM main.employee_payroll WHERE date <= ?)
+            """, (end, end))
+            conn.execute("""
+                UPDATE main.cheques SET vendor_transaction_id = NULL
+                WHERE vendor_transaction_id IN (SELECT id FROM main.vendor_transactions WHERE date <= ?)
+            """, (end,))
+            for table in ARCHIVE_TABLES:
+                conn.execute(f"DELETE FROM main.{table} WHERE date <= ?", (end,))
+
+            note = f"Balance brought forward from {year}"
+            items_by_vendor = {}
+            for vendor_id, due, amount in open_items:
+                items_by_vendor.setdefault(vendor_id, []).append((due, amount))
+            for vendor_id, net in vendor_nets:
+                items = items_by_vendor.get(vendor_id, [])
+                # what is not an open purchase settles (or adds to) the opening balance first
+                rest = (net or 0) - sum(amount for _, amount in items)
+                if rest:
+                    rest_due = min([due for due, _ in items] + [f"{year}-01-01"]) if rest > 0 else None
+                    items.insert(0, (rest_due, rest))
+                conn.executemany("""
+                    INSERT INTO main.vendor_transactions (vendor_id, date, type, amount, note, due_date)
+                    VALUES (?, ?, 'carry_forward', ?, ?, ?)
+                """, [(vendor_id, end, amount, note, due) for due, amount in items])
+            conn.executemany("""
+                INSERT INTO main.employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes)
+                VALUES (?, ?, 'Carry Forward', ?, ?, ?, ?, ?)
+            """, [(employee_id, end, abs(net), max(net, 0), max(-net, 0), balance or 0, note)
+                  for employee_id, net, balance in payroll_nets if net or balance])
+            conn.execute("INSERT INTO main.fiscal_archives (year, file_name, closed_at, row_count) VALUES (?, ?, ?, ?)",
+                         (year, file_name, closed_at, row_count))
+            conn.execute("DELETE FROM main.app_meta WHERE key='applying_delta'")
+            if log_change:
+                conn.execute("INSERT INTO main.change_log (table_name, pk, op) VALUES ('fiscal_archives', ?, 'C')", (year,))
+    finally:
+        conn.execute("DETACH DATABASE archive")
+    return {"year": year, "file": archive_file_path(db_path, file_name), "rows": row_count}
+
+def close_fiscal_years(db_path, through_year):
+    """
+    Closes every open year up to and including `through_year`, oldest first,
+    one archive file per year. Each year is a single transaction over the live
+    and the archive file, so a failure leaves both as they were. The live file
+    is compacted afterwards. Returns [{year, file, rows}].
+    """
+    if through_year >= date.today().year:
+        raise ValueError("Only years that have already ended can be closed.")
+    conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT)
+    try:
+        closed = get_closed_through(conn)
+        if closed is not None and through_year <= closed:
+            raise ValueError(f"{through_year} is already closed.")
+        if closed is not None:
+            first_year = closed + 1
+        else:
+            first_dates = [conn.execute(f"SELECT MIN(date) FROM {table}").fetchone()[0] for table in ARCHIVE_TABLES]
+            first_dates = [d for d in first_dates if d and d[:4].isdigit()]
+            first_year = min(int(min(first_dates)[:4]), through_year) if first_dates else through_year
+        results = [_close_one_year(conn, db_path, year) for year in range(first_year, through_year + 1)]
+        conn.execute("VACUUM")
+        return results
+    finally:
+        conn.close()
 
-        preview = QPrintPreviewDialog(printer, self)
-        preview.setWindowTitle("Print Preview - Monthly Report")
-        preview.paintRequested.connect(doc.print)
-        preview.exec()
+def close_year_cli(argv):
+    parser = argparse.ArgumentParser(
+        prog="NBS --close-year",
+        description="Move closed fiscal years into per-year archive files, leaving carry-forward balances."
+    )
+    parser.add_argument("year", type=int, help="last year to close")
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        results = close_fiscal_years(args.db, args.year)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"Could not close {args.year}: {e}", file=sys.stderr)
+        return 1
+    for r in results:
+        print(f"{r['year']}: {r['rows']} rows -> {r['file']}")
+    return 0
+
+# --- Ledger operations (shared by the tabs and the ledger service) ---
+# These write through `conn` without committing; the caller owns the transaction.
+
+def add_cashflow_entry(conn, entry_type, date_iso, amount, category_id=None, description="", notes=""):
+    """
+    Adds an Income, Expense or Capital entry and returns its id. Raises
+    ValueError for a second Sales/Services income on the same date or a date
+    in a closed year.
+    """
+    check_open_period(conn, date_iso)
+    if entry_type == "Income":
+        row = conn.execute("SELECT name FROM income_categories WHERE id=?", (category_id,)).fetchone()
+        cat_name = row[0].strip().lower() if row else ""
+        if cat_name in [name.lower() for name in INCOME_CATEGORIES]:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM daily_income WHERE date=? AND category_id=?", (date_iso, category_id)
+            ).fetchone()[0]
+            if count > 0:
+                raise ValueError(f"Only one '{cat_name.title()}' income entry is allowed per date.")
+        sql = "INSERT INTO daily_income (date, amount, category_id, description, notes) VALUES (?, ?, ?, ?, ?)"
+    elif entry_type == "Expense":
+        sql = "INSERT INTO daily_expense (date, amount, category_id, description, notes) VALUES (?, ?, ?, ?, ?)"
+    elif entry_type == "Capital":
+        sql = "INSERT INTO daily_capital (date, amount, category, description, notes) VALUES (?, ?, ?, ?, ?)"
+        category_id = "Additional Capital"
+    else:
+        raise ValueError(f"Unknown entry type: {entry_type}")
+    return conn.execute(sql, (date_iso, amount, category_id, description, notes)).lastrowid
+
+def add_vendor_transaction(conn, vendor_id, ttype, date_iso, amount, note="", due_iso=None, invoice_no="",
+                           payment_mode=None, bank_name=None, cheque_due=None):
+    """
+    Records a purchase, payment or return. A purchase with a bank name gets its
+    cheque; a payment is mirrored as a "Vendors" cashflow expense.
+    Returns (transaction id, whether a cheque was created).
+    """
+    check_open_period(conn, date_iso)
+    row = conn.execute("SELECT name FROM vendors WHERE id=?", (vendor_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown vendor id: {vendor_id}")
+    vendor_name = row[0]
+    cheque_created = False
+    if ttype == "purchase":
+        trans_id = conn.execute('''INSERT INTO vendor_transactions
+            (vendor_id, date, type, amount, note, due_date, invoice_no)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (vendor_id, date_iso, ttype, amount, note, due_iso, invoice_no)
+        ).lastrowid
+        if bank_name:
+            conn.execute('''INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid, vendor_transaction_id)
+                            VALUES (?, ?, ?, ?, ?, 0, ?)''',
+                         (date_iso, vendor_name, bank_name, cheque_due, amount, trans_id))
+            cheque_created = True
+    elif ttype == "payment":
+        trans_id = conn.execute('''INSERT INTO vendor_transactions
+            (vendor_id, date, type, amount, note, invoice_no, payment_mode)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (vendor_id, date_iso, ttype, amount, note, invoice_no, payment_mode)
+        ).lastrowid
+        mode_label = payment_mode.strip() if payment_mode else "Other"
+        conn.execute(
+            '''INSERT INTO daily_expense (date, amount, category_id, description, notes, vendor_transaction_id)
+            VALUES (?, ?, ?, ?, ?, ?)''',
+            (date_iso, amount, get_expense_category_id(conn, "Vendors"), vendor_name, f"Paid via {mode_label}", trans_id)
+        )
+    elif ttype == "return":
+        trans_id = conn.execute('''INSERT INTO vendor_transactions
+            (vendor_id, date, type, amount, note)
+            VALUES (?, ?, ?, ?, ?)''',
+            (vendor_id, date_iso, ttype, amount, note)
+        ).lastrowid
+    else:
+        raise ValueError(f"Unknown transaction type: {ttype}")
+    return trans_id, cheque_created
+
+def pay_cheque(conn, cheque_id):
+    """
+    Marks a cheque paid and books today's "Paid via Cheque" payment (with its
+    cashflow expense) against the vendor of the same name, if there is one.
+    Returns the payment's vendor transaction id, or None.
+    """
+    conn.execute("UPDATE cheques SET is_paid=1 WHERE id=?", (cheque_id,))
+    row = conn.execute("SELECT company_name, amount FROM cheques WHERE id=?", (cheque_id,)).fetchone()
+    if not row:
+        return None
+    vendor_name, amount = row
+    vrow = conn.execute("SELECT id FROM vendors WHERE name = ?", (vendor_name,)).fetchone()
+    if not vrow:
+        return None
+    trans_id, _ = add_vendor_transaction(
+        conn, vrow[0], "payment", date.today().isoformat(), amount, note="Paid via Cheque", invoice_no=None,
+        payment_mode="Cheque"
+    )
+    return trans_id
+
+# Outstanding advance per employee, as PayrollTab.update_employee_loan_balance works it out
+EMPLOYEE_LOAN_SQL = """
+    COALESCE(SUM(CASE WHEN p.type IN ('Advance', 'Carry Forward') THEN p.debit END), 0)
+    - COALESCE(SUM(CASE WHEN p.type IN ('Deduction', 'Carry Forward') THEN p.credit END), 0)
+"""
 
-        file_dialog = QFileDialog()
-        file_path, _ = file_dialog.getSaveFileName(self, "Save PDF", f"MonthlyReport_{q_year}-{q_month}.pdf", "PDF Files (*.pdf)")
-        if not file_path:
-            return
-        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-        printer.setOutputFileName(file_path)
-        doc.print(printer)
+def payroll_run_defaults(conn, pay_date_iso):
+    """
+    One row per employee for a payroll run: (employee id, name, salary, loan
+    balance, suggested deduction, date already paid this month or None). The
+    suggested deduction recovers the loan balance, up to one month's salary.
+    """
+    rows = conn.execute(f"""
+        SELECT e.id, e.name, COALESCE(e.salary, 0), {EMPLOYEE_LOAN_SQL},
+               MAX(CASE WHEN p.type = 'Salary Payment' AND substr(p.date, 1, 7) = ? THEN p.date END)
+        FROM employees e LEFT JOIN employee_payroll p ON p.employee_id = e.id
+        GROUP BY e.id
+        ORDER BY e.name COLLATE NOCASE
+    """, (pay_date_iso[:7],)).fetchall()
+    return [(eid, name, salary, loan, min(max(loan, 0), salary), paid) for eid, name, salary, loan, paid in rows]
+
+def payroll_line(employee_id, name, salary, deduction, loan):
+    """(employee id, name, net pay, deduction) for run_payroll; raises ValueError on a bad amount."""
+    if salary < 0 or deduction < 0:
+        raise ValueError(f"{name}: amounts must be zero or positive.")
+    if deduction > salary:
+        raise ValueError(f"{name}: the deduction is more than the salary.")
+    if deduction > max(loan, 0):
+        raise ValueError(f"{name}: the deduction is more than the loan balance ({fmt_money(loan)}).")
+    return employee_id, name, salary - deduction, deduction
+
+def run_payroll(conn, pay_date_iso, lines, notes=""):
+    """
+    Posts a payroll run from (employee id, name, net pay, deduction) lines: a
+    "Salary Payment" for the net pay (with its Salary cashflow expense unless it
+    is nil) and a "Deduction" against the loan when there is one. Inserts are
+    batched across employees. Returns the number of employees paid. The caller
+    commits.
+    """
+    check_open_period(conn, pay_date_iso)
+    lines = [line for line in lines if line[2] > 0 or line[3] > 0]
+    if not lines:
+        return 0
+    ids = [line[0] for line in lines]
+    marks = ",".join("?" * len(ids))
+    balances = dict(conn.execute(f"""
+        SELECT employee_id, balance FROM (
+            SELECT employee_id, balance,
+                   ROW_NUMBER() OVER (PARTITION BY employee_id ORDER BY date DESC, id DESC) AS rn
+            FROM employee_payroll WHERE employee_id IN ({marks})
+        ) WHERE rn = 1
+    """, ids).fetchall())
+    payroll_rows = []
+    for employee_id, _, paid, deduction in lines:
+        balance = balances.get(employee_id) or 0
+        # recorded even when the loan takes all of it, so the month shows as paid
+        payroll_rows.append((employee_id, pay_date_iso, "Salary Payment", paid, paid, 0, balance, notes))
+        if deduction > 0:
+            balance -= deduction
+            payroll_rows.append((employee_id, pay_date_iso, "Deduction", deduction, 0, deduction, balance, notes))
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM employee_payroll").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        payroll_rows
+    )
+    names = {line[0]: line[1] for line in lines}
+    category_id = get_expense_category_id(conn, "Salary")
+    conn.executemany(
+        "INSERT INTO daily_expense (date, amount, category_id, description, notes, payroll_id) VALUES (?, ?, ?, ?, ?, ?)",
+        [(pay_date_iso, amount, category_id, names[employee_id], "Payroll - Salary Payment", payroll_id)
+         for payroll_id, employee_id, amount in conn.execute(
+             "SELECT id, employee_id, amount FROM employee_payroll WHERE id > ? AND type = 'Salary Payment' AND amount > 0",
+             (last_id,)
+         ).fetchall()]
+    )
+    conn.execute(f"""
+        UPDATE employees SET loan_balance = (
+            SELECT {EMPLOYEE_LOAN_SQL} FROM employee_payroll p WHERE p.employee_id = employees.id
+        ) WHERE id IN ({marks})
+    """, ids)
+    return len(lines)
+
+def vendor_entry_columns(ttype, amount):
+    """(display type, debit, credit) for a vendor_transactions row, amounts in fils."""
+    if ttype == "purchase":
+        return "Purchase", amount, 0
+    if ttype in ("payment", "return"):
+        return ttype.capitalize(), 0, amount
+    if ttype == "carry_forward":
+        return "Brought Forward", max(amount, 0), max(-amount, 0)
+    return (ttype or "").capitalize(), 0, 0
+
+def build_vendor_statement_rows(opening_balance, rows):
+    """Returns (StatementRow list starting with the opening balance, closing balance)."""
+    balance = opening_balance
+    data_rows = [StatementRow(None, "Opening Balance", max(opening_balance, 0), max(-opening_balance, 0), balance, None)]
+    for date_str, ttype, amt, due, balance in rows:
+        ttype_display, debit, credit = vendor_entry_columns(ttype, amt)
+        data_rows.append(StatementRow(date_str, ttype_display, debit, credit, balance, due))
+    return data_rows, balance
+
+
+class ReportTemplate:
+    """
+    An HTML fragment with $name / ${name} placeholders ($$ is a literal $).
+    The text is split once into literal chunks and field names, so rendering
+    is a single join; values are inserted with str() and are not escaped.
+    """
+    _FIELD = re.compile(r"\$(?:(\$)|(\w+)|\{(\w+)\})")
+
+    def __init__(self, text):
+        self.literals = []
+        self.fields = []
+        chunk = []
+        pos = 0
+        for m in self._FIELD.finditer(text):
+            chunk.append(text[pos:m.start()])
+            pos = m.end()
+            if m.group(1):
+                chunk.append("$")
+                continue
+            self.literals.append("".join(chunk))
+            self.fields.append(m.group(2) or m.group(3))
+            chunk = []
+        chunk.append(text[pos:])
+        self.literals.append("".join(chunk))
 
-class DailyTab(QWidget):
-    def __init__(self, dashboard_tab, parent=None):
-        super().__init__(parent)
-        self.dashboard_tab = dashboard_tab
-        layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(10)
+    def render(self, values=None, **kwargs):
+        values = dict(values or {}, **kwargs) if kwargs else values
+        out = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            out.append(str(values[name]))
+            out.append(literal)
+        return "".join(out)
 
-        self.filter_widget = FilterWidget()
-        layout.addWidget(self.filter_widget)
-        self.filter_widget.date_from.dateChanged.connect(self.load_data)
-        self.filter_widget.date_to.dateChanged.connect(self.load_data)
-        self.filter_widget.category_input.currentIndexChanged.connect(self.load_data)
-        self.filter_widget.description_input.textChanged.connect(self.load_data)
-        self.filter_widget.clear_button.clicked.connect(self.load_data)
-        self.filter_widget.on_month_selected()
+    def render_rows(self, rows):
+        """Renders the template once per mapping in rows and joins the results."""
+        return "".join(map(self.render, rows))
 
-        layout.addSpacing(0)
 
-        # --- Button Row with left margin and Today label with right margin ---
-        btn_row = QHBoxLayout()
-        btn_row.setSpacing(0)
+class ReportBuilder:
+    """Collects rendered pieces of a report and joins them once at the end."""
 
-        # Container widget for left margin for buttons
-        btn_left_container = QWidget()
-        btn_left_layout = QHBoxLayout()
-        btn_left_layout.setContentsMargins(12, 0, 0, 0)
-        btn_left_layout.setSpacing(12)
-        btn_left_container.setLayout(btn_left_layout)
+    def __init__(self):
+        self.parts = []
 
-        self.add_entry_btn = QPushButton()
-        self.add_entry_btn.setToolTip("Add Income/Expense Entry (F1)")
-        self.add_entry_btn.setFixedSize(40, 40)
-        self.add_entry_btn.setStyleSheet(
-            "background:#26292A; color:white; border-radius: 3px;"
-        )
-        # Use standard Plus icon
-        self.add_entry_btn = QPushButton()
-        self.add_entry_btn.setToolTip("Add Income/Expense Entry (F1)")
-        self.add_entry_btn.setFixedSize(40, 40)
-        self.add_entry_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
+    def add(self, template, values=None, **kwargs):
+        self.parts.append(template.render(values, **kwargs))
+        return self
 
-        # Use 'list-add' theme icon if available, fallback to unicode plus
-        icon = QIcon.fromTheme("list-add")
-        if not icon.isNull():
-            self.add_entry_btn.setIcon(icon)
-            self.add_entry_btn.setIconSize(QSizeF(24, 24).toSize())
-            self.add_entry_btn.setText("")  # No text, icon-only
-        else:
-            self.add_entry_btn.setText("＋")
-            self.add_entry_btn.setFont(QFont("Arial", 22, QFont.Weight.Bold))
+    def add_rows(self, template, rows):
+        self.parts.append(template.render_rows(rows))
+        return self
 
-        self.add_entry_btn.clicked.connect(self.show_entry_dialog)
+    def html(self):
+        return "".join(self.parts)
 
-        # --- Print Button: now icon-only with tooltip ---
-        self.print_btn = QPushButton()
-        self.print_btn.setToolTip("Print Day Report (F12)")
-        self.print_btn.setFixedSize(40, 40)
-        self.print_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
 
-        printer_icon = QIcon.fromTheme("printer")
-        if not printer_icon.isNull():
-            self.print_btn.setIcon(printer_icon)
-            self.print_btn.setIconSize(QSizeF(24, 24).toSize())
-            self.print_btn.setText("")
-        else:
-            self.print_btn.setText("\U0001F5A8")  # Unicode printer emoji
+# Stylesheets are plain constants, shared by the GUI previews and the batch exports
+VENDOR_STATEMENT_CSS = '''            body {
+                font-family: Arial, sans-serif;
+                background: #fff;
+                font-size: 11px;
+                margin: 30px 12px 40px 12px;
+            }
+            h2 {
+                text-align: center;
+                color: #fb700e;
+                font-size: 25px;
+                margin-bottom: 10px;
+            }
+            h3 {
+                margin-bottom: 8px;
+                font-size: 15px;
+                text-align: center;
+            }
+            .summary {
+            display: flex;
+            flex-direction: row;
+            justify-content: space-between;
+            align-items: baseline;
+            font-size: 15px;
+            margin: 0 auto 18px auto;
+            max-width: 600px;
+            gap: 30px;
+        }
+        .summary-col {
+            display: flex;
+            flex-direction: row;
+            align-items: baseline;
+            white-space: nowrap;
+        }
+        .summary-col b {
+            margin-right: 4px;
+        }
+        .amount {
+            font-weight: bold;
+            margin-right: 4px;
+            min-width: 64px;
+            text-align: right;
+            display: inline-block;
+        }
+        .aed {
+            font-size: 12px;
+            margin-left: 2px;
+            color: #333;
+        }
+            table {
+                width: 100%;
+                border-collapse: collapse;
+                background: white;
+                font-size: 13px;
+                margin-top: 10px;
+            }
+            th, td {
+                border: 1px solid #ccc;
+                padding: 8px 7px;
+                text-align: left;
+                color: #232627;
+            }
+            th {
+                background-color: #232627;
+                color: #fff;
+                font-size: 13px;
+                text-align: center;
+            }
+            td:first-child, th:first-child {
+                text-align: left;
+            }
+            tr.opening-balance td {
+                background: #ffe0b2 !important;
+                font-weight: bold;
+            }
+            tr:nth-child(even):not(.opening-balance) {
+                background-color: #fafafa;
+            }
+            tfoot td {
+                border-top: 2px solid #232627;
+                font-weight: bold;
+                background: #f5f5f5;
+            }
+            .footer {
+                margin-top: 45px;
+                font-size: 12px;
+                color: #888;
+                text-align: right;
+            }
+            .signature-section {
+                margin-top: 45px;
+                font-size: 13px;
+            }
+            .signature-line {
+                width: 200px;
+                border-bottom: 1px solid #888;
+                margin: 32px 0 2px 0;
+            }
+            @media print {
+                body {
+                    margin: 0;
+                    background: #fff;
+                }
+                .footer, .signature-section {
+                    page-break-inside: avoid;
+                }
+                table, tr, td, th {
+                    page-break-inside: avoid;
+                }
+            }
+'''
 
-        self.print_btn.clicked.connect(self.print_day_report)
-        self.print_shortcut = QShortcut(QKeySequence("F12"), self)
-        self.print_shortcut.activated.connect(self.print_day_report)
-        btn_left_layout.addWidget(self.add_entry_btn)
-        btn_left_layout.addWidget(self.print_btn)
+MONTHLY_REPORT_CSS = '''body {
+    font-family: 'Segoe UI', 'Arial', sans-serif;
+    background: #f6f7fa;
+    color: #232627;
+    margin: 0;
+    padding: 0;
+}
+.wrapper {
+    max-width: 950px;
+    margin: 28px auto;
+    background: #fff;
+    border-radius: 18px;
+    box-shadow: 0 8px 30px rgba(0,0,0,0.10);
+    padding: 12px 36px 15px 36px;
+}
+.header {
+    display: flex;
+    align-items: center;
+    border-bottom: 4px solid #fb700e;
+    padding-bottom: 10px;
+}
+.logo {
+    height: 78px;
+    margin-right: 28px;
+}
+.title-section {
+    flex: 1;
+    text-align: right;
+}
+h1 {
+    margin: 0;
+    font-size: 22px;
+    font-weight: 800;
+    color: #fb700e;
+    letter-spacing: 1px;
+}
+h2 {
+    margin: 6px 0 0 0;
+    font-size: 17px;
+    color: #1e88e5;
+    font-weight: 700;
+}
+.report-table {
+    width: 100%;
+    border-collapse: separate;
+    border-spacing: 0;
+    margin: 20px 0 20px 0;
+    background: #fff;
+    border-radius: 5px;
+    overflow: hidden;
+    box-shadow: 0 2px 10px rgba(255,112,14,0.04);
+}
+.report-table th {
+    background: #fb700e;
+    color: #fff;
+    font-size: 12px;
+    font-weight: 700;
+    padding: 6px 0;
+    border: none;
+}
+.report-table td {
+    font-size: 12px;
+    padding: 4px 0;
+    border: none;
+    text-align: center;
+    transition: background 0.2s;
+}
+.report-table tr:nth-child(odd) td {
+    background: #faf8f4;
+}
+.report-table tr.total-row td {
+    background: #ffe0b2;
+    color: #1d2a3a;
+    font-weight: 700;
+    font-size: 14px;
+    border-top: 3px solid #fb700e;
+}
+.summary-box {
+    display: flex;
+    justify-content: space-between;
+    gap: 20px;
+    margin: 20px 0 0 0;
+}
+.summary-item {
+    flex: 1 1 0;
+    background: #f7fafe;
+    border-radius: 5px;
+    padding: 10px 5px 5px 10px;
+    box-shadow: 0 1px 6px rgba(30,136,229,0.04);
+    text-align: center;
+    border-left: 7px solid #fb700e;
+}
+.summary-item.blue { border-left-color: #1976d2; }
+.summary-item.green { border-left-color: #43a047; }
+.summary-item.orange { border-left-color: #fb700e; }
+.summary-title {
+    font-size: 15px;
+    color: #777;
+    font-weight: 700;
+    margin-bottom: 4px;
+    letter-spacing: 0.5px;
+}
+.summary-value {
+    font-size: 17px;
+    font-weight: bold;
+    color: #232627;
+}
+.summary-value.green { color: #43a047; }
+.summary-value.orange { color: #fb700e; }
+.summary-value.blue { color: #1976d2; }
+.summary-value.red { color: #e53935; }
+.footer {
+    margin-top: 20px;
+    text-align: right;
+    color: #888;
+    font-size: 13px;
+}
+@media print {
+    body, .wrapper { box-shadow:none; background: #fff; }
+}
+'''
 
-        btn_row.addWidget(btn_left_container)
-        btn_row.addStretch()
-        layout.addLayout(btn_row)
+VENDOR_STATEMENT_HEAD = ReportTemplate('''    <!DOCTYPE html>
+    <html lang='en'>
+    <head>
+        <meta charset='UTF-8'>
+        <title>Vendor Transactions Report</title>
+        <style>
+$css
+        </style>
+    </head>
+    <body>
 
-        layout.addSpacing(4)
+        <h2>Vendor Transactions Report</h2>
+        <h3>Vendor: <span style='color:#e53935'>$vendor_name</span></h3>
 
-        # --- Income and Expense Records label ---
-        label = QLabel("Income and Expense Records:")
-        label.setContentsMargins(8, 0, 0, 0)  # Horizontal gap from left for label
-        layout.addWidget(label)
+        <div class="summary">
+        <div class="summary-col">
+            <b>Opening Balance:</b>
+            <span class="amount">$opening_balance</span>
+            <span class="aed">AED</span>
+        </div>
+        <div class="summary-col">
+            <b>Current Balance:</b>
+            <span class="amount">$balance</span>
+            <span class="aed">AED</span>
+        </div>$as_of
+    </div>
 
-        layout.addSpacing(2)  # Gap between label and table
+        <table>
+            <thead>
+                <tr>
+                    <th>Date</th>
+                    <th>Type</th>
+                    <th>Debit (AED)</th>
+                    <th>Credit (AED)</th>
+                    <th>Balance (AED)</th>
+                    <th>Due Date</th>
+                </tr>
+            </thead>
+            <tbody>
+'''.replace("$css", VENDOR_STATEMENT_CSS.replace("$", "$$")))
+VENDOR_STATEMENT_AS_OF = ReportTemplate('''
+        <div class="summary-col">
+            <b>Balance as of $date:</b>
+            <span class="amount">$balance</span>
+            <span class="aed">AED</span>
+        </div>''')
+VENDOR_STATEMENT_OPENING_ROW = ReportTemplate('''            <tr class="opening-balance">
+                <td>$date</td>
+                <td>$type</td>
+                <td>$debit</td>
+                <td>$credit</td>
+                <td>$balance</td>
+                <td>$due</td>
+            </tr>
+''')
+VENDOR_STATEMENT_ROW = ReportTemplate('''            <tr>
+                <td>$date</td>
+                <td>$type</td>
+                <td>$debit</td>
+                <td>$credit</td>
+                <td>$balance</td>
+                <td>$due</td>
+            </tr>
+''')
+VENDOR_STATEMENT_TAIL = ReportTemplate('''            </tbody>
+        </table>
 
-        # --- Data Table ---
-        self.data_table = QTableWidget()
-        self.data_table.setWordWrap(True)
-        self.data_table.setColumnCount(8)
-        self.data_table.setHorizontalHeaderLabels([
-            'Date', 'Month', 'Type', 'Category', 'Description', 'Amount (AED)', 'Notes', 'ID'
-        ])
-        header = self.data_table.horizontalHeader()
-        self.data_table.setColumnWidth(0, 100)   # Date
-        self.data_table.setColumnWidth(1, 120)   # Month
-        self.data_table.setColumnWidth(2, 100)   # Type
-        self.data_table.setColumnWidth(3, 170)   # Category
-        self.data_table.setColumnWidth(4, 270)   # Description
-        self.data_table.setColumnWidth(5, 150)   # Amount
-        self.data_table.setColumnWidth(6, 200)   # Notes
-        self.data_table.setColumnHidden(7, True) # Hide ID
+        <div class="signature-section">
+            <div style="float:left;">
+                <div class="signature-line"></div>
+                <div>Prepared By</div>
+            </div>
+            <div style="float:right;">
+                <div class="signature-line"></div>
+                <div>Approved By</div>
+            </div>
+            <div style="clear:both;"></div>
+        </div>
 
-        # Set column resize modes: fixed for all except Notes, which stretches
-        for idx in range(7):
-            if idx == 6:
-                header.setSectionResizeMode(idx, QHeaderView.ResizeMode.Stretch)
-            else:
-                header.setSectionResizeMode(idx, QHeaderView.ResizeMode.Fixed)
+        <div class="footer">
+            Generated on: $generated_on
+        </div>
 
-        self.data_table.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.data_table.verticalHeader().setDefaultSectionSize(36)
+    </body>
+    </html>
+''')
+
+MONTHLY_REPORT_HEAD = ReportTemplate('''<html>
+<head>
+<style>
+$css
+</style>
+</head>
+<body>
+<div class="wrapper">
+    <div class="header">
+        $logo
+        <div class="title-section">
+            <h1>Monthly Financial Report</h1>
+            <h2>$month_title</h2>
+        </div>
+    </div>
+    <table class="report-table">
+        <tr>
+            <th>Date</th>
+            <th>Sales</th>
+            <th>Service</th>
+            <th>Total Income</th>
+            <th>Expenses</th>
+            <th>Balance</th>
+        </tr>
+'''.replace("$css", MONTHLY_REPORT_CSS.replace("$", "$$")))
+MONTHLY_REPORT_ROW = ReportTemplate('''        <tr>
+            <td>$date</td>
+            <td>$sales</td>
+            <td>$services</td>
+            <td>$income</td>
+            <td>$expenses</td>
+            <td class="summary-value $balance_class">$balance</td>
+        </tr>
+''')
+MONTHLY_REPORT_TAIL = ReportTemplate('''        <tr class="total-row">
+            <td>TOTAL</td>
+            <td>$total_sales</td>
+            <td>$total_services</td>
+            <td>$total_income</td>
+            <td>$total_expenses</td>
+            <td class="summary-value $total_balance_class">$total_balance</td>
+        </tr>
+    </table>
+    <div class="summary-box">
+        <div class="summary-item green">
+            <div class="summary-title">Available Cash in Hand</div>
+            <div class="summary-value green">$available_cash AED</div>
+        </div>
+        <div class="summary-item blue">
+            <div class="summary-title">Additional Capital</div>
+            <div class="summary-value blue">$additional_capital AED</div>
+        </div>
+        <div class="summary-item orange">
+            <div class="summary-title">Profit %</div>
+            <div class="summary-value orange">$profit_percent %</div>
+        </div>
+    </div>
+    <div class="footer">
+        Generated on: $generated_on
+    </div>
+</div>
+</body>
+</html>
+''')
+
+def build_vendor_statement_html(vendor_name, opening_balance, balance, data_rows, as_of=None):
+    """`as_of` is an optional (date_iso, balance) pair shown next to the current balance."""
+    as_of_html = ""
+    if as_of:
+        as_of_html = VENDOR_STATEMENT_AS_OF.render(date=to_ddmmyyyy(as_of[0]), balance=fmt_money(as_of[1], True))
+    report = ReportBuilder().add(
+        VENDOR_STATEMENT_HEAD, vendor_name=vendor_name, opening_balance=fmt_money(opening_balance, True),
+        balance=fmt_money(balance, True), as_of=as_of_html,
+    )
+    if data_rows:
+        report.add(VENDOR_STATEMENT_OPENING_ROW, data_rows[0].formatted())
+        report.add_rows(VENDOR_STATEMENT_ROW, (row.formatted() for row in data_rows[1:]))
+    report.add(VENDOR_STATEMENT_TAIL, generated_on=datetime.now().strftime("%d-%m-%Y %H:%M"))
+    return report.html()
+
+
+LOGO_PATH = os.path.join(os.path.expanduser("~"), ".national_bicycles_logo.png")
+_logo_html = None
+
+
+def get_logo_html():
+    """The logo as an inline <img>, read and base64-encoded once until invalidate_logo_cache()."""
+    global _logo_html
+    if _logo_html is None:
+        _logo_html = ""
+        if os.path.exists(LOGO_PATH):
+            with open(LOGO_PATH, "rb") as f:
+                logo_data = base64.b64encode(f.read()).decode("utf-8")
+            _logo_html = f"<img class='logo' src='data:image/png;base64,{logo_data}'/>"
+    return _logo_html
 
-        layout.addWidget(self.data_table)
 
-        layout.addSpacing(12)  # Gap before totals
+_logo_image = None
 
-        # --- Totals frame: now Add. Capital last ---
-        self.totals_frame = QFrame()
-        self.totals_frame.setFrameShape(QFrame.Shape.NoFrame)
-        self.totals_frame.setObjectName("totalsbox")
-        totals_layout = QHBoxLayout(self.totals_frame)
-        totals_layout.setSpacing(18)
-        totals_layout.setContentsMargins(0, 7, 0, 7)
-        def card(style, text):
-            box = QFrame()
-            box.setFrameShape(QFrame.Shape.StyledPanel)
-            box.setStyleSheet(style)
-            v = QVBoxLayout(box)
-            v.setContentsMargins(14, 10, 14, 10)
-            v.setSpacing(2)
-            label = QLabel(text)
-            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            v.addWidget(label)
-            return box, label
-        card_style = lambda c: (f"background: {c}; border-radius:15px;"
-            "border: none; color:#F1F3F4; min-width:135px; font-weight:bold; font-size:17px;")
-        self.total_income_box, self.total_income_label = card(card_style("#232627"), "Income")
-        self.total_expense_box, self.total_expense_label = card(card_style("#232627"), "Expense")
-        self.balance_box, self.balance_label = card(card_style("#232627"), "Balance")
-        self.profit_box, self.profit_label = card(card_style("#232627"), "Profit %")
-        self.capital_box, self.capital_label = card(card_style("#232627"), "Add. Capital")
-        totals_layout.addWidget(self.total_income_box)
-        totals_layout.addWidget(self.total_expense_box)
-        totals_layout.addWidget(self.balance_box)
-        totals_layout.addWidget(self.profit_box)
-        totals_layout.addWidget(self.capital_box)
-        self.totals_frame.setLayout(totals_layout)
-        layout.addWidget(self.totals_frame)
 
-        self.data_table.doubleClicked.connect(self.handle_table_double_click)
-        self.setLayout(layout)
-        self.load_data()
-        self.data_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.data_table.clearSelection()
-        self.data_table.setCurrentCell(-1, -1)
+def get_logo_image():
+    """The logo as a QImage for the native PDF reports (None if there is no logo), cached like get_logo_html()."""
+    global _logo_image
+    if _logo_image is None:
+        _logo_image = QImage(LOGO_PATH) if os.path.exists(LOGO_PATH) else QImage()
+    return None if _logo_image.isNull() else _logo_image
 
-    def show_entry_dialog(self):
-        dialog = IncomeExpenseEntryDialog(self)
-        if dialog.exec():
-            (
-                date_iso,
-                type_str,
-                cat_id,
-                amount_text,
-                desc,
-                notes
-            ) = dialog.get_values()
-            amt = parse_amount(amount_text)
-            if amt <= 0:
-                QMessageBox.warning(self, "Amount Required", "Please enter a valid amount greater than zero.")
-                return
-            conn = get_conn()
-            c = conn.cursor()
-            if type_str == "Income":
-                # Duplicate Sales/Services check, as before
-                c.execute("SELECT name FROM income_categories WHERE id=?", (cat_id,))
-                cat_row = c.fetchone()
-                cat_name = cat_row[0].strip().lower() if cat_row else ""
-                if cat_name in [name.lower() for name in INCOME_CATEGORIES]:
-                    c.execute(
-                        "SELECT COUNT(*) FROM daily_income WHERE date=? AND category_id=?",
-                        (date_iso, cat_id)
-                    )
-                    if c.fetchone()[0] > 0:
-                        QMessageBox.warning(
-                            self,
-                            "Duplicate Entry",
-                            f"Only one '{cat_name.title()}' income entry is allowed per date."
-                        )
-                        conn.close()
-                        return
-                # Insert Income
-                c.execute(
-                    "INSERT INTO daily_income (date, amount, category_id, description, notes) VALUES (?, ?, ?, ?, ?)",
-                    (date_iso, amt, cat_id, desc, notes),
-                )
-            elif type_str == "Expense":
-                c.execute(
-                    "INSERT INTO daily_expense (date, amount, category_id, description, notes) VALUES (?, ?, ?, ?, ?)",
-                    (date_iso, amt, cat_id, desc, notes),
-                )
-            elif type_str == "Capital":
-                
-                c.execute(
-                    "INSERT INTO daily_capital (date, amount, category, description, notes) VALUES (?, ?, ?, ?, ?)",
-                    (date_iso, amt, "Additional Capital", desc, notes),
-                )
-            conn.commit()
-            conn.close()
-            self.load_data()
-            self.dashboard_tab.refresh()
 
-    def load_data(self):
-        date_from = self.filter_widget.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.filter_widget.date_to.date().toString("yyyy-MM-dd")
-        cat = self.filter_widget.category_input.currentData()
-        desc_filter = self.filter_widget.description_input.text().strip().lower()
+def invalidate_logo_cache():
+    global _logo_html, _logo_image
+    _logo_html = None
+    _logo_image = None
 
-        conn = get_conn()
-        c = conn.cursor()
-        rows = []
-        params = []
 
-        # Fetch income and expense records
-        if not cat or cat == "All":
-            final_query = """
-            SELECT di.date, di.amount, ic.name, 'Income', di.description, di.id, di.category_id, di.notes
-            FROM daily_income di
-            LEFT JOIN income_categories ic ON di.category_id = ic.id
-            WHERE di.date BETWEEN ? AND ?
+def build_monthly_report_html(report, month, year, logo_html=""):
+    def day_rows():
+        for d, sales, services, income, expenses, balance in report["rows"]:
+            yield {
+                "date": to_ddmmyyyy(d), "sales": fmt_money(sales, True), "services": fmt_money(services, True),
+                "income": fmt_money(income, True), "expenses": fmt_money(expenses, True),
+                "balance": fmt_money(balance, True), "balance_class": "red" if balance < 0 else "green",
+            }
+
+    total_balance = report["total_balance"]
+    return (ReportBuilder()
+            .add(MONTHLY_REPORT_HEAD, logo=logo_html or "", month_title=QDate(year, month, 1).toString('MMMM yyyy'))
+            .add_rows(MONTHLY_REPORT_ROW, day_rows())
+            .add(MONTHLY_REPORT_TAIL,
+                 total_sales=fmt_money(report["total_sales"], True),
+                 total_services=fmt_money(report["total_services"], True),
+                 total_income=fmt_money(report["total_income"], True),
+                 total_expenses=fmt_money(report["total_expenses"], True),
+                 total_balance=fmt_money(total_balance, True),
+                 total_balance_class="red" if total_balance < 0 else "green",
+                 available_cash=fmt_money(report["available_cash"], True),
+                 additional_capital=fmt_money(report["additional_capital"], True),
+                 profit_percent=f"{report['profit_percent']:,.2f}",
+                 generated_on=datetime.now().strftime('%d-%m-%Y %H:%M'))
+            .html())
+
+
+# --- Native PDF reports (QPainter on QPdfWriter / QPrinter) ---
+PDF_MARGIN_MM = 10
+PDF_FONT_FAMILY = "Arial"
+PDF_ORANGE, PDF_BLUE, PDF_GREEN, PDF_RED, PDF_DARK = "#fb700e", "#1976d2", "#43a047", "#e53935", "#232627"
+
+
+class TabularReport:
+    """
+    A one-table A4 report drawn directly with QPainter: title block, optional
+    summary boxes, a table whose header repeats on every page, a totals row,
+    closing boxes, signature lines and a "page i of n" footer.
+
+    The layout is computed once, in points, into a list of drawing operations
+    per page; paint() replays it on any paged device (a QPdfWriter for the file,
+    the QPrinter of a QPrintPreviewDialog for the preview) scaled to its DPI.
+
+    columns are (header, relative width, "left" | "center" | "right"); rows are
+    tuples of already formatted strings. row_styles maps a row index to a dict
+    with optional "fill", "bold" and "colors" ({column index: colour}).
+    summary/closing are (label, value, colour) boxes above/below the table.
+    """
+    ROW_PADDING = 4
+
+    def __init__(self, title, columns, rows, subtitle="", totals=None, summary=(), closing=(),
+                 logo=None, signatures=(), row_styles=None, footer=""):
+        self.title = title
+        self.subtitle = subtitle
+        self.columns = columns
+        self.rows = rows
+        self.totals = totals
+        self.summary = summary
+        self.closing = closing
+        self.logo = logo
+        self.signatures = signatures
+        self.row_styles = row_styles or {}
+        self.footer = footer or f"Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M')}"
+        self._pages = None
+
+    @staticmethod
+    def page_layout():
+        return QPageLayout(QPageSize(QPageSize.PageSizeId.A4), QPageLayout.Orientation.Portrait,
+                           QMarginsF(PDF_MARGIN_MM, PDF_MARGIN_MM, PDF_MARGIN_MM, PDF_MARGIN_MM),
+                           QPageLayout.Unit.Millimeter)
+
+    @staticmethod
+    def _font(size, bold=False):
+        # Pixel sizes in a point-based coordinate system: the painter scale maps them to the device
+        font = QFont(PDF_FONT_FAMILY)
+        font.setPixelSize(size)
+        font.setBold(bold)
+        return font
+
+    @property
+    def page_count(self):
+        return len(self.layout())
+
+    def layout(self):
+        if self._pages is not None:
+            return self._pages
+        area = QRectF(self.page_layout().paintRectPoints())
+        width, height = area.width(), area.height()
+        fonts = {
+            "title": self._font(18, True), "subtitle": self._font(13, True), "cell": self._font(9),
+            "cell_bold": self._font(9, True), "box_label": self._font(9, True), "box_value": self._font(12, True),
+            "small": self._font(8),
+        }
+        self.fonts = fonts
+        metrics = {key: QFontMetricsF(font) for key, font in fonts.items()}
+        row_h = metrics["cell"].height() + 2 * self.ROW_PADDING
+        footer_h = metrics["small"].height() + 6
+        bottom = height - footer_h
+        box_h = metrics["box_label"].height() + metrics["box_value"].height() + 12
+
+        total_weight = sum(weight for _, weight, _ in self.columns) or 1
+        col_x, x = [], 0.0
+        for _, weight, _ in self.columns:
+            w = width * weight / total_weight
+            col_x.append((x, w))
+            x += w
+        aligns = {"left": Qt.AlignmentFlag.AlignLeft, "center": Qt.AlignmentFlag.AlignHCenter,
+                  "right": Qt.AlignmentFlag.AlignRight}
+        col_align = [aligns[align] | Qt.AlignmentFlag.AlignVCenter for _, _, align in self.columns]
+
+        pages = []
+        state = {"y": 0.0}
+
+        def text(rect, value, font, color=PDF_DARK, flags=Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter):
+            pages[-1].append(("text", rect, value, font, color, flags))
+
+        def cells(y, values, font_key, colors=None):
+            fm = metrics[font_key]
+            for i, value in enumerate(values):
+                cx, cw = col_x[i]
+                inner = cw - 2 * self.ROW_PADDING
+                shown = fm.elidedText(str(value), Qt.TextElideMode.ElideRight, inner)
+                color = (colors or {}).get(i, PDF_DARK)
+                text(QRectF(cx + self.ROW_PADDING, y, inner, row_h), shown, font_key, color, col_align[i])
+
+        def boxes(items):
+            y = state["y"]
+            gap = 12
+            bw = (width - gap * (len(items) - 1)) / len(items)
+            for i, (label, value, color) in enumerate(items):
+                bx = i * (bw + gap)
+                pages[-1].append(("fill", QRectF(bx, y, bw, box_h), "#f7fafe"))
+                pages[-1].append(("fill", QRectF(bx, y, 5, box_h), color))
+                text(QRectF(bx + 10, y + 4, bw - 14, metrics["box_label"].height()), label, "box_label", "#777777")
+                text(QRectF(bx + 10, y + 6 + metrics["box_label"].height(), bw - 14, metrics["box_value"].height()),
+                     value, "box_value", color)
+            state["y"] = y + box_h + 12
+
+        def table_header():
+            y = state["y"]
+            pages[-1].append(("fill", QRectF(0, y, width, row_h), PDF_DARK))
+            cells(y, [header for header, _, _ in self.columns], "cell_bold", {i: "#ffffff" for i in range(len(self.columns))})
+            state["y"] = y + row_h
+
+        def new_page(with_header=True):
+            pages.append([])
+            y = 0.0
+            if len(pages) == 1:
+                title_h = metrics["title"].height()
+                sub_h = metrics["subtitle"].height() if self.subtitle else 0
+                block_h = max(title_h + sub_h + 4, 50 if self.logo is not None else 0)
+                if self.logo is not None:
+                    logo_w = 50 * self.logo.width() / max(1, self.logo.height())
+                    pages[-1].append(("image", QRectF(0, 0, logo_w, 50), self.logo))
+                title_align = Qt.AlignmentFlag.AlignRight if self.logo is not None else Qt.AlignmentFlag.AlignHCenter
+                text(QRectF(0, 0, width, title_h), self.title, "title", PDF_ORANGE, title_align | Qt.AlignmentFlag.AlignVCenter)
+                if self.subtitle:
+                    text(QRectF(0, title_h + 4, width, sub_h), self.subtitle, "subtitle", PDF_BLUE,
+                         title_align | Qt.AlignmentFlag.AlignVCenter)
+                y = block_h + 6
+                pages[-1].append(("line", QPointF(0, y), QPointF(width, y), PDF_ORANGE, 3))
+                y += 14
+                state["y"] = y
+                if self.summary:
+                    boxes(self.summary)
+            else:
+                running = self.title + (f" - {self.subtitle}" if self.subtitle else "")
+                text(QRectF(0, 0, width, metrics["cell_bold"].height()), running, "cell_bold", PDF_ORANGE)
+                state["y"] = metrics["cell_bold"].height() + 8
+            if with_header:
+                table_header()
+
+        def ensure(space, with_header=True):
+            if state["y"] + space > bottom:
+                new_page(with_header)
+
+        new_page()
+        for index, row in enumerate(self.rows):
+            ensure(row_h)
+            y = state["y"]
+            style = self.row_styles.get(index, {})
+            fill = style.get("fill") or ("#faf8f4" if index % 2 else None)
+            if fill:
+                pages[-1].append(("fill", QRectF(0, y, width, row_h), fill))
+            cells(y, row, "cell_bold" if style.get("bold") else "cell", style.get("colors"))
+            pages[-1].append(("line", QPointF(0, y + row_h), QPointF(width, y + row_h), "#dddddd", 0.5))
+            state["y"] = y + row_h
+        if self.totals is not None:
+            ensure(row_h)
+            y = state["y"]
+            pages[-1].append(("fill", QRectF(0, y, width, row_h), "#ffe0b2"))
+            pages[-1].append(("line", QPointF(0, y), QPointF(width, y), PDF_ORANGE, 2))
+            cells(y, self.totals, "cell_bold", self.row_styles.get("totals", {}).get("colors"))
+            state["y"] = y + row_h
+        if self.closing:
+            state["y"] += 12
+            ensure(box_h, with_header=False)
+            boxes(self.closing)
+        if self.signatures:
+            sig_h = 40 + metrics["cell"].height()
+            state["y"] += 20
+            ensure(sig_h, with_header=False)
+            y = state["y"]
+            sig_w = 150
+            for i, label in enumerate(self.signatures):
+                sx = 0 if i == 0 else width - sig_w
+                pages[-1].append(("line", QPointF(sx, y + 32), QPointF(sx + sig_w, y + 32), "#888888", 1))
+                text(QRectF(sx, y + 36, sig_w, metrics["cell"].height()), label, "cell")
+            state["y"] = y + sig_h
+
+        small_h = metrics["small"].height()
+        for number, ops in enumerate(pages, start=1):
+            foot = QRectF(0, height - small_h, width, small_h)
+            ops.append(("text", foot, self.footer, "small", "#888888", Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter))
+            ops.append(("text", foot, f"Page {number} of {len(pages)}", "small", "#888888",
+                        Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter))
+        self._pages = pages
+        return pages
+
+    def paint(self, device):
+        """Draws every page on a QPdfWriter or QPrinter; can be called repeatedly (preview refreshes)."""
+        pages = self.layout()
+        device.setPageLayout(self.page_layout())
+        painter = QPainter()
+        if not painter.begin(device):
+            raise RuntimeError("Could not start painting the report")
+        try:
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            scale = device.logicalDpiX() / 72.0
+            for number, ops in enumerate(pages):
+                if number:
+                    device.newPage()
+                painter.save()
+                painter.scale(scale, scale)
+                for op in ops:
+                    kind = op[0]
+                    if kind == "text":
+                        _, rect, value, font_key, color, flags = op
+                        painter.setFont(self.fonts[font_key])
+                        painter.setPen(QColor(color))
+                        painter.drawText(rect, flags.value, value)
+                    elif kind == "fill":
+                        painter.fillRect(op[1], QColor(op[2]))
+                    elif kind == "line":
+                        painter.setPen(QPen(QColor(op[3]), op[4]))
+                        painter.drawLine(op[1], op[2])
+                    elif kind == "image":
+                        painter.drawImage(op[1], op[2])
+                painter.restore()
+        finally:
+            painter.end()
+
+    def write_pdf(self, file_path):
+        writer = QPdfWriter(file_path)
+        writer.setTitle(self.title)
+        self.paint(writer)
+
+    def preview(self, parent, window_title):
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
+        printer.setPageLayout(self.page_layout())
+        dialog = QPrintPreviewDialog(printer, parent)
+        dialog.setWindowTitle(window_title)
+        dialog.paintRequested.connect(self.paint)
+        return dialog.exec()
+
+
+def monthly_report_table(report, month, year, logo=None, profit_column=False):
+    columns = [("Date", 14, "center"), ("Sales", 14, "right"), ("Service", 14, "right"), ("Total Income", 16, "right"),
+               ("Expenses", 14, "right"), ("Balance", 16, "right")]
+    if profit_column:
+        columns.append(("Profit %", 12, "right"))
+    rows, styles = [], {}
+    for index, (d, sales, services, income, expenses, balance) in enumerate(report["rows"]):
+        row = [to_ddmmyyyy(d), fmt_money(sales, True), fmt_money(services, True), fmt_money(income, True),
+               fmt_money(expenses, True), fmt_money(balance, True)]
+        if profit_column:
+            row.append(f"{(balance / income * 100) if income > 0 else 0:.2f}")
+        rows.append(row)
+        styles[index] = {"colors": {5: PDF_RED if balance < 0 else PDF_GREEN}}
+    total_balance = report["total_balance"]
+    totals = ["TOTAL", fmt_money(report["total_sales"], True), fmt_money(report["total_services"], True),
+              fmt_money(report["total_income"], True), fmt_money(report["total_expenses"], True),
+              fmt_money(total_balance, True)]
+    if profit_column:
+        totals.append(f"{report['profit_percent']:.2f}")
+    styles["totals"] = {"colors": {5: PDF_RED if total_balance < 0 else PDF_GREEN}}
+    closing = [
+        ("Available Cash in Hand", f"{fmt_money(report['available_cash'], True)} AED", PDF_GREEN),
+        ("Additional Capital", f"{fmt_money(report['additional_capital'], True)} AED", PDF_BLUE),
+        ("Profit %", f"{report['profit_percent']:,.2f} %", PDF_ORANGE),
+    ]
+    return TabularReport("Monthly Financial Report", columns, rows, subtitle=QDate(year, month, 1).toString('MMMM yyyy'),
+                         totals=totals, closing=closing, logo=logo, row_styles=styles)
+
+
+def vendor_statement_table(vendor_name, opening_balance, balance, data_rows, as_of=None):
+    columns = [("Date", 14, "left"), ("Type", 22, "left"), ("Debit (AED)", 16, "right"), ("Credit (AED)", 16, "right"),
+               ("Balance (AED)", 18, "right"), ("Due Date", 14, "center")]
+    rows = [row.cells() for row in data_rows]
+    summary = [("Opening Balance", f"{fmt_money(opening_balance, True)} AED", PDF_ORANGE),
+               ("Current Balance", f"{fmt_money(balance, True)} AED", PDF_RED)]
+    if as_of:
+        summary.append((f"Balance as of {to_ddmmyyyy(as_of[0])}", f"{fmt_money(as_of[1], True)} AED", PDF_BLUE))
+    styles = {0: {"fill": "#ffe0b2", "bold": True}} if rows else {}
+    return TabularReport("Vendor Transactions Report", columns, rows, subtitle=f"Vendor: {vendor_name}",
+                         summary=summary, row_styles=styles, signatures=("Prepared By", "Approved By"))
+
+
+# --- Analytics (columnar snapshots of the ledgers) ---
+try:
+    import numpy as np
+except ImportError:  # analytics are optional; nothing else in the app needs numpy
+    np = None
+
+ANALYTICS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".national_bicycles_cache")
+CASHFLOW_INCOME, CASHFLOW_EXPENSE, CASHFLOW_CAPITAL = 0, 1, 2
+VENDOR_PURCHASE, VENDOR_PAYMENT, VENDOR_RETURN = 0, 1, 2
+
+# Dates become whole days since 1970-01-01 so they fit an int32 column.
+_DAY_SQL = "CAST(julianday(date) - 2440587.5 AS INTEGER)"
+SNAPSHOT_SOURCES = {
+    "cashflow": {
+        "tables": ("daily_income", "daily_expense", "daily_capital"),
+        "sql": f"""
+            SELECT {_DAY_SQL}, {CASHFLOW_INCOME}, COALESCE(category_id, -1), COALESCE(amount, 0)
+            FROM daily_income WHERE julianday(date) IS NOT NULL
             UNION ALL
-            SELECT de.date, de.amount, ec.name, 'Expense', de.description, de.id, de.category_id, de.notes
-            FROM daily_expense de
-            LEFT JOIN expense_categories ec ON de.category_id = ec.id
-            WHERE de.date BETWEEN ? AND ?
+            SELECT {_DAY_SQL}, {CASHFLOW_EXPENSE}, COALESCE(category_id, -1), COALESCE(amount, 0)
+            FROM daily_expense WHERE julianday(date) IS NOT NULL
             UNION ALL
-            SELECT dc.date, dc.amount, dc.category, 'Capital', dc.description, dc.id, NULL, dc.notes
-            FROM daily_capital dc
-            WHERE dc.date BETWEEN ? AND ?
-            ORDER BY date ASC
-            """
-            params = [date_from, date_to, date_from, date_to, date_from, date_to]
-            c.execute(final_query, params)
-            rows = c.fetchall()
+            SELECT {_DAY_SQL}, {CASHFLOW_CAPITAL}, -1, COALESCE(amount, 0)
+            FROM daily_capital WHERE julianday(date) IS NOT NULL
+        """,
+        "columns": (("day", "int32"), ("kind", "int8"), ("category_id", "int32"), ("amount", "int64")),
+    },
+    "vendor_ledger": {
+        "tables": ("vendor_transactions",),
+        "sql": f"""
+            SELECT {_DAY_SQL}, COALESCE(vendor_id, -1),
+                   CASE type WHEN 'purchase' THEN {VENDOR_PURCHASE}
+                             WHEN 'payment' THEN {VENDOR_PAYMENT}
+                             WHEN 'return' THEN {VENDOR_RETURN} ELSE -1 END,
+                   COALESCE(amount, 0)
+            FROM vendor_transactions WHERE julianday(date) IS NOT NULL
+        """,
+        "columns": (("day", "int32"), ("vendor_id", "int32"), ("type", "int8"), ("amount", "int64")),
+    },
+}
 
-        elif cat.startswith("inc:"):
-            cat_id = int(cat.split(":")[1])
-            income_query = '''SELECT di.date, di.amount, ic.name, 'Income', di.description, di.id, di.category_id, di.notes
-                      FROM daily_income di
-                      LEFT JOIN income_categories ic ON di.category_id = ic.id
-                      WHERE di.date BETWEEN ? AND ? AND di.category_id = ?'''
-            params = [date_from, date_to, cat_id]
-            c.execute(income_query + " ORDER BY di.date DESC", params)
-            rows = c.fetchall()
-        elif cat.startswith("exp:"):
-            cat_id = int(cat.split(":")[1])
-            expense_query = '''SELECT de.date, de.amount, ec.name, 'Expense', de.description, de.id, de.category_id, de.notes
-                               FROM daily_expense de
-                               LEFT JOIN expense_categories ec ON de.category_id = ec.id
-                               WHERE de.date BETWEEN ? AND ? AND de.category_id = ?'''
-            params = [date_from, date_to, cat_id]
-            c.execute(expense_query + " ORDER BY de.date DESC", params)
-            rows = c.fetchall()
-        
-        elif cat.startswith("capital:"):
-            c.execute(
-                "SELECT date, amount, category, 'Capital', description, id, NULL, notes FROM daily_capital WHERE date BETWEEN ? AND ? AND category=?",
-                (date_from, date_to, "Additional Capital")
-            )
-            rows = c.fetchall()
-        else:
-            rows = []
+class LedgerSnapshot:
+    """Column arrays of one SNAPSHOT_SOURCES entry, usually memory-mapped from the cache."""
+    def __init__(self, name, columns, versions):
+        self.name = name
+        self.columns = columns
+        self.versions = versions
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+def _snapshot_cache_root(db_path, cache_dir):
+    return os.path.join(cache_dir, hashlib.sha1(db_path.encode("utf-8")).hexdigest()[:12])
+
+def _write_snapshot(cache_root, name, versions, columns):
+    os.makedirs(cache_root, exist_ok=True)
+    # Every generation gets new file names: files that are still memory-mapped
+    # cannot be overwritten on Windows.
+    stamp = f"{time.time_ns():x}"
+    for column, values in columns.items():
+        np.save(os.path.join(cache_root, f"{name}.{stamp}.{column}.npy"), values)
+    meta_path = os.path.join(cache_root, f"{name}.json")
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"stamp": stamp, "versions": versions}, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    for file_name in os.listdir(cache_root):
+        if file_name.startswith(f"{name}.") and file_name.endswith(".npy") and f".{stamp}." not in file_name:
+            try:
+                os.remove(os.path.join(cache_root, file_name))
+            except OSError:
+                pass  # still mapped somewhere; removed after a later rebuild
 
-        # Apply description filter
-        if desc_filter:
-            rows = [r for r in rows if desc_filter in (r[4] or "").lower()]
+def load_snapshot(name, db_path=None, cache_dir=ANALYTICS_CACHE_DIR):
+    """
+    Returns the LedgerSnapshot for `name`, reusing the on-disk .npy cache as long
+    as the table_versions of its source tables are unchanged.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for analytics.")
+    source = SNAPSHOT_SOURCES[name]
+    db_path = os.path.abspath(db_path or DB_NAME)
+    cache_root = _snapshot_cache_root(db_path, cache_dir)
+    conn = sqlite3.connect(db_path)
+    try:
+        versions = get_table_versions(conn, source["tables"])
+        if versions is not None:
+            versions["closed_through"] = get_closed_through(conn)
+        try:
+            with open(os.path.join(cache_root, f"{name}.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        if versions is not None and meta and meta.get("versions") == versions:
+            try:
+                columns = {
+                    column: np.load(os.path.join(cache_root, f"{name}.{meta['stamp']}.{column}.npy"), mmap_mode="r")
+                    for column, _ in source["columns"]
+                }
+                return LedgerSnapshot(name, columns, versions)
+            except (OSError, ValueError):
+                pass  # incomplete cache, rebuild below
+        rows = conn.execute(source["sql"]).fetchall()
+        archives = conn.execute("SELECT file_name FROM fiscal_archives ORDER BY year").fetchall() \
+            if versions is not None and versions["closed_through"] is not None else []
+    finally:
+        conn.close()
+    # closed years are immutable, so their rows only need reading when the snapshot is rebuilt
+    for (file_name,) in archives:
+        path = archive_file_path(db_path, file_name)
+        if os.path.exists(path):
+            archive_conn = get_readonly_conn(path)
+            try:
+                rows += archive_conn.execute(source["sql"]).fetchall()
+            finally:
+                archive_conn.close()
+
+    matrix = np.array(rows, dtype=np.int64).reshape(len(rows), len(source["columns"]))
+    columns = {
+        column: np.ascontiguousarray(matrix[:, i], dtype=dtype)
+        for i, (column, dtype) in enumerate(source["columns"])
+    }
+    if versions is not None:
+        try:
+            _write_snapshot(cache_root, name, versions, columns)
+        except OSError:
+            pass  # caching is best effort
+    return LedgerSnapshot(name, columns, versions)
+
+def days_to_months(days):
+    """Days since 1970-01-01 -> months since 1970-01 (month index)."""
+    return np.asarray(days).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+def month_index(year, month):
+    return (year - 1970) * 12 + (month - 1)
+
+def month_index_label(index):
+    return str(np.datetime64(int(index), "M"))
+
+def group_sum(keys, values):
+    """Exact integer sums of `values` per distinct key; returns (sorted keys, sums)."""
+    keys = np.asarray(keys)
+    if keys.size == 0:
+        return keys[:0], np.zeros(0, dtype=np.int64)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    values = np.asarray(values, dtype=np.int64)[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(values, starts)
+
+def dense_series(keys, values, start, stop):
+    """Spreads sparse (key, value) pairs over every key in [start, stop], filling gaps with 0."""
+    series = np.zeros(stop - start + 1, dtype=np.int64)
+    keys = np.asarray(keys)
+    inside = (keys >= start) & (keys <= stop)
+    series[keys[inside] - start] = np.asarray(values)[inside]
+    return series
+
+def rolling_sum(series, window):
+    """Trailing sum over `window` entries (shorter at the start of the series)."""
+    totals = np.cumsum(series, dtype=np.int64)
+    totals[window:] = totals[window:] - totals[:-window]
+    return totals
+
+def monthly_totals(cashflow, kind):
+    mask = cashflow["kind"] == kind
+    return group_sum(days_to_months(cashflow["day"][mask]), cashflow["amount"][mask])
+
+def category_totals_by_year(cashflow, kind):
+    """Returns [(year, category_id, fils)] for income or expense categories across all years."""
+    mask = cashflow["kind"] == kind
+    years = days_to_months(cashflow["day"][mask]) // 12 + 1970
+    categories = cashflow["category_id"][mask].astype(np.int64) + 1  # -1 (none) -> 0
+    keys, sums = group_sum(years * 1_000_000 + categories, cashflow["amount"][mask])
+    return [(int(k // 1_000_000), int(k % 1_000_000) - 1, int(s)) for k, s in zip(keys, sums)]
+
+def vendor_monthly_purchases(vendor_ledger, vendor_id=None):
+    """Returns {vendor_id: (month indexes, purchase fils)} for one or all vendors."""
+    mask = vendor_ledger["type"] == VENDOR_PURCHASE
+    if vendor_id is not None:
+        mask &= vendor_ledger["vendor_id"] == vendor_id
+    vendors = vendor_ledger["vendor_id"][mask].astype(np.int64)
+    months = days_to_months(vendor_ledger["day"][mask])
+    keys, sums = group_sum(vendors * 100_000 + months, vendor_ledger["amount"][mask])
+    curves = {}
+    for vid in np.unique(keys // 100_000):
+        selected = keys // 100_000 == vid
+        curves[int(vid)] = (keys[selected] % 100_000, sums[selected])
+    return curves
+
+def year_over_year(months, totals):
+    """
+    Lines every month up with the same month a year earlier.
+    Returns (month indexes, current, previous, change %) with NaN where the previous year is 0.
+    """
+    if len(months) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, np.zeros(0)
+    start, stop = int(months[0]), int(months[-1])
+    current = dense_series(months, totals, start, stop)
+    previous = dense_series(months, totals, start - 12, stop - 12)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(previous != 0, (current - previous) / np.abs(previous) * 100, np.nan)
+    return np.arange(start, stop + 1), current, previous, change
+
+DARK_STYLESHEET = """
+QMainWindow, QWidget {
+    background: #181A1B;
+    color: #F1F3F4;
+    font-family: 'Segoe UI', 'Arial', sans-serif;
+}
+QLabel { color: #F1F3F4; font-size: 15px; }
+QTabWidget::pane {
+    border: none;
+    border-top: 2px solid #5a3a12;
+    background: #181A1B;
+    border-radius: 0px 0px 0 0;
+    margin: 10px 6px 6px 6px; /* top right bottom left */
+}
+QTabBar::tab {
+    background: #232627;
+    color: #cfcfcf;
+    border-radius: 5px 5px 0 0;
+    padding: 8px 14px;
+    margin-left: 10px;
+    margin-top: 6px;
+    font-size: 15px;
+    min-width: 100px;
+}
+QTabBar::tab:selected {
+    background: #26292A;
+    color: #fff;
+    font-weight: bold;
+    border: 2px solid #fb700e;
+    border-radius: 5px 5px 0 0;
+}
+QLineEdit, QComboBox, QDateEdit, QTextEdit {
+    background: #232627;
+    color: #F1F3F4;
+    border: 1.3px solid #35393A;
+    border-radius: 5px;
+    padding: 8px;
+    font-size: 15px;
+}
+QLineEdit:focus, QComboBox:focus, QDateEdit:focus, QTextEdit:focus {
+    border: 1.7px solid #6C7A89;
+}
+QPushButton {
+    background: #232627;
+    color: #F1F3F4;
+    border-radius: 5px;
+    padding: 8px 20px;
+    font-size: 15px;
+    border: 1px solid #35393A;
+}
+QPushButton:pressed { background: #35393A; }
+QPushButton:disabled { background: #232627; color: #555; }
+QTableWidget {
+    background: #181A1B;
+    color: #F1F3F4;
+    gridline-color: #232627;
+    font-size: 15px;
+}
+QHeaderView::section {
+    background-color: #2A2C2E;
+    color: #F1F3F4;
+    font-weight: bold;
+    font-size: 15px;
+    border: none;
+    border-radius: 0;
+    padding: 4px;
+}
+QTableWidget QTableCornerButton::section { background: #232627; }
+QFrame#totalsbox { background: #232627; border-radius: 12px; color: #F1F3F4; }
+QListWidget {
+    background: #232627;
+    color: #F1F3F4;
+    border-radius: 5px;
+    padding: 5px;
+}
+QScrollBar:vertical, QScrollBar:horizontal {
+    background: #232627;
+    width: 12px;
+    margin: 0px;
+    border-radius: 5px;
+}
+QScrollBar::handle:vertical, QScrollBar::handle:horizontal {
+    background: #35393A;
+    border-radius: 5px;
+}
+QToolTip {
+    background: #35393A;
+    color: #F1F3F4;
+    border: 1px solid #6C7A89;
+}
+QComboBox {
+    background: #232627;
+    padding: 8px 14px;
+    min-width: 120px;
+    border-radius: 1px;
+}
+QTabWidget#mainTabs QTabBar::tab:selected {
+    color: #fb700e;
+}
+QTabWidget#vendorsSubTabs QTabBar::tab:selected {
+    color: #fff;
+    border: 2px solid #35393A;
+}
+QTabWidget#vendorsSubTabs::pane {
+    border: none;
+}
+
+"""
+
+DIALOG_STYLESHEET = """
+QDialog { background: #181A1B; }
+QLabel { font-size: 15px; font-weight: 600; color: #F1F3F4; }
+QLineEdit, QComboBox, QDateEdit {
+    border-radius: 5px; padding: 8px; font-size: 14px;
+    border: 1.3px solid #35393A; background: #232627; color: #F1F3F4;
+}
+QPushButton {
+    border-radius: 5px; padding: 9px 18px; font-size: 14px;
+    background: #26292A; color: #F1F3F4; font-weight: bold;
+}
+QPushButton:pressed { background: #35393A; }
+QLineEdit:focus, QComboBox:focus, QDateEdit:focus { border: 2px solid #fb700e; }
+"""
+
+# You may define more as needed, e.g.:
+FORM_STYLESHEET = """
+QFormLayout QLabel { color: #F1F3F4; }
+"""
+
+# ---------------- Dialog and Tab Classes ----------------
+
+class EntryEditDialog(QDialog):
+    def __init__(self, entry_type, entry_id, date, cat_id, amount, desc, notes='', parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Edit Entry")
+        self.entry_type = entry_type
+        self.entry_id = entry_id
+        self.setMinimumWidth(390)
+        self.setStyleSheet(DIALOG_STYLESHEET)
+        self.layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.date_input = QDateEdit()
+        self.date_input.setDisplayFormat("dd-MM-yyyy")
+        self.date_input.setCalendarPopup(True)
+        try:
+            dt = datetime.strptime(date, "%Y-%m-%d")
+            self.date_input.setDate(QDate(dt.year, dt.month, dt.day))
+        except Exception:
+            self.date_input.setDate(QDate.currentDate())
+        form.addRow("Date:", self.date_input)
+        self.cat_combo = QComboBox()
+        if entry_type == "Income":
+            for cid, name in get_income_categories():
+                self.cat_combo.addItem(name, cid)
+        else:
+            for cid, name in get_expense_categories():
+                self.cat_combo.addItem(name, cid)
+        idx = self.cat_combo.findData(cat_id)
+        if idx != -1:
+            self.cat_combo.setCurrentIndex(idx)
+        form.addRow("Category:", self.cat_combo)
+        self.desc_input = QLineEdit(desc or "")
+        form.addRow("Description:", self.desc_input)
+        self.amount_input = QLineEdit(fmt_money(amount))
+        self.amount_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        form.addRow("Amount (AED):", self.amount_input)
+        self.notes_input = QLineEdit(notes or "")
+        self.notes_input.setPlaceholderText("Notes (optional)")
+        form.addRow("Notes:", self.notes_input)
+        self.layout.addLayout(form)
+
+        btn_row = QHBoxLayout()
+        self.save_btn = QPushButton("Save")
+        self.save_btn.clicked.connect(self.accept)
+        self.delete_btn = QPushButton("Delete")
+        self.delete_btn.clicked.connect(self.delete_entry)
+        self.clear_btn = QPushButton("Clear")
+        self.clear_btn.clicked.connect(self.clear_form)
+        for b in [self.save_btn, self.delete_btn, self.clear_btn]:
+            btn_row.addWidget(b)
+        self.layout.addLayout(btn_row)
+        self.deleted = False
+
+    def get_values(self):
+        date_iso = self.date_input.date().toString("yyyy-MM-dd")
+        return (
+            date_iso,
+            self.cat_combo.currentData(),
+            parse_amount(self.amount_input.text()),
+            self.desc_input.text(),
+            self.notes_input.text()
+        )
+
+    def delete_entry(self):
+        self.deleted = True
+        self.accept()
+
+    def clear_form(self):
+        self.date_input.setDate(QDate.currentDate())
+        self.cat_combo.setCurrentIndex(0)
+        self.desc_input.clear()
+        self.amount_input.clear()
+
+class IncomeExpenseEntryDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add Transaction")
+        self.setMinimumWidth(450)
+        self.setMaximumWidth(500)
+        self.setStyleSheet(DIALOG_STYLESHEET)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+
+        title = QLabel("Add Income / Expense / Capital")
+        title.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        title.setStyleSheet("font-size:17px; font-weight:600; margin-bottom:8px;")
+        layout.addWidget(title)
+
+        form = QFormLayout()
+        form.setLabelAlignment(Qt.AlignmentFlag.AlignLeft)
+        form.setFormAlignment(Qt.AlignmentFlag.AlignLeft)
+        form.setSpacing(8)
+        form.setFieldGrowthPolicy(QFormLayout.FieldGrowthPolicy.AllNonFixedFieldsGrow)
+
+        # Date
+        self.date_input = QDateEdit()
+        self.date_input.setDisplayFormat("dd-MM-yyyy")
+        self.date_input.setCalendarPopup(True)
+        self.date_input.setDate(QDate.currentDate())
+        self.date_input.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        form.addRow("Date", self.date_input)
+
+        # Type
+        self.type_input = QComboBox()
+        self.type_input.addItems(ENTRY_TYPES)
+        form.addRow("Type", self.type_input)
+
+        # Category
+        self.category_input = QComboBox()
+        form.addRow("Category", self.category_input)
+
+        # Description
+        self.description_input = QLineEdit()
+        self.description_input.setPlaceholderText("Description")
+        self.description_input.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        desc_completer = QCompleter(get_all_descriptions())
+        desc_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.description_input.setCompleter(desc_completer)
+        form.addRow("Description", self.description_input)
+
+        # Notes
+        self.notes_input = QLineEdit()
+        self.notes_input.setPlaceholderText("Notes (optional)")
+        self.notes_input.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        form.addRow("Notes", self.notes_input)
+
+        layout.addLayout(form)
+
+        # Amount (centered, bold, larger)
+        amount_row = QHBoxLayout()
+        amount_row.addStretch()
+        self.amount_input = QLineEdit()
+        self.amount_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.amount_input.setPlaceholderText("Amount (AED)")
+        afont = QFont()
+        afont.setPointSize(20)
+        afont.setBold(True)
+        self.amount_input.setFont(afont)
+        self.amount_input.setFixedWidth(220)
+        amount_row.addWidget(self.amount_input)
+        amount_row.addStretch()
+        layout.addLayout(amount_row)
+
+        # Button row (centered)
+        btn_row = QHBoxLayout()
+        btn_row.setSpacing(5)
+        btn_row.addStretch()
+        self.save_btn = QPushButton("Save")
+        self.save_btn.clicked.connect(self.accept)
+        self.delete_btn = QPushButton("Delete")
+        self.delete_btn.clicked.connect(self.delete_entry)
+        self.clear_btn = QPushButton("Clear")
+        self.clear_btn.clicked.connect(self.clear_form)
+        for b in [self.save_btn, self.delete_btn, self.clear_btn]:
+            btn_row.addWidget(b)
+        btn_row.addStretch()
+        layout.addLayout(btn_row)
+        self.deleted = False
+
+        self.type_input.currentTextChanged.connect(self.update_category_options)
+        self.category_input.currentIndexChanged.connect(self.handle_category_change)
+        self.type_input.currentTextChanged.connect(self.update_amount_placeholder_color)
+        self.update_category_options()
+        self.update_amount_placeholder_color(self.type_input.currentText())
+
+    def update_category_options(self, *_):
+        t = self.type_input.currentText()
+        self.category_input.blockSignals(True)
+        self.category_input.clear()
+        if t == ENTRY_TYPES[0]:
+            for cid, name in get_income_categories():
+                self.category_input.addItem(name, cid)
+        elif t == ENTRY_TYPES[1]:
+            for cid, name in get_expense_categories():
+                if name.strip().lower() == "vendors":
+                    continue
+                self.category_input.addItem(name, cid)
+        elif t == ENTRY_TYPES[2]:
+            self.category_input.addItem("Additional Capital", "additional_capital")
+        self.category_input.blockSignals(False)
+
+    def handle_category_change(self):
+        pass
+
+    def update_amount_placeholder_color(self, t):
+        color = "#43a047" if t == "Income" else "#e53935"
+        if t == "Capital":
+            color = "#1976d2"
+        self.amount_input.setStyleSheet(
+            f"""
+            QLineEdit {{
+                background: #232627;
+                color: #F1F3F4;
+                border-radius: 10px;
+                border: 1.3px solid #35393A;
+                font-size: 20px;
+                font-weight:bold;
+            }}
+            QLineEdit::placeholder {{
+                color: {color};
+                font-weight: bold;
+                letter-spacing: 1px;
+            }}
+            """
+        )
+
+    def clear_form(self):
+        self.date_input.setDate(QDate.currentDate())
+        self.type_input.setCurrentIndex(0)
+        self.category_input.setCurrentIndex(0)
+        self.description_input.clear()
+        self.amount_input.clear()
+        self.notes_input.clear()
+
+    def delete_entry(self):
+        self.deleted = True
+        self.accept()
+
+    def get_values(self):
+        date_iso = self.date_input.date().toString("yyyy-MM-dd")
+        desc = self.description_input.text()
+        notes = self.notes_input.text()
+        return (
+            date_iso,
+            self.type_input.currentText(),
+            self.category_input.currentData(),
+            self.amount_input.text(),
+            desc,
+            notes
+        )
+
+class BatchEntryDialog(QDialog):
+    """
+    Spreadsheet-style sheet for entering many income/expense/capital lines for
+    one date. Rows are validated locally; the caller commits them together.
+    """
+    COLUMNS = ["Type", "Category", "Description", "Amount (AED)", "Notes"]
+
+    def __init__(self, parent=None, rows=12):
+        super().__init__(parent)
+        self.setWindowTitle("Batch Entry")
+        self.resize(900, 560)
+        self.setStyleSheet(DIALOG_STYLESHEET)
+        self.descriptions = get_all_descriptions()
+        self.income_categories = get_income_categories()
+        self.expense_categories = [
+            (cid, name) for cid, name in get_expense_categories() if name.strip().lower() != "vendors"
+        ]
+        self.entries = []
+
+        layout = QVBoxLayout(self)
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Date:"))
+        self.date_input = QDateEdit()
+        self.date_input.setDisplayFormat("dd-MM-yyyy")
+        self.date_input.setCalendarPopup(True)
+        self.date_input.setDate(QDate.currentDate())
+        top.addWidget(self.date_input)
+        top.addStretch()
+        self.add_row_btn = QPushButton("Add Row")
+        self.add_row_btn.clicked.connect(self.add_row)
+        self.remove_row_btn = QPushButton("Remove Row")
+        self.remove_row_btn.clicked.connect(self.remove_row)
+        top.addWidget(self.add_row_btn)
+        top.addWidget(self.remove_row_btn)
+        layout.addLayout(top)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.itemChanged.connect(self.on_item_changed)
+        layout.addWidget(self.table)
+
+        self.totals_label = QLabel("")
+        self.totals_label.setStyleSheet("font-weight:bold;")
+        layout.addWidget(self.totals_label)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch()
+        self.save_btn = QPushButton("Save All")
+        self.save_btn.clicked.connect(self.accept)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        btn_row.addWidget(self.save_btn)
+        btn_row.addWidget(self.cancel_btn)
+        layout.addLayout(btn_row)
+
+        for _ in range(rows):
+            self.add_row()
+        self.update_totals()
+
+    def add_row(self):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        type_combo = QComboBox()
+        type_combo.addItems(ENTRY_TYPES)
+        type_combo.setCurrentText("Expense")
+        category_combo = QComboBox()
+        self.table.setCellWidget(row, 0, type_combo)
+        self.table.setCellWidget(row, 1, category_combo)
+        desc_input = QLineEdit()
+        completer = QCompleter(self.descriptions, desc_input)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        desc_input.setCompleter(completer)
+        self.table.setCellWidget(row, 2, desc_input)
+        for col in (3, 4):
+            self.table.setItem(row, col, QTableWidgetItem(""))
+        type_combo.currentTextChanged.connect(lambda t, combo=category_combo: self.fill_categories(combo, t))
+        type_combo.currentTextChanged.connect(self.update_totals)
+        self.fill_categories(category_combo, type_combo.currentText())
+
+    def remove_row(self):
+        row = self.table.currentRow()
+        if row < 0:
+            row = self.table.rowCount() - 1
+        if row >= 0:
+            self.table.removeRow(row)
+            self.update_totals()
+
+    def fill_categories(self, combo, entry_type):
+        combo.clear()
+        if entry_type == "Income":
+            for cid, name in self.income_categories:
+                combo.addItem(name, cid)
+        elif entry_type == "Expense":
+            for cid, name in self.expense_categories:
+                combo.addItem(name, cid)
+        else:
+            combo.addItem("Additional Capital", "additional_capital")
+
+    def on_item_changed(self, item):
+        if item.column() == 3:
+            self.update_totals()
+            # typing an amount on the last line opens a fresh one
+            if item.row() == self.table.rowCount() - 1 and item.text().strip():
+                self.add_row()
+
+    def row_values(self, row):
+        type_str = self.table.cellWidget(row, 0).currentText()
+        category = self.table.cellWidget(row, 1)
+        desc = self.table.cellWidget(row, 2).text().strip()
+        amount_text = self.table.item(row, 3).text().strip() if self.table.item(row, 3) else ""
+        notes = self.table.item(row, 4).text().strip() if self.table.item(row, 4) else ""
+        return type_str, category.currentData(), category.currentText(), desc, amount_text, notes
+
+    def update_totals(self, *_):
+        totals = dict.fromkeys(ENTRY_TYPES, 0)
+        for row in range(self.table.rowCount()):
+            type_str, _, _, _, amount_text, _ = self.row_values(row)
+            totals[type_str] += parse_amount(amount_text)
+        self.totals_label.setText(
+            f"Income: {fmt_money(totals['Income'], True)} AED    "
+            f"Expense: {fmt_money(totals['Expense'], True)} AED    "
+            f"Capital: {fmt_money(totals['Capital'], True)} AED"
+        )
+
+    def validate(self):
+        """Collects the filled rows into self.entries; returns a list of problems (empty when valid)."""
+        date_iso = self.date_input.date().toString("yyyy-MM-dd")
+        once_per_day = [name.lower() for name in INCOME_CATEGORIES]
+        conn = get_conn()
+        taken = {
+            row[0] for row in conn.execute(
+                "SELECT DISTINCT category_id FROM daily_income WHERE date=?", (date_iso,)
+            )
+        }
+        conn.close()
+        errors = []
+        entries = []
+        self.table.blockSignals(True)  # highlighting must not trigger on_item_changed
+        for row in range(self.table.rowCount()):
+            type_str, cat_id, cat_name, desc, amount_text, notes = self.row_values(row)
+            self.table.item(row, 3).setData(Qt.ItemDataRole.BackgroundRole, None)
+            if not (desc or amount_text or notes):
+                continue
+            try:
+                amount = to_fils(amount_text)
+            except (InvalidOperation, ValueError):
+                amount = 0
+            if amount <= 0:
+                errors.append(f"Row {row + 1}: enter an amount greater than zero.")
+                self.table.item(row, 3).setBackground(QColor("#7f1d1d"))
+                continue
+            if cat_id is None:
+                errors.append(f"Row {row + 1}: choose a category.")
+                continue
+            if type_str == "Income" and cat_name.strip().lower() in once_per_day:
+                if cat_id in taken:
+                    errors.append(f"Row {row + 1}: only one '{cat_name}' income entry is allowed per date.")
+                    self.table.item(row, 3).setBackground(QColor("#7f1d1d"))
+                    continue
+                taken.add(cat_id)
+            entries.append((type_str, cat_id, amount, desc, notes))
+        self.table.blockSignals(False)
+        self.table.viewport().update()
+        if not entries and not errors:
+            errors.append("Nothing to save: fill in at least one row.")
+        self.entries = entries
+        return errors
+
+    def accept(self):
+        errors = self.validate()
+        if errors:
+            QMessageBox.warning(self, "Check Entries", "\n".join(errors))
+            return
+        super().accept()
+
+    def get_values(self):
+        return self.date_input.date().toString("yyyy-MM-dd"), self.entries
+
+class FilterWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        vbox = QVBoxLayout(self)
+        filter_layout = QHBoxLayout()
+        self.setStyleSheet(DIALOG_STYLESHEET)
+
+        # --- Month Combo ---
+        self.month_combo = QComboBox()
+        self.month_combo.addItem("All Months", None)
+        for m in range(1, 13):
+            self.month_combo.addItem(QDate(2000, m, 1).toString("MMMM"), m)
+        current_month = QDate.currentDate().month()
+        self.month_combo.setCurrentIndex(current_month)  # Default to current month
+        self.month_combo.currentIndexChanged.connect(self.on_month_selected)
+        
+
+        self.date_from = QDateEdit()
+        self.date_from.setDisplayFormat("dd-MM-yyyy")
+        self.date_from.setCalendarPopup(True)
+        self.date_from.setMinimumWidth(120) 
+
+        self.date_to = QDateEdit()
+        self.date_to.setDisplayFormat("dd-MM-yyyy")
+        self.date_to.setCalendarPopup(True)
+        self.date_to.setMinimumWidth(120) 
+
+        today = QDate.currentDate()
+        first_of_month = QDate(today.year(), today.month(), 1)
+        self.date_from.setDate(first_of_month)
+        self.date_to.setDate(today)
+
+        self.category_input = QComboBox()
+        self.category_input.addItem("All", None)
+
+        self.description_input = QLineEdit()
+        self.description_input.setPlaceholderText("Description contains...")
+        # Auto-complete for Description
+        desc_completer = QCompleter(get_all_descriptions())
+        desc_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.description_input.setCompleter(desc_completer)
+
+        filter_layout.addWidget(QLabel("Month:"))
+        filter_layout.addWidget(self.month_combo)
+
+        filter_layout.addWidget(QLabel("From:"))
+        filter_layout.addWidget(self.date_from)
+        filter_layout.addWidget(QLabel("To:"))
+        filter_layout.addWidget(self.date_to)
+        filter_layout.addWidget(QLabel("Category:"))
+        filter_layout.addWidget(self.category_input)
+        filter_layout.addWidget(self.description_input)
+
+        self.clear_button = QPushButton("Clear All Filters")
+        filter_layout.addWidget(self.clear_button)
+        self.clear_button.clicked.connect(self.clear_all_filters)
+
+        vbox.addLayout(filter_layout)
+        self.refresh_categories()
+
+    def refresh_categories(self):
+        self.category_input.clear()
+        self.category_input.addItem("All", None)
+        for cid, name in get_income_categories():
+            self.category_input.addItem(f"Income: {name}", f"inc:{cid}")
+        for cid, name in get_expense_categories():
+            self.category_input.addItem(f"Expense: {name}", f"exp:{cid}")
+        self.category_input.addItem("Capital: Additional Capital", "capital:additional_capital")
+
+    def clear_all_filters(self):
+        today = QDate.currentDate()
+        first_of_month = QDate(today.year(), today.month(), 1)
+        self.date_from.setDate(first_of_month)
+        self.date_to.setDate(today)
+        self.month_combo.setCurrentIndex(QDate.currentDate().month())  # selects current month
+        self.category_input.setCurrentIndex(0)
+        self.description_input.clear()
+
+    def on_month_selected(self):
+        month = self.month_combo.currentData()
+        today = QDate.currentDate()
+        year = today.year()
+        if month is None:
+            first = QDate(year, 1, 1)
+            last = QDate(year, 12, 31)
+            self.date_from.setDate(first)
+            self.date_to.setDate(last)
+        else:
+            first = QDate(year, month, 1)
+            last = first.addMonths(1).addDays(-1)
+            self.date_from.setDate(first)
+            if month == today.month() and year == today.year():
+                self.date_to.setDate(today)
+            else:
+                self.date_to.setDate(last)
+
+# --- Cash projection ---
+CASH_PROJECTION_DAYS = 90
+CASH_RUN_RATE_DAYS = 56  # history behind the weekday income/spending averages (8 of each weekday)
+PAYROLL_DEFAULT_DAY = 31  # salaries fall due at month end unless an employee's last payment says otherwise
+
+def month_day(year, month, day):
+    """date(year, month, day), with day clamped to the month's length; month may run past 12."""
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return date(year, month, min(day, (next_month - timedelta(days=1)).day))
+
+def cash_position(conn, as_of_iso):
+    """Cash on hand after as_of: income plus additional capital less expenses, closed years included."""
+    total = 0
+    for table, sign, extra in (("daily_income", 1, ""), ("daily_expense", -1, ""),
+                               ("daily_capital", 1, " AND category='Additional Capital'")):
+        columns = ("date", "amount", "category") if table == "daily_capital" else ("date", "amount")
+        try:
+            src = ledger_source(conn, table, columns, "0001-01-01", as_of_iso)
+        except MissingArchiveError:
+            raise
+        except ValueError:
+            src = table  # more closed years than can be attached at once; open years only
+        total += sign * conn.execute(
+            f"SELECT COALESCE(SUM(amount), 0) FROM {src} WHERE date <= ?{extra}", (as_of_iso,)
+        ).fetchone()[0]
+    return total
+
+def projection_run_rate(conn, today):
+    """
+    Average takings less everyday spending (expenses not tied to a vendor
+    payment or payroll, which are projected separately) per weekday over the
+    last CASH_RUN_RATE_DAYS days, in fils, Monday first.
+    """
+    start = (today - timedelta(days=CASH_RUN_RATE_DAYS)).isoformat()
+    end = (today - timedelta(days=1)).isoformat()
+    income_src = ledger_source(conn, "daily_income", ("date", "amount"), start, end)
+    expense_src = ledger_source(conn, "daily_expense", ("date", "amount", "vendor_transaction_id", "payroll_id"), start, end)
+    totals = [0] * 7
+    for sign, sql in ((1, f"SELECT date, SUM(amount) FROM {income_src} WHERE date BETWEEN ? AND ? GROUP BY date"),
+                      (-1, f"SELECT date, SUM(amount) FROM {expense_src} WHERE date BETWEEN ? AND ? "
+                           f"AND vendor_transaction_id IS NULL AND payroll_id IS NULL GROUP BY date")):
+        for day, amount in conn.execute(sql, (start, end)):
+            try:
+                totals[date.fromisoformat(day).weekday()] += sign * (amount or 0)
+            except (TypeError, ValueError):
+                continue
+    weeks = CASH_RUN_RATE_DAYS / 7
+    return [round(total / weeks) for total in totals]
+
+def projection_cheque_events(conn, today):
+    """Unpaid cheques as (date, fils, label); overdue ones are due today."""
+    events = []
+    for company, due_iso, amount in conn.execute("SELECT company_name, due_date, amount FROM cheques WHERE is_paid=0"):
+        try:
+            due = date.fromisoformat(due_iso)
+        except (TypeError, ValueError):
+            due = today
+        events.append((max(due, today), -amount, f"Cheque to {company}"))
+    return events
+
+def projection_payable_events(conn, today):
+    """
+    Open vendor purchases (the A/P aging items) as (date, fils, label) on their
+    due date, or purchase date plus NET terms when there is none. Purchases
+    with an unpaid cheque are left to the cheque; overdue items are due today.
+    """
+    rows = QUERY_CACHE.fetchall(conn, AP_OPEN_ITEMS_CTE + """
+        SELECT COALESCE(v.name, ''), o.due, t.date, t.due_date, t.net_terms, o.open_amount
+        FROM open_items o
+        LEFT JOIN vendors v ON v.id = o.vendor_id
+        LEFT JOIN vendor_transactions t ON t.id = o.tid AND o.tid <> 0
+        WHERE NOT EXISTS (SELECT 1 FROM cheques c WHERE c.vendor_transaction_id = o.tid AND c.is_paid = 0)
+    """, (None, None), ("vendors", "vendor_transactions", "cheques"))
+    events = []
+    for vendor, due_iso, date_iso, due_date, net_terms, amount in rows:
+        terms = re.search(r"\d+", net_terms or "")
+        try:
+            if not due_date and date_iso and terms:
+                due = date.fromisoformat(date_iso) + timedelta(days=int(terms.group()))
+            else:
+                due = date.fromisoformat(due_iso)
+        except (TypeError, ValueError):
+            due = today
+        events.append((max(due, today), -amount, f"{vendor} (overdue)" if due < today else vendor))
+    return events
+
+def projection_payroll_events(conn, today, until):
+    """
+    Monthly salaries as (date, fils, label) up to `until`. Each employee is paid
+    on the day of the month of their last salary payment (PAYROLL_DEFAULT_DAY
+    if none); this month's salary is skipped once it has been paid.
+    """
+    last_paid = dict(conn.execute(
+        "SELECT employee_id, MAX(date) FROM employee_payroll WHERE type='Salary Payment' GROUP BY employee_id"
+    ).fetchall())
+    events = []
+    for employee_id, name, salary in conn.execute("SELECT id, name, salary FROM employees WHERE salary > 0"):
+        month = today.month
+        payday = PAYROLL_DEFAULT_DAY
+        try:
+            last = date.fromisoformat(last_paid.get(employee_id))
+        except (TypeError, ValueError):
+            last = None
+        if last:
+            # a payment on the last day of a short month still means month end
+            payday = PAYROLL_DEFAULT_DAY if (last + timedelta(days=1)).day == 1 else last.day
+            if (last.year, last.month) >= (today.year, today.month):
+                month += 1
+        due = month_day(today.year, month, payday)
+        while due <= until:
+            events.append((max(due, today), -salary, f"Salary - {name}"))
+            month += 1
+            due = month_day(today.year, month, payday)
+    return events
+
+class CashProjection:
+    """
+    Day-by-day cash forecast for the next `days` days. The dated events of each
+    source (cheques, payables, payroll) are kept sorted, and refresh() re-reads
+    only the sources whose tables changed since the last call (table_versions).
+    The merged timeline plus the weekday run rate is folded into daily balances
+    and a running minimum in one pass, so lowest_balance(n) is a lookup.
+    """
+    SOURCES = {
+        "cheques": ("cheques",),
+        "payables": ("vendors", "vendor_transactions", "cheques"),
+        "payroll": ("employees", "employee_payroll"),
+        "run_rate": ("daily_income", "daily_expense"),
+        "cash": ("daily_income", "daily_expense", "daily_capital"),
+    }
+    EVENT_SOURCES = ("cheques", "payables", "payroll")
+
+    def __init__(self, days=CASH_PROJECTION_DAYS):
+        self.days = days
+        self.db_file = None
+        self.today = None
+        self.stamps = {}
+        self.sources = {name: [] for name in self.EVENT_SOURCES}
+        self.run_rate = [0] * 7
+        self.opening = 0
+        self.events = []
+        self.balances = []
+        self.lowest = []  # lowest[i] = (balance, day) with the minimum balance over days 0..i
+
+    def refresh(self, conn, today=None):
+        """Brings the projection up to date; returns the names of the sources that were re-read."""
+        today = today or date.today()
+        db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+        if (db_file, today) != (self.db_file, self.today):
+            self.db_file, self.today, self.stamps = db_file, today, {}
+        versions = get_table_versions(conn)
+        changed = []
+        for name, tables in self.SOURCES.items():
+            stamp = tuple(versions[t] for t in tables) if versions else None
+            if stamp is None or self.stamps.get(name) != stamp:
+                self.load(conn, name)
+                self.stamps[name] = stamp
+                changed.append(name)
+        if changed:
+            self.fold()
+        return changed
+
+    def load(self, conn, name):
+        today = self.today
+        if name == "cheques":
+            self.sources[name] = sorted(projection_cheque_events(conn, today))
+        elif name == "payables":
+            self.sources[name] = sorted(projection_payable_events(conn, today))
+        elif name == "payroll":
+            self.sources[name] = sorted(projection_payroll_events(conn, today, today + timedelta(days=self.days)))
+        elif name == "run_rate":
+            self.run_rate = projection_run_rate(conn, today)
+        elif name == "cash":
+            self.opening = cash_position(conn, today.isoformat())
+
+    def fold(self):
+        today, days = self.today, self.days
+        end = today + timedelta(days=days)
+        self.events = [e for e in heapq.merge(*(self.sources[n] for n in self.EVENT_SOURCES)) if e[0] <= end]
+        net = [0] * (days + 1)
+        for when, amount, _ in self.events:
+            net[(when - today).days] += amount
+        first_weekday = today.weekday()
+        for i in range(1, days + 1):
+            net[i] += self.run_rate[(first_weekday + i) % 7]
+        balance, low = self.opening, None
+        self.balances, self.lowest = [], []
+        for i, change in enumerate(net):
+            balance += change
+            self.balances.append(balance)
+            if low is None or balance < low[0]:
+                low = (balance, i)
+            self.lowest.append(low)
+
+    def balance_on(self, days):
+        return self.balances[min(days, self.days)]
+
+    def lowest_balance(self, days=None):
+        """(lowest projected balance, its date) over the next `days` days."""
+        balance, day = self.lowest[min(self.days if days is None else days, self.days)]
+        return balance, self.today + timedelta(days=day)
+
+    def upcoming(self, limit=None):
+        """The dated events in order as (date, fils, label, projected balance at the end of that day)."""
+        rows = [(when, amount, label, self.balances[(when - self.today).days]) for when, amount, label in self.events]
+        return rows if limit is None else rows[:limit]
+
+CASH_PROJECTION = CashProjection()
+
+class DashboardTab(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.selected_month = date.today().month
+        self.selected_year = date.today().year
+        self.setStyleSheet(DIALOG_STYLESHEET)
+        self.layout = QVBoxLayout(self)
+
+        # Header
+        title = QLabel("Dashboard", self)
+        title.setObjectName("dashboardTitle")
+        title.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        self.layout.addWidget(title)
+        subtitle = QLabel("Quick snapshot of your business finances", self)
+        subtitle.setObjectName("dashboardSubtitle")
+        subtitle.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        self.layout.addWidget(subtitle)
+
+        # Month/Year Picker Row
+        self.topRow = QHBoxLayout()
+        self.month_combo = QComboBox()
+        for m in range(1, 13):
+            self.month_combo.addItem(QDate(2000, m, 1).toString("MMMM"), m)
+        self.month_combo.setCurrentIndex(self.selected_month - 1)
+        self.month_combo.currentIndexChanged.connect(self.set_month)
+
+        self.year_combo = QComboBox()
+        for y in range(date.today().year, 1999, -1):
+            self.year_combo.addItem(str(y), y)
+        self.year_combo.setCurrentText(str(self.selected_year))
+        self.year_combo.currentIndexChanged.connect(self.set_month)
+
+        self.export_pdf_btn = QPushButton("Export PDF")
+        self.export_pdf_btn.setIcon(QIcon.fromTheme("document-save"))
+        self.export_pdf_btn.setStyleSheet("""
+            QPushButton {
+                background: #fb700e;
+                color: #fff;
+                border-radius: 12px;
+                font-weight: 600;
+                padding: 8px 18px;
+                font-size: 16px;
+                letter-spacing: 0.5px;
+            }
+            QPushButton:hover {
+                background: #ff9800;
+            }
+        """)
+        self.export_pdf_btn.clicked.connect(self.export_monthly_report_pdf)
+
+        self.topRow.addWidget(QLabel("Month:", self))
+        self.topRow.addWidget(self.month_combo)
+        self.topRow.addWidget(QLabel("Year:", self))
+        self.topRow.addWidget(self.year_combo)
+        self.topRow.addStretch()
+        self.topRow.addWidget(self.export_pdf_btn)
+        self.layout.addLayout(self.topRow)
+
+        # Modern Rectangle KPI Cards Section in a grid
+        self.kpiGrid = QGridLayout()
+        self.kpiGrid.setSpacing(18)
+        self.layout.addSpacing(18)
+        self.layout.addLayout(self.kpiGrid)
+
+        aging_title = QLabel("Accounts Payable Aging", self)
+        aging_title.setObjectName("dashboardSubtitle")
+        self.layout.addSpacing(18)
+        self.layout.addWidget(aging_title)
+        self.agingGrid = QGridLayout()
+        self.agingGrid.setSpacing(18)
+        self.layout.addLayout(self.agingGrid)
+
+        projection_title = QLabel(f"Cash Projection (next {CASH_PROJECTION_DAYS} days)", self)
+        projection_title.setObjectName("dashboardSubtitle")
+        self.layout.addSpacing(18)
+        self.layout.addWidget(projection_title)
+        self.projectionGrid = QGridLayout()
+        self.projectionGrid.setSpacing(18)
+        self.layout.addLayout(self.projectionGrid)
+        self.projection_table = QTableWidget(0, 4)
+        self.projection_table.setHorizontalHeaderLabels(["Date", "Due", "Amount (AED)", "Projected Balance (AED)"])
+        self.projection_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.projection_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.projection_table.verticalHeader().setVisible(False)
+        self.projection_table.setMaximumHeight(220)
+        self.layout.addWidget(self.projection_table)
+
+        self.layout.addStretch(1)
+        self.refresh()
+
+    def set_month(self):
+        self.selected_month = self.month_combo.currentData()
+        self.selected_year = self.year_combo.currentData()
+        self.refresh()
+
+    def get_ap_aging_totals(self):
+        conn = get_conn()
+        totals = ap_aging_totals(fetch_ap_aging(conn))
+        conn.close()
+        return totals
+
+    def get_total_accounts_payable(self):
+        # the open items of every vendor with a positive balance add up to that balance
+        return sum(self.get_ap_aging_totals())
+
+    def get_income_year_over_year(self):
+        """Change % of the selected month's income against the same month last year (None without NumPy)."""
+        if np is None:
+            return None
+        try:
+            cashflow = load_snapshot("cashflow")
+        except (sqlite3.Error, OSError, RuntimeError):
+            return None
+        months, totals = monthly_totals(cashflow, CASHFLOW_INCOME)
+        _, _, _, change = year_over_year(months, totals)
+        idx = month_index(self.selected_year, self.selected_month)
+        if len(months) == 0 or not months[0] <= idx <= months[-1]:
+            return float("nan")
+        return float(change[idx - months[0]])
+
+    def kpi_card_rect(self, icon, title, amount, color, bg="#232627"):
+        box = QFrame()
+        box.setStyleSheet(
+            f"""
+                QFrame {{
+                    background: {bg};
+                    border-radius: 5px;
+                    padding: 0px 0px;
+                    /* Remove border for no outline */
+                }}
+            """
+        )
+        h = QHBoxLayout(box)
+        h.setContentsMargins(8, 4, 8, 4)
+        h.setSpacing(4)
+        icon_label = QLabel(icon)
+        icon_label.setStyleSheet(f"font-size:38px; color:{color};")
+        icon_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        h.addWidget(icon_label, 0, Qt.AlignmentFlag.AlignVCenter)
+        right = QVBoxLayout()
+        right.setContentsMargins(0, 0, 0, 0)
+        title_label = QLabel(title)
+        title_label.setStyleSheet("font-size:16px;color:#bcbcbc; font-weight:700; margin-bottom:0px;")
+        right.addWidget(title_label)
+        amount_label = QLabel(amount)
+        amount_label.setStyleSheet(
+            f"font-size:24px;font-weight:700;color:{color};margin-top:2px;letter-spacing:1px;"
+        )
+        right.addWidget(amount_label)
+        right.addStretch()
+        h.addLayout(right)
+        return box
+
+    def refresh(self):
+        # Remove old KPI cards
+        for grid in (self.kpiGrid, self.agingGrid):
+            for i in reversed(range(grid.count())):
+                w = grid.itemAt(i).widget()
+                if w:
+                    grid.removeWidget(w)
+                    w.deleteLater()
+
+        conn = get_conn()
+        q_month = f"{self.selected_month:02}"
+        q_year = str(self.selected_year)
+        month_from, month_to = f"{q_year}-{q_month}-01", f"{q_year}-{q_month}-31"
+        income_src = view_ledger_source(self, conn, "daily_income", ("date", "amount"), month_from, month_to)
+        expense_src = view_ledger_source(self, conn, "daily_expense", ("date", "amount"), month_from, month_to)
+        income = QUERY_CACHE.scalar(
+            conn, f"SELECT SUM(amount) FROM {income_src} WHERE date BETWEEN ? AND ?", (month_from, month_to), ("daily_income",)
+        ) or 0
+        expenses = QUERY_CACHE.scalar(
+            conn, f"SELECT SUM(amount) FROM {expense_src} WHERE date BETWEEN ? AND ?", (month_from, month_to), ("daily_expense",)
+        ) or 0
+        balance = income - expenses
+        profit_percent = (balance / income * 100) if income > 0 else 0
+        aging_totals = self.get_ap_aging_totals()
+        total_payable = sum(aging_totals)
+        income_yoy = self.get_income_year_over_year()
+
+        card_data = [
+            ("\U0001F4B0", "Total Income", f"{fmt_money(income, True)} AED", "#43a047"),
+            ("\U0001F4B8", "Total Expenses", f"{fmt_money(expenses, True)} AED", "#e53935"),
+            ("\U0001F4B5", "Balance", f"{fmt_money(balance, True)} AED", "#fbc02d" if balance >= 0 else "#e53935"),
+            ("\U0001F4C8", "Profit %", f"{profit_percent:,.2f} %", "#43a047" if profit_percent >= 0 else "#e53935"),
+            ("\U0001F4B3", "A/P Vendors", f"{fmt_money(total_payable, True)} AED", "#fb700e"),
+            
+            ]
+        if income_yoy is not None:
+            card_data.append(
+                ("\U0001F4C5", "Income vs Last Year", f"{income_yoy:+,.2f} %" if income_yoy == income_yoy else "n/a",
+                 "#43a047" if not income_yoy < 0 else "#e53935")
+            )
+
+        # Arrange cards in a grid of 3 columns
+        num_columns = 3
+        for idx, data in enumerate(card_data):
+            row = idx // num_columns
+            col = idx % num_columns
+            self.kpiGrid.addWidget(self.kpi_card_rect(*data), row, col)
+
+        aging_colors = ("#43a047", "#fbc02d", "#fb700e", "#f4511e", "#e53935")
+        for col, (label, amount, color) in enumerate(zip(AP_AGING_BUCKETS, aging_totals, aging_colors)):
+            self.agingGrid.addWidget(self.kpi_card_rect("\u23F3", label, f"{fmt_money(amount, True)} AED", color), 0, col)
+
+        conn.close()
+        self.refresh_projection(force=True)
+
+    def refresh_projection(self, force=False):
+        """Redraws the projection cards; without force only when a source table has changed."""
+        conn = get_conn()
+        try:
+            changed = CASH_PROJECTION.refresh(conn)
+        except MissingArchiveError as e:
+            warn_missing_archive(self, e)
+            return
+        finally:
+            conn.close()
+        if not changed and not force:
+            return
+        for i in reversed(range(self.projectionGrid.count())):
+            w = self.projectionGrid.itemAt(i).widget()
+            if w:
+                self.projectionGrid.removeWidget(w)
+                w.deleteLater()
+
+        def color(amount):
+            return "#43a047" if amount >= 0 else "#e53935"
+
+        today_balance = CASH_PROJECTION.balance_on(0)
+        cards = [("\U0001F3E6", "Cash Today", f"{fmt_money(today_balance, True)} AED", color(today_balance))]
+        for days in (30, CASH_PROJECTION_DAYS):
+            low, when = CASH_PROJECTION.lowest_balance(days)
+            cards.append(("\U0001F4C9", f"Lowest in {days} Days ({when.strftime('%d-%m')})",
+                          f"{fmt_money(low, True)} AED", color(low)))
+        end_balance = CASH_PROJECTION.balance_on(CASH_PROJECTION_DAYS)
+        cards.append(("\U0001F52E", f"In {CASH_PROJECTION_DAYS} Days", f"{fmt_money(end_balance, True)} AED", color(end_balance)))
+        for col, data in enumerate(cards):
+            self.projectionGrid.addWidget(self.kpi_card_rect(*data), 0, col)
+
+        rows = CASH_PROJECTION.upcoming(50)
+        self.projection_table.setRowCount(len(rows))
+        for i, (when, amount, label, balance) in enumerate(rows):
+            for col, text in enumerate((to_ddmmyyyy(when.isoformat()), label,
+                                        fmt_money(amount, True), fmt_money(balance, True))):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                if col == 3 and balance < 0:
+                    item.setForeground(QColor("#e53935"))
+                self.projection_table.setItem(i, col, item)
+
+    def export_monthly_report_pdf(self):
+        month = self.selected_month
+        year = self.selected_year
+        q_month = f"{month:02}"
+        q_year = str(year)
+        conn = get_conn()
+        try:
+            report = fetch_monthly_report(conn, month, year)
+        except MissingArchiveError as e:
+            QMessageBox.warning(self, "Monthly Report", str(e))
+            return
+        finally:
+            conn.close()
+
+        table = monthly_report_table(report, month, year, profit_column=True)
+        table.preview(self, "Print Preview - Monthly Report")
+
+        file_dialog = QFileDialog()
+        file_path, _ = file_dialog.getSaveFileName(self, "Save PDF", f"MonthlyReport_{q_year}-{q_month}.pdf", "PDF Files (*.pdf)")
+        if not file_path:
+            return
+        table.write_pdf(file_path)
+
+# --- Receipt printing (ESC/POS thermal printer) ---
+try:
+    import win32print
+except ImportError:  # pywin32 only exists on Windows; receipts then go to a file backend
+    win32print = None
+
+RECEIPT_LINE_WIDTH = 42
+RECEIPT_LABEL_WIDTH = 20
+RECEIPT_TOP_MARGIN = b"\r\n" * 2
+RECEIPT_BOTTOM_MARGIN = b"\r\n" * 8
+RECEIPT_CUT = b'\x1d\x56\x00'
+RECEIPT_ENCODING = "utf-8"
+RECEIPT_RETRIES = 3
+RECEIPT_RETRY_DELAY = 2.0  # seconds, doubled after each failed attempt
+RECEIPT_FALLBACK_FILE = os.path.join(os.path.expanduser("~"), "NationalBicyclesReceipts.prn")
+
+_receipt_templates = {}
+
+
+def receipt_template(title):
+    """Pre-encoded fixed parts of a receipt: (head, rule, tail). Built once per title."""
+    template = _receipt_templates.get(title)
+    if template is None:
+        rule = b"-" * RECEIPT_LINE_WIDTH + b"\r\n"
+        head = (RECEIPT_TOP_MARGIN
+                + "NATIONAL BICYCLES".center(RECEIPT_LINE_WIDTH).encode(RECEIPT_ENCODING) + b"\r\n"
+                + title.center(RECEIPT_LINE_WIDTH).encode(RECEIPT_ENCODING) + b"\r\n"
+                + rule)
+        tail = b"-" * RECEIPT_LINE_WIDTH + RECEIPT_BOTTOM_MARGIN + RECEIPT_CUT
+        template = _receipt_templates[title] = (head, rule, tail)
+    return template
+
+
+def render_day_receipt(date_ddmmyyyy, total_income, total_expense, expense_rows):
+    """The complete byte stream for the daily report receipt, paper cut included."""
+    head, rule, tail = receipt_template("DAILY REPORT")
+    width, label_width = RECEIPT_LINE_WIDTH, RECEIPT_LABEL_WIDTH
+    balance = total_income - total_expense
+
+    def lined_amount(label, amount):
+        return f"{label:<{label_width}}{fmt_money(amount, True):>{width - label_width}}\r\n"
+
+    summary = (
+        lined_amount("Total Sales:", total_income)
+        + lined_amount("Total Expenses:", total_expense)
+        + lined_amount("Balance:", balance)
+    )
+    parts = [
+        head,
+        f"Date: {date_ddmmyyyy}\r\n".encode(RECEIPT_ENCODING), rule,
+        summary.encode(RECEIPT_ENCODING), rule,
+        f"BALANCE: {fmt_money(balance, True)}".center(width).encode(RECEIPT_ENCODING) + b"\r\n", rule,
+    ]
+    body = ["Expense Details:\r\n", "\r\n"]
+    if expense_rows:
+        for desc, amt in expense_rows:
+            desc_str = desc or ""
+            if len(desc_str) > 24:
+                desc_str = desc_str[:24] + "…"  # Shorten long descriptions
+            amt_str = fmt_money(amt, True)
+            space = width - len(desc_str) - len(amt_str)
+            body.append(desc_str + " " * max(1, space) + amt_str + "\r\n")
+    else:
+        body.append("No Expenses".center(width) + "\r\n")
+    parts += ["".join(body).encode(RECEIPT_ENCODING), tail]
+    return b"".join(parts)
+
+
+class WindowsRawPrinter:
+    """Sends jobs as RAW data through the Windows print spooler."""
+
+    def __init__(self, printer_name=None):
+        if win32print is None:
+            raise RuntimeError("pywin32 is not installed")
+        self.printer_name = printer_name
+
+    def describe(self):
+        return self.printer_name or "default printer"
+
+    def write(self, title, data):
+        printer_name = self.printer_name or win32print.GetDefaultPrinter()
+        hprinter = win32print.OpenPrinter(printer_name)
+        try:
+            win32print.StartDocPrinter(hprinter, 1, (title, None, "RAW"))
+            try:
+                win32print.StartPagePrinter(hprinter)
+                win32print.WritePrinter(hprinter, data)
+                win32print.EndPagePrinter(hprinter)
+            finally:
+                win32print.EndDocPrinter(hprinter)
+        finally:
+            win32print.ClosePrinter(hprinter)
+
+
+class FilePrinter:
+    """
+    Appends each job's exact byte stream to a file, named pipe or device node
+    (e.g. /dev/usb/lp0). Used when pywin32 is missing and for checking receipts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def describe(self):
+        return self.path
+
+    def write(self, title, data):
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+
+def default_receipt_backend():
+    """NBS_RECEIPT_PRINTER=file:<path> forces a file backend; otherwise the Windows spooler if available."""
+    target = os.environ.get("NBS_RECEIPT_PRINTER", "")
+    if target.startswith("file:"):
+        return FilePrinter(target[len("file:"):])
+    if win32print is not None:
+        return WindowsRawPrinter(target or None)
+    return FilePrinter(RECEIPT_FALLBACK_FILE)
+
+
+class ReceiptSpooler(QObject):
+    """
+    Queue of print jobs drained by one worker thread, so a slow or offline
+    printer never blocks the UI. A failed job is retried with a growing delay;
+    the outcome is reported through signals (delivered on the GUI thread).
+    """
+    jobPrinted = pyqtSignal(str)
+    jobFailed = pyqtSignal(str, str)
+
+    def __init__(self, backend, retries=RECEIPT_RETRIES, retry_delay=RECEIPT_RETRY_DELAY, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.jobs = queue.Queue()
+        self.stopping = threading.Event()
+        self.worker = threading.Thread(target=self._run, name="receipt-spooler", daemon=True)
+        self.worker.start()
+
+    def submit(self, title, data):
+        self.jobs.put((title, bytes(data)))
+
+    def pending(self):
+        return self.jobs.unfinished_tasks
+
+    def stop(self, timeout=5.0):
+        """Give queued jobs one last attempt (up to timeout seconds) and end the worker."""
+        self.stopping.set()
+        self.jobs.put(None)
+        self.worker.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                self._print(*job)
+            finally:
+                self.jobs.task_done()
+
+    def _print(self, title, data):
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                self.backend.write(title, data)
+            except Exception as e:
+                if attempt == self.retries or self.stopping.wait(delay):
+                    self.jobFailed.emit(title, str(e))
+                    return
+                delay *= 2
+            else:
+                self.jobPrinted.emit(title)
+                return
+
+
+_receipt_spooler = None
+
+
+def get_receipt_spooler():
+    global _receipt_spooler
+    if _receipt_spooler is None:
+        _receipt_spooler = ReceiptSpooler(default_receipt_backend())
+    return _receipt_spooler
+
+
+class DailyTab(QWidget):
+    def __init__(self, dashboard_tab, parent=None):
+        super().__init__(parent)
+        self.dashboard_tab = dashboard_tab
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(10)
+
+        self.filter_widget = FilterWidget()
+        layout.addWidget(self.filter_widget)
+        self.filter_widget.date_from.dateChanged.connect(self.load_data)
+        self.filter_widget.date_to.dateChanged.connect(self.load_data)
+        self.filter_widget.category_input.currentIndexChanged.connect(self.load_data)
+        self.filter_widget.description_input.textChanged.connect(self.load_data)
+        self.filter_widget.clear_button.clicked.connect(self.load_data)
+        self.filter_widget.on_month_selected()
+
+        layout.addSpacing(0)
+
+        # --- Button Row with left margin and Today label with right margin ---
+        btn_row = QHBoxLayout()
+        btn_row.setSpacing(0)
+
+        # Container widget for left margin for buttons
+        btn_left_container = QWidget()
+        btn_left_layout = QHBoxLayout()
+        btn_left_layout.setContentsMargins(12, 0, 0, 0)
+        btn_left_layout.setSpacing(12)
+        btn_left_container.setLayout(btn_left_layout)
+
+        self.add_entry_btn = QPushButton()
+        self.add_entry_btn.setToolTip("Add Income/Expense Entry (F1)")
+        self.add_entry_btn.setFixedSize(40, 40)
+        self.add_entry_btn.setStyleSheet(
+            "background:#26292A; color:white; border-radius: 3px;"
+        )
+        # Use standard Plus icon
+        self.add_entry_btn = QPushButton()
+        self.add_entry_btn.setToolTip("Add Income/Expense Entry (F1)")
+        self.add_entry_btn.setFixedSize(40, 40)
+        self.add_entry_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
+
+        # Use 'list-add' theme icon if available, fallback to unicode plus
+        icon = QIcon.fromTheme("list-add")
+        if not icon.isNull():
+            self.add_entry_btn.setIcon(icon)
+            self.add_entry_btn.setIconSize(QSizeF(24, 24).toSize())
+            self.add_entry_btn.setText("")  # No text, icon-only
+        else:
+            self.add_entry_btn.setText("＋")
+            self.add_entry_btn.setFont(QFont("Arial", 22, QFont.Weight.Bold))
+
+        self.add_entry_btn.clicked.connect(self.show_entry_dialog)
+
+        # --- Print Button: now icon-only with tooltip ---
+        self.print_btn = QPushButton()
+        self.print_btn.setToolTip("Print Day Report (F12)")
+        self.print_btn.setFixedSize(40, 40)
+        self.print_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
+
+        printer_icon = QIcon.fromTheme("printer")
+        if not printer_icon.isNull():
+            self.print_btn.setIcon(printer_icon)
+            self.print_btn.setIconSize(QSizeF(24, 24).toSize())
+            self.print_btn.setText("")
+        else:
+            self.print_btn.setText("\U0001F5A8")  # Unicode printer emoji
+
+        self.print_btn.clicked.connect(self.print_day_report)
+        self.print_shortcut = QShortcut(QKeySequence("F12"), self)
+        self.print_shortcut.activated.connect(self.print_day_report)
+
+        self.batch_entry_btn = QPushButton()
+        self.batch_entry_btn.setToolTip("Batch Entry for a Day (F2)")
+        self.batch_entry_btn.setFixedSize(40, 40)
+        self.batch_entry_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
+        batch_icon = QIcon.fromTheme("document-new")
+        if not batch_icon.isNull():
+            self.batch_entry_btn.setIcon(batch_icon)
+            self.batch_entry_btn.setIconSize(QSizeF(24, 24).toSize())
+        else:
+            self.batch_entry_btn.setText("\u2630")
+            self.batch_entry_btn.setFont(QFont("Arial", 18, QFont.Weight.Bold))
+        self.batch_entry_btn.clicked.connect(self.show_batch_entry_dialog)
+        self.batch_entry_shortcut = QShortcut(QKeySequence("F2"), self)
+        self.batch_entry_shortcut.activated.connect(self.show_batch_entry_dialog)
+        btn_left_layout.addWidget(self.add_entry_btn)
+        btn_left_layout.addWidget(self.batch_entry_btn)
+        btn_left_layout.addWidget(self.print_btn)
+
+        btn_row.addWidget(btn_left_container)
+        btn_row.addStretch()
+        layout.addLayout(btn_row)
+
+        layout.addSpacing(4)
+
+        # --- Income and Expense Records label ---
+        label = QLabel("Income and Expense Records:")
+        label.setContentsMargins(8, 0, 0, 0)  # Horizontal gap from left for label
+        layout.addWidget(label)
+
+        layout.addSpacing(2)  # Gap between label and table
+
+        # --- Data Table ---
+        self.data_table = QTableWidget()
+        self.data_table.setWordWrap(True)
+        self.data_table.setColumnCount(8)
+        self.data_table.setHorizontalHeaderLabels([
+            'Date', 'Month', 'Type', 'Category', 'Description', 'Amount (AED)', 'Notes', 'ID'
+        ])
+        header = self.data_table.horizontalHeader()
+        self.data_table.setColumnWidth(0, 100)   # Date
+        self.data_table.setColumnWidth(1, 120)   # Month
+        self.data_table.setColumnWidth(2, 100)   # Type
+        self.data_table.setColumnWidth(3, 170)   # Category
+        self.data_table.setColumnWidth(4, 270)   # Description
+        self.data_table.setColumnWidth(5, 150)   # Amount
+        self.data_table.setColumnWidth(6, 200)   # Notes
+        self.data_table.setColumnHidden(7, True) # Hide ID
+
+        # Set column resize modes: fixed for all except Notes, which stretches
+        for idx in range(7):
+            if idx == 6:
+                header.setSectionResizeMode(idx, QHeaderView.ResizeMode.Stretch)
+            else:
+                header.setSectionResizeMode(idx, QHeaderView.ResizeMode.Fixed)
+
+        self.data_table.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.data_table.verticalHeader().setDefaultSectionSize(36)
+
+        layout.addWidget(self.data_table)
+
+        layout.addSpacing(12)  # Gap before totals
+
+        # --- Totals frame: now Add. Capital last ---
+        self.totals_frame = QFrame()
+        self.totals_frame.setFrameShape(QFrame.Shape.NoFrame)
+        self.totals_frame.setObjectName("totalsbox")
+        totals_layout = QHBoxLayout(self.totals_frame)
+        totals_layout.setSpacing(18)
+        totals_layout.setContentsMargins(0, 7, 0, 7)
+        def card(style, text):
+            box = QFrame()
+            box.setFrameShape(QFrame.Shape.StyledPanel)
+            box.setStyleSheet(style)
+            v = QVBoxLayout(box)
+            v.setContentsMargins(14, 10, 14, 10)
+            v.setSpacing(2)
+            label = QLabel(text)
+            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            v.addWidget(label)
+            return box, label
+        card_style = lambda c: (f"background: {c}; border-radius:15px;"
+            "border: none; color:#F1F3F4; min-width:135px; font-weight:bold; font-size:17px;")
+        self.total_income_box, self.total_income_label = card(card_style("#232627"), "Income")
+        self.total_expense_box, self.total_expense_label = card(card_style("#232627"), "Expense")
+        self.balance_box, self.balance_label = card(card_style("#232627"), "Balance")
+        self.profit_box, self.profit_label = card(card_style("#232627"), "Profit %")
+        self.capital_box, self.capital_label = card(card_style("#232627"), "Add. Capital")
+        totals_layout.addWidget(self.total_income_box)
+        totals_layout.addWidget(self.total_expense_box)
+        totals_layout.addWidget(self.balance_box)
+        totals_layout.addWidget(self.profit_box)
+        totals_layout.addWidget(self.capital_box)
+        self.totals_frame.setLayout(totals_layout)
+        layout.addWidget(self.totals_frame)
+
+        self.data_table.doubleClicked.connect(self.handle_table_double_click)
+        self.setLayout(layout)
+        self.load_data()
+        self.data_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.data_table.clearSelection()
+        self.data_table.setCurrentCell(-1, -1)
+
+    def show_entry_dialog(self):
+        dialog = IncomeExpenseEntryDialog(self)
+        if dialog.exec():
+            (
+                date_iso,
+                type_str,
+                cat_id,
+                amount_text,
+                desc,
+                notes
+            ) = dialog.get_values()
+            amt = parse_amount(amount_text)
+            if amt <= 0:
+                QMessageBox.warning(self, "Amount Required", "Please enter a valid amount greater than zero.")
+                return
+            conn = get_conn()
+            try:
+                add_cashflow_entry(conn, type_str, date_iso, amt, cat_id, desc, notes)
+            except ValueError as e:
+                conn.close()
+                QMessageBox.warning(self, "Cannot Save", str(e))
+                return
+            conn.commit()
+            conn.close()
+            self.load_data()
+            self.dashboard_tab.refresh()
+
+    def show_batch_entry_dialog(self):
+        dialog = BatchEntryDialog(self)
+        if not dialog.exec():
+            return
+        date_iso, entries = dialog.get_values()
+        income = [(date_iso, amt, cat_id, desc, notes) for typ, cat_id, amt, desc, notes in entries if typ == "Income"]
+        expense = [(date_iso, amt, cat_id, desc, notes) for typ, cat_id, amt, desc, notes in entries if typ == "Expense"]
+        capital = [(date_iso, amt, "Additional Capital", desc, notes) for typ, _, amt, desc, notes in entries if typ == "Capital"]
+        conn = get_conn()
+        try:
+            check_open_period(conn, date_iso)
+        except ValueError as e:
+            conn.close()
+            QMessageBox.warning(self, "Cannot Save", str(e))
+            return
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO daily_income (date, amount, category_id, description, notes) VALUES (?, ?, ?, ?, ?)", income)
+                conn.executemany(
+                    "INSERT INTO daily_expense (date, amount, category_id, description, notes) VALUES (?, ?, ?, ?, ?)", expense)
+                conn.executemany(
+                    "INSERT INTO daily_capital (date, amount, category, description, notes) VALUES (?, ?, ?, ?, ?)", capital)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Could not save the entries; nothing was recorded.\n{e}")
+            return
+        finally:
+            conn.close()
+        self.load_data()
+        self.dashboard_tab.refresh()
+
+    def load_data(self):
+        date_from = self.filter_widget.date_from.date().toString("yyyy-MM-dd")
+        date_to = self.filter_widget.date_to.date().toString("yyyy-MM-dd")
+        cat = self.filter_widget.category_input.currentData()
+        desc_filter = self.filter_widget.description_input.text().strip().lower()
+
+        conn = get_conn()
+        c = conn.cursor()
+        rows = []
+        params = []
+        # closed years are read from their archives
+        cashflow_columns = ("id", "date", "amount", "category_id", "description", "notes")
+        income_src = view_ledger_source(self, conn, "daily_income", cashflow_columns, date_from, date_to)
+        expense_src = view_ledger_source(self, conn, "daily_expense", cashflow_columns, date_from, date_to)
+        capital_src = view_ledger_source(self, conn, "daily_capital", ("id", "date", "amount", "category", "description", "notes"),
+                                         date_from, date_to)
+
+        # Fetch income and expense records
+        if not cat or cat == "All":
+            final_query = f"""
+            SELECT di.date, di.amount, ic.name, 'Income', di.description, di.id, di.category_id, di.notes
+            FROM {income_src} di
+            LEFT JOIN income_categories ic ON di.category_id = ic.id
+            WHERE di.date BETWEEN ? AND ?
+            UNION ALL
+            SELECT de.date, de.amount, ec.name, 'Expense', de.description, de.id, de.category_id, de.notes
+            FROM {expense_src} de
+            LEFT JOIN expense_categories ec ON de.category_id = ec.id
+            WHERE de.date BETWEEN ? AND ?
+            UNION ALL
+            SELECT dc.date, dc.amount, dc.category, 'Capital', dc.description, dc.id, NULL, dc.notes
+            FROM {capital_src} dc
+            WHERE dc.date BETWEEN ? AND ?
+            ORDER BY date ASC
+            """
+            params = [date_from, date_to, date_from, date_to, date_from, date_to]
+            c.execute(final_query, params)
+            rows = c.fetchall()
+
+        elif cat.startswith("inc:"):
+            cat_id = int(cat.split(":")[1])
+            income_query = f'''SELECT di.date, di.amount, ic.name, 'Income', di.description, di.id, di.category_id, di.notes
+                      FROM {income_src} di
+                      LEFT JOIN income_categories ic ON di.category_id = ic.id
+                      WHERE di.date BETWEEN ? AND ? AND di.category_id = ?'''
+            params = [date_from, date_to, cat_id]
+            c.execute(income_query + " ORDER BY di.date DESC", params)
+            rows = c.fetchall()
+        elif cat.startswith("exp:"):
+            cat_id = int(cat.split(":")[1])
+            expense_query = f'''SELECT de.date, de.amount, ec.name, 'Expense', de.description, de.id, de.category_id, de.notes
+                               FROM {expense_src} de
+                               LEFT JOIN expense_categories ec ON de.category_id = ec.id
+                               WHERE de.date BETWEEN ? AND ? AND de.category_id = ?'''
+            params = [date_from, date_to, cat_id]
+            c.execute(expense_query + " ORDER BY de.date DESC", params)
+            rows = c.fetchall()
+        
+        elif cat.startswith("capital:"):
+            c.execute(
+                f"SELECT date, amount, category, 'Capital', description, id, NULL, notes FROM {capital_src} WHERE date BETWEEN ? AND ? AND category=?",
+                (date_from, date_to, "Additional Capital")
+            )
+            rows = c.fetchall()
+        else:
+            rows = []
+
+        # Apply description filter
+        if desc_filter:
+            rows = [r for r in rows if desc_filter in (r[4] or "").lower()]
 
         self.data_table.setRowCount(len(rows))
         total_income = 0
@@ -1215,7 +4357,7 @@ class DailyTab(QWidget):
             notes_len = len(notes or "")
             self.data_table.setRowHeight(i, 56 if desc_len > 60 or notes_len > 60 else 36)
             for col, value in enumerate([
-                to_ddmmyyyy(d), to_month(d), typ, cat or "", desc or "", f"{amt:.2f} AED", notes or ""
+                to_ddmmyyyy(d), to_month(d), typ, cat or "", desc or "", f"{fmt_money(amt)} AED", notes or ""
             ]):
                 item = QTableWidgetItem(str(value))
                 item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -1233,2157 +4375,2964 @@ class DailyTab(QWidget):
             elif typ == "Capital":
                 total_capital += amt
 
-        balance = total_income - total_expense
-        profit_percent = (balance / total_income * 100) if total_income > 0 else 0
-        color = "#43a047" if balance >= 0 else "#e53935"
-        self.total_income_label.setText(f"Income<br><span style='font-size:21px; color:#43a047'>{total_income:.2f} AED</span>")
-        self.total_expense_label.setText(f"Expense<br><span style='font-size:21px; color:#e53935'>{total_expense:.2f} AED</span>")
-        self.balance_label.setText(
-            f"Balance<br><span style='font-size:21px; color:{color}'>{balance:.2f} AED</span>"
-        )
-        self.profit_label.setText(
-            f"Profit %<br><span style='font-size:21px; color:{color}'>{profit_percent:.2f}%</span>"
-        )
-        self.capital_label.setText(f"Add. Capital<br><span style='font-size:21px; color:#1e88e5'>{total_capital:.2f} AED</span>")
-        conn.close()
+        balance = total_income - total_expense
+        profit_percent = (balance / total_income * 100) if total_income > 0 else 0
+        color = "#43a047" if balance >= 0 else "#e53935"
+        self.total_income_label.setText(f"Income<br><span style='font-size:21px; color:#43a047'>{fmt_money(total_income)} AED</span>")
+        self.total_expense_label.setText(f"Expense<br><span style='font-size:21px; color:#e53935'>{fmt_money(total_expense)} AED</span>")
+        self.balance_label.setText(
+            f"Balance<br><span style='font-size:21px; color:{color}'>{fmt_money(balance)} AED</span>"
+        )
+        self.profit_label.setText(
+            f"Profit %<br><span style='font-size:21px; color:{color}'>{profit_percent:.2f}%</span>"
+        )
+        self.capital_label.setText(f"Add. Capital<br><span style='font-size:21px; color:#1e88e5'>{fmt_money(total_capital)} AED</span>")
+        conn.close()
+
+        # Always scroll to the bottom (show latest date at the bottom)
+        if self.data_table.rowCount() > 0:
+            self.data_table.scrollToBottom()
+
+    def handle_table_double_click(self, idx):
+        row = idx.row()
+        typ = self.data_table.item(row, 2).text()
+
+        cat = self.data_table.item(row, 3).text()
+        # Block editing for Vendors expense
+        if typ == "Expense" and cat.strip().lower() == "vendors":
+            QMessageBox.information(
+                self,
+                "Edit in Vendor Tab",
+                "Vendor transactions can only be modified through Vendors tab."
+            )
+            return
+        # Block editing for Payroll-related expense
+        if typ == "Expense" and cat == "Salary":
+            QMessageBox.information(
+                self,
+                "Edit in Payroll Tab",
+                "Payroll entries can only be modified through Payroll tab."
+            )
+            return
+        
+        conn = get_conn()
+        try:
+            check_open_period(conn, to_iso_date(self.data_table.item(row, 0).text()))
+        except ValueError as e:
+            QMessageBox.information(self, "Closed Year", str(e))
+            return
+        finally:
+            conn.close()
+
+        id_item = self.data_table.item(row, 7)
+        if id_item is None or not id_item.text().strip().isdigit():
+            QMessageBox.warning(self, "Error", "ID not found for this entry.")
+            return
+        eid = int(id_item.text())
+        date_str = self.data_table.item(row, 0).text()
+        desc = self.data_table.item(row, 4).text()
+        amt = to_fils(self.data_table.item(row, 5).text())
+        notes = self.data_table.item(row, 6).text()
+        conn = get_conn()
+        c = conn.cursor()
+        if typ == "Income":
+            c.execute("SELECT category_id FROM daily_income WHERE id=?", (eid,))
+        else:
+            c.execute("SELECT category_id FROM daily_expense WHERE id=?", (eid,))
+        result = c.fetchone()
+        catid = result[0] if result else None
+        conn.close()
+        dialog = EntryEditDialog(typ, eid, to_iso_date(date_str), catid, amt, desc, notes, self)
+        if dialog.exec():
+            if dialog.deleted:
+                self.delete_entry(typ, eid)
+            else:
+                new_date, new_catid, new_amt, new_desc, new_notes = dialog.get_values()
+                self.update_entry(typ, eid, new_date, new_catid, new_amt, new_desc, new_notes)
+            self.load_data()
+            self.dashboard_tab.refresh()
+
+    def update_entry(self, typ, eid, date, catid, amt, desc, notes):
+        conn = get_conn()
+        try:
+            check_open_period(conn, date)
+        except ValueError as e:
+            conn.close()
+            QMessageBox.warning(self, "Cannot Save", str(e))
+            return
+        c = conn.cursor()
+        if typ == "Income":
+            c.execute("UPDATE daily_income SET date=?, category_id=?, amount=?, description=?, notes=? WHERE id=?",
+                      (date, catid, amt, desc, notes, eid))
+        else:
+            c.execute("UPDATE daily_expense SET date=?, category_id=?, amount=?, description=?, notes=? WHERE id=?",
+                      (date, catid, amt, desc, notes, eid))
+        conn.commit()
+        conn.close()
+
+    def delete_entry(self, typ, eid):
+        conn = get_conn()
+        c = conn.cursor()
+        if typ == "Income":
+            c.execute("DELETE FROM daily_income WHERE id=?", (eid,))
+        else:
+            c.execute("DELETE FROM daily_expense WHERE id=?", (eid,))
+        conn.commit()
+        conn.close()
+
+    def preview_transactions(self, selected_date, transaction_rows):
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Transactions for {QDate.fromString(selected_date, 'yyyy-MM-dd').toString('dd/MM/yyyy')}")
+        layout = QVBoxLayout(dialog)
+        table = QTableWidget()
+        table.setColumnCount(6)
+        table.setHorizontalHeaderLabels(['Type', 'Category', 'Amount', 'Description', 'Notes', 'Date'])
+        table.setRowCount(len(transaction_rows))
+        for i, (d, cat, typ, amt, desc, notes) in enumerate(transaction_rows):
+            table.setItem(i, 0, QTableWidgetItem(typ))
+            table.setItem(i, 1, QTableWidgetItem(cat or ""))
+            table.setItem(i, 2, QTableWidgetItem(f"{fmt_money(amt, True)} AED"))
+            table.setItem(i, 3, QTableWidgetItem(desc or ""))
+            table.setItem(i, 4, QTableWidgetItem(notes or ""))
+            table.setItem(i, 5, QTableWidgetItem(QDate.fromString(d, "yyyy-MM-dd").toString("dd/MM/yyyy")))
+        table.resizeColumnsToContents()
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(table)
+        btn_layout = QHBoxLayout()
+        ok_btn = QPushButton("Print")
+        cancel_btn = QPushButton("Cancel")
+        btn_layout.addWidget(ok_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+        ok_btn.clicked.connect(dialog.accept)
+        cancel_btn.clicked.connect(dialog.reject)
+        return dialog.exec() == QDialog.DialogCode.Accepted
+
+    def print_day_report(self):
+        # --- Step 1: Ask user for date to print ---
+        date_dialog = QDialog(self)
+        date_dialog.setWindowTitle("Select Date for Daily Report")
+        layout = QVBoxLayout(date_dialog)
+        date_edit = QDateEdit()
+        date_edit.setDisplayFormat("dd-MM-yyyy")
+        date_edit.setCalendarPopup(True)
+        date_edit.setDate(QDate.currentDate())
+        layout.addWidget(QLabel("Select date to print:"))
+        layout.addWidget(date_edit)
+        btn_row = QHBoxLayout()
+        ok_btn = QPushButton("OK")
+        cancel_btn = QPushButton("Cancel")
+        btn_row.addWidget(ok_btn)
+        btn_row.addWidget(cancel_btn)
+        layout.addLayout(btn_row)
+        ok_btn.clicked.connect(date_dialog.accept)
+        cancel_btn.clicked.connect(date_dialog.reject)
+        if date_dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        selected_date = date_edit.date().toString("yyyy-MM-dd")
+        date_ddmmyyyy = date_edit.date().toString("dd/MM/yyyy")
+
+        # --- Step 2: Gather summary data ---
+        conn = get_conn()
+        c = conn.cursor()
+
+        c.execute("""
+            SELECT SUM(amount) FROM daily_income di
+            LEFT JOIN income_categories ic ON di.category_id=ic.id
+            WHERE di.date=? AND ic.name='Sales'
+        """, (selected_date,))
+        sales = c.fetchone()[0] or 0
+
+        c.execute("""
+            SELECT SUM(amount) FROM daily_income di
+            LEFT JOIN income_categories ic ON di.category_id=ic.id
+            WHERE di.date=? AND ic.name='Services'
+        """, (selected_date,))
+        services = c.fetchone()[0] or 0
+
+        total_income = sales + services
+
+        c.execute("SELECT SUM(amount) FROM daily_expense WHERE date=?", (selected_date,))
+        total_expense = c.fetchone()[0] or 0
+        gross_income = total_income - total_expense
+
+        c.execute("SELECT description, amount FROM daily_expense WHERE date=? ORDER BY id ASC", (selected_date,))
+        expense_rows = c.fetchall()
+        conn.close()
+
+        # --- Step 3: Show preview dialog ---
+        preview = QDialog(self)
+        preview.setWindowTitle(f"Daily Summary Preview - {date_ddmmyyyy}")
+        preview.resize(421, 0)
+        vbox = QVBoxLayout(preview)
+
+        # Heading
+        heading = QLabel("Daily Summary")
+        heading_font = QFont()
+        heading_font.setBold(True)
+        heading_font.setPointSize(22)
+        heading.setFont(heading_font)
+        heading.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        vbox.addWidget(heading)
+
+        # Date
+        date_lbl = QLabel(f"Date: {date_ddmmyyyy}")
+        date_font = QFont()
+        date_font.setBold(True)
+        date_font.setPointSize(20)
+        date_lbl.setFont(date_font)
+        date_lbl.setAlignment(Qt.AlignmentFlag.AlignRight)
+        date_lbl.setStyleSheet("color: #fb700e;")
+        vbox.addWidget(date_lbl)
+
+        # 2px vertical gap (8px by default, you can adjust)
+        vbox.addSpacing(8)
+
+        # Sales, Service, Total Income, Expenses - vertically aligned
+        amount_font = QFont("Courier New", 12)  # Monospaced for alignment
+
+        summary_grid = QGridLayout()
+        summary_grid.setHorizontalSpacing(16)
+        summary_labels = ["Sales:", "Service:", "Total Income:", "Expenses:"]
+        summary_values = [sales, services, total_income, total_expense]
+        for row, (lbl, val) in enumerate(zip(summary_labels, summary_values)):
+            l = QLabel(lbl)
+            l.setFont(QFont("Segoe UI", 11))
+            l.setAlignment(Qt.AlignmentFlag.AlignLeft)
+            summary_grid.addWidget(l, row, 0)
+            v = QLabel(f"{fmt_money(val, True):>12} ")
+            v.setFont(amount_font)
+            v.setAlignment(Qt.AlignmentFlag.AlignRight)
+            v.setMinimumWidth(120)
+            summary_grid.addWidget(v, row, 1)
+        vbox.addLayout(summary_grid)
+
+        # Balance (center, bold, larger)
+        vbox.addSpacing(8)
+        balance_lbl = QLabel(f"BALANCE: {fmt_money(gross_income, True)} ")
+        balance_font = QFont()
+        balance_font.setBold(True)
+        balance_font.setPointSize(16)
+        balance_lbl.setFont(balance_font)
+        balance_lbl.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        balance_lbl.setStyleSheet("""
+            color: #fb700e;
+            border: 2px solid #ffbe87;
+            border-radius: 5px;
+            padding: 6px 0 6px 0;
+        """)
+        vbox.addWidget(balance_lbl)
+
+        # Expense Details section
+        expense_heading = QLabel("Expense Details:")
+        expense_heading.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
+        expense_heading.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        vbox.addWidget(expense_heading)
+
+        # Expense details in grid with vertical alignment for amounts
+        if expense_rows:
+            expense_grid = QGridLayout()
+            expense_grid.setHorizontalSpacing(16)
+            desc_font = QFont("Segoe UI", 10)
+            amt_font = QFont("Courier New", 11)
+            for row, (desc, amt) in enumerate(expense_rows):
+                desc_lbl = QLabel(desc or "")
+                desc_lbl.setFont(desc_font)
+                desc_lbl.setAlignment(Qt.AlignmentFlag.AlignLeft)
+                expense_grid.addWidget(desc_lbl, row, 0)
+                amt_lbl = QLabel(f"{fmt_money(amt, True):>12} ")
+                amt_lbl.setFont(amt_font)
+                amt_lbl.setAlignment(Qt.AlignmentFlag.AlignRight)
+                amt_lbl.setMinimumWidth(120)
+                expense_grid.addWidget(amt_lbl, row, 1)
+            vbox.addLayout(expense_grid)
+        else:
+            vbox.addWidget(QLabel("No Expenses"))
+
+        vbox.addSpacing(10)
+
+        # Buttons
+        btn_row = QHBoxLayout()
+        print_btn = QPushButton("Print")
+        cancel_btn = QPushButton("Cancel")
+        btn_row.addStretch()
+        btn_row.addWidget(print_btn)
+        btn_row.addWidget(cancel_btn)
+        btn_row.addStretch()
+        vbox.addLayout(btn_row)
+        print_btn.clicked.connect(preview.accept)
+        cancel_btn.clicked.connect(preview.reject)
+
+        if preview.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        # --- Step 4: Queue the receipt; the spooler prints it in the background ---
+        data = render_day_receipt(date_ddmmyyyy, total_income, total_expense, expense_rows)
+        spooler = get_receipt_spooler()
+        if not getattr(self, "_spooler_connected", False):
+            spooler.jobFailed.connect(self.on_print_failed)
+            self._spooler_connected = True
+        spooler.submit("Day Report", data)
+
+    def on_print_failed(self, title, error):
+        QMessageBox.warning(self, "Print Error", f"Failed to print {title}:\n{error}")
+
+            
+
+# --- Employee photos (app-managed store, thumbnails, LRU cache) ---
+PHOTO_STORE_DIR = os.path.join(os.path.expanduser("~"), "NBS_EmployeePhotos")
+PHOTO_THUMB_DIR = os.path.join(PHOTO_STORE_DIR, ".thumbs")
+PHOTO_THUMB_SIZE = 144  # px; the payroll labels are 64-72 px, so this stays sharp on 2x screens
+PHOTO_CACHE_SIZE = 64
+
+
+def store_employee_photo(src):
+    """Copies a picked photo into the photo store under a content hash and returns the stored path."""
+    with open(src, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:32]
+    ext = os.path.splitext(src)[1].lower() or ".jpg"
+    os.makedirs(PHOTO_STORE_DIR, exist_ok=True)
+    dest = os.path.join(PHOTO_STORE_DIR, digest + ext)
+    if not os.path.exists(dest):
+        shutil.copyfile(src, dest)
+    return dest
+
+
+def photo_cache_key(photo):
+    """(path, mtime, size) of an existing photo, so an edited file gets a new thumbnail; None if missing."""
+    if not photo:
+        return None
+    try:
+        st = os.stat(photo)
+    except OSError:
+        return None
+    return (os.path.abspath(photo), st.st_mtime_ns, st.st_size)
+
+
+def photo_thumbnail_path(key):
+    name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".png"
+    return os.path.join(PHOTO_THUMB_DIR, name)
+
+
+def make_photo_thumbnail(key):
+    """
+    Decodes the photo at thumbnail size (QImageReader lets JPEGs be decoded
+    downscaled) and saves it as PNG. QImage only, so safe off the GUI thread.
+    """
+    thumb = photo_thumbnail_path(key)
+    if os.path.exists(thumb):
+        return thumb
+    reader = QImageReader(key[0])
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and max(size.width(), size.height()) > PHOTO_THUMB_SIZE:
+        reader.setScaledSize(size.scaled(PHOTO_THUMB_SIZE, PHOTO_THUMB_SIZE, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return None
+    os.makedirs(PHOTO_THUMB_DIR, exist_ok=True)
+    tmp = f"{thumb}.{uuid.uuid4().hex}.tmp"
+    if not image.save(tmp, "PNG"):
+        return None
+    os.replace(tmp, thumb)
+    return thumb
+
+
+class PhotoThumbnails(QObject):
+    """
+    Serves employee photo thumbnails from an in-memory LRU of QPixmaps backed
+    by PNG thumbnails on disk. A thumbnail that does not exist yet is built on
+    a worker thread; pixmap() returns None meanwhile and ready(photo) fires
+    once it can be shown.
+    """
+    ready = pyqtSignal(str)
+
+    def __init__(self, capacity=PHOTO_CACHE_SIZE, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.cache = OrderedDict()
+        self.pending = set()
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="photo-thumbs")
+
+    def pixmap(self, photo):
+        key = photo_cache_key(photo)
+        if key is None:
+            return None
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            return pixmap
+        thumb = photo_thumbnail_path(key)
+        if os.path.exists(thumb):
+            pixmap = QPixmap(thumb)
+            if not pixmap.isNull():
+                self.cache[key] = pixmap
+                if len(self.cache) > self.capacity:
+                    self.cache.popitem(last=False)
+                return pixmap
+        self._schedule(photo, key)
+        return None
+
+    def prefetch(self, photos):
+        for photo in photos:
+            key = photo_cache_key(photo)
+            if key is not None and key not in self.cache and not os.path.exists(photo_thumbnail_path(key)):
+                self._schedule(photo, key)
+
+    def _schedule(self, photo, key):
+        if key in self.pending:
+            return
+        self.pending.add(key)
+        self.pool.submit(self._build, photo, key)
+
+    def _build(self, photo, key):
+        try:
+            thumb = make_photo_thumbnail(key)
+        except OSError:
+            thumb = None
+        self.pending.discard(key)
+        if thumb:
+            self.ready.emit(photo)
+
+
+_photo_thumbnails = None
+
+
+def get_photo_thumbnails():
+    global _photo_thumbnails
+    if _photo_thumbnails is None:
+        _photo_thumbnails = PhotoThumbnails()
+    return _photo_thumbnails
+
+
+def show_photo(label, photo):
+    """Puts the cached thumbnail of photo on label (cleared while it is being built or if there is none)."""
+    pixmap = get_photo_thumbnails().pixmap(photo)
+    label.setPixmap(pixmap if pixmap is not None else QPixmap())
 
-        # Always scroll to the bottom (show latest date at the bottom)
-        if self.data_table.rowCount() > 0:
-            self.data_table.scrollToBottom()
 
-    def handle_table_double_click(self, idx):
-        row = idx.row()
-        typ = self.data_table.item(row, 2).text()
+class ManagePayrollTab(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setLayout(QHBoxLayout())
+        self.form = QFormLayout()
+        self.name_edit = QLineEdit()
+        self.desig_edit = QLineEdit()
+        self.salary_edit = QLineEdit()
+        self.joining_edit = QDateEdit()
+        self.joining_edit.setCalendarPopup(True)
+        self.joining_edit.setDate(QDate.currentDate())
+        self.loan_edit = QLineEdit()
+        self.loan_edit.setReadOnly(True)
+        self.photo_label = QLabel()
+        self.photo_label.setFixedSize(72, 72)
+        self.photo_label.setScaledContents(True)
+        self.upload_btn = QPushButton("Upload Photo")
+        self.upload_btn.clicked.connect(self.upload_photo)
+        get_photo_thumbnails().ready.connect(self.on_thumbnail_ready)
+        photo_row = QHBoxLayout()
+        photo_row.addWidget(self.photo_label)
+        photo_row.addWidget(self.upload_btn)
 
-        cat = self.data_table.item(row, 3).text()
-        # Block editing for Vendors expense
-        if typ == "Expense" and cat.strip().lower() == "vendors":
-            QMessageBox.information(
-                self,
-                "Edit in Vendor Tab",
-                "Vendor transactions can only be modified through Vendors tab."
-            )
-            return
-        # Block editing for Payroll-related expense
-        if typ == "Expense" and cat == "Salary":
-            QMessageBox.information(
-                self,
-                "Edit in Payroll Tab",
-                "Payroll entries can only be modified through Payroll tab."
-            )
-            return
-        
-        id_item = self.data_table.item(row, 7)
-        if id_item is None or not id_item.text().strip().isdigit():
-            QMessageBox.warning(self, "Error", "ID not found for this entry.")
+        self.form.addRow("Name:", self.name_edit)
+        self.form.addRow("Designation:", self.desig_edit)
+        self.form.addRow("Salary:", self.salary_edit)
+        self.form.addRow("Joining Date:", self.joining_edit)
+        self.form.addRow("Loan Balance:", self.loan_edit)
+        self.form.addRow("Photo:", photo_row)
+        self.save_btn = QPushButton("Save")
+        self.save_btn.clicked.connect(self.save_employee)
+        self.clear_btn = QPushButton("Clear")
+        self.clear_btn.clicked.connect(self.clear_form)
+        btns = QHBoxLayout()
+        btns.addWidget(self.save_btn)
+        btns.addWidget(self.clear_btn)
+        self.form.addRow(btns)
+
+        left = QVBoxLayout()
+        left.addLayout(self.form)
+        left.addStretch()
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Name", "Designation", "Salary", "Joining Date", "Loan Balance"])
+        self.table.cellClicked.connect(self.select_employee)
+        self.load_employees()
+
+        self.layout().addLayout(left, 1)
+        self.layout().addWidget(self.table, 2)
+
+    def upload_photo(self):
+        file, _ = QFileDialog.getOpenFileName(self, "Select Photo", "", "Image Files (*.png *.jpg *.jpeg *.bmp)")
+        if file:
+            try:
+                dest_path = store_employee_photo(file)
+            except OSError as e:
+                QMessageBox.warning(self, "Photo", f"Could not copy the photo:\n{e}")
+                return
+            self.photo_path = dest_path
+            show_photo(self.photo_label, dest_path)
+
+    def on_thumbnail_ready(self, photo):
+        if photo == getattr(self, "photo_path", None):
+            show_photo(self.photo_label, photo)
+
+    def clear_form(self):
+        self.name_edit.clear()
+        self.desig_edit.clear()
+        self.salary_edit.clear()
+        self.loan_edit.clear()
+        self.joining_edit.setDate(QDate.currentDate())
+        self.photo_label.clear()
+        self.photo_path = None
+        self.selected_id = None
+
+    def save_employee(self):
+        name = self.name_edit.text().strip()
+        desig = self.desig_edit.text().strip()
+        salary = parse_amount(self.salary_edit.text())
+        joining = self.joining_edit.date().toString("yyyy-MM-dd")
+        photo = getattr(self, "photo_path", "")
+        loan = parse_amount(self.loan_edit.text())
+        if not name:
+            QMessageBox.warning(self, "Validation", "Name required")
             return
-        eid = int(id_item.text())
-        date_str = self.data_table.item(row, 0).text()
-        desc = self.data_table.item(row, 4).text()
-        amt = float(self.data_table.item(row, 5).text().replace("AED", "").strip())
-        notes = self.data_table.item(row, 6).text()
         conn = get_conn()
         c = conn.cursor()
-        if typ == "Income":
-            c.execute("SELECT category_id FROM daily_income WHERE id=?", (eid,))
+        if hasattr(self, "selected_id") and self.selected_id:
+            c.execute("UPDATE employees SET name=?, designation=?, salary=?, joining_date=?, loan_balance=?, photo_path=? WHERE id=?",
+                      (name, desig, salary, joining, loan, photo, self.selected_id))
         else:
-            c.execute("SELECT category_id FROM daily_expense WHERE id=?", (eid,))
-        result = c.fetchone()
-        catid = result[0] if result else None
+            c.execute("INSERT INTO employees (name, designation, salary, joining_date, loan_balance, photo_path) VALUES (?, ?, ?, ?, ?, ?)",
+                      (name, desig, salary, joining, loan, photo))
+        conn.commit()
         conn.close()
-        dialog = EntryEditDialog(typ, eid, to_iso_date(date_str), catid, amt, desc, notes, self)
-        if dialog.exec():
-            if dialog.deleted:
-                self.delete_entry(typ, eid)
-            else:
-                new_date, new_catid, new_amt, new_desc, new_notes = dialog.get_values()
-                self.update_entry(typ, eid, new_date, new_catid, new_amt, new_desc, new_notes)
-            self.load_data()
-            self.dashboard_tab.refresh()
+        self.clear_form()
+        self.load_employees()
 
-    def update_entry(self, typ, eid, date, catid, amt, desc, notes):
+    def load_employees(self):
+        self.table.setRowCount(0)
         conn = get_conn()
         c = conn.cursor()
-        if typ == "Income":
-            c.execute("UPDATE daily_income SET date=?, category_id=?, amount=?, description=?, notes=? WHERE id=?",
-                      (date, catid, amt, desc, notes, eid))
-        else:
-            c.execute("UPDATE daily_expense SET date=?, category_id=?, amount=?, description=?, notes=? WHERE id=?",
-                      (date, catid, amt, desc, notes, eid))
-        conn.commit()
+        c.execute("SELECT id, name, designation, salary, joining_date, loan_balance FROM employees")
+        for i, (eid, name, desig, salary, joining, loan) in enumerate(c.fetchall()):
+            self.table.insertRow(i)
+            for col, val in enumerate([name, desig, fmt_money(salary), joining, fmt_money(loan)]):
+                self.table.setItem(i, col, QTableWidgetItem(str(val)))
         conn.close()
 
-    def delete_entry(self, typ, eid):
+    def select_employee(self, row, _):
         conn = get_conn()
         c = conn.cursor()
-        if typ == "Income":
-            c.execute("DELETE FROM daily_income WHERE id=?", (eid,))
-        else:
-            c.execute("DELETE FROM daily_expense WHERE id=?", (eid,))
-        conn.commit()
+        c.execute("SELECT id, name, designation, salary, joining_date, loan_balance, photo_path FROM employees")
+        data = c.fetchall()[row]
+        self.selected_id, name, desig, salary, joining, loan, photo = data
+        self.name_edit.setText(name)
+        self.desig_edit.setText(desig)
+        self.salary_edit.setText(fmt_money(salary))
+        self.joining_edit.setDate(QDate.fromString(joining, "yyyy-MM-dd"))
+        self.loan_edit.setText(fmt_money(loan))
+        self.photo_path = photo
+        show_photo(self.photo_label, photo)
         conn.close()
 
-    def preview_transactions(self, selected_date, transaction_rows):
-        dialog = QDialog(self)
-        dialog.setWindowTitle(f"Transactions for {QDate.fromString(selected_date, 'yyyy-MM-dd').toString('dd/MM/yyyy')}")
-        layout = QVBoxLayout(dialog)
-        table = QTableWidget()
-        table.setColumnCount(6)
-        table.setHorizontalHeaderLabels(['Type', 'Category', 'Amount', 'Description', 'Notes', 'Date'])
-        table.setRowCount(len(transaction_rows))
-        for i, (d, cat, typ, amt, desc, notes) in enumerate(transaction_rows):
-            table.setItem(i, 0, QTableWidgetItem(typ))
-            table.setItem(i, 1, QTableWidgetItem(cat or ""))
-            table.setItem(i, 2, QTableWidgetItem(f"{amt:,.2f} AED"))
-            table.setItem(i, 3, QTableWidgetItem(desc or ""))
-            table.setItem(i, 4, QTableWidgetItem(notes or ""))
-            table.setItem(i, 5, QTableWidgetItem(QDate.fromString(d, "yyyy-MM-dd").toString("dd/MM/yyyy")))
-        table.resizeColumnsToContents()
-        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        layout.addWidget(table)
-        btn_layout = QHBoxLayout()
-        ok_btn = QPushButton("Print")
-        cancel_btn = QPushButton("Cancel")
-        btn_layout.addWidget(ok_btn)
-        btn_layout.addWidget(cancel_btn)
-        layout.addLayout(btn_layout)
-        ok_btn.clicked.connect(dialog.accept)
-        cancel_btn.clicked.connect(dialog.reject)
-        return dialog.exec() == QDialog.DialogCode.Accepted
+class OutstandingBalanceCard(QWidget):
+        def __init__(self, balance=0, parent=None):
+            super().__init__(parent)
+            self.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Maximum)
+            outer = QHBoxLayout(self)
+            outer.setContentsMargins(0,0,0,0)
+            outer.setSpacing(0)
+
+            # Orange vertical bar
+            bar = QLabel()
+            bar.setFixedWidth(4)
+            bar.setFixedHeight(40)
+            bar.setStyleSheet("background:#fb700e; border-radius:2px;")
+            bar.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
+            outer.addWidget(bar)
+
+            # Main content area
+            content = QVBoxLayout()
+            content.setContentsMargins(16,8,16,8)
+            content.setSpacing(2)
+
+            # Big, bold black currency label
+            self.amount_label = QLabel()
+            font = QFont()
+            font.setPointSize(20)
+            font.setBold(True)
+            self.amount_label.setFont(font)
+            self.amount_label.setStyleSheet("color:#fff;")
+            self.amount_label.setText(self.format_balance(balance))
+            self.amount_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
+
+            # Muted sublabel
+            sublabel = QLabel("Outstanding Balance")
+            font.setBold(True)
+            sublabel.setStyleSheet("color:#888;")
+            sublabel.setAlignment(Qt.AlignmentFlag.AlignLeft)
+
+            content.addWidget(self.amount_label)
+            content.addWidget(sublabel)
+            content.addStretch(1)
+            outer.addLayout(content)
+
+            # Card background and padding
+            self.setStyleSheet("""
+            QWidget {
+                background: #181a1b;
+                border-radius: 13px;
+                padding: 0px;
+            }
+            """)
+            self.setContentsMargins(0,0,0,0)
+
+        def set_balance(self, balance):
+            self.amount_label.setText(self.format_balance(balance))
+
+        def format_balance(self, balance):
+            return f"AED {fmt_money(balance, True)}"
+
+class PayrollRunDialog(QDialog):
+    """Month-end payroll: every employee's salary and loan deduction, posted in one go."""
+    COLUMNS = ["Employee", "Salary", "Loan Balance", "Deduction", "Net Pay", "Status"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Payroll Run")
+        self.setMinimumSize(860, 480)
+        self.rows = []
+        self.posted = 0
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Pay Date:"))
+        self.date_edit = QDateEdit()
+        self.date_edit.setCalendarPopup(True)
+        self.date_edit.setDisplayFormat("dd-MM-yyyy")
+        self.date_edit.setDate(QDate.currentDate())
+        self.date_edit.dateChanged.connect(self.load_employees)
+        top.addWidget(self.date_edit)
+        top.addWidget(QLabel("Notes:"))
+        self.notes_edit = QLineEdit()
+        self.notes_edit.setPlaceholderText("Notes (optional)")
+        top.addWidget(self.notes_edit)
+        layout.addLayout(top)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.itemChanged.connect(self.update_row)
+        layout.addWidget(self.table)
 
-    def print_day_report(self):
-        # --- Step 1: Ask user for date to print ---
-        date_dialog = QDialog(self)
-        date_dialog.setWindowTitle("Select Date for Daily Report")
-        layout = QVBoxLayout(date_dialog)
-        date_edit = QDateEdit()
-        date_edit.setDisplayFormat("dd-MM-yyyy")
-        date_edit.setCalendarPopup(True)
-        date_edit.setDate(QDate.currentDate())
-        layout.addWidget(QLabel("Select date to print:"))
-        layout.addWidget(date_edit)
-        btn_row = QHBoxLayout()
-        ok_btn = QPushButton("OK")
+        bottom = QHBoxLayout()
+        self.total_label = QLabel("")
+        self.total_label.setStyleSheet("font-weight:bold;")
+        bottom.addWidget(self.total_label)
+        bottom.addStretch()
+        post_btn = QPushButton("Post Payroll")
+        post_btn.setStyleSheet("font-weight:bold; background:#fb700e; color:white; border-radius:5px; padding:8px 18px;")
+        post_btn.clicked.connect(self.post)
         cancel_btn = QPushButton("Cancel")
-        btn_row.addWidget(ok_btn)
-        btn_row.addWidget(cancel_btn)
-        layout.addLayout(btn_row)
-        ok_btn.clicked.connect(date_dialog.accept)
-        cancel_btn.clicked.connect(date_dialog.reject)
-        if date_dialog.exec() != QDialog.DialogCode.Accepted:
-            return
+        cancel_btn.clicked.connect(self.reject)
+        bottom.addWidget(post_btn)
+        bottom.addWidget(cancel_btn)
+        layout.addLayout(bottom)
+        self.load_employees()
 
-        selected_date = date_edit.date().toString("yyyy-MM-dd")
-        date_ddmmyyyy = date_edit.date().toString("dd/MM/yyyy")
+    def pay_date(self):
+        return self.date_edit.date().toString("yyyy-MM-dd")
 
-        # --- Step 2: Gather summary data ---
+    def load_employees(self):
         conn = get_conn()
-        c = conn.cursor()
+        self.rows = payroll_run_defaults(conn, self.pay_date())
+        conn.close()
+        self.table.blockSignals(True)
+        self.table.setRowCount(len(self.rows))
+        for row, (_, name, salary, loan, deduction, paid) in enumerate(self.rows):
+            cells = [name, fmt_money(salary), fmt_money(loan), fmt_money(deduction), fmt_money(salary - deduction),
+                     f"Paid {to_ddmmyyyy(paid)}" if paid else ""]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if col == 0:
+                    item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
+                    # already paid this month: left out unless ticked on purpose
+                    item.setCheckState(Qt.CheckState.Unchecked if paid else Qt.CheckState.Checked)
+                elif col in (1, 3):
+                    item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEditable)
+                else:
+                    item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+                if col:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.table.setItem(row, col, item)
+        self.table.blockSignals(False)
+        self.update_total()
+
+    def update_row(self, item):
+        if item.column() in (1, 3):
+            row = item.row()
+            net = parse_amount(self.table.item(row, 1).text()) - parse_amount(self.table.item(row, 3).text())
+            self.table.blockSignals(True)
+            self.table.item(row, 4).setText(fmt_money(net))
+            self.table.blockSignals(False)
+        self.update_total()
+
+    def selected_lines(self):
+        """(employee id, name, net pay, deduction) for the ticked rows; raises ValueError on a bad amount."""
+        lines = []
+        for row, (eid, name, _, loan, _, _) in enumerate(self.rows):
+            if self.table.item(row, 0).checkState() != Qt.CheckState.Checked:
+                continue
+            salary = parse_amount(self.table.item(row, 1).text())
+            deduction = parse_amount(self.table.item(row, 3).text())
+            lines.append(payroll_line(eid, name, salary, deduction, loan))
+        return lines
 
-        c.execute("""
-            SELECT SUM(amount) FROM daily_income di
-            LEFT JOIN income_categories ic ON di.category_id=ic.id
-            WHERE di.date=? AND ic.name='Sales'
-        """, (selected_date,))
-        sales = c.fetchone()[0] or 0
+    def update_total(self):
+        try:
+            lines = self.selected_lines()
+        except ValueError as e:
+            self.total_label.setText(str(e))
+            return
+        self.total_label.setText(
+            f"{len(lines)} employees  |  Net pay: {fmt_money(sum(l[2] for l in lines), True)} AED"
+            f"  |  Deductions: {fmt_money(sum(l[3] for l in lines), True)} AED"
+        )
 
-        c.execute("""
-            SELECT SUM(amount) FROM daily_income di
-            LEFT JOIN income_categories ic ON di.category_id=ic.id
-            WHERE di.date=? AND ic.name='Services'
-        """, (selected_date,))
-        services = c.fetchone()[0] or 0
+    def post(self):
+        try:
+            lines = self.selected_lines()
+        except ValueError as e:
+            QMessageBox.warning(self, "Payroll Run", str(e))
+            return
+        if not any(l[2] > 0 or l[3] > 0 for l in lines):
+            QMessageBox.information(self, "Payroll Run", "Tick at least one employee with an amount to pay.")
+            return
+        total = sum(l[2] for l in lines)
+        if QMessageBox.question(
+            self, "Post Payroll",
+            f"Pay {fmt_money(total, True)} AED to {len(lines)} employees on {to_ddmmyyyy(self.pay_date())}?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        ) != QMessageBox.StandardButton.Yes:
+            return
+        conn = get_conn()
+        try:
+            self.posted = run_payroll(conn, self.pay_date(), lines, self.notes_edit.text().strip())
+            conn.commit()
+        except ValueError as e:
+            conn.rollback()
+            QMessageBox.warning(self, "Payroll Run", str(e))
+            return
+        finally:
+            conn.close()
+        self.accept()
 
-        total_income = sales + services
+class PayrollTab(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setLayout(QVBoxLayout())
+        top = QHBoxLayout()
+        self.employee_combo = QComboBox()
+        self.employee_combo.currentIndexChanged.connect(self.load_employee)
+        top.addWidget(self.employee_combo)
+        self.photo = QLabel()
+        self.photo.setFixedSize(64, 64)
+        self.photo.setScaledContents(True)
+        self.photo_path = None
+        get_photo_thumbnails().ready.connect(self.on_thumbnail_ready)
+        self.emp_info = QLabel()
+        top.addWidget(self.photo)
+        top.addWidget(self.emp_info)
+        top.addStretch()
+        self.layout().addLayout(top)
+        self.outstanding_card = OutstandingBalanceCard(balance=0)
+        top.addWidget(self.outstanding_card)
 
-        c.execute("SELECT SUM(amount) FROM daily_expense WHERE date=?", (selected_date,))
-        total_expense = c.fetchone()[0] or 0
-        gross_income = total_income - total_expense
 
-        c.execute("SELECT description, amount FROM daily_expense WHERE date=? ORDER BY id ASC", (selected_date,))
-        expense_rows = c.fetchall()
-        conn.close()
+        # --- Add "Add Transaction" Button ---
+        self.add_transaction_btn = QPushButton("Add Transaction")
+        self.add_transaction_btn.setFixedWidth(180)
+        self.add_transaction_btn.setStyleSheet("font-size:15px; font-weight:bold; background:#fb700e; color:white; border-radius:5px; padding:8px 18px;")
+        self.add_transaction_btn.setToolTip("Add Salary or Advance")
+        self.run_payroll_btn = QPushButton("Run Payroll")
+        self.run_payroll_btn.setFixedWidth(180)
+        self.run_payroll_btn.setStyleSheet("font-size:15px; font-weight:bold; background:#26292A; color:white; border-radius:5px; padding:8px 18px;")
+        self.run_payroll_btn.setToolTip("Pay every employee's salary for the month")
+        btn_row = QHBoxLayout()
+        btn_row.addWidget(self.add_transaction_btn)
+        btn_row.addWidget(self.run_payroll_btn)
+        btn_row.addStretch()
+        self.layout().addLayout(btn_row)
 
-        # --- Step 3: Show preview dialog ---
-        preview = QDialog(self)
-        preview.setWindowTitle(f"Daily Summary Preview - {date_ddmmyyyy}")
-        preview.resize(421, 0)
-        vbox = QVBoxLayout(preview)
+        self.add_transaction_btn.clicked.connect(self.choose_transaction_type)
+        self.run_payroll_btn.clicked.connect(self.show_payroll_run)
 
-        # Heading
-        heading = QLabel("Daily Summary")
-        heading_font = QFont()
-        heading_font.setBold(True)
-        heading_font.setPointSize(22)
-        heading.setFont(heading_font)
-        heading.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        vbox.addWidget(heading)
+        # Transactions Table
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["Date", "Type", "Debit", "Credit", "Balance", "Notes"])
+        self.table.setColumnWidth(0, 120)   # Date
+        self.table.setColumnWidth(1, 140)   # Type
+        self.table.setColumnWidth(2, 120)   # Debit
+        self.table.setColumnWidth(3, 120)   # Credit
+        self.table.setColumnWidth(4, 120)   # Balance
+        self.table.setColumnWidth(5, 220)   # Notes
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
 
-        # Date
-        date_lbl = QLabel(f"Date: {date_ddmmyyyy}")
-        date_font = QFont()
-        date_font.setBold(True)
-        date_font.setPointSize(20)
-        date_lbl.setFont(date_font)
-        date_lbl.setAlignment(Qt.AlignmentFlag.AlignRight)
-        date_lbl.setStyleSheet("color: #fb700e;")
-        vbox.addWidget(date_lbl)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.layout().addWidget(self.table)
+        self.load_employees()
 
-        # 2px vertical gap (8px by default, you can adjust)
-        vbox.addSpacing(8)
+        self.table.doubleClicked.connect(self.handle_table_double_click)
 
-        # Sales, Service, Total Income, Expenses - vertically aligned
-        amount_font = QFont("Courier New", 12)  # Monospaced for alignment
+    def choose_transaction_type(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Select Transaction Type")
+        dialog.setMinimumWidth(280)
+        vbox = QVBoxLayout(dialog)
+        vbox.addWidget(QLabel("What type of payroll transaction?"))
+        btn_row = QHBoxLayout()
+        btn_salary = QPushButton("Salary")
+        btn_advance = QPushButton("Advance")
+        btn_row.addWidget(btn_salary)
+        btn_row.addWidget(btn_advance)
+        vbox.addLayout(btn_row)
 
-        summary_grid = QGridLayout()
-        summary_grid.setHorizontalSpacing(16)
-        summary_labels = ["Sales:", "Service:", "Total Income:", "Expenses:"]
-        summary_values = [sales, services, total_income, total_expense]
-        for row, (lbl, val) in enumerate(zip(summary_labels, summary_values)):
-            l = QLabel(lbl)
-            l.setFont(QFont("Segoe UI", 11))
-            l.setAlignment(Qt.AlignmentFlag.AlignLeft)
-            summary_grid.addWidget(l, row, 0)
-            v = QLabel(f"{val:>12,.2f} ")
-            v.setFont(amount_font)
-            v.setAlignment(Qt.AlignmentFlag.AlignRight)
-            v.setMinimumWidth(120)
-            summary_grid.addWidget(v, row, 1)
-        vbox.addLayout(summary_grid)
+        selected = {}
 
-        # Balance (center, bold, larger)
-        vbox.addSpacing(8)
-        balance_lbl = QLabel(f"BALANCE: {gross_income:,.2f} ")
-        balance_font = QFont()
-        balance_font.setBold(True)
-        balance_font.setPointSize(16)
-        balance_lbl.setFont(balance_font)
-        balance_lbl.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        balance_lbl.setStyleSheet("""
-            color: #fb700e;
-            border: 2px solid #ffbe87;
-            border-radius: 5px;
-            padding: 6px 0 6px 0;
-        """)
-        vbox.addWidget(balance_lbl)
+        def choose_salary():
+            selected['type'] = 'Salary Payment'
+            dialog.accept()
+        def choose_advance():
+            selected['type'] = 'Advance'
+            dialog.accept()
+        btn_salary.clicked.connect(choose_salary)
+        btn_advance.clicked.connect(choose_advance)
 
-        # Expense Details section
-        expense_heading = QLabel("Expense Details:")
-        expense_heading.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
-        expense_heading.setAlignment(Qt.AlignmentFlag.AlignLeft)
-        vbox.addWidget(expense_heading)
+        if dialog.exec() == QDialog.DialogCode.Accepted and 'type' in selected:
+            self.show_transaction_dialog(selected['type'])
 
-        # Expense details in grid with vertical alignment for amounts
-        if expense_rows:
-            expense_grid = QGridLayout()
-            expense_grid.setHorizontalSpacing(16)
-            desc_font = QFont("Segoe UI", 10)
-            amt_font = QFont("Courier New", 11)
-            for row, (desc, amt) in enumerate(expense_rows):
-                desc_lbl = QLabel(desc or "")
-                desc_lbl.setFont(desc_font)
-                desc_lbl.setAlignment(Qt.AlignmentFlag.AlignLeft)
-                expense_grid.addWidget(desc_lbl, row, 0)
-                amt_lbl = QLabel(f"{amt:>12,.2f} ")
-                amt_lbl.setFont(amt_font)
-                amt_lbl.setAlignment(Qt.AlignmentFlag.AlignRight)
-                amt_lbl.setMinimumWidth(120)
-                expense_grid.addWidget(amt_lbl, row, 1)
-            vbox.addLayout(expense_grid)
-        else:
-            vbox.addWidget(QLabel("No Expenses"))
+    def show_transaction_dialog(self, tx_type):
+        class SalaryDialog(QDialog):
+            def __init__(self, parent):
+                super().__init__(parent)
+                self.setWindowTitle("Record Salary Payment")
+                self.setMinimumWidth(340)
+                form = QFormLayout(self)
+                self.date_edit = QDateEdit()
+                self.date_edit.setCalendarPopup(True)
+                self.date_edit.setDate(QDate.currentDate())
+                self.date_edit.setDisplayFormat("dd-MM-yyyy")
+                form.addRow("Date:", self.date_edit)
 
-        vbox.addSpacing(10)
+                self.salary_amount_edit = QLineEdit()
+                self.salary_amount_edit.setPlaceholderText("Salary before deductions (AED)")
+                self.salary_amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                afont = QFont()
+                afont.setPointSize(16)
+                afont.setBold(True)
+                self.salary_amount_edit.setFont(afont)
+                form.addRow("Salary:", self.salary_amount_edit)
 
-        # Buttons
-        btn_row = QHBoxLayout()
-        print_btn = QPushButton("Print")
-        cancel_btn = QPushButton("Cancel")
-        btn_row.addStretch()
-        btn_row.addWidget(print_btn)
-        btn_row.addWidget(cancel_btn)
-        btn_row.addStretch()
-        vbox.addLayout(btn_row)
-        print_btn.clicked.connect(preview.accept)
-        cancel_btn.clicked.connect(preview.reject)
+                self.deduction_amount_edit = QLineEdit()
+                self.deduction_amount_edit.setPlaceholderText("Deduction Amount (AED)")
+                self.deduction_amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.deduction_amount_edit.setFont(afont)
+                form.addRow("Deductions:", self.deduction_amount_edit)
 
-        if preview.exec() != QDialog.DialogCode.Accepted:
-            return
+                self.notes_edit = QLineEdit()
+                self.notes_edit.setPlaceholderText("Notes (optional)")
+                form.addRow("Notes:", self.notes_edit)
+
+                btn_row = QHBoxLayout()
+                save_btn = QPushButton("Save")
+                cancel_btn = QPushButton("Cancel")
+                save_btn.clicked.connect(self.accept)
+                cancel_btn.clicked.connect(self.reject)
+                btn_row.addWidget(save_btn)
+                btn_row.addWidget(cancel_btn)
+                form.addRow(btn_row)
+                self.setLayout(form)
 
-        # --- Step 4: Build print lines (same as before) ---
-        LINE_WIDTH = 42
-        label_width = 20
+            def get_values(self):
+                return (
+                    self.salary_amount_edit.text(),
+                    self.deduction_amount_edit.text(),
+                    self.date_edit.date().toString("yyyy-MM-dd"),
+                    self.notes_edit.text(),
+                )
 
-        def center_text(text, width=LINE_WIDTH):
-            return text.center(width)
+        class AdvanceDialog(QDialog):
+            def __init__(self, parent):
+                super().__init__(parent)
+                self.setWindowTitle("Record Advance")
+                self.setMinimumWidth(340)
+                form = QFormLayout(self)
+                self.date_edit = QDateEdit()
+                self.date_edit.setCalendarPopup(True)
+                self.date_edit.setDate(QDate.currentDate())
+                self.date_edit.setDisplayFormat("dd-MM-yyyy")
+                form.addRow("Date:", self.date_edit)
 
-        LEFT_MARGIN_SPACES = " " * 0
-        TOP_MARGIN_LINES = "\r\n" * 2
-        BOTTOM_MARGIN_LINES = "\r\n" * 8
+                self.amount_edit = QLineEdit()
+                self.amount_edit.setPlaceholderText("Advance Amount (AED)")
+                self.amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                afont = QFont()
+                afont.setPointSize(16)
+                afont.setBold(True)
+                self.amount_edit.setFont(afont)
+                form.addRow("Amount:", self.amount_edit)
 
-        lines = []
-        lines.append(center_text("NATIONAL BICYCLES"))
-        lines.append(center_text("DAILY REPORT"))
-        lines.append("-" * LINE_WIDTH)
-        lines.append(f"Date: {date_ddmmyyyy}")
-        lines.append("-" * LINE_WIDTH)
-        def lined_amount(label, amount):
-            amt_str = f"{amount:,.2f}"
-            return f"{label:<{label_width}}{amt_str:>{LINE_WIDTH - label_width}}"
-        lines.append(lined_amount("Total Sales:", total_income))
-        lines.append(lined_amount("Total Expenses:", total_expense))
-        lines.append(lined_amount("Balance:", gross_income))
-        lines.append("-" * LINE_WIDTH)
-        lines.append(center_text(f"BALANCE: {gross_income:,.2f}"))
-        lines.append("-" * LINE_WIDTH)
-        lines.append("Expense Details:")
-        lines.extend([""]) 
-        if expense_rows:
-            for desc, amt in expense_rows:
-                desc_str = (desc or "")
-                if len(desc_str) > 24:
-                    desc_str = desc_str[:24] + "…"  # Shorten long descriptions
-                amt_str = f"{amt:,.2f}"
-                space = LINE_WIDTH - len(desc_str) - len(amt_str)
-                lines.append(desc_str + " " * max(1, space) + amt_str)
-        else:
-            lines.append(center_text("No Expenses"))
-        lines.append("-" * LINE_WIDTH)
+                self.notes_edit = QLineEdit()
+                self.notes_edit.setPlaceholderText("Notes (optional)")
+                form.addRow("Notes:", self.notes_edit)
 
-        lines_with_margin = [LEFT_MARGIN_SPACES + line for line in lines]
-        receipt_text = TOP_MARGIN_LINES + "\r\n".join(lines_with_margin) + BOTTOM_MARGIN_LINES
+                btn_row = QHBoxLayout()
+                save_btn = QPushButton("Save")
+                cancel_btn = QPushButton("Cancel")
+                save_btn.clicked.connect(self.accept)
+                cancel_btn.clicked.connect(self.reject)
+                btn_row.addWidget(save_btn)
+                btn_row.addWidget(cancel_btn)
+                form.addRow(btn_row)
+                self.setLayout(form)
 
-        CUT = b'\x1d\x56\x00'
+            def get_values(self):
+                return (
+                    self.amount_edit.text(),
+                    self.date_edit.date().toString("yyyy-MM-dd"),
+                    self.notes_edit.text(),
+                )
 
-        try:
-            printer_name = win32print.GetDefaultPrinter()
-            hprinter = win32print.OpenPrinter(printer_name)
-            try:
-                hjob = win32print.StartDocPrinter(hprinter, 1, ("Day Report", None, "RAW"))
-                win32print.StartPagePrinter(hprinter)
-                win32print.WritePrinter(hprinter, receipt_text.encode('utf-8'))
-                win32print.WritePrinter(hprinter, CUT)
-                win32print.EndPagePrinter(hprinter)
-                win32print.EndDocPrinter(hprinter)
-            finally:
-                win32print.ClosePrinter(hprinter)
-        except Exception as e:
-            QMessageBox.warning(self, "Print Error", f"Failed to print:\n{e}")
+        class DeductionDialog(QDialog):
+            def __init__(self, parent):
+                super().__init__(parent)
+                self.setWindowTitle("Record Deduction")
+                self.setMinimumWidth(340)
+                form = QFormLayout(self)
+                self.date_edit = QDateEdit()
+                self.date_edit.setCalendarPopup(True)
+                self.date_edit.setDate(QDate.currentDate())
+                self.date_edit.setDisplayFormat("dd-MM-yyyy")
+                form.addRow("Date:", self.date_edit)
 
-            
+                self.amount_edit = QLineEdit()
+                self.amount_edit.setPlaceholderText("Deduction Amount (AED)")
+                self.amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
+                afont = QFont()
+                afont.setPointSize(16)
+                afont.setBold(True)
+                self.amount_edit.setFont(afont)
+                form.addRow("Amount:", self.amount_edit)
 
-class ManagePayrollTab(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setLayout(QHBoxLayout())
-        self.form = QFormLayout()
-        self.name_edit = QLineEdit()
-        self.desig_edit = QLineEdit()
-        self.salary_edit = QLineEdit()
-        self.joining_edit = QDateEdit()
-        self.joining_edit.setCalendarPopup(True)
-        self.joining_edit.setDate(QDate.currentDate())
-        self.loan_edit = QLineEdit()
-        self.loan_edit.setReadOnly(True)
-        self.photo_label = QLabel()
-        self.photo_label.setFixedSize(72, 72)
-        self.photo_label.setScaledContents(True)
-        self.upload_btn = QPushButton("Upload Photo")
-        self.upload_btn.clicked.connect(self.upload_photo)
-        photo_row = QHBoxLayout()
-        photo_row.addWidget(self.photo_label)
-        photo_row.addWidget(self.upload_btn)
+                self.notes_edit = QLineEdit()
+                self.notes_edit.setPlaceholderText("Notes (optional)")
+                form.addRow("Notes:", self.notes_edit)
 
-        self.form.addRow("Name:", self.name_edit)
-        self.form.addRow("Designation:", self.desig_edit)
-        self.form.addRow("Salary:", self.salary_edit)
-        self.form.addRow("Joining Date:", self.joining_edit)
-        self.form.addRow("Loan Balance:", self.loan_edit)
-        self.form.addRow("Photo:", photo_row)
-        self.save_btn = QPushButton("Save")
-        self.save_btn.clicked.connect(self.save_employee)
-        self.clear_btn = QPushButton("Clear")
-        self.clear_btn.clicked.connect(self.clear_form)
-        btns = QHBoxLayout()
-        btns.addWidget(self.save_btn)
-        btns.addWidget(self.clear_btn)
-        self.form.addRow(btns)
+                btn_row = QHBoxLayout()
+                save_btn = QPushButton("Save")
+                cancel_btn = QPushButton("Cancel")
+                save_btn.clicked.connect(self.accept)
+                cancel_btn.clicked.connect(self.reject)
+                btn_row.addWidget(save_btn)
+                btn_row.addWidget(cancel_btn)
+                form.addRow(btn_row)
+                self.setLayout(form)
 
-        left = QVBoxLayout()
-        left.addLayout(self.form)
-        left.addStretch()
+            def get_values(self):
+                return (
+                    self.amount_edit.text(),
+                    self.date_edit.date().toString("yyyy-MM-dd"),
+                    self.notes_edit.text(),
+                )
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Name", "Designation", "Salary", "Joining Date", "Loan Balance"])
-        self.table.cellClicked.connect(self.select_employee)
-        self.load_employees()
+        if tx_type == "Salary Payment":
+            dlg = SalaryDialog(self)
+            if dlg.exec() == QDialog.DialogCode.Accepted:
+                salary_text, deduction_text, date, notes = dlg.get_values()
+                name = self.employee_combo.currentText()
+                eid = self.emp_map.get(name)
+                if eid is None:
+                    QMessageBox.warning(self, "Employee required", "Please select an employee.")
+                    return
+                # posted as a one-line payroll run, so it is recorded the same way as the month-end run
+                conn = get_conn()
+                try:
+                    loan = conn.execute(
+                        f"SELECT {EMPLOYEE_LOAN_SQL} FROM employee_payroll p WHERE p.employee_id=?", (eid,)
+                    ).fetchone()[0]
+                    line = payroll_line(eid, name, parse_amount(salary_text), parse_amount(deduction_text), loan)
+                    if not run_payroll(conn, date, [line], notes):
+                        raise ValueError("Enter a salary or a deduction.")
+                    conn.commit()
+                except ValueError as e:
+                    conn.rollback()
+                    QMessageBox.warning(self, "Cannot Save", str(e))
+                    return
+                finally:
+                    conn.close()
+                if hasattr(self.window(), "daily") and hasattr(self.window().daily, "load_data"):
+                    self.window().daily.load_data()
+                self.load_employee(self.employee_combo.currentIndex())
+                QMessageBox.information(self, "Success", "Transaction recorded.")
 
-        self.layout().addLayout(left, 1)
-        self.layout().addWidget(self.table, 2)
+        elif tx_type == "Advance":
+            dlg = AdvanceDialog(self)
+            if dlg.exec() == QDialog.DialogCode.Accepted:
+                amount_text, date, notes = dlg.get_values()
+                amt = parse_amount(amount_text)
+                if amt <= 0:
+                    QMessageBox.warning(self, "Amount Required", "Advance amount must be greater than zero.")
+                    return
+                name = self.employee_combo.currentText()
+                eid = self.emp_map.get(name)
+                if eid is None:
+                    QMessageBox.warning(self, "Employee required", "Please select an employee.")
+                    return
+                # Get previous balance
+                conn = get_conn()
+                try:
+                    check_open_period(conn, date)
+                except ValueError as e:
+                    conn.close()
+                    QMessageBox.warning(self, "Cannot Save", str(e))
+                    return
+                c = conn.cursor()
+                c.execute("SELECT balance FROM employee_payroll WHERE employee_id=? ORDER BY date DESC, id DESC LIMIT 1", (eid,))
+                prev = c.fetchone()
+                prev_balance = prev[0] if prev else 0
+                debit = amt
+                credit = 0
+                new_balance = prev_balance + amt
+                c.execute(
+                    "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (eid, date, "Advance", amt, debit, credit, new_balance, notes)
+                )
+                payroll_id = c.lastrowid
+                conn.commit()
+                conn.close()
+                # Restore cashflow entry for Advance
+                self._record_salary_expense_in_cashflow(emp_name=name, amount=debit, date=date, tx_type="Advance", payroll_id=payroll_id)
+                if hasattr(self.window(), "daily") and hasattr(self.window().daily, "load_data"):
+                     self.window().daily.load_data()
+                self.load_employee(self.employee_combo.currentIndex())
+                QMessageBox.information(self, "Success", "Transaction recorded.")
 
-    def upload_photo(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Select Photo", "", "Image Files (*.png *.jpg *.jpeg *.bmp)")
-        if file:
-            dest_dir = os.path.join(os.path.expanduser("~"), "NBS_EmployeePhotos")
-            os.makedirs(dest_dir, exist_ok=True)
-            dest_path = os.path.join(dest_dir, os.path.basename(file))
-            shutil.copyfile(file, dest_path)
-            self.photo_label.setPixmap(QPixmap(dest_path))
-            self.photo_path = dest_path
+        elif tx_type == "Deduction":
+            dlg = DeductionDialog(self)
+            if dlg.exec() == QDialog.DialogCode.Accepted:
+                amount_text, date, notes = dlg.get_values()
+                amt = parse_amount(amount_text)
+                if amt <= 0:
+                    QMessageBox.warning(self, "Amount Required", "Deduction amount must be greater than zero.")
+                    return
+                name = self.employee_combo.currentText()
+                eid = self.emp_map.get(name)
+                if eid is None:
+                    QMessageBox.warning(self, "Employee required", "Please select an employee.")
+                    return
+                # Get previous balance
+                conn = get_conn()
+                try:
+                    check_open_period(conn, date)
+                except ValueError as e:
+                    conn.close()
+                    QMessageBox.warning(self, "Cannot Save", str(e))
+                    return
+                c = conn.cursor()
+                c.execute("SELECT balance FROM employee_payroll WHERE employee_id=? ORDER BY date DESC, id DESC LIMIT 1", (eid,))
+                prev = c.fetchone()
+                prev_balance = prev[0] if prev else 0
+                debit = 0
+                credit = amt
+                new_balance = prev_balance - amt
+                c.execute(
+                    "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (eid, date, "Deduction", amt, debit, credit, new_balance, notes)
+                )
+                conn.commit()
+                conn.close()
+                self.load_employee(self.employee_combo.currentIndex())
+                QMessageBox.information(self, "Success", "Transaction recorded.")
 
-    def clear_form(self):
-        self.name_edit.clear()
-        self.desig_edit.clear()
-        self.salary_edit.clear()
-        self.loan_edit.clear()
-        self.joining_edit.setDate(QDate.currentDate())
-        self.photo_label.clear()
-        self.photo_path = None
-        self.selected_id = None
 
-    def save_employee(self):
-        name = self.name_edit.text().strip()
-        desig = self.desig_edit.text().strip()
-        salary = parse_amount(self.salary_edit.text())
-        joining = self.joining_edit.date().toString("yyyy-MM-dd")
-        photo = getattr(self, "photo_path", "")
-        loan = parse_amount(self.loan_edit.text())
-        if not name:
-            QMessageBox.warning(self, "Validation", "Name required")
+    def show_payroll_run(self):
+        dlg = PayrollRunDialog(self)
+        if dlg.exec() != QDialog.DialogCode.Accepted:
             return
-        conn = get_conn()
-        c = conn.cursor()
-        if hasattr(self, "selected_id") and self.selected_id:
-            c.execute("UPDATE employees SET name=?, designation=?, salary=?, joining_date=?, loan_balance=?, photo_path=? WHERE id=?",
-                      (name, desig, salary, joining, loan, photo, self.selected_id))
-        else:
-            c.execute("INSERT INTO employees (name, designation, salary, joining_date, loan_balance, photo_path) VALUES (?, ?, ?, ?, ?, ?)",
-                      (name, desig, salary, joining, loan, photo))
-        conn.commit()
+        main_window = self.window()
+        if hasattr(main_window, "daily") and hasattr(main_window.daily, "load_data"):
+            main_window.daily.load_data()
+        self.load_employee(self.employee_combo.currentIndex())
+        QMessageBox.information(self, "Payroll Run", f"Salaries posted for {dlg.posted} employees.")
+
+    def load_employees(self):
+        self.employee_combo.clear()
+        self.emp_map = {}
+        for eid, name in REF_CACHE.get("employees"):
+            self.emp_map[name] = eid
+            self.employee_combo.addItem(name)
+        conn = get_conn()
+        photos = [row[0] for row in conn.execute("SELECT photo_path FROM employees WHERE photo_path IS NOT NULL AND photo_path != ''")]
         conn.close()
-        self.clear_form()
-        self.load_employees()
+        get_photo_thumbnails().prefetch(photos)
+        if self.emp_map:
+            self.load_employee(0)
 
-    def load_employees(self):
-        self.table.setRowCount(0)
+    def on_thumbnail_ready(self, photo):
+        if photo == self.photo_path:
+            show_photo(self.photo, photo)
+
+    def load_employee(self, idx):
+        if idx < 0 or not self.emp_map:
+            return
+        name = self.employee_combo.currentText()
+        eid = self.emp_map[name]
         conn = get_conn()
         c = conn.cursor()
-        c.execute("SELECT id, name, designation, salary, joining_date, loan_balance FROM employees")
-        for i, row in enumerate(c.fetchall()):
-            self.table.insertRow(i)
-            for col, val in enumerate(row[1:]):
-                self.table.setItem(i, col, QTableWidgetItem(str(val)))
+        c.execute("SELECT designation, salary, joining_date, photo_path FROM employees WHERE id=?", (eid,))
+        row = c.fetchone()
+        if not row:
+            return
+        desig, salary, joining, photo = row
+        self.emp_info.setText(f"{name}\n{desig}\nSalary: {fmt_money(salary)}\nJoined: {joining}")
+        self.photo_path = photo
+        show_photo(self.photo, photo)
         conn.close()
+        # Only call load_transactions now; don't set card yet
+        self.load_transactions(eid)
 
-    def select_employee(self, row, _):
+    def load_transactions(self, eid):
+        self.table.setRowCount(0)
         conn = get_conn()
         c = conn.cursor()
-        c.execute("SELECT id, name, designation, salary, joining_date, loan_balance, photo_path FROM employees")
-        data = c.fetchall()[row]
-        self.selected_id, name, desig, salary, joining, loan, photo = data
-        self.name_edit.setText(name)
-        self.desig_edit.setText(desig)
-        self.salary_edit.setText(str(salary))
-        self.joining_edit.setDate(QDate.fromString(joining, "yyyy-MM-dd"))
-        self.loan_edit.setText(str(loan))
-        self.photo_label.setPixmap(QPixmap(photo) if photo and os.path.exists(photo) else QPixmap())
-        self.photo_path = photo
+        c.execute("SELECT id, date, type, debit, credit, balance, notes FROM employee_payroll WHERE employee_id=? ORDER BY date ASC, id ASC", (eid,))
+        rows = c.fetchall()
         conn.close()
 
-class OutstandingBalanceCard(QWidget):
-        def __init__(self, balance=0.0, parent=None):
-            super().__init__(parent)
-            self.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Maximum)
-            outer = QHBoxLayout(self)
-            outer.setContentsMargins(0,0,0,0)
-            outer.setSpacing(0)
-
-            # Orange vertical bar
-            bar = QLabel()
-            bar.setFixedWidth(4)
-            bar.setFixedHeight(40)
-            bar.setStyleSheet("background:#fb700e; border-radius:2px;")
-            bar.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
-            outer.addWidget(bar)
-
-            # Main content area
-            content = QVBoxLayout()
-            content.setContentsMargins(16,8,16,8)
-            content.setSpacing(2)
-
-            # Big, bold black currency label
-            self.amount_label = QLabel()
-            font = QFont()
-            font.setPointSize(20)
-            font.setBold(True)
-            self.amount_label.setFont(font)
-            self.amount_label.setStyleSheet("color:#fff;")
-            self.amount_label.setText(self.format_balance(balance))
-            self.amount_label.setAlignment(Qt.AlignmentFlag.AlignLeft)
-
-            # Muted sublabel
-            sublabel = QLabel("Outstanding Balance")
-            font.setBold(True)
-            sublabel.setStyleSheet("color:#888;")
-            sublabel.setAlignment(Qt.AlignmentFlag.AlignLeft)
-
-            content.addWidget(self.amount_label)
-            content.addWidget(sublabel)
-            content.addStretch(1)
-            outer.addLayout(content)
-
-            # Card background and padding
-            self.setStyleSheet("""
-            QWidget {
-                background: #181a1b;
-                border-radius: 13px;
-                padding: 0px;
-            }
-            """)
-            self.setContentsMargins(0,0,0,0)
-
-        def set_balance(self, balance):
-            self.amount_label.setText(self.format_balance(balance))
-
-        def format_balance(self, balance):
-            return f"AED {balance:,.2f}"
-
-class PayrollTab(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setLayout(QVBoxLayout())
-        top = QHBoxLayout()
-        self.employee_combo = QComboBox()
-        self.employee_combo.currentIndexChanged.connect(self.load_employee)
-        top.addWidget(self.employee_combo)
-        self.photo = QLabel()
-        self.photo.setFixedSize(64, 64)
-        self.photo.setScaledContents(True)
-        self.emp_info = QLabel()
-        top.addWidget(self.photo)
-        top.addWidget(self.emp_info)
-        top.addStretch()
-        self.layout().addLayout(top)
-        self.outstanding_card = OutstandingBalanceCard(balance=0.0)
-        top.addWidget(self.outstanding_card)
+        last_balance = 0
+        for i, (payroll_id, date_str, typ, debit, credit, balance, notes) in enumerate(rows):
+            debit_str = ""
+            credit_str = ""
+            if typ == "Salary Payment":
+                debit_str = fmt_money(debit) if debit else ""
+                credit_str = fmt_money(credit) if credit else ""
+            elif typ == "Advance":
+                debit_str = fmt_money(debit) if debit else ""
+            elif typ == "Deduction":
+                credit_str = fmt_money(credit) if credit else ""
 
+            self.table.insertRow(i)
+            id_item = QTableWidgetItem(str(payroll_id))
+            id_item.setData(Qt.ItemDataRole.UserRole, payroll_id)
+            self.table.setVerticalHeaderItem(i, id_item)
+            self.table.setItem(i, 0, QTableWidgetItem(str(date_str)))
+            self.table.setItem(i, 1, QTableWidgetItem(str(typ)))
+            self.table.setItem(i, 2, QTableWidgetItem(debit_str))
+            self.table.setItem(i, 3, QTableWidgetItem(credit_str))
+            self.table.setItem(i, 4, QTableWidgetItem(fmt_money(balance)))
+            self.table.setItem(i, 5, QTableWidgetItem(str(notes)))
 
-        # --- Add "Add Transaction" Button ---
-        self.add_transaction_btn = QPushButton("Add Transaction")
-        self.add_transaction_btn.setFixedWidth(180)
-        self.add_transaction_btn.setStyleSheet("font-size:15px; font-weight:bold; background:#fb700e; color:white; border-radius:5px; padding:8px 18px;")
-        self.add_transaction_btn.setToolTip("Add Salary or Advance")
-        self.layout().addWidget(self.add_transaction_btn, alignment=Qt.AlignmentFlag.AlignLeft)
+            # Only update prev_balance for Advance/Deduction
+            if typ == "Advance" or typ == "Deduction":
+                prev_balance = balance
 
-        self.add_transaction_btn.clicked.connect(self.choose_transaction_type)
+            last_balance = balance  # always the latest
 
-        # Transactions Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["Date", "Type", "Debit", "Credit", "Balance", "Notes"])
-        self.table.setColumnWidth(0, 120)   # Date
-        self.table.setColumnWidth(1, 140)   # Type
-        self.table.setColumnWidth(2, 120)   # Debit
-        self.table.setColumnWidth(3, 120)   # Credit
-        self.table.setColumnWidth(4, 120)   # Balance
-        self.table.setColumnWidth(5, 220)   # Notes
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
-        self.table.verticalHeader().setVisible(False)
+        self.outstanding_card.set_balance(last_balance)
 
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.layout().addWidget(self.table)
-        self.load_employees()
+    def handle_table_double_click(self, index):
+        row = index.row()
+        eid = self.emp_map.get(self.employee_combo.currentText())
+        id_item = self.table.verticalHeaderItem(row)
+        if id_item is None:
+            QMessageBox.warning(self, "Error", "Could not identify transaction ID.")
+            return
+        payroll_id = int(id_item.text())
 
-        self.table.doubleClicked.connect(self.handle_table_double_click)
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("SELECT date, type, amount, notes FROM employee_payroll WHERE id=?", (payroll_id,))
+        rec = c.fetchone()
+        if rec:
+            try:
+                check_open_period(conn, rec[0])
+            except ValueError as e:
+                conn.close()
+                QMessageBox.information(self, "Closed Year", str(e))
+                return
+        conn.close()
+        if not rec:
+            QMessageBox.warning(self, "Error", "Could not find transaction details.")
+            return
 
-    def choose_transaction_type(self):
+        date_str, typ, amount, notes = rec
         dialog = QDialog(self)
-        dialog.setWindowTitle("Select Transaction Type")
-        dialog.setMinimumWidth(280)
-        vbox = QVBoxLayout(dialog)
-        vbox.addWidget(QLabel("What type of payroll transaction?"))
-        btn_row = QHBoxLayout()
-        btn_salary = QPushButton("Salary")
-        btn_advance = QPushButton("Advance")
-        btn_row.addWidget(btn_salary)
-        btn_row.addWidget(btn_advance)
-        vbox.addLayout(btn_row)
-
-        selected = {}
+        dialog.setWindowTitle("Edit/Delete Transaction")
+        dialog.setMinimumWidth(350)
+        form = QFormLayout(dialog)
+        date_edit = QDateEdit()
+        date_edit.setCalendarPopup(True)
+        date_edit.setDate(QDate.fromString(date_str, "yyyy-MM-dd"))
+        form.addRow("Date:", date_edit)
+        type_combo = QComboBox()
+        type_combo.addItems(["Salary Payment", "Advance", "Deduction"])
+        idx = type_combo.findText(typ)
+        if idx != -1:
+            type_combo.setCurrentIndex(idx)
+        form.addRow("Type:", type_combo)
+        amount_edit = QLineEdit(fmt_money(amount))
+        form.addRow("Amount:", amount_edit)
+        notes_edit = QLineEdit(notes or "")
+        form.addRow("Notes:", notes_edit)
 
-        def choose_salary():
-            selected['type'] = 'Salary Payment'
-            dialog.accept()
-        def choose_advance():
-            selected['type'] = 'Advance'
-            dialog.accept()
-        btn_salary.clicked.connect(choose_salary)
-        btn_advance.clicked.connect(choose_advance)
+        btn_row = QHBoxLayout()
+        save_btn = QPushButton("Save")
+        delete_btn = QPushButton("Delete")
+        cancel_btn = QPushButton("Cancel")
+        btn_row.addWidget(save_btn)
+        btn_row.addWidget(delete_btn)
+        btn_row.addWidget(cancel_btn)
+        form.addRow(btn_row)
 
-        if dialog.exec() == QDialog.DialogCode.Accepted and 'type' in selected:
-            self.show_transaction_dialog(selected['type'])
+        def do_save():
+            new_date = date_edit.date().toString("yyyy-MM-dd")
+            new_type = type_combo.currentText()
+            try:
+                if not amount_edit.text().strip():
+                    raise ValueError
+                new_amt = to_fils(amount_edit.text())
+            except (InvalidOperation, ValueError):
+                QMessageBox.warning(dialog, "Error", "Amount required.")
+                return
+            new_notes = notes_edit.text()
+            debit = credit = 0
+            if new_type == "Salary Payment":
+                debit = new_amt
+            elif new_type == "Advance":
+                debit = new_amt
+            elif new_type == "Deduction":
+                credit = new_amt
 
-    def show_transaction_dialog(self, tx_type):
-        class SalaryDialog(QDialog):
-            def __init__(self, parent):
-                super().__init__(parent)
-                self.setWindowTitle("Record Salary Payment")
-                self.setMinimumWidth(340)
-                form = QFormLayout(self)
-                self.date_edit = QDateEdit()
-                self.date_edit.setCalendarPopup(True)
-                self.date_edit.setDate(QDate.currentDate())
-                self.date_edit.setDisplayFormat("dd-MM-yyyy")
-                form.addRow("Date:", self.date_edit)
+            conn = get_conn()
+            try:
+                check_open_period(conn, new_date)
+            except ValueError as e:
+                conn.close()
+                QMessageBox.warning(dialog, "Cannot Save", str(e))
+                return
+            c = conn.cursor()
+            c.execute(
+                "UPDATE employee_payroll SET date=?, type=?, amount=?, debit=?, credit=?, notes=? WHERE id=?",
+                (new_date, new_type, new_amt, debit, credit, new_notes, payroll_id)
+            )
+            conn.commit()
+            conn.close()
+            emp_name = self.employee_combo.currentText()
+            self._update_or_delete_salary_expense_entry(
+                payroll_id=payroll_id,
+                emp_name=emp_name,
+                new_date=new_date,
+                new_type=new_type,
+                new_amount=debit,
+            )
+            self.update_employee_loan_balance(eid)
+            # Refresh cashflow/daily tab
+            main_window = self.window()
+            if hasattr(main_window, "daily") and hasattr(main_window.daily, "load_data"):
+                main_window.daily.load_data()
+            dialog.accept()
+            self.load_employee(self.employee_combo.currentIndex())
 
-                self.salary_amount_edit = QLineEdit()
-                self.salary_amount_edit.setPlaceholderText("Salary Paid (AED)")
-                self.salary_amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                afont = QFont()
-                afont.setPointSize(16)
-                afont.setBold(True)
-                self.salary_amount_edit.setFont(afont)
-                form.addRow("Salary Paid:", self.salary_amount_edit)
+        def do_delete():
+            reply = QMessageBox.question(dialog, "Confirm Delete", "Delete this transaction?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes:
+                conn = get_conn()
+                c = conn.cursor()
+                # the cashflow mirror goes with it (trg_employee_payroll_cascade_delete)
+                c.execute("DELETE FROM employee_payroll WHERE id=?", (payroll_id,))
+                conn.commit()
+                conn.close()
+                self.update_employee_loan_balance(eid)
+                # Refresh cashflow/daily tab
+                main_window = self.window()
+                if hasattr(main_window, "daily") and hasattr(main_window.daily, "load_data"):
+                    main_window.daily.load_data()
+                dialog.accept()
+                self.load_employee(self.employee_combo.currentIndex())
 
-                self.deduction_amount_edit = QLineEdit()
-                self.deduction_amount_edit.setPlaceholderText("Deduction Amount (AED)")
-                self.deduction_amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.deduction_amount_edit.setFont(afont)
-                form.addRow("Deductions:", self.deduction_amount_edit)
+        save_btn.clicked.connect(do_save)
+        delete_btn.clicked.connect(do_delete)
+        cancel_btn.clicked.connect(dialog.reject)
+        dialog.exec()
 
-                self.notes_edit = QLineEdit()
-                self.notes_edit.setPlaceholderText("Notes (optional)")
-                form.addRow("Notes:", self.notes_edit)
+        # (Optional) If you want newest first, call self.table.sortItems(0, Qt.SortOrder.DescendingOrder) here
 
-                btn_row = QHBoxLayout()
-                save_btn = QPushButton("Save")
-                cancel_btn = QPushButton("Cancel")
-                save_btn.clicked.connect(self.accept)
-                cancel_btn.clicked.connect(self.reject)
-                btn_row.addWidget(save_btn)
-                btn_row.addWidget(cancel_btn)
-                form.addRow(btn_row)
-                self.setLayout(form)
+    def update_employee_loan_balance(self, eid):
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("""
+            SELECT
+                COALESCE(SUM(CASE WHEN type IN ('Advance', 'Carry Forward') THEN debit ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN type IN ('Deduction', 'Carry Forward') THEN credit ELSE 0 END), 0)
+            FROM employee_payroll
+            WHERE employee_id=?
+        """, (eid,))
+        advance_sum, deduction_sum = c.fetchone()
+        loan_balance = advance_sum - deduction_sum
+        c.execute("UPDATE employees SET loan_balance=? WHERE id=?", (loan_balance, eid))
+        conn.commit()
+        conn.close()
+        self.outstanding_card.set_balance(loan_balance)
 
-            def get_values(self):
-                return (
-                    self.salary_amount_edit.text(),
-                    self.deduction_amount_edit.text(),
-                    self.date_edit.date().toString("yyyy-MM-dd"),
-                    self.notes_edit.text(),
+    def _record_salary_expense_in_cashflow(self, emp_name, amount, date, tx_type, payroll_id):
+        with get_conn() as conn:
+            c = conn.cursor()
+            cat_id = get_expense_category_id(conn, "Salary")
+            description = emp_name
+            notes = f"Payroll - {tx_type}"
+            c.execute("SELECT id FROM daily_expense WHERE payroll_id=?", (payroll_id,))
+            already = c.fetchone()
+            if not already:
+                c.execute(
+                    """INSERT INTO daily_expense
+                       (date, amount, category_id, description, notes, payroll_id)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (date, amount, cat_id, description, notes, payroll_id)
                 )
+                conn.commit()
 
-        class AdvanceDialog(QDialog):
-            def __init__(self, parent):
-                super().__init__(parent)
-                self.setWindowTitle("Record Advance")
-                self.setMinimumWidth(340)
-                form = QFormLayout(self)
-                self.date_edit = QDateEdit()
-                self.date_edit.setCalendarPopup(True)
-                self.date_edit.setDate(QDate.currentDate())
-                self.date_edit.setDisplayFormat("dd-MM-yyyy")
-                form.addRow("Date:", self.date_edit)
-
-                self.amount_edit = QLineEdit()
-                self.amount_edit.setPlaceholderText("Advance Amount (AED)")
-                self.amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                afont = QFont()
-                afont.setPointSize(16)
-                afont.setBold(True)
-                self.amount_edit.setFont(afont)
-                form.addRow("Amount:", self.amount_edit)
-
-                self.notes_edit = QLineEdit()
-                self.notes_edit.setPlaceholderText("Notes (optional)")
-                form.addRow("Notes:", self.notes_edit)
+    def _update_or_delete_salary_expense_entry(self, payroll_id, emp_name, new_date, new_type, new_amount):
+        if new_type not in ("Salary Payment", "Advance"):
+            with get_conn() as conn:
+                conn.execute("DELETE FROM daily_expense WHERE payroll_id=?", (payroll_id,))
+            return
+        with get_conn() as conn:
+            updated = conn.execute(
+                "UPDATE daily_expense SET date=?, amount=?, notes=? WHERE payroll_id=?",
+                (new_date, new_amount, f"Payroll - {new_type}", payroll_id)
+            ).rowcount
+        if not updated:
+            # e.g. a Deduction turned into an Advance: it gets its cashflow entry now
+            self._record_salary_expense_in_cashflow(emp_name, new_amount, new_date, new_type, payroll_id)
 
-                btn_row = QHBoxLayout()
-                save_btn = QPushButton("Save")
-                cancel_btn = QPushButton("Cancel")
-                save_btn.clicked.connect(self.accept)
-                cancel_btn.clicked.connect(self.reject)
-                btn_row.addWidget(save_btn)
-                btn_row.addWidget(cancel_btn)
-                form.addRow(btn_row)
-                self.setLayout(form)
+class DocumentsTab(QWidget):
+    documentsChanged = pyqtSignal()
 
-            def get_values(self):
-                return (
-                    self.amount_edit.text(),
-                    self.date_edit.date().toString("yyyy-MM-dd"),
-                    self.notes_edit.text(),
-                )
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        # --- Search filter row ---
+        filter_row = QHBoxLayout()
+        filter_row.addWidget(QLabel("Search Description:"))
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Type to filter by description...")
+        self.filter_edit.textChanged.connect(self.load_documents)
+        filter_row.addWidget(self.filter_edit)
+        filter_row.addStretch()
+        self.add_btn = QPushButton("Add Document")
+        self.add_btn.clicked.connect(self.add_document)
+        filter_row.addWidget(self.add_btn)
+        layout.addLayout(filter_row)
 
-        class DeductionDialog(QDialog):
-            def __init__(self, parent):
-                super().__init__(parent)
-                self.setWindowTitle("Record Deduction")
-                self.setMinimumWidth(340)
-                form = QFormLayout(self)
-                self.date_edit = QDateEdit()
-                self.date_edit.setCalendarPopup(True)
-                self.date_edit.setDate(QDate.currentDate())
-                self.date_edit.setDisplayFormat("dd-MM-yyyy")
-                form.addRow("Date:", self.date_edit)
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["Description", "Category", "Expiry Date", "Status"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+        self.table.doubleClicked.connect(self.handle_table_double_click)
+        self.load_documents()
 
-                self.amount_edit = QLineEdit()
-                self.amount_edit.setPlaceholderText("Deduction Amount (AED)")
-                self.amount_edit.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                afont = QFont()
-                afont.setPointSize(16)
-                afont.setBold(True)
-                self.amount_edit.setFont(afont)
-                form.addRow("Amount:", self.amount_edit)
+    def load_documents(self):
+        filter_text = self.filter_edit.text().strip().lower()
+        docs = [d for d in load_documents_from_db() if not filter_text or filter_text in d.description.lower()]
+        statuses = [self.compute_status_sort(doc.expiry_date) for doc in docs]
+        # Sort: expired (0), expiring soon (1), valid (2)
+        order = sorted(range(len(docs)), key=lambda i: (statuses[i][2], docs[i].description.lower()))
+
+        self.table.setRowCount(len(order))
+        for i, pos in enumerate(order):
+            doc = docs[pos]
+            status, color, _ = statuses[pos]
+            self.table.setItem(i, 0, QTableWidgetItem(doc.description))
+            self.table.setItem(i, 1, QTableWidgetItem(doc.category))
+            self.table.setItem(i, 2, QTableWidgetItem(doc.expiry_date))
+            self._set_status_cell(i, status, color)
+            for j in range(4):
+                self.table.item(i, j).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.documents = [docs[pos] for pos in order]
+
+    def _set_status_cell(self, row, status, color):
+        status_item = QTableWidgetItem(status)
+        status_item.setForeground(QColor("white"))
+        status_item.setBackground(QColor(color))
+        status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.table.setItem(row, 3, status_item)
+
+    def update_document_row(self, key):
+        """Refreshes the status cell of the document identified by (description, category, expiry_date)."""
+        for row, doc in enumerate(self.documents):
+            if (doc["description"], doc["category"], doc["expiry_date"]) == key:
+                status, color, _ = self.compute_status_sort(doc["expiry_date"])
+                self._set_status_cell(row, status, color)
 
-                self.notes_edit = QLineEdit()
-                self.notes_edit.setPlaceholderText("Notes (optional)")
-                form.addRow("Notes:", self.notes_edit)
+    def compute_status_sort(self, expiry_str):
+        expiry = QDate.fromString(expiry_str, "dd/MM/yyyy")
+        today = QDate.currentDate()
+        days = today.daysTo(expiry)
+        if not expiry.isValid():
+            return "Invalid Date", "#616161", 3
+        if days > 30:
+            return " ✅ Valid", "#43a047", 2
+        elif 0 <= days <= 30:
+            return "⚠️ Expiring Soon", "#fbc02d", 1
+        else:
+            stat = f"❌ Expired {abs(days)} days ago" if days < -1 else "Expired"
+            return stat, "#e53935", 0
 
-                btn_row = QHBoxLayout()
-                save_btn = QPushButton("Save")
-                cancel_btn = QPushButton("Cancel")
-                save_btn.clicked.connect(self.accept)
-                cancel_btn.clicked.connect(self.reject)
-                btn_row.addWidget(save_btn)
-                btn_row.addWidget(cancel_btn)
-                form.addRow(btn_row)
-                self.setLayout(form)
+    def add_document(self):
+        dlg = DocumentEntryDialog(parent=self)
+        if dlg.exec():
+            desc, cat, expiry = dlg.get_values()
+            if desc and cat and expiry:
+                save_document_to_db(desc, cat, expiry)
+                self.load_documents()
+                self.documentsChanged.emit()
 
-            def get_values(self):
-                return (
-                    self.amount_edit.text(),
-                    self.date_edit.date().toString("yyyy-MM-dd"),
-                    self.notes_edit.text(),
-                )
+    def handle_table_double_click(self, index):
+        row = index.row()
+        doc = self.documents[row]
+        dialog = DocumentActionDialog(doc, self)
+        result = dialog.exec()
+        if dialog.renewed:
+            new_expiry = dialog.get_new_expiry()
+            if new_expiry:
+                update_document_expiry(doc, new_expiry)
+                self.load_documents()
+                self.documentsChanged.emit()
+        elif dialog.deleted:
+            delete_document(doc)
+            self.load_documents()
+            self.documentsChanged.emit()
 
-        if tx_type == "Salary Payment":
-            dlg = SalaryDialog(self)
-            if dlg.exec() == QDialog.DialogCode.Accepted:
-                salary_text, deduction_text, date, notes = dlg.get_values()
-                try:
-                    salary_amt = float(salary_text)
-                except Exception:
-                    salary_amt = 0.0
-                try:
-                    deduction_amt = float(deduction_text)
-                except Exception:
-                    deduction_amt = 0.0
-                if salary_amt < 0:
-                    QMessageBox.warning(self, "Amount Required", "Salary amount must be zero or positive.")
-                    return
-                if deduction_amt < 0:
-                    QMessageBox.warning(self, "Amount Required", "Deduction amount must be zero or positive.")
-                    return
-                name = self.employee_combo.currentText()
-                eid = self.emp_map.get(name)
-                if eid is None:
-                    QMessageBox.warning(self, "Employee required", "Please select an employee.")
-                    return
-                # Get previous balance
-                conn = get_conn()
-                c = conn.cursor()
-                c.execute("SELECT balance FROM employee_payroll WHERE employee_id=? ORDER BY date DESC, id DESC LIMIT 1", (eid,))
-                prev = c.fetchone()
-                prev_balance = prev[0] if prev else 0
-                debit = salary_amt
-                credit = deduction_amt
-                # Only deduction affects balance
-                if deduction_amt > 0:
-                    new_balance = prev_balance - deduction_amt
-                else:
-                    new_balance = prev_balance
-                c.execute(
-                    "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (eid, date, "Salary Payment", salary_amt, debit, credit, new_balance, notes)
-                )
-                conn.commit()
-                conn.close()
-                # Restore cashflow entry for Salary Payment
-                self._record_salary_expense_in_cashflow(emp_name=name, amount=debit, date=date, tx_type="Salary Payment")
-                if hasattr(self.window(), "daily") and hasattr(self.window().daily, "load_data"):
-                    self.window().daily.load_data()
-                self.load_employee(self.employee_combo.currentIndex())
-                QMessageBox.information(self, "Success", "Transaction recorded.")
+class DocumentActionDialog(QDialog):
+    def __init__(self, doc, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Document Action")
+        self.setMinimumWidth(350)
+        self.renewed = False
+        self.deleted = False
+        self._new_expiry = None
 
-        elif tx_type == "Advance":
-            dlg = AdvanceDialog(self)
-            if dlg.exec() == QDialog.DialogCode.Accepted:
-                amount_text, date, notes = dlg.get_values()
-                try:
-                    amt = float(amount_text)
-                except Exception:
-                    amt = 0.0
-                if amt <= 0:
-                    QMessageBox.warning(self, "Amount Required", "Advance amount must be greater than zero.")
-                    return
-                name = self.employee_combo.currentText()
-                eid = self.emp_map.get(name)
-                if eid is None:
-                    QMessageBox.warning(self, "Employee required", "Please select an employee.")
-                    return
-                # Get previous balance
-                conn = get_conn()
-                c = conn.cursor()
-                c.execute("SELECT balance FROM employee_payroll WHERE employee_id=? ORDER BY date DESC, id DESC LIMIT 1", (eid,))
-                prev = c.fetchone()
-                prev_balance = prev[0] if prev else 0
-                debit = amt
-                credit = 0
-                new_balance = prev_balance + amt
-                c.execute(
-                    "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (eid, date, "Advance", amt, debit, credit, new_balance, notes)
-                )
-                conn.commit()
-                conn.close()
-                # Restore cashflow entry for Advance
-                self._record_salary_expense_in_cashflow(emp_name=name, amount=debit, date=date, tx_type="Advance")
-                if hasattr(self.window(), "daily") and hasattr(self.window().daily, "load_data"):
-                     self.window().daily.load_data()
-                self.load_employee(self.employee_combo.currentIndex())
-                QMessageBox.information(self, "Success", "Transaction recorded.")
+        layout = QVBoxLayout(self)
+        label = QLabel(
+            f"Description: <b>{doc['description']}</b><br>"
+            f"Category: <b>{doc['category']}</b><br>"
+            f"Expiry Date: <b>{doc['expiry_date']}</b>"
+        )
+        label.setTextFormat(Qt.TextFormat.RichText)
+        layout.addWidget(label)
 
-        elif tx_type == "Deduction":
-            dlg = DeductionDialog(self)
-            if dlg.exec() == QDialog.DialogCode.Accepted:
-                amount_text, date, notes = dlg.get_values()
-                try:
-                    amt = float(amount_text)
-                except Exception:
-                    amt = 0.0
-                if amt <= 0:
-                    QMessageBox.warning(self, "Amount Required", "Deduction amount must be greater than zero.")
-                    return
-                name = self.employee_combo.currentText()
-                eid = self.emp_map.get(name)
-                if eid is None:
-                    QMessageBox.warning(self, "Employee required", "Please select an employee.")
-                    return
-                # Get previous balance
-                conn = get_conn()
-                c = conn.cursor()
-                c.execute("SELECT balance FROM employee_payroll WHERE employee_id=? ORDER BY date DESC, id DESC LIMIT 1", (eid,))
-                prev = c.fetchone()
-                prev_balance = prev[0] if prev else 0
-                debit = 0
-                credit = amt
-                new_balance = prev_balance - amt
-                c.execute(
-                    "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (eid, date, "Deduction", amt, debit, credit, new_balance, notes)
-                )
-                conn.commit()
-                conn.close()
-                self.load_employee(self.employee_combo.currentIndex())
-                QMessageBox.information(self, "Success", "Transaction recorded.")
+        btn_row = QHBoxLayout()
+        renew_btn = QPushButton("Renew Document")
+        delete_btn = QPushButton("Delete Document")
+        cancel_btn = QPushButton("Cancel")
+        btn_row.addWidget(renew_btn)
+        btn_row.addWidget(delete_btn)
+        btn_row.addWidget(cancel_btn)
+        layout.addLayout(btn_row)
 
+        renew_btn.clicked.connect(self.handle_renew)
+        delete_btn.clicked.connect(self.handle_delete)
+        cancel_btn.clicked.connect(self.reject)
 
-    def load_employees(self):
-        self.employee_combo.clear()
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, name FROM employees")
-        self.emp_map = {}
-        for eid, name in c.fetchall():
-            self.emp_map[name] = eid
-            self.employee_combo.addItem(name)
-        conn.close()
-        if self.emp_map:
-            self.load_employee(0)
+    def handle_renew(self):
+        date_dlg = QDialog(self)
+        date_dlg.setWindowTitle("Renew Document - New Expiry Date")
+        layout = QVBoxLayout(date_dlg)
+        date_edit = QDateEdit()
+        date_edit.setDisplayFormat("dd/MM/yyyy")
+        date_edit.setCalendarPopup(True)
+        date_edit.setDate(QDate.currentDate())
+        layout.addWidget(QLabel("New Expiry Date:"))
+        layout.addWidget(date_edit)
+        btn_row = QHBoxLayout()
+        ok_btn = QPushButton("OK")
+        cancel_btn = QPushButton("Cancel")
+        btn_row.addWidget(ok_btn)
+        btn_row.addWidget(cancel_btn)
+        layout.addLayout(btn_row)
+        ok_btn.clicked.connect(date_dlg.accept)
+        cancel_btn.clicked.connect(date_dlg.reject)
+        if date_dlg.exec():
+            self._new_expiry = date_edit.date().toString("dd/MM/yyyy")
+            self.renewed = True
+            self.accept()
 
-    def load_employee(self, idx):
-        if idx < 0 or not self.emp_map:
-            return
-        name = self.employee_combo.currentText()
-        eid = self.emp_map[name]
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT designation, salary, joining_date, photo_path FROM employees WHERE id=?", (eid,))
-        row = c.fetchone()
-        if not row:
-            return
-        desig, salary, joining, photo = row
-        self.emp_info.setText(f"{name}\n{desig}\nSalary: {salary}\nJoined: {joining}")
-        self.photo.setPixmap(QPixmap(photo) if photo and os.path.exists(photo) else QPixmap())
-        conn.close()
-        # Only call load_transactions now; don't set card yet
-        self.load_transactions(eid)
+    def handle_delete(self):
+        reply = QMessageBox.question(
+            self, "Delete Document",
+            "Are you sure you want to delete this document?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.deleted = True
+            self.accept()
 
-    def load_transactions(self, eid):
-        self.table.setRowCount(0)
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, date, type, debit, credit, balance, notes FROM employee_payroll WHERE employee_id=? ORDER BY date ASC, id ASC", (eid,))
-        rows = c.fetchall()
-        conn.close()
+    def get_new_expiry(self):
+        return self._new_expiry
 
-        last_balance = 0.0
-        for i, (payroll_id, date_str, typ, debit, credit, balance, notes) in enumerate(rows):
-            debit_str = ""
-            credit_str = ""
-            if typ == "Salary Payment":
-                debit_str = f"{debit:.2f}" if debit else ""
-                credit_str = f"{credit:.2f}" if credit else ""
-            elif typ == "Advance":
-                debit_str = f"{debit:.2f}" if debit else ""
-            elif typ == "Deduction":
-                credit_str = f"{credit:.2f}" if credit else ""
+class DocumentEntryDialog(QDialog):
+    def __init__(self, parent=None, desc="", cat="", expiry=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add/Edit Document")
+        self.setMinimumWidth(340)
+        form = QFormLayout(self)
+        self.desc_edit = QLineEdit(desc)
+        self.cat_edit = QLineEdit(cat)
+        self.expiry_edit = QDateEdit()
+        self.expiry_edit.setDisplayFormat("dd/MM/yyyy")
+        self.expiry_edit.setCalendarPopup(True)
+        if expiry:
+            qdate = QDate.fromString(expiry, "dd/MM/yyyy")
+            self.expiry_edit.setDate(qdate if qdate.isValid() else QDate.currentDate())
+        else:
+            self.expiry_edit.setDate(QDate.currentDate())
+        form.addRow("Description:", self.desc_edit)
+        form.addRow("Category:", self.cat_edit)
+        form.addRow("Expiry Date:", self.expiry_edit)
+        btn_row = QHBoxLayout()
+        save_btn = QPushButton("Save")
+        save_btn.clicked.connect(self.accept)
+        cancel_btn = QPushButton("Cancel")
+        cancel_btn.clicked.connect(self.reject)
+        btn_row.addWidget(save_btn)
+        btn_row.addWidget(cancel_btn)
+        form.addRow(btn_row)
+        self.setLayout(form)
 
-            self.table.insertRow(i)
-            id_item = QTableWidgetItem(str(payroll_id))
-            id_item.setData(Qt.ItemDataRole.UserRole, payroll_id)
-            self.table.setVerticalHeaderItem(i, id_item)
-            self.table.setItem(i, 0, QTableWidgetItem(str(date_str)))
-            self.table.setItem(i, 1, QTableWidgetItem(str(typ)))
-            self.table.setItem(i, 2, QTableWidgetItem(debit_str))
-            self.table.setItem(i, 3, QTableWidgetItem(credit_str))
-            self.table.setItem(i, 4, QTableWidgetItem(f"{balance:.2f}"))
-            self.table.setItem(i, 5, QTableWidgetItem(str(notes)))
+    def get_values(self):
+        return (
+            self.desc_edit.text().strip(),
+            self.cat_edit.text().strip(),
+            self.expiry_edit.date().toString("dd/MM/yyyy")
+        )
 
-            # Only update prev_balance for Advance/Deduction
-            if typ == "Advance" or typ == "Deduction":
-                prev_balance = balance
+# --- Persistent storage functions using CSV file (replace with DB for production) ---
 
-            last_balance = balance  # always the latest
+def load_documents_from_db():
+    docs = []
+    try:
+        with open("documents.csv", encoding="utf-8") as f:
+            for line in f:
+                row = line.strip().split(",")
+                if len(row) >= 3:
+                    docs.append(DocumentRecord(row[0], sys.intern(row[1]), row[2]))
+    except Exception:
+        pass
+    return docs
 
-        self.outstanding_card.set_balance(last_balance)
+def save_document_to_db(desc, cat, expiry):
+    with open("documents.csv", "a", encoding="utf-8") as f:
+        f.write(f"{desc},{cat},{expiry}\n")
 
-    def handle_table_double_click(self, index):
-        row = index.row()
-        eid = self.emp_map.get(self.employee_combo.currentText())
-        id_item = self.table.verticalHeaderItem(row)
-        if id_item is None:
-            QMessageBox.warning(self, "Error", "Could not identify transaction ID.")
-            return
-        payroll_id = int(id_item.text())
+def update_document_expiry(doc, new_expiry):
+    docs = load_documents_from_db()
+    updated = False
+    for d in docs:
+        if (d["description"] == doc["description"] and
+            d["category"] == doc["category"] and
+            d["expiry_date"] == doc["expiry_date"]):
+            d["expiry_date"] = new_expiry
+            updated = True
+            break
+    if updated:
+        with open("documents.csv", "w", encoding="utf-8") as f:
+            for d in docs:
+                f.write(f"{d['description']},{d['category']},{d['expiry_date']}\n")
 
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT date, type, amount, notes FROM employee_payroll WHERE id=?", (payroll_id,))
-        rec = c.fetchone()
-        conn.close()
-        if not rec:
-            QMessageBox.warning(self, "Error", "Could not find transaction details.")
-            return
+def delete_document(doc):
+    docs = load_documents_from_db()
+    docs = [
+        d for d in docs
+        if not (d["description"] == doc["description"] and
+                d["category"] == doc["category"] and
+                d["expiry_date"] == doc["expiry_date"])
+    ]
+    with open("documents.csv", "w", encoding="utf-8") as f:
+        for d in docs:
+            f.write(f"{d['description']},{d['category']},{d['expiry_date']}\n")
 
-        date_str, typ, amount, notes = rec
-        dialog = QDialog(self)
-        dialog.setWindowTitle("Edit/Delete Transaction")
-        dialog.setMinimumWidth(350)
-        form = QFormLayout(dialog)
-        date_edit = QDateEdit()
-        date_edit.setCalendarPopup(True)
-        date_edit.setDate(QDate.fromString(date_str, "yyyy-MM-dd"))
-        form.addRow("Date:", date_edit)
-        type_combo = QComboBox()
-        type_combo.addItems(["Salary Payment", "Advance", "Deduction"])
-        idx = type_combo.findText(typ)
-        if idx != -1:
-            type_combo.setCurrentIndex(idx)
-        form.addRow("Type:", type_combo)
-        amount_edit = QLineEdit(str(amount))
-        form.addRow("Amount:", amount_edit)
-        notes_edit = QLineEdit(notes or "")
-        form.addRow("Notes:", notes_edit)
+class ExpenseCategoryTab(QWidget):
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        self.list_widget = QListWidget()
+        self.refresh_list()
+        layout.addWidget(QLabel("Expense Categories:"))
+        layout.addWidget(self.list_widget)
 
-        btn_row = QHBoxLayout()
-        save_btn = QPushButton("Save")
+        btn_layout = QHBoxLayout()
+        add_btn = QPushButton("Add")
+        add_btn.clicked.connect(self.add_category)
+        edit_btn = QPushButton("Edit")
+        edit_btn.clicked.connect(self.edit_category)
         delete_btn = QPushButton("Delete")
-        cancel_btn = QPushButton("Cancel")
-        btn_row.addWidget(save_btn)
-        btn_row.addWidget(delete_btn)
-        btn_row.addWidget(cancel_btn)
-        form.addRow(btn_row)
+        delete_btn.clicked.connect(self.delete_category)
+        btn_layout.addWidget(add_btn)
+        btn_layout.addWidget(edit_btn)
+        btn_layout.addWidget(delete_btn)
+        layout.addLayout(btn_layout)
 
-        def do_save():
-            new_date = date_edit.date().toString("yyyy-MM-dd")
-            new_type = type_combo.currentText()
+        self.setLayout(layout)
+
+    def refresh_list(self):
+        self.list_widget.clear()
+        cats = get_expense_categories()
+        for cid, name in cats:
+            self.list_widget.addItem(name)
+
+    def add_category(self):
+        text, ok = QInputDialog.getText(self, "Add Expense Category", "Category Name:")
+        if ok and text.strip():
+            conn = get_conn()
+            c = conn.cursor()
             try:
-                new_amt = float(amount_edit.text())
-            except Exception:
-                QMessageBox.warning(dialog, "Error", "Amount required.")
-                return
-            new_notes = notes_edit.text()
-            debit = credit = 0
-            if new_type == "Salary Payment":
-                debit = new_amt
-            elif new_type == "Advance":
-                debit = new_amt
-            elif new_type == "Deduction":
-                credit = new_amt
+                c.execute("INSERT INTO expense_categories (name) VALUES (?)", (text.strip(),))
+                conn.commit()
+            except sqlite3.IntegrityError:
+                QMessageBox.warning(self, "Exists", "This category already exists.")
+            conn.close()
+            self.refresh_list()
 
+    def edit_category(self):
+        selected = self.list_widget.currentItem()
+        if not selected:
+            return
+        old_name = selected.text()
+        text, ok = QInputDialog.getText(self, "Edit Expense Category", "Category Name:", text=old_name)
+        if ok and text.strip():
             conn = get_conn()
             c = conn.cursor()
-            c.execute(
-                "UPDATE employee_payroll SET date=?, type=?, amount=?, debit=?, credit=?, notes=? WHERE id=?",
-                (new_date, new_type, new_amt, debit, credit, new_notes, payroll_id)
-            )
-            conn.commit()
+            try:
+                c.execute("UPDATE expense_categories SET name=? WHERE name=?", (text.strip(), old_name))
+                conn.commit()
+            except sqlite3.IntegrityError:
+                QMessageBox.warning(self, "Exists", "This category already exists.")
             conn.close()
-            emp_name = self.employee_combo.currentText()
-            self._update_or_delete_salary_expense_entry(
-                old_date=date_str,
-                old_type=typ,
-                old_amount=amount,
-                emp_name=emp_name,
-                new_date=new_date,
-                new_type=new_type,
-                new_amount=new_amt,
-            )
-            self.update_employee_loan_balance(eid)
-            # Refresh cashflow/daily tab
-            main_window = self.window()
-            if hasattr(main_window, "daily") and hasattr(main_window.daily, "load_data"):
-                main_window.daily.load_data()
-            dialog.accept()
-            self.load_employee(self.employee_combo.currentIndex())
+            self.refresh_list()
 
-        def do_delete():
-            reply = QMessageBox.question(dialog, "Confirm Delete", "Delete this transaction?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-            if reply == QMessageBox.StandardButton.Yes:
-                conn = get_conn()
-                c = conn.cursor()
-                c.execute("DELETE FROM employee_payroll WHERE id=?", (payroll_id,))
+    def delete_category(self):
+        selected = self.list_widget.currentItem()
+        if not selected:
+            return
+        name = selected.text()
+        reply = QMessageBox.question(self, "Confirm", f"Delete category '{name}'? This will also remove associated expense entries.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            conn = get_conn()
+            c = conn.cursor()
+            c.execute("SELECT id FROM expense_categories WHERE name=?", (name,))
+            res = c.fetchone()
+            if res:
+                cat_id = res[0]
+                c.execute("DELETE FROM daily_expense WHERE category_id=?", (cat_id,))
+                c.execute("DELETE FROM expense_categories WHERE id=?", (cat_id,))
                 conn.commit()
-                conn.close()
-                emp_name = self.employee_combo.currentText()
-                self._update_or_delete_salary_expense_entry(
-                    old_date=date_str,
-                    old_type=typ,
-                    old_amount=amount,
-                    emp_name=emp_name,
-                    new_date=None,
-                    new_type=None,
-                    new_amount=None,
-                )
-                self.update_employee_loan_balance(eid)
-                # Refresh cashflow/daily tab
-                main_window = self.window()
-                if hasattr(main_window, "daily") and hasattr(main_window.daily, "load_data"):
-                    main_window.daily.load_data()
-                dialog.accept()
-                self.load_employee(self.employee_combo.currentIndex())
+            conn.close()
+            self.refresh_list()
 
-        save_btn.clicked.connect(do_save)
-        delete_btn.clicked.connect(do_delete)
-        cancel_btn.clicked.connect(dialog.reject)
-        dialog.exec()
+class VendorDialog(QDialog):
+    def __init__(self, parent=None, title="Add Vendor", name="", contact="", opening_balance=0):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumWidth(350)
+        layout = QFormLayout(self)
+        self.name_input = QLineEdit(name)
+        self.name_input.setPlaceholderText("Enter vendor name")
+        self.contact_input = QLineEdit(contact)
+        self.contact_input.setPlaceholderText("Enter contact (optional)")
+        self.opening_input = QLineEdit(fmt_money(opening_balance))
+        self.opening_input.setPlaceholderText("Opening balance in AED")
+        layout.addRow("Vendor Name:", self.name_input)
+        layout.addRow("Contact:", self.contact_input)
+        layout.addRow("Opening Balance (AED):", self.opening_input)
+        button_box = QHBoxLayout()
+        self.save_btn = QPushButton(QIcon.fromTheme("dialog-ok"), "Save")
+        self.save_btn.clicked.connect(self.accept)
+        self.cancel_btn = QPushButton(QIcon.fromTheme("dialog-cancel"), "Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        button_box.addWidget(self.save_btn)
+        button_box.addWidget(self.cancel_btn)
+        layout.addRow(button_box)
+        self.setLayout(layout)
 
-        # (Optional) If you want newest first, call self.table.sortItems(0, Qt.SortOrder.DescendingOrder) here
+    def get_values(self):
+        name = self.name_input.text().strip()
+        contact = self.contact_input.text().strip()
+        opening_balance = parse_amount(self.opening_input.text())
+        return name, contact, opening_balance
+    
 
-    def update_employee_loan_balance(self, eid):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("""
-            SELECT
-                COALESCE(SUM(CASE WHEN type='Advance' THEN debit ELSE 0 END), 0),
-                COALESCE(SUM(CASE WHEN type='Deduction' THEN credit ELSE 0 END), 0)
-            FROM employee_payroll
-            WHERE employee_id=?
-        """, (eid,))
-        advance_sum, deduction_sum = c.fetchone()
-        loan_balance = advance_sum - deduction_sum
-        c.execute("UPDATE employees SET loan_balance=? WHERE id=?", (loan_balance, eid))
-        conn.commit()
-        conn.close()
-        self.outstanding_card.set_balance(loan_balance)
+class TransactionEntryDialog(QDialog):
+    def __init__(self, parent, vendor_id, vendor_name, ttype=None, edit_mode=False, trans_id=None, init_data=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add Transaction" if not edit_mode else "Edit Transaction")
+        self.vendor_id = vendor_id
+        self.edit_mode = edit_mode
+        self.trans_id = trans_id
+        self.ttype = ttype if ttype else "purchase"
+        self.setMinimumWidth(520)
+        self.setMinimumHeight(400)
 
-    def _record_salary_expense_in_cashflow(self, emp_name, amount, date, tx_type):
-        with get_conn() as conn:
-            c = conn.cursor()
-            c.execute("SELECT id FROM expense_categories WHERE lower(name)=?", ("salary",))
-            row = c.fetchone()
-            if row:
-                cat_id = row[0]
-            else:
-                c.execute("INSERT INTO expense_categories (name) VALUES ('Salary')")
-                cat_id = c.lastrowid
-                conn.commit()
-            description = emp_name
-            notes = f"Payroll - {tx_type}"
-            c.execute(
-                """SELECT id FROM daily_expense
-                   WHERE date=? AND category_id=? AND amount=? AND description=? AND notes=?""",
-                (date, cat_id, amount, description, notes)
-            )
-            already = c.fetchone()
-            if not already:
-                c.execute(
-                    """INSERT INTO daily_expense
-                       (date, amount, category_id, description, notes)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (date, amount, cat_id, description, notes)
-                )
-                conn.commit()
+        main_layout = QVBoxLayout(self)
+        form = QFormLayout()
+        form.setLabelAlignment(Qt.AlignmentFlag.AlignRight)
+        form.setFormAlignment(Qt.AlignmentFlag.AlignHCenter)
 
-    def _update_or_delete_salary_expense_entry(self, old_date, old_type, old_amount, emp_name, new_date, new_type, new_amount):
-        if old_type not in ("Salary Payment", "Advance"):
-            return
-        with get_conn() as conn:
-            c = conn.cursor()
-            c.execute("SELECT id FROM expense_categories WHERE lower(name)=?", ("salary",))
-            row = c.fetchone()
-            if not row:
-                return
-            cat_id = row[0]
-            description = emp_name
-            notes = f"Payroll - {old_type}"
-            c.execute(
-                """SELECT id FROM daily_expense
-                   WHERE date=? AND category_id=? AND amount=? AND description=? AND notes=?""",
-                (old_date, cat_id, old_amount, description, notes)
-            )
-            exp_row = c.fetchone()
-            if not exp_row:
-                return
-            exp_id = exp_row[0]
-            if new_type in ("Salary Payment", "Advance") and new_date and new_amount is not None:
-                new_notes = f"Payroll - {new_type}"
-                c.execute(
-                    "UPDATE daily_expense SET date=?, amount=?, notes=? WHERE id=?",
-                    (new_date, new_amount, new_notes, exp_id)
-                )
-            else:
-                c.execute("DELETE FROM daily_expense WHERE id=?", (exp_id,))
-            conn.commit()
+        vendor_label = QLabel(f"<b>Vendor:</b> <span style='color:#e53935;'>{vendor_name}</span>")
+        vendor_label.setTextFormat(Qt.TextFormat.RichText)
+        vendor_label.setFont(QFont("Segoe UI", 16, QFont.Weight.Bold))
+        vendor_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        main_layout.addWidget(vendor_label)
 
-class DocumentsTab(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        layout = QVBoxLayout(self)
-        # --- Search filter row ---
-        filter_row = QHBoxLayout()
-        filter_row.addWidget(QLabel("Search Description:"))
-        self.filter_edit = QLineEdit()
-        self.filter_edit.setPlaceholderText("Type to filter by description...")
-        self.filter_edit.textChanged.connect(self.load_documents)
-        filter_row.addWidget(self.filter_edit)
-        filter_row.addStretch()
-        self.add_btn = QPushButton("Add Document")
-        self.add_btn.clicked.connect(self.add_document)
-        filter_row.addWidget(self.add_btn)
-        layout.addLayout(filter_row)
+        self.trans_type = QLabel(self.ttype.capitalize())
+        self.trans_type.setStyleSheet("font-size:16px; color:#fb700e; font-weight:600;")
+        form.addRow("Transaction Type:", self.trans_type)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Description", "Category", "Expiry Date", "Status"])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        layout.addWidget(self.table)
-        self.table.doubleClicked.connect(self.handle_table_double_click)
-        self.load_documents()
+        self.trans_entry_date = QDateEdit()
+        self.trans_entry_date.setDisplayFormat("dd-MM-yyyy")
+        self.trans_entry_date.setCalendarPopup(True)
+        self.trans_entry_date.setDate(QDate.currentDate())
+        self.trans_entry_date.setMinimumWidth(140)
 
-    def load_documents(self):
-        docs = load_documents_from_db()
-        filter_text = self.filter_edit.text().strip().lower()
-        filtered_docs = []
-        for d in docs:
-            if not filter_text or filter_text in d["description"].lower():
-                filtered_docs.append(d)
-                
-        # Add status and color and sortnum for sorting and later use
-        table_docs = []
-        for doc in filtered_docs:
-            status, color, sortnum = self.compute_status_sort(doc["expiry_date"])
-            table_docs.append((sortnum, status, color, doc))
-        # Sort: expired (0), expiring soon (1), valid (2)
-        table_docs.sort(key=lambda x: (x[0], x[3]["description"].lower()))
-
-        self.table.setRowCount(len(table_docs))
-        for i, (sortnum, status, color, doc) in enumerate(table_docs):
-            desc, cat, expiry = doc["description"], doc["category"], doc["expiry_date"]
-            self.table.setItem(i, 0, QTableWidgetItem(desc))
-            self.table.setItem(i, 1, QTableWidgetItem(cat))
-            self.table.setItem(i, 2, QTableWidgetItem(expiry))
-            status_item = QTableWidgetItem(status)
-            status_item.setForeground(QColor("white"))
-            status_item.setBackground(QColor(color))
-            self.table.setItem(i, 3, status_item)
-            for j in range(4):
-                self.table.item(i, j).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.documents = [doc for (_, _, _, doc) in table_docs]
+        self.trans_invoice_input = QLineEdit()
+        self.trans_invoice_input.setPlaceholderText("Invoice number (optional)")
+        self.duplicate_invoices = []
+        self.invoice_warning = QLabel("")
+        self.invoice_warning.setStyleSheet("color:#e53935; font-weight:600;")
+        self.invoice_warning.setWordWrap(True)
+        self.invoice_warning.hide()
+        # look the number up once typing pauses, not on every keystroke
+        self.invoice_check_timer = QTimer(self)
+        self.invoice_check_timer.setSingleShot(True)
+        self.invoice_check_timer.setInterval(250)
+        self.invoice_check_timer.timeout.connect(self.check_duplicate_invoice)
 
-    def compute_status_sort(self, expiry_str):
-        expiry = QDate.fromString(expiry_str, "dd/MM/yyyy")
-        today = QDate.currentDate()
-        days = today.daysTo(expiry)
-        if not expiry.isValid():
-            return "Invalid Date", "#616161", 3
-        if days > 30:
-            return " ✅ Valid", "#43a047", 2
-        elif 0 <= days <= 30:
-            return "⚠️ Expiring Soon", "#fbc02d", 1
-        else:
-            stat = f"❌ Expired {abs(days)} days ago" if days < -1 else "Expired"
-            return stat, "#e53935", 0
+        self.trans_note_input = QLineEdit()
+        self.trans_note_input.setPlaceholderText("Enter note or remarks (optional)")
 
-    def add_document(self):
-        dlg = DocumentEntryDialog(parent=self)
-        if dlg.exec():
-            desc, cat, expiry = dlg.get_values()
-            if desc and cat and expiry:
-                save_document_to_db(desc, cat, expiry)
-                self.load_documents()
+        self.trans_amount_input = QLineEdit()
+        self.trans_amount_input.setPlaceholderText("Enter amount in AED")
+        amount_font = QFont()
+        amount_font.setPointSize(20)
+        amount_font.setBold(True)
+        self.trans_amount_input.setFont(amount_font)
+        self.trans_amount_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-    def handle_table_double_click(self, index):
-        row = index.row()
-        doc = self.documents[row]
-        dialog = DocumentActionDialog(doc, self)
-        result = dialog.exec()
-        if dialog.renewed:
-            new_expiry = dialog.get_new_expiry()
-            if new_expiry:
-                update_document_expiry(doc, new_expiry)
-                self.load_documents()
-        elif dialog.deleted:
-            delete_document(doc)
-            self.load_documents()
+        # Payment Mode (only for payment)
+        self.trans_payment_mode = QComboBox()
+        self.trans_payment_mode.addItems(['Cash', 'Credit Card', 'Bank Transfer', 'Other'])
+        self.trans_payment_mode.setEditable(True)
+        self.trans_payment_mode.setMinimumWidth(240)
 
-class DocumentActionDialog(QDialog):
-    def __init__(self, doc, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Document Action")
-        self.setMinimumWidth(350)
-        self.renewed = False
-        self.deleted = False
-        self._new_expiry = None
+        # Cheque Fields (used as due date for purchase)
+        self.paid_by_cheque_checkbox = QCheckBox("Payment done by Cheque")
+        self.paid_by_cheque_checkbox.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.paid_by_cheque_checkbox.setStyleSheet("""
+            QCheckBox {
+                background-color: #3A3A3C;
+                color: #F1F3F4;
+                font-size: 15px;
+                padding: 10px 20px;
+                border: 2px solid #5F6368;
+                border-radius: 6px;
+            }
+            QCheckBox::indicator {
+                width: 16px;
+                height: 16px;
+            }
+            QCheckBox:checked {
+                background-color: #1E8E3E;
+                color: white;
+                border-color: #1E8E3E;
+            }
+        """)
+        self.cheque_bank_name = QLineEdit()
+        self.cheque_bank_name.setPlaceholderText("Bank Name")
+        self.cheque_due_date = QDateEdit()
+        self.cheque_due_date.setDisplayFormat("dd-MM-yyyy")
+        self.cheque_due_date.setCalendarPopup(True)
+        self.cheque_due_date.setDate(QDate.currentDate())
+        self.cheque_due_date.setMinimumWidth(140)
 
-        layout = QVBoxLayout(self)
-        label = QLabel(
-            f"Description: <b>{doc['description']}</b><br>"
-            f"Category: <b>{doc['category']}</b><br>"
-            f"Expiry Date: <b>{doc['expiry_date']}</b>"
-        )
-        label.setTextFormat(Qt.TextFormat.RichText)
-        layout.addWidget(label)
+        # Hide/show fields based on transaction type
+        self.ttype = self.ttype.lower()
+        if self.ttype == "purchase":
+            form.addRow("Date:", self.trans_entry_date)
+            form.addRow("Invoice No:", self.trans_invoice_input)
+            form.addRow("", self.invoice_warning)
+            self.trans_invoice_input.textChanged.connect(self.invoice_check_timer.start)
+            # REMOVE: form.addRow("Due Date:", self.trans_due_date)
+            form.addRow("Notes:", self.trans_note_input)
+            form.addRow(self.paid_by_cheque_checkbox)
+            self.cheque_fields_row = QHBoxLayout()
+            self.cheque_fields_row.addWidget(QLabel("Bank Name:"))
+            self.cheque_fields_row.addWidget(self.cheque_bank_name)
+            self.cheque_fields_row.addWidget(QLabel("Cheque Due Date:"))
+            self.cheque_fields_row.addWidget(self.cheque_due_date)
+            form.addRow(self.cheque_fields_row)
+            self.cheque_bank_name.hide()
+            self.cheque_due_date.hide()
+            self.cheque_fields_row.itemAt(0).widget().hide()
+            self.cheque_fields_row.itemAt(2).widget().hide()
+            self.paid_by_cheque_checkbox.stateChanged.connect(self.toggle_cheque_fields)
+        elif self.ttype == "payment":
+            form.addRow("Date:", self.trans_entry_date)
+            form.addRow("Mode of Payment:", self.trans_payment_mode)
+            form.addRow("Invoice No:", self.trans_invoice_input)
+            form.addRow("Notes:", self.trans_note_input)
+        elif self.ttype == "return":
+            form.addRow("Date:", self.trans_entry_date)
+            form.addRow("Amount (AED):", self.trans_amount_input)
+            form.addRow("Notes:", self.trans_note_input)
 
-        btn_row = QHBoxLayout()
-        renew_btn = QPushButton("Renew Document")
-        delete_btn = QPushButton("Delete Document")
-        cancel_btn = QPushButton("Cancel")
-        btn_row.addWidget(renew_btn)
-        btn_row.addWidget(delete_btn)
-        btn_row.addWidget(cancel_btn)
-        layout.addLayout(btn_row)
+        if self.ttype in ("purchase", "payment"):
+            form.addRow("Amount (AED):", self.trans_amount_input)
 
-        renew_btn.clicked.connect(self.handle_renew)
-        delete_btn.clicked.connect(self.handle_delete)
-        cancel_btn.clicked.connect(self.reject)
+        main_layout.addLayout(form)
 
-    def handle_renew(self):
-        date_dlg = QDialog(self)
-        date_dlg.setWindowTitle("Renew Document - New Expiry Date")
-        layout = QVBoxLayout(date_dlg)
-        date_edit = QDateEdit()
-        date_edit.setDisplayFormat("dd/MM/yyyy")
-        date_edit.setCalendarPopup(True)
-        date_edit.setDate(QDate.currentDate())
-        layout.addWidget(QLabel("New Expiry Date:"))
-        layout.addWidget(date_edit)
         btn_row = QHBoxLayout()
-        ok_btn = QPushButton("OK")
-        cancel_btn = QPushButton("Cancel")
-        btn_row.addWidget(ok_btn)
-        btn_row.addWidget(cancel_btn)
-        layout.addLayout(btn_row)
-        ok_btn.clicked.connect(date_dlg.accept)
-        cancel_btn.clicked.connect(date_dlg.reject)
-        if date_dlg.exec():
-            self._new_expiry = date_edit.date().toString("dd/MM/yyyy")
-            self.renewed = True
-            self.accept()
-
-    def handle_delete(self):
-        reply = QMessageBox.question(
-            self, "Delete Document",
-            "Are you sure you want to delete this document?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
-        if reply == QMessageBox.StandardButton.Yes:
-            self.deleted = True
-            self.accept()
+        btn_row.addStretch()
+        self.btn_ok = QPushButton("Save" if edit_mode else "Add Transaction")
+        self.btn_ok.setDefault(True)
+        self.btn_ok.clicked.connect(self.confirm_and_accept)
+        btn_cancel = QPushButton("Cancel")
+        btn_cancel.clicked.connect(self.reject)
+        btn_row.addWidget(self.btn_ok)
+        btn_row.addWidget(btn_cancel)
+        btn_row.addStretch()
+        main_layout.addLayout(btn_row)
 
-    def get_new_expiry(self):
-        return self._new_expiry
+        if self.edit_mode and init_data:
+            # REMOVE: due, get from cheque_due instead
+            (date_str, ttype, amt, old_due, note, invoice_no, payment_mode, net_terms, bank_name, cheque_due) = (
+                *(init_data + (None, None)),  # add extra fields for backward comp.
+            )[:10]
+            try:
+                dt = datetime.strptime(date_str, "%Y-%m-%d")
+                self.trans_entry_date.setDate(QDate(dt.year, dt.month, dt.day))
+            except Exception:
+                self.trans_entry_date.setDate(QDate.currentDate())
+            self.trans_invoice_input.setText(invoice_no or "")
+            self.trans_note_input.setText(note or "")
+            # REMOVE: self.trans_due_date.setDate(...)
+            self.trans_payment_mode.setCurrentText(payment_mode or "")
+            self.trans_amount_input.setText(fmt_money(amt))
+            if bank_name:
+                self.paid_by_cheque_checkbox.setChecked(True)
+                self.cheque_bank_name.setText(bank_name)
+                self.cheque_bank_name.show()
+                self.cheque_fields_row.itemAt(0).widget().show()
+                self.cheque_fields_row.itemAt(2).widget().show()
+                self.cheque_due_date.show()
+                # Set cheque_due_date as the only due date
+                if cheque_due:
+                    try:
+                        dt = datetime.strptime(cheque_due, "%Y-%m-%d")
+                        self.cheque_due_date.setDate(QDate(dt.year, dt.month, dt.day))
+                    except Exception:
+                        pass
 
-class DocumentEntryDialog(QDialog):
-    def __init__(self, parent=None, desc="", cat="", expiry=None):
-        super().__init__(parent)
-        self.setWindowTitle("Add/Edit Document")
-        self.setMinimumWidth(340)
-        form = QFormLayout(self)
-        self.desc_edit = QLineEdit(desc)
-        self.cat_edit = QLineEdit(cat)
-        self.expiry_edit = QDateEdit()
-        self.expiry_edit.setDisplayFormat("dd/MM/yyyy")
-        self.expiry_edit.setCalendarPopup(True)
-        if expiry:
-            qdate = QDate.fromString(expiry, "dd/MM/yyyy")
-            self.expiry_edit.setDate(qdate if qdate.isValid() else QDate.currentDate())
-        else:
-            self.expiry_edit.setDate(QDate.currentDate())
-        form.addRow("Description:", self.desc_edit)
-        form.addRow("Category:", self.cat_edit)
-        form.addRow("Expiry Date:", self.expiry_edit)
-        btn_row = QHBoxLayout()
-        save_btn = QPushButton("Save")
-        save_btn.clicked.connect(self.accept)
-        cancel_btn = QPushButton("Cancel")
-        cancel_btn.clicked.connect(self.reject)
-        btn_row.addWidget(save_btn)
-        btn_row.addWidget(cancel_btn)
-        form.addRow(btn_row)
-        self.setLayout(form)
+    def check_duplicate_invoice(self):
+        conn = get_conn()
+        self.duplicate_invoices = find_duplicate_invoices(
+            conn, self.vendor_id, self.trans_invoice_input.text(), exclude_id=self.trans_id
+        )
+        conn.close()
+        if self.duplicate_invoices:
+            seen = ", ".join(f"{to_ddmmyyyy(d)} ({fmt_money(amount, True)} AED)" for _, d, amount in self.duplicate_invoices[:3])
+            more = f" and {len(self.duplicate_invoices) - 3} more" if len(self.duplicate_invoices) > 3 else ""
+            self.invoice_warning.setText(f"Already entered for this vendor on {seen}{more}.")
+        self.invoice_warning.setVisible(bool(self.duplicate_invoices))
+
+    def confirm_and_accept(self):
+        if self.ttype == "purchase":
+            self.invoice_check_timer.stop()
+            self.check_duplicate_invoice()
+            if self.duplicate_invoices and QMessageBox.question(
+                self, "Duplicate Invoice",
+                f"Invoice {self.trans_invoice_input.text().strip()} has already been entered for this vendor.\n"
+                "Save it again anyway?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No
+            ) != QMessageBox.StandardButton.Yes:
+                return
+        self.accept()
+
+    def toggle_cheque_fields(self, state):
+        show = state == Qt.CheckState.Checked.value
+        self.cheque_bank_name.setVisible(show)
+        self.cheque_due_date.setVisible(show)
+        self.cheque_fields_row.itemAt(0).widget().setVisible(show)
+        self.cheque_fields_row.itemAt(2).widget().setVisible(show)
 
     def get_values(self):
+        ttype = self.ttype
+        date_iso = self.trans_entry_date.date().toString("yyyy-MM-dd")
+        amt = self.trans_amount_input.text()
+        invoice_no = self.trans_invoice_input.text()
+        note = self.trans_note_input.text()
+        # DUE DATE LOGIC: for purchase, always use cheque_due_date
+        if self.ttype == "purchase":
+            due_iso = self.cheque_due_date.date().toString("yyyy-MM-dd")
+        else:
+            due_iso = None
+        payment_mode = self.trans_payment_mode.currentText() if self.ttype == "payment" else None
+        bank_name = self.cheque_bank_name.text() if (self.ttype == "purchase" and self.paid_by_cheque_checkbox.isChecked()) else None
+        cheque_due = self.cheque_due_date.date().toString("yyyy-MM-dd") if (self.ttype == "purchase" and self.paid_by_cheque_checkbox.isChecked()) else None
         return (
-            self.desc_edit.text().strip(),
-            self.cat_edit.text().strip(),
-            self.expiry_edit.date().toString("dd/MM/yyyy")
+            ttype, date_iso, amt, invoice_no, due_iso, note, payment_mode, bank_name, cheque_due
         )
 
-# --- Persistent storage functions using CSV file (replace with DB for production) ---
-
-def load_documents_from_db():
-    docs = []
-    try:
-        with open("documents.csv", encoding="utf-8") as f:
-            for line in f:
-                row = line.strip().split(",")
-                if len(row) >= 3:
-                    docs.append({"description": row[0], "category": row[1], "expiry_date": row[2]})
-    except Exception:
-        pass
-    return docs
+    def update_due_date_by_net_terms(self):
+        today = QDate.currentDate()
+        if self.net_30.isChecked():
+            self.trans_due_date.setDate(today.addDays(30))
+        elif self.net_60.isChecked():
+            self.trans_due_date.setDate(today.addDays(60))
+        elif self.net_90.isChecked():
+            self.trans_due_date.setDate(today.addDays(90))
 
-def save_document_to_db(desc, cat, expiry):
-    with open("documents.csv", "a", encoding="utf-8") as f:
-        f.write(f"{desc},{cat},{expiry}\n")
+    def update_section_visibility(self):
+        ttype = self.trans_type_combo.currentText().lower()
+        def grayscale_effect():
+            effect = QGraphicsColorizeEffect()
+            effect.setColor(QColor("#888888"))
+            effect.setStrength(0.75)
+            return effect
+        if ttype == "purchase":
+            self.due_frame.setGraphicsEffect(None)
+            self.payment_frame.setGraphicsEffect(grayscale_effect())
+            self.enable_widgets_in_frame(self.due_frame, True)
+            self.enable_widgets_in_frame(self.payment_frame, False)
+        elif ttype == "payment":
+            self.due_frame.setGraphicsEffect(grayscale_effect())
+            self.payment_frame.setGraphicsEffect(None)
+            self.enable_widgets_in_frame(self.due_frame, False)
+            self.enable_widgets_in_frame(self.payment_frame, True)
+        elif ttype == "return":
+            self.due_frame.setGraphicsEffect(grayscale_effect())
+            self.payment_frame.setGraphicsEffect(grayscale_effect())
+            self.enable_widgets_in_frame(self.due_frame, False)
+            self.enable_widgets_in_frame(self.payment_frame, False)
+        else:
+            self.due_frame.setGraphicsEffect(None)
+            self.payment_frame.setGraphicsEffect(None)
+            self.enable_widgets_in_frame(self.due_frame, True)
+            self.enable_widgets_in_frame(self.payment_frame, True)
 
-def update_document_expiry(doc, new_expiry):
-    docs = load_documents_from_db()
-    updated = False
-    for d in docs:
-        if (d["description"] == doc["description"] and
-            d["category"] == doc["category"] and
-            d["expiry_date"] == doc["expiry_date"]):
-            d["expiry_date"] = new_expiry
-            updated = True
-            break
-    if updated:
-        with open("documents.csv", "w", encoding="utf-8") as f:
-            for d in docs:
-                f.write(f"{d['description']},{d['category']},{d['expiry_date']}\n")
+    def enable_widgets_in_frame(self, frame, enabled):
+        for i in range(frame.layout().count()):
+            item = frame.layout().itemAt(i)
+            widget = item.widget()
+            if isinstance(widget, (QLineEdit, QDateEdit, QComboBox, QCheckBox)):
+                widget.setEnabled(enabled)
 
-def delete_document(doc):
-    docs = load_documents_from_db()
-    docs = [
-        d for d in docs
-        if not (d["description"] == doc["description"] and
-                d["category"] == doc["category"] and
-                d["expiry_date"] == doc["expiry_date"])
-    ]
-    with open("documents.csv", "w", encoding="utf-8") as f:
-        for d in docs:
-            f.write(f"{d['description']},{d['category']},{d['expiry_date']}\n")
+    def update_due_date_by_net_terms(self):
+        today = QDate.currentDate()
+        if self.net_30.isChecked():
+            self.trans_due_date.setDate(today.addDays(30))
+        elif self.net_60.isChecked():
+            self.trans_due_date.setDate(today.addDays(60))
+        elif self.net_90.isChecked():
+            self.trans_due_date.setDate(today.addDays(90))
+    
+    def sync_due_date_from_cheque(self):
+            if self.cheque_due_date.isVisible():
+                # Always sync the purchase due date to cheque due date if cheque section is visible
+                self.trans_due_date.setDate(self.cheque_due_date.date())
 
-class ExpenseCategoryTab(QWidget):
-    def __init__(self):
-        super().__init__()
-        layout = QVBoxLayout()
-        self.list_widget = QListWidget()
-        self.refresh_list()
-        layout.addWidget(QLabel("Expense Categories:"))
-        layout.addWidget(self.list_widget)
+    def sync_cheque_due_date(self):
+            if self.cheque_due_date.isVisible():
+                # If the user tries to set purchase due date different from cheque due date, force it back
+                if self.trans_due_date.date() != self.cheque_due_date.date():
+                    self.trans_due_date.setDate(self.cheque_due_date.date())
 
-        btn_layout = QHBoxLayout()
-        add_btn = QPushButton("Add")
-        add_btn.clicked.connect(self.add_category)
-        edit_btn = QPushButton("Edit")
-        edit_btn.clicked.connect(self.edit_category)
-        delete_btn = QPushButton("Delete")
-        delete_btn.clicked.connect(self.delete_category)
-        btn_layout.addWidget(add_btn)
-        btn_layout.addWidget(edit_btn)
-        btn_layout.addWidget(delete_btn)
-        layout.addLayout(btn_layout)
+    def save_transaction(self):
+        ttype = self.trans_type_combo.currentText().lower()
+        amount = parse_amount(self.trans_amount_input.text())
+        if amount <= 0:
+            QMessageBox.warning(self, "Invalid", "Amount must be greater than zero.")
+            return
 
-        self.setLayout(layout)
+        note = self.trans_note_input.text()
+        entry_date_iso = self.trans_entry_date.date().toString("yyyy-MM-dd")
+        due_date_iso = self.trans_due_date.date().toString("yyyy-MM-dd")
+        net_terms = ""
+        if self.net_30.isChecked():
+            net_terms = "NET 30"
+        elif self.net_60.isChecked():
+            net_terms = "NET 60"
+        elif self.net_90.isChecked():
+            net_terms = "NET 90"
+        payment_mode = self.trans_payment_mode.currentText()
+        invoice_no = self.trans_invoice_input.text().strip()
+        conn = get_conn()
+        try:
+            check_open_period(conn, entry_date_iso)
+        except ValueError as e:
+            conn.close()
+            QMessageBox.warning(self, "Cannot Save", str(e))
+            return
+        c = conn.cursor()
+        if self.edit_mode and self.trans_id:
+            # UPDATE vendor_transactions
+            c.execute('''UPDATE vendor_transactions SET date=?, type=?, amount=?, note=?, due_date=?, invoice_no=?, payment_mode=?, net_terms=?
+                         WHERE id=?''',
+                      (entry_date_iso, ttype, amount, note,
+                       due_date_iso if ttype == "purchase" else None,
+                       invoice_no,
+                       payment_mode if ttype == "payment" else None,
+                       net_terms if ttype == "purchase" else None,
+                       self.trans_id))
+            # --- Update daily_expense for "payment" ---
+            if ttype == "payment":
+                c.execute("UPDATE daily_expense SET date=?, amount=? WHERE vendor_transaction_id=?",
+                          (entry_date_iso, amount, self.trans_id))
+            else:
+                c.execute("DELETE FROM daily_expense WHERE vendor_transaction_id=?", (self.trans_id,))
+        else:
+            # INSERT vendor_transactions (your original logic)
+            c.execute('''INSERT INTO vendor_transactions
+                (vendor_id, date, type, amount, note, due_date, invoice_no, payment_mode, net_terms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (self.vendor_id, entry_date_iso, ttype, amount, note,
+                    due_date_iso if ttype == "purchase" else None,
+                    invoice_no,
+                    payment_mode if ttype == "payment" else None,
+                    net_terms if ttype == "purchase" else None)
+            )
+            vendor_trans_id = c.lastrowid
+            if ttype == "payment":
+                # Find or create "Vendors" expense category
+                cat_id = get_expense_category_id(conn, "Vendors")
+                c.execute("SELECT name FROM vendors WHERE id=?", (self.vendor_id,))
+                vrow = c.fetchone()
+                vendor_name = vrow[0] if vrow else ""
+                descr = f"{vendor_name} Payment ({fmt_money(amount)} AED)"
+                c.execute(
+                    '''INSERT INTO daily_expense (date, amount, category_id, description, vendor_transaction_id)
+                    VALUES (?, ?, ?, ?, ?)''',
+                    (entry_date_iso, amount, cat_id, descr, vendor_trans_id)
+                )
+        conn.commit()
+        conn.close()
+        self.accept()
 
-    def refresh_list(self):
-        self.list_widget.clear()
-        cats = get_expense_categories()
-        for cid, name in cats:
-            self.list_widget.addItem(name)
+class VendorsTab(QWidget):
+    chequeCreated = pyqtSignal()
+    cashflowChanged = pyqtSignal()  # a delete took mirrored cashflow rows with it
+    def __init__(self, daily_tab=None):
+        super().__init__()
+        self.ensure_invoice_payment_columns()  # Ensure columns exist before any queries
+        self.daily_tab = daily_tab
+        self.vendors = []
+        self.vendor_index = VendorIndex()
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.tabs = QTabWidget()
+        self.tabs.setObjectName("vendorsSubTabs")
+        self.tabs.setContentsMargins(0, 0, 0, 0)
+        self.layout.addWidget(self.tabs)
+        self.setLayout(self.layout)
+        
 
-    def add_category(self):
-        text, ok = QInputDialog.getText(self, "Add Expense Category", "Category Name:")
-        if ok and text.strip():
-            conn = get_conn()
-            c = conn.cursor()
-            try:
-                c.execute("INSERT INTO expense_categories (name) VALUES (?)", (text.strip(),))
-                conn.commit()
-            except sqlite3.IntegrityError:
-                QMessageBox.warning(self, "Exists", "This category already exists.")
-            conn.close()
-            self.refresh_list()
+        # ---- DISTINCT TAB STYLING ----
+        self.setStyleSheet(DIALOG_STYLESHEET)
 
-    def edit_category(self):
-        selected = self.list_widget.currentItem()
-        if not selected:
-            return
-        old_name = selected.text()
-        text, ok = QInputDialog.getText(self, "Edit Expense Category", "Category Name:", text=old_name)
-        if ok and text.strip():
-            conn = get_conn()
-            c = conn.cursor()
-            try:
-                c.execute("UPDATE expense_categories SET name=? WHERE name=?", (text.strip(), old_name))
-                conn.commit()
-            except sqlite3.IntegrityError:
-                QMessageBox.warning(self, "Exists", "This category already exists.")
-            conn.close()
-            self.refresh_list()
+        # --- Transactions Tab ---
+        self.trans_tab = QWidget()
+        self.trans_layout = QVBoxLayout()
+        self.trans_layout.setContentsMargins(0, 0, 0, 0)
+        self.trans_tab.setLayout(self.trans_layout)
 
-    def delete_category(self):
-        selected = self.list_widget.currentItem()
-        if not selected:
-            return
-        name = selected.text()
-        reply = QMessageBox.question(self, "Confirm", f"Delete category '{name}'? This will also remove associated expense entries.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("SELECT id FROM expense_categories WHERE name=?", (name,))
-            res = c.fetchone()
-            if res:
-                cat_id = res[0]
-                c.execute("DELETE FROM daily_expense WHERE category_id=?", (cat_id,))
-                c.execute("DELETE FROM expense_categories WHERE id=?", (cat_id,))
-                conn.commit()
-            conn.close()
-            self.refresh_list()
+        # --- FILTER + CURRENT BALANCE row ---
+        filter_row = QHBoxLayout()
+        filter_row.setContentsMargins(0, 0, 0, 0)
+        filter_row.setSpacing(10)
 
-class VendorDialog(QDialog):
-    def __init__(self, parent=None, title="Add Vendor", name="", contact="", opening_balance=0.0):
-        super().__init__(parent)
-        self.setWindowTitle(title)
-        self.setMinimumWidth(350)
-        layout = QFormLayout(self)
-        self.name_input = QLineEdit(name)
-        self.name_input.setPlaceholderText("Enter vendor name")
-        self.contact_input = QLineEdit(contact)
-        self.contact_input.setPlaceholderText("Enter contact (optional)")
-        self.opening_input = QLineEdit(str(opening_balance))
-        self.opening_input.setPlaceholderText("Opening balance in AED")
-        layout.addRow("Vendor Name:", self.name_input)
-        layout.addRow("Contact:", self.contact_input)
-        layout.addRow("Opening Balance (AED):", self.opening_input)
-        button_box = QHBoxLayout()
-        self.save_btn = QPushButton(QIcon.fromTheme("dialog-ok"), "Save")
-        self.save_btn.clicked.connect(self.accept)
-        self.cancel_btn = QPushButton(QIcon.fromTheme("dialog-cancel"), "Cancel")
-        self.cancel_btn.clicked.connect(self.reject)
-        button_box.addWidget(self.save_btn)
-        button_box.addWidget(self.cancel_btn)
-        layout.addRow(button_box)
-        self.setLayout(layout)
+        filter_row.addWidget(QLabel("Select Vendor:"))
 
-    def get_values(self):
-        name = self.name_input.text().strip()
-        contact = self.contact_input.text().strip()
-        opening_balance = parse_amount(self.opening_input.text())
-        return name, contact, opening_balance
-    
+        self.trans_vendor_combo = QComboBox()
+        self.trans_vendor_combo.setMinimumWidth(300)
+        self.trans_vendor_combo.setMaximumWidth(320)
+        self.trans_vendor_combo.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToContents)
+        self.trans_vendor_combo.currentIndexChanged.connect(self.refresh_transactions_table)
+        filter_row.addWidget(self.trans_vendor_combo)
 
-class TransactionEntryDialog(QDialog):
-    def __init__(self, parent, vendor_id, vendor_name, ttype=None, edit_mode=False, trans_id=None, init_data=None):
-        super().__init__(parent)
-        self.setWindowTitle("Add Transaction" if not edit_mode else "Edit Transaction")
-        self.vendor_id = vendor_id
-        self.edit_mode = edit_mode
-        self.trans_id = trans_id
-        self.ttype = ttype if ttype else "purchase"
-        self.setMinimumWidth(520)
-        self.setMinimumHeight(400)
+        self.trans_vendor_search = QLineEdit()
+        self.trans_vendor_search.setPlaceholderText("Search vendor...")
+        self.trans_vendor_search.setFixedWidth(300)
+        self.trans_vendor_search.textChanged.connect(self.filter_trans_vendor_combo)
+        filter_row.addWidget(self.trans_vendor_search)
+        
 
-        main_layout = QVBoxLayout(self)
-        form = QFormLayout()
-        form.setLabelAlignment(Qt.AlignmentFlag.AlignRight)
-        form.setFormAlignment(Qt.AlignmentFlag.AlignHCenter)
+        filter_row.addStretch(1)
 
-        vendor_label = QLabel(f"<b>Vendor:</b> <span style='color:#e53935;'>{vendor_name}</span>")
-        vendor_label.setTextFormat(Qt.TextFormat.RichText)
-        vendor_label.setFont(QFont("Segoe UI", 16, QFont.Weight.Bold))
-        vendor_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        main_layout.addWidget(vendor_label)
+        self.current_balance_label = QLabel("Current Balance: 0.00 AED")
+        self.current_balance_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.current_balance_label.setStyleSheet(
+            "font-size:16px; font-weight:bold; color:#fdc59e; margin:8px 0px 0 0;"
+        )
+        filter_row.addWidget(self.current_balance_label)
 
-        self.trans_type = QLabel(self.ttype.capitalize())
-        self.trans_type.setStyleSheet("font-size:16px; color:#fb700e; font-weight:600;")
-        form.addRow("Transaction Type:", self.trans_type)
+        self.trans_layout.addLayout(filter_row)
 
-        self.trans_entry_date = QDateEdit()
-        self.trans_entry_date.setDisplayFormat("dd-MM-yyyy")
-        self.trans_entry_date.setCalendarPopup(True)
-        self.trans_entry_date.setDate(QDate.currentDate())
-        self.trans_entry_date.setMinimumWidth(140)
+        # --- BUTTONS row: Export PDF & Add Transaction ---
+        buttons_row = QHBoxLayout()
+        buttons_row.setContentsMargins(0, 10, 0, 0)
+        buttons_row.setSpacing(12)
 
-        self.trans_invoice_input = QLineEdit()
-        self.trans_invoice_input.setPlaceholderText("Invoice number (optional)")
+        # --- Add Transaction Button (icon only)
+        self.show_add_entry_btn = QPushButton()
+        self.show_add_entry_btn.setToolTip("Add Transaction (F1)")
+        self.show_add_entry_btn.setFixedSize(40, 40)
+        self.show_add_entry_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
+        add_icon = QIcon.fromTheme("list-add")
+        if not add_icon.isNull():
+            self.show_add_entry_btn.setIcon(add_icon)
+            self.show_add_entry_btn.setIconSize(QSizeF(24, 24).toSize())
+            self.show_add_entry_btn.setText("")
+        else:
+            self.show_add_entry_btn.setText("＋")
+            self.show_add_entry_btn.setFont(QFont("Arial", 22, QFont.Weight.Bold))
+        self.show_add_entry_btn.clicked.connect(self.show_transaction_dialog)
+        self.add_transaction_shortcut = QShortcut(QKeySequence("F1"), self)
+        self.add_transaction_shortcut.activated.connect(self.show_transaction_dialog)
+        buttons_row.addWidget(self.show_add_entry_btn)
 
-        self.trans_note_input = QLineEdit()
-        self.trans_note_input.setPlaceholderText("Enter note or remarks (optional)")
+        # --- Export PDF Button (icon only)
+        self.export_pdf_btn = QPushButton()
+        self.export_pdf_btn.setToolTip("Export Transactions PDF")
+        self.export_pdf_btn.setFixedSize(40, 40)
+        self.export_pdf_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
+        pdf_icon = QIcon.fromTheme("document-save")
+        if not pdf_icon.isNull():
+            self.export_pdf_btn.setIcon(pdf_icon)
+            self.export_pdf_btn.setIconSize(QSizeF(24, 24).toSize())
+            self.export_pdf_btn.setText("")
+        else:
+            self.export_pdf_btn.setText("\U0001F4BE")  # Floppy disk emoji as fallback
+        self.export_pdf_btn.clicked.connect(self.export_transactions_pdf)
+        buttons_row.addWidget(self.export_pdf_btn)
 
-        self.trans_amount_input = QLineEdit()
-        self.trans_amount_input.setPlaceholderText("Enter amount in AED")
-        amount_font = QFont()
-        amount_font.setPointSize(20)
-        amount_font.setBold(True)
-        self.trans_amount_input.setFont(amount_font)
-        self.trans_amount_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        buttons_row.addStretch(1)
 
-        # Payment Mode (only for payment)
-        self.trans_payment_mode = QComboBox()
-        self.trans_payment_mode.addItems(['Cash', 'Credit Card', 'Bank Transfer', 'Other'])
-        self.trans_payment_mode.setEditable(True)
-        self.trans_payment_mode.setMinimumWidth(240)
+        # --- Balance as of a past date (disputes / audits)
+        buttons_row.addWidget(QLabel("Balance as of:"))
+        self.as_of_date = QDateEdit()
+        self.as_of_date.setDisplayFormat("dd-MM-yyyy")
+        self.as_of_date.setCalendarPopup(True)
+        self.as_of_date.setDate(QDate.currentDate())
+        self.as_of_date.dateChanged.connect(self.update_as_of_balance)
+        buttons_row.addWidget(self.as_of_date)
+        self.as_of_balance_label = QLabel("")
+        self.as_of_balance_label.setStyleSheet("font-size:15px; font-weight:bold; color:#fdc59e;")
+        buttons_row.addWidget(self.as_of_balance_label)
+        self.trans_layout.addLayout(buttons_row)
 
-        # Cheque Fields (used as due date for purchase)
-        self.paid_by_cheque_checkbox = QCheckBox("Payment done by Cheque")
-        self.paid_by_cheque_checkbox.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.paid_by_cheque_checkbox.setStyleSheet("""
-            QCheckBox {
-                background-color: #3A3A3C;
-                color: #F1F3F4;
-                font-size: 15px;
-                padding: 10px 20px;
-                border: 2px solid #5F6368;
-                border-radius: 6px;
-            }
-            QCheckBox::indicator {
-                width: 16px;
-                height: 16px;
-            }
-            QCheckBox:checked {
-                background-color: #1E8E3E;
-                color: white;
-                border-color: #1E8E3E;
-            }
-        """)
-        self.cheque_bank_name = QLineEdit()
-        self.cheque_bank_name.setPlaceholderText("Bank Name")
-        self.cheque_due_date = QDateEdit()
-        self.cheque_due_date.setDisplayFormat("dd-MM-yyyy")
-        self.cheque_due_date.setCalendarPopup(True)
-        self.cheque_due_date.setDate(QDate.currentDate())
-        self.cheque_due_date.setMinimumWidth(140)
+        # Vendor Transactions Table
+        self.trans_layout.addSpacing(6)
+        self.trans_layout.addWidget(QLabel("Vendor Transactions:"))
+        self.load_earlier_btn = QPushButton("Load earlier transactions")
+        self.load_earlier_btn.setStyleSheet("background:#26292A; color:white; border-radius:3px; padding:4px 12px;")
+        self.load_earlier_btn.clicked.connect(self.load_earlier_transactions)
+        self.load_earlier_btn.hide()
+        self.trans_layout.addWidget(self.load_earlier_btn, alignment=Qt.AlignmentFlag.AlignLeft)
+        self.trans_table = QTableWidget()
+        self.trans_table.setColumnCount(9)
+        self.trans_table.setHorizontalHeaderLabels([
+            'Date', 'Invoice No.', 'Type', 'Debit (AED)', 'Credit (AED)', 'Balance (AED)', 'Due Date',
+            'Payment Mode', 'Note'
+        ])
+        self.trans_table.setColumnWidth(0, 110)     # Date
+        self.trans_table.setColumnWidth(1, 90)      # Invoice No.
+        self.trans_table.setColumnWidth(2, 100)     # Type
+        self.trans_table.setColumnWidth(3, 100)     # Debit (AED)
+        self.trans_table.setColumnWidth(4, 100)     # Credit (AED)
+        self.trans_table.setColumnWidth(5, 110)     # Balance (AED)
+        self.trans_table.setColumnWidth(6, 115)     # Due Date
+        self.trans_table.setColumnWidth(7, 130)     # Payment Mode
+        self.trans_table.setColumnWidth(8, 200)     # Note
+        header = self.trans_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(8, QHeaderView.ResizeMode.Stretch)  # Only let Note stretch
+        self.trans_table.setAlternatingRowColors(True)
+        self.trans_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.trans_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.trans_table.customContextMenuRequested.connect(self.show_transaction_context_menu)
+        self.trans_table.doubleClicked.connect(self.handle_transaction_double_click)
+        self.trans_layout.addWidget(self.trans_table)
+        self.tabs.addTab(self.trans_tab, "Transactions")
 
-        # Hide/show fields based on transaction type
-        self.ttype = self.ttype.lower()
-        if self.ttype == "purchase":
-            form.addRow("Date:", self.trans_entry_date)
-            form.addRow("Invoice No:", self.trans_invoice_input)
-            # REMOVE: form.addRow("Due Date:", self.trans_due_date)
-            form.addRow("Notes:", self.trans_note_input)
-            form.addRow(self.paid_by_cheque_checkbox)
-            self.cheque_fields_row = QHBoxLayout()
-            self.cheque_fields_row.addWidget(QLabel("Bank Name:"))
-            self.cheque_fields_row.addWidget(self.cheque_bank_name)
-            self.cheque_fields_row.addWidget(QLabel("Cheque Due Date:"))
-            self.cheque_fields_row.addWidget(self.cheque_due_date)
-            form.addRow(self.cheque_fields_row)
-            self.cheque_bank_name.hide()
-            self.cheque_due_date.hide()
-            self.cheque_fields_row.itemAt(0).widget().hide()
-            self.cheque_fields_row.itemAt(2).widget().hide()
-            self.paid_by_cheque_checkbox.stateChanged.connect(self.toggle_cheque_fields)
-        elif self.ttype == "payment":
-            form.addRow("Date:", self.trans_entry_date)
-            form.addRow("Mode of Payment:", self.trans_payment_mode)
-            form.addRow("Invoice No:", self.trans_invoice_input)
-            form.addRow("Notes:", self.trans_note_input)
-        elif self.ttype == "return":
-            form.addRow("Date:", self.trans_entry_date)
-            form.addRow("Amount (AED):", self.trans_amount_input)
-            form.addRow("Notes:", self.trans_note_input)
+        # --------- OVERVIEW TAB -------------
+        self.overview_tab = QWidget()
+        self.overview_layout = QVBoxLayout(self.overview_tab)
+        self.overview_layout.setContentsMargins(0, 0, 0, 0)
+        # Filter row
+        overview_filter_row = QHBoxLayout()
+        overview_filter_row.setContentsMargins(0, 0, 0, 0)
+        overview_filter_row.setSpacing(10)
+        overview_filter_row.addWidget(QLabel("Vendor:"))
+        self.overview_vendor_search = QLineEdit()
+        self.overview_vendor_search.setPlaceholderText("Search vendor...")
+        overview_filter_row.addWidget(self.overview_vendor_search)
+        overview_filter_row.addWidget(QLabel("From:"))
+        self.overview_date_from = QDateEdit()
+        self.overview_date_from.setDisplayFormat("dd-MM-yyyy")
+        self.overview_date_from.setCalendarPopup(True)
+        today = QDate.currentDate()
+        first_of_month = QDate(today.year(), today.month(), 1)
+        self.overview_date_from.setDate(first_of_month)
+        overview_filter_row.addWidget(self.overview_date_from)
+        overview_filter_row.addWidget(QLabel("To:"))
+        self.overview_date_to = QDateEdit()
+        self.overview_date_to.setDisplayFormat("dd-MM-yyyy")
+        self.overview_date_to.setCalendarPopup(True)
+        self.overview_date_to.setDate(today)
+        overview_filter_row.addWidget(self.overview_date_to)
+        self.overview_date_from.dateChanged.connect(self.refresh_overview_table)
+        self.overview_date_to.dateChanged.connect(self.refresh_overview_table)
+        self.overview_date_to.setMinimumWidth(120)
+        self.overview_date_from.setMinimumWidth(120) 
+        self.overview_cheque_only_btn = QPushButton("Cheque Only")
+        self.overview_cheque_only_btn.setCheckable(True)
+        self.overview_cheque_only_btn.setChecked(False)
+        self.overview_cheque_only_btn.setStyleSheet(DARK_STYLESHEET)
+        
+        overview_filter_row.addWidget(self.overview_cheque_only_btn)
+        self.overview_cheque_only_btn.toggled.connect(self.refresh_overview_table)
+        overview_filter_row.addStretch()
+        self.overview_aging_btn = QPushButton("A/P Aging")
+        self.overview_aging_btn.clicked.connect(self.show_ap_aging)
+        overview_filter_row.addWidget(self.overview_aging_btn)
+        self.overview_duplicates_btn = QPushButton("Duplicate Invoices")
+        self.overview_duplicates_btn.clicked.connect(self.show_duplicate_invoices)
+        overview_filter_row.addWidget(self.overview_duplicates_btn)
+        self.overview_layout.addLayout(overview_filter_row)
 
-        if self.ttype in ("purchase", "payment"):
-            form.addRow("Amount (AED):", self.trans_amount_input)
+        self.overview_table = QTableWidget()
+        self.overview_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.overview_table.setColumnCount(9)
+        self.overview_table.setHorizontalHeaderLabels([
+            'Date', 'Invoice No.', 'Vendor', 'Type', 'Debit (AED)', 'Credit (AED)', 'Due Date', 'Payment Mode', 'Notes'
+        ])
+        self.overview_table.setShowGrid(True)
+        self.overview_table.setGridStyle(Qt.PenStyle.SolidLine)
+        self.overview_table.setAlternatingRowColors(False)
+        self.overview_table.verticalHeader().setVisible(True)
+        overview_header = self.overview_table.horizontalHeader()
+        overview_header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.overview_layout.addWidget(self.overview_table)
 
-        main_layout.addLayout(form)
+        overview_totals_row = QHBoxLayout()
+        overview_totals_row.setContentsMargins(0, 0, 0, 0)
+        overview_totals_row.setSpacing(24)
+        self.lbl_total_purchases = QLabel("Total Purchases: 0.00 AED")
+        self.lbl_total_purchases.setStyleSheet("font-weight:bold;color:#43a047;")
+        self.lbl_total_payments = QLabel("Total Payments: 0.00 AED")
+        self.lbl_total_payments.setStyleSheet("font-weight:bold;color:#e53935;")
+        self.lbl_current_balance = QLabel("Current Balance: 0.00 AED")
+        self.lbl_current_balance.setStyleSheet("font-weight:bold;color:#fbc02d;")
+        overview_totals_row.addWidget(self.lbl_total_purchases)
+        overview_totals_row.addWidget(self.lbl_total_payments)
+        self.lbl_overdue = QLabel("Overdue: 0.00 AED")
+        self.lbl_overdue.setStyleSheet("font-weight:bold;color:#e53935;")
+        overview_totals_row.addWidget(self.lbl_current_balance)
+        overview_totals_row.addWidget(self.lbl_overdue)
+        overview_totals_row.addStretch()
+        self.overview_layout.addLayout(overview_totals_row)
 
-        btn_row = QHBoxLayout()
-        btn_row.addStretch()
-        self.btn_ok = QPushButton("Save" if edit_mode else "Add Transaction")
-        self.btn_ok.setDefault(True)
-        self.btn_ok.clicked.connect(self.accept)
-        btn_cancel = QPushButton("Cancel")
-        btn_cancel.clicked.connect(self.reject)
-        btn_row.addWidget(self.btn_ok)
-        btn_row.addWidget(btn_cancel)
-        btn_row.addStretch()
-        main_layout.addLayout(btn_row)
+        self.tabs.addTab(self.overview_tab, "Overview")
 
-        if self.edit_mode and init_data:
-            # REMOVE: due, get from cheque_due instead
-            (date_str, ttype, amt, old_due, note, invoice_no, payment_mode, net_terms, bank_name, cheque_due) = (
-                *(init_data + (None, None)),  # add extra fields for backward comp.
-            )[:10]
-            try:
-                dt = datetime.strptime(date_str, "%Y-%m-%d")
-                self.trans_entry_date.setDate(QDate(dt.year, dt.month, dt.day))
-            except Exception:
-                self.trans_entry_date.setDate(QDate.currentDate())
-            self.trans_invoice_input.setText(invoice_no or "")
-            self.trans_note_input.setText(note or "")
-            # REMOVE: self.trans_due_date.setDate(...)
-            self.trans_payment_mode.setCurrentText(payment_mode or "")
-            self.trans_amount_input.setText(str(amt))
-            if bank_name:
-                self.paid_by_cheque_checkbox.setChecked(True)
-                self.cheque_bank_name.setText(bank_name)
-                self.cheque_bank_name.show()
-                self.cheque_fields_row.itemAt(0).widget().show()
-                self.cheque_fields_row.itemAt(2).widget().show()
-                self.cheque_due_date.show()
-                # Set cheque_due_date as the only due date
-                if cheque_due:
-                    try:
-                        dt = datetime.strptime(cheque_due, "%Y-%m-%d")
-                        self.cheque_due_date.setDate(QDate(dt.year, dt.month, dt.day))
-                    except Exception:
-                        pass
+        # Connect filter events for Overview tab
+        self.overview_vendor_search.textChanged.connect(self.refresh_overview_table)
+        self.overview_date_from.dateChanged.connect(self.refresh_overview_table)
+        self.overview_date_to.dateChanged.connect(self.refresh_overview_table)
+       
 
-    def toggle_cheque_fields(self, state):
-        show = state == Qt.CheckState.Checked.value
-        self.cheque_bank_name.setVisible(show)
-        self.cheque_due_date.setVisible(show)
-        self.cheque_fields_row.itemAt(0).widget().setVisible(show)
-        self.cheque_fields_row.itemAt(2).widget().setVisible(show)
+        # --- Manage Vendors Tab (unchanged) ---
+        self.vendor_manage_tab = QWidget()
+        self.vendor_manage_layout = QVBoxLayout()
+        self.vendor_manage_layout.setContentsMargins(0, 0, 0, 0) 
+        self.vendor_manage_tab.setLayout(self.vendor_manage_layout)
+        filter_row2 = QHBoxLayout()
+        filter_row2.addWidget(QLabel("Search Vendor:"))
+        self.vendor_search_input = QLineEdit()
+        self.vendor_search_input.setPlaceholderText("Type at least 2 letters of vendor name...")
+        self.vendor_search_input.textChanged.connect(self.filter_vendor_table)
+        filter_row2.addWidget(self.vendor_search_input)
+        filter_row2.addStretch()
+        self.vendor_manage_layout.addLayout(filter_row2)
 
-    def get_values(self):
-        ttype = self.ttype
-        date_iso = self.trans_entry_date.date().toString("yyyy-MM-dd")
-        amt = self.trans_amount_input.text()
-        invoice_no = self.trans_invoice_input.text()
-        note = self.trans_note_input.text()
-        # DUE DATE LOGIC: for purchase, always use cheque_due_date
-        if self.ttype == "purchase":
-            due_iso = self.cheque_due_date.date().toString("yyyy-MM-dd")
-        else:
-            due_iso = None
-        payment_mode = self.trans_payment_mode.currentText() if self.ttype == "payment" else None
-        bank_name = self.cheque_bank_name.text() if (self.ttype == "purchase" and self.paid_by_cheque_checkbox.isChecked()) else None
-        cheque_due = self.cheque_due_date.date().toString("yyyy-MM-dd") if (self.ttype == "purchase" and self.paid_by_cheque_checkbox.isChecked()) else None
-        return (
-            ttype, date_iso, amt, invoice_no, due_iso, note, payment_mode, bank_name, cheque_due
+        # Total Account Payable label
+        self.total_payable_label = QLabel("Total Account Payable: 0.00 AED")
+        self.total_payable_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.total_payable_label.setStyleSheet(
+            "font-size:16px; font-weight:bold; color:#43a047; margin:0 0px 0px 0;"
         )
+        self.vendor_manage_layout.addWidget(self.total_payable_label)
 
-    def update_due_date_by_net_terms(self):
-        today = QDate.currentDate()
-        if self.net_30.isChecked():
-            self.trans_due_date.setDate(today.addDays(30))
-        elif self.net_60.isChecked():
-            self.trans_due_date.setDate(today.addDays(60))
-        elif self.net_90.isChecked():
-            self.trans_due_date.setDate(today.addDays(90))
+        self.vendor_table = QTableWidget()
+        self.vendor_table.setColumnCount(4)
+        self.vendor_table.setHorizontalHeaderLabels([
+            "Vendor Name", "Contact", "Opening Balance (AED)", "Current Balance (AED)"
+        ])
+        self.vendor_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.vendor_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.vendor_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.vendor_table.setAlternatingRowColors(True)
+        self.vendor_manage_layout.addWidget(QLabel("Vendors:"))
+        self.vendor_manage_layout.addWidget(self.vendor_table)
+        button_row = QHBoxLayout()
+        self.add_vendor_btn = QPushButton("Add Vendor")
+        self.add_vendor_btn.clicked.connect(self.show_add_vendor_dialog)
+        self.edit_vendor_btn = QPushButton("Edit Vendor")
+        self.edit_vendor_btn.clicked.connect(self.show_edit_vendor_dialog)
+        self.delete_vendor_btn = QPushButton("Delete Vendor")
+        self.delete_vendor_btn.clicked.connect(self.delete_vendor)
+        button_row.addWidget(self.add_vendor_btn)
+        button_row.addWidget(self.edit_vendor_btn)
+        button_row.addWidget(self.delete_vendor_btn)
+        self.vendor_manage_layout.addLayout(button_row)
+        style = self.style()
+        transactions_icon = style.standardIcon(QStyle.StandardPixmap.SP_FileDialogListView)
+        overview_icon = style.standardIcon(QStyle.StandardPixmap.SP_ComputerIcon)
+        manage_icon = style.standardIcon(QStyle.StandardPixmap.SP_DirIcon)
+        self.tabs.addTab(self.trans_tab, transactions_icon, "Transactions")
+        self.tabs.addTab(self.overview_tab, overview_icon, "Overview")
+        self.tabs.addTab(self.vendor_manage_tab, manage_icon, "Manage Vendors")
+        self.tabs.currentChanged.connect(self._on_tab_changed)
 
-    def update_section_visibility(self):
-        ttype = self.trans_type_combo.currentText().lower()
-        def grayscale_effect():
-            effect = QGraphicsColorizeEffect()
-            effect.setColor(QColor("#888888"))
-            effect.setStrength(0.75)
-            return effect
-        if ttype == "purchase":
-            self.due_frame.setGraphicsEffect(None)
-            self.payment_frame.setGraphicsEffect(grayscale_effect())
-            self.enable_widgets_in_frame(self.due_frame, True)
-            self.enable_widgets_in_frame(self.payment_frame, False)
-        elif ttype == "payment":
-            self.due_frame.setGraphicsEffect(grayscale_effect())
-            self.payment_frame.setGraphicsEffect(None)
-            self.enable_widgets_in_frame(self.due_frame, False)
-            self.enable_widgets_in_frame(self.payment_frame, True)
-        elif ttype == "return":
-            self.due_frame.setGraphicsEffect(grayscale_effect())
-            self.payment_frame.setGraphicsEffect(grayscale_effect())
-            self.enable_widgets_in_frame(self.due_frame, False)
-            self.enable_widgets_in_frame(self.payment_frame, False)
-        else:
-            self.due_frame.setGraphicsEffect(None)
-            self.payment_frame.setGraphicsEffect(None)
-            self.enable_widgets_in_frame(self.due_frame, True)
-            self.enable_widgets_in_frame(self.payment_frame, True)
+        # --- Now, after all widgets are created, call refresh_vendor_combo ---
+        self.refresh_vendor_combo()
+
+
+    def _on_tab_changed(self, index):
+        if self.tabs.tabText(index) == "Overview":
+            self.refresh_overview_table()
+
+        # Data Loading
+        self.refresh_vendor_combo()
+        self.refresh_vendor_table()
+        self.refresh_transactions_table()
+
+    def refresh_overview_vendor_combo(self):
+        self.overview_vendor_combo.blockSignals(True)
+        self.overview_vendor_combo.clear()
+        self.overview_vendor_combo.addItem("All", None)
+        for vid, name, *_ in self.vendors:
+            self.overview_vendor_combo.addItem(name, vid)
+        self.overview_vendor_combo.blockSignals(False)
+
+    def refresh_overview_table(self):
+        vendor_search = self.overview_vendor_search.text().strip().lower()
+        date_from = self.overview_date_from.date().toString("yyyy-MM-dd")
+        date_to = self.overview_date_to.date().toString("yyyy-MM-dd")
+        cheque_only = self.overview_cheque_only_btn.isChecked()
+        conn = get_conn()
+        c = conn.cursor()
+        query = """
+            SELECT vt.date, vt.invoice_no, v.name, vt.type, vt.amount, vt.due_date, vt.payment_mode, vt.note, vt.vendor_id
+            FROM vendor_transactions vt
+            LEFT JOIN vendors v ON vt.vendor_id = v.id
+            WHERE vt.date BETWEEN ? AND ?
+        """
+        params = [date_from, date_to]
+        if vendor_search:
+            query += " AND lower(v.name) LIKE ?"
+            params.append(f"%{vendor_search}%")
+        if cheque_only:
+            query += " AND vt.payment_mode = 'Cheque'"
+        query += " ORDER BY vt.date DESC, vt.id DESC"
+        c.execute(query, params)
+        rows = c.fetchall()
+        self.overview_table.setRowCount(len(rows))
+        total_purchase = 0
+        total_payment = 0
+        for i, (date_str, invoice_no, vendor_name, ttype, amt, due, payment_mode, note, vendor_id) in enumerate(rows):
+            ttype_display, debit, credit = vendor_entry_columns(ttype, amt)
+            if ttype == "purchase":
+                total_purchase += amt
+            elif ttype in ("payment", "return"):
+                total_payment += amt
+            debit = fmt_money(debit) if debit else ""
+            credit = fmt_money(credit) if credit else ""
+            row_values = [
+                to_ddmmyyyy(date_str),
+                invoice_no or "",
+                vendor_name or "",
+                ttype_display,
+                debit,
+                credit,
+                to_ddmmyyyy(due) if due else "",
+                payment_mode or "",
+                note or ""
+            ]
+            for col, value in enumerate(row_values):
+                item = QTableWidgetItem(str(value))
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                if col == 8:
+                    item.setForeground(QColor("#aaa"))
+                self.overview_table.setItem(i, col, item)
+            self.overview_table.setRowHeight(i, 30)
 
-    def enable_widgets_in_frame(self, frame, enabled):
-        for i in range(frame.layout().count()):
-            item = frame.layout().itemAt(i)
-            widget = item.widget()
-            if isinstance(widget, (QLineEdit, QDateEdit, QComboBox, QCheckBox)):
-                widget.setEnabled(enabled)
+        # --- Total Purchases & Payments
+        self.lbl_total_purchases.setText(f"Total Purchases: {fmt_money(total_purchase)} AED")
+        self.lbl_total_payments.setText(f"Total Payments: {fmt_money(total_payment)} AED")
 
-    def update_due_date_by_net_terms(self):
-        today = QDate.currentDate()
-        if self.net_30.isChecked():
-            self.trans_due_date.setDate(today.addDays(30))
-        elif self.net_60.isChecked():
-            self.trans_due_date.setDate(today.addDays(60))
-        elif self.net_90.isChecked():
-            self.trans_due_date.setDate(today.addDays(90))
-    
-    def sync_due_date_from_cheque(self):
-            if self.cheque_due_date.isVisible():
-                # Always sync the purchase due date to cheque due date if cheque section is visible
-                self.trans_due_date.setDate(self.cheque_due_date.date())
+        # --- Current Balance: TOTAL ACCOUNT PAYABLE (including opening balance) ---
+        # Show sum of positive balances (payable) of all vendors that match the filter
+        c.execute("SELECT id, name FROM vendors")
+        vendor_names = dict(c.fetchall())
+        aging = fetch_ap_aging(conn)
+        conn.close()
+        if vendor_search:
+            aging = {vid: b for vid, b in aging.items() if vendor_search in (vendor_names.get(vid) or "").lower()}
+        aging_totals = ap_aging_totals(aging)
+        total_account_payable = sum(aging_totals)
+        self.lbl_current_balance.setText(f"Current Balance: {fmt_money(total_account_payable)} AED")
+        self.lbl_overdue.setText(f"Overdue: {fmt_money(total_account_payable - aging_totals[0])} AED")
 
-    def sync_cheque_due_date(self):
-            if self.cheque_due_date.isVisible():
-                # If the user tries to set purchase due date different from cheque due date, force it back
-                if self.trans_due_date.date() != self.cheque_due_date.date():
-                    self.trans_due_date.setDate(self.cheque_due_date.date())
+    def show_ap_aging(self):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Accounts Payable Aging")
+        dialog.resize(900, 500)
+        layout = QVBoxLayout(dialog)
+        top = QHBoxLayout()
+        top.addWidget(QLabel("As of:"))
+        as_of = QDateEdit()
+        as_of.setDisplayFormat("dd-MM-yyyy")
+        as_of.setCalendarPopup(True)
+        as_of.setDate(QDate.currentDate())
+        top.addWidget(as_of)
+        top.addStretch()
+        layout.addLayout(top)
+        table = QTableWidget()
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setColumnCount(len(AP_AGING_BUCKETS) + 2)
+        table.setHorizontalHeaderLabels(["Vendor", *AP_AGING_BUCKETS, "Total"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(table)
 
-    def save_transaction(self):
-        ttype = self.trans_type_combo.currentText().lower()
-        amount = parse_amount(self.trans_amount_input.text())
-        if amount < 0.01:
-            QMessageBox.warning(self, "Invalid", "Amount must be greater than zero.")
+        def load():
+            conn = get_conn()
+            vendor_names = dict(conn.execute("SELECT id, name FROM vendors").fetchall())
+            aging = fetch_ap_aging(conn, as_of.date().toString("yyyy-MM-dd"))
+            conn.close()
+            rows = sorted(
+                ((vendor_names.get(vid) or "", buckets) for vid, buckets in aging.items()),
+                key=lambda r: r[0].lower()
+            )
+            rows.append(("TOTAL", ap_aging_totals(aging)))
+            table.setRowCount(len(rows))
+            for i, (name, buckets) in enumerate(rows):
+                values = [name] + [fmt_money(b, True) for b in buckets] + [fmt_money(sum(buckets), True)]
+                for col, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                    if i == len(rows) - 1:
+                        font = item.font()
+                        font.setBold(True)
+                        item.setFont(font)
+                    table.setItem(i, col, item)
+
+        as_of.dateChanged.connect(load)
+        load()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(dialog.accept)
+        layout.addWidget(close_btn, alignment=Qt.AlignmentFlag.AlignRight)
+        dialog.exec()
+
+    def show_duplicate_invoices(self):
+        conn = get_conn()
+        duplicates = scan_duplicate_invoices(conn)
+        conn.close()
+        if not duplicates:
+            QMessageBox.information(self, "Duplicate Invoices", "No invoice number has been entered twice for the same vendor.")
             return
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Duplicate Invoices")
+        dialog.resize(900, 500)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(f"{len(duplicates)} invoice numbers entered more than once"))
+        table = QTableWidget()
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setColumnCount(5)
+        table.setHorizontalHeaderLabels(["Vendor", "Invoice No.", "Entries", "Dates", "Total (AED)"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        table.setRowCount(len(duplicates))
+        for i, dup in enumerate(duplicates):
+            dates = ", ".join(f"{to_ddmmyyyy(d)} ({fmt_money(amount, True)})" for _, d, amount in dup["entries"])
+            values = [dup["vendor"], dup["invoice_no"], str(dup["count"]), dates, fmt_money(dup["total"], True)]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                table.setItem(i, col, item)
+        layout.addWidget(table)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(dialog.accept)
+        layout.addWidget(close_btn, alignment=Qt.AlignmentFlag.AlignRight)
+        dialog.exec()
 
-        note = self.trans_note_input.text()
-        entry_date_iso = self.trans_entry_date.date().toString("yyyy-MM-dd")
-        due_date_iso = self.trans_due_date.date().toString("yyyy-MM-dd")
-        net_terms = ""
-        if self.net_30.isChecked():
-            net_terms = "NET 30"
-        elif self.net_60.isChecked():
-            net_terms = "NET 60"
-        elif self.net_90.isChecked():
-            net_terms = "NET 90"
-        payment_mode = self.trans_payment_mode.currentText()
-        invoice_no = self.trans_invoice_input.text().strip()
+    def ensure_invoice_payment_columns(self):
         conn = get_conn()
         c = conn.cursor()
-        if self.edit_mode and self.trans_id:
-            # UPDATE vendor_transactions
-            c.execute('''UPDATE vendor_transactions SET date=?, type=?, amount=?, note=?, due_date=?, invoice_no=?, payment_mode=?, net_terms=?
-                         WHERE id=?''',
-                      (entry_date_iso, ttype, amount, note,
-                       due_date_iso if ttype == "purchase" else None,
-                       invoice_no,
-                       payment_mode if ttype == "payment" else None,
-                       net_terms if ttype == "purchase" else None,
-                       self.trans_id))
-            # --- Update daily_expense for "payment" ---
-            if ttype == "payment":
-                c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-                cat = c.fetchone()
-                if cat:
-                    cat_id = cat[0]
-                    c.execute("SELECT name FROM vendors WHERE id=?", (self.vendor_id,))
-                    vrow = c.fetchone()
-                    vendor_name = vrow[0] if vrow else ""
-                    old_descr = f"{vendor_name} Payment ({amount:.2f} AED)"
-                    # Try to update an existing expense entry for this transaction (might not exist)
-                    c.execute("""
-                        UPDATE daily_expense SET date=?, amount=?, description=?
-                        WHERE date=? AND amount=? AND category_id=? AND description=?
-                    """, (entry_date_iso, amount, old_descr, entry_date_iso, amount, cat_id, old_descr))
-        else:
-            # INSERT vendor_transactions (your original logic)
-            c.execute('''INSERT INTO vendor_transactions
-                (vendor_id, date, type, amount, note, due_date, invoice_no, payment_mode, net_terms)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (self.vendor_id, entry_date_iso, ttype, amount, note,
-                    due_date_iso if ttype == "purchase" else None,
-                    invoice_no,
-                    payment_mode if ttype == "payment" else None,
-                    net_terms if ttype == "purchase" else None)
-            )
-            if ttype == "payment":
-                # Find or create "Vendors" expense category
-                c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-                cat = c.fetchone()
-                if cat:
-                    cat_id = cat[0]
-                else:
-                    c.execute("INSERT INTO expense_categories (name) VALUES ('Vendors')")
-                    cat_id = c.lastrowid
-                c.execute("SELECT name FROM vendors WHERE id=?", (self.vendor_id,))
-                vrow = c.fetchone()
-                vendor_name = vrow[0] if vrow else ""
-                descr = f"{vendor_name} Payment ({amount:.2f} AED)"
-                c.execute("""
-                    SELECT 1 FROM daily_expense WHERE date=? AND amount=? AND category_id=? AND description=?
-                """, (entry_date_iso, amount, cat_id, descr))
-                if not c.fetchone():
-                    c.execute(
-                        '''INSERT INTO daily_expense (date, amount, category_id, description)
-                        VALUES (?, ?, ?, ?)''',
-                        (entry_date_iso, amount, cat_id, descr)
-                    )
+        c.execute("PRAGMA table_info(vendor_transactions)")
+        cols = [row[1] for row in c.fetchall()]
+        if "invoice_no" not in cols:
+            c.execute("ALTER TABLE vendor_transactions ADD COLUMN invoice_no TEXT")
+        if "payment_mode" not in cols:
+            c.execute("ALTER TABLE vendor_transactions ADD COLUMN payment_mode TEXT")
+        if "net_terms" not in cols:
+            c.execute("ALTER TABLE vendor_transactions ADD COLUMN net_terms TEXT")
         conn.commit()
         conn.close()
-        self.accept()
 
-class VendorsTab(QWidget):
-    chequeCreated = pyqtSignal()
-    def __init__(self, daily_tab=None):
-        super().__init__()
-        self.ensure_invoice_payment_columns()  # Ensure columns exist before any queries
-        self.daily_tab = daily_tab
-        self.vendors = []
-        self.layout = QVBoxLayout()
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        self.tabs = QTabWidget()
-        self.tabs.setObjectName("vendorsSubTabs")
-        self.tabs.setContentsMargins(0, 0, 0, 0)
-        self.layout.addWidget(self.tabs)
-        self.setLayout(self.layout)
-        
+    def fill_trans_vendor_combo(self):
+        """Fills the vendor combo from the index, keeping the selection; returns True if the selected vendor changed."""
+        current = self.trans_vendor_combo.currentData()
+        self.trans_vendor_combo.blockSignals(True)
+        self.trans_vendor_combo.clear()
+        for pos in self.vendor_index.search(self.trans_vendor_search.text()):
+            vendor = self.vendor_index.vendors[pos]
+            vid, name = vendor.id, vendor.name
+            self.trans_vendor_combo.addItem(name, vid)
+        idx = self.trans_vendor_combo.findData(current)
+        if idx >= 0:
+            self.trans_vendor_combo.setCurrentIndex(idx)
+        self.trans_vendor_combo.blockSignals(False)
+        return self.trans_vendor_combo.currentData() != current
 
-        # ---- DISTINCT TAB STYLING ----
-        self.setStyleSheet(DIALOG_STYLESHEET)
+    def filter_trans_vendor_combo(self):
+        # search keystrokes only reload the statement when the selected vendor changes
+        if self.fill_trans_vendor_combo():
+            self.refresh_transactions_table()
 
-        # --- Transactions Tab ---
-        self.trans_tab = QWidget()
-        self.trans_layout = QVBoxLayout()
-        self.trans_layout.setContentsMargins(0, 0, 0, 0)
-        self.trans_tab.setLayout(self.trans_layout)
+    def refresh_vendor_combo(self):
+        self.vendor_index.refresh()
+        self.fill_trans_vendor_combo()
+        self.refresh_transactions_table()
 
-        # --- FILTER + CURRENT BALANCE row ---
-        filter_row = QHBoxLayout()
-        filter_row.setContentsMargins(0, 0, 0, 0)
-        filter_row.setSpacing(10)
+    def update_total_payable_label(self):
+        # Sum current balance of ALL vendors, not just filtered
+        self.total_payable_label.setText(f"Total Account Payable: {fmt_money(self.vendor_index.total_payable)} AED")
 
-        filter_row.addWidget(QLabel("Select Vendor:"))
+    def refresh_transactions_table(self):
+        idx = self.trans_vendor_combo.currentIndex()
+        if idx == -1 or self.trans_vendor_combo.count() == 0:
+            self.trans_table.setRowCount(0)
+            self.load_earlier_btn.hide()
+            self.as_of_balance_label.setText("")
+            self.current_balance_label.setText("Current Balance: 0.00 AED")
+            self.update_total_payable_label()
+            return
+        vendor_id = self.trans_vendor_combo.itemData(idx)
+        if vendor_id is None:
+            self.trans_table.setRowCount(0)
+            self.load_earlier_btn.hide()
+            self.as_of_balance_label.setText("")
+            self.current_balance_label.setText("Current Balance: 0.00 AED")
+            self.update_total_payable_label()
+            return
 
-        self.trans_vendor_combo = QComboBox()
-        self.trans_vendor_combo.setMinimumWidth(300)
-        self.trans_vendor_combo.setMaximumWidth(320)
-        self.trans_vendor_combo.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToContents)
-        self.trans_vendor_combo.currentIndexChanged.connect(self.refresh_transactions_table)
-        filter_row.addWidget(self.trans_vendor_combo)
+        conn = get_conn()
+        page = fetch_vendor_statement_page(conn, vendor_id)
+        self.vendor_index.refresh(conn)
+        conn.close()
+        self.statement_vendor_id = vendor_id
+        self.statement_cursor = page["cursor"]
+        self.trans_table.setRowCount(0)
+        self.insert_statement_rows(page["rows"])
+        self.load_earlier_btn.setVisible(page["has_more"])
+        self.current_balance_label.setText(f"Current Balance: {fmt_money(page['closing_balance'])} AED")
+        self.update_as_of_balance()
+        self.update_total_payable_label()
+        self.trans_table.scrollToBottom()
 
-        self.trans_vendor_search = QLineEdit()
-        self.trans_vendor_search.setPlaceholderText("Search vendor...")
-        self.trans_vendor_search.setFixedWidth(300)
-        self.trans_vendor_search.textChanged.connect(self.filter_trans_vendor_combo)
-        filter_row.addWidget(self.trans_vendor_search)
-        
+    def update_as_of_balance(self):
+        vendor_id = self.trans_vendor_combo.currentData()
+        if vendor_id is None:
+            self.as_of_balance_label.setText("")
+            return
+        conn = get_conn()
+        try:
+            balance = vendor_balance_as_of(conn, vendor_id, self.as_of_date.date().toString("yyyy-MM-dd"))
+        except ValueError as e:
+            self.as_of_balance_label.setText("n/a")
+            self.as_of_balance_label.setToolTip(str(e))
+            return
+        finally:
+            conn.close()
+        self.as_of_balance_label.setToolTip("")
+        self.as_of_balance_label.setText(f"{fmt_money(balance)} AED")
 
-        filter_row.addStretch(1)
+    def load_earlier_transactions(self):
+        if getattr(self, "statement_cursor", None) is None:
+            return
+        conn = get_conn()
+        page = fetch_vendor_statement_page(conn, self.statement_vendor_id, before=self.statement_cursor)
+        conn.close()
+        self.statement_cursor = page["cursor"]
+        self.insert_statement_rows(page["rows"])
+        self.load_earlier_btn.setVisible(page["has_more"])
+        self.trans_table.scrollToItem(self.trans_table.item(len(page["rows"]), 0) or self.trans_table.item(0, 0))
+
+    def insert_statement_rows(self, rows):
+        """Inserts statement rows (oldest first) above the rows already in the table."""
+        for i, (trans_id, date_str, invoice_no, ttype, amt, due, payment_mode, note, balance) in enumerate(rows):
+            ttype_display, debit, credit = vendor_entry_columns(ttype, amt)
+            debit = fmt_money(debit) if debit else ""
+            credit = fmt_money(credit) if credit else ""
 
-        self.current_balance_label = QLabel("Current Balance: 0.00 AED")
-        self.current_balance_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.current_balance_label.setStyleSheet(
-            "font-size:16px; font-weight:bold; color:#fdc59e; margin:8px 0px 0 0;"
-        )
-        filter_row.addWidget(self.current_balance_label)
+            # If purchase and due date are the same, hide due date in table
+            due_date_display = ""
+            if due and date_str != due:
+                due_date_display = to_ddmmyyyy(due)
 
-        self.trans_layout.addLayout(filter_row)
+            row_values = [
+                to_ddmmyyyy(date_str),            # 0 Date
+                invoice_no or "",                 # 1 Invoice No.
+                ttype_display,                    # 2 Type
+                debit,                            # 3 Debit (AED)
+                credit,                           # 4 Credit (AED)
+                fmt_money(balance),               # 5 Balance (AED)
+                due_date_display,                 # 6 Due Date
+                payment_mode or '',               # 7 Payment Mode
+                note or ''                        # 8 Note
+            ]
+            self.trans_table.insertRow(i)
+            for col, value in enumerate(row_values):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                # Dim the Notes column (index 8)
+                if col == 8:
+                    item.setForeground(QColor("#aaa"))  # Dimmed/gray color for notes
+                self.trans_table.setItem(i, col, item)
+            self.trans_table.item(i, 0).setData(Qt.ItemDataRole.UserRole, trans_id)
+            self.trans_table.setRowHeight(i, 30)
 
-        # --- BUTTONS row: Export PDF & Add Transaction ---
-        buttons_row = QHBoxLayout()
-        buttons_row.setContentsMargins(0, 10, 0, 0)
-        buttons_row.setSpacing(12)
 
-        # --- Add Transaction Button (icon only)
-        self.show_add_entry_btn = QPushButton()
-        self.show_add_entry_btn.setToolTip("Add Transaction (F1)")
-        self.show_add_entry_btn.setFixedSize(40, 40)
-        self.show_add_entry_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
-        add_icon = QIcon.fromTheme("list-add")
-        if not add_icon.isNull():
-            self.show_add_entry_btn.setIcon(add_icon)
-            self.show_add_entry_btn.setIconSize(QSizeF(24, 24).toSize())
-            self.show_add_entry_btn.setText("")
-        else:
-            self.show_add_entry_btn.setText("＋")
-            self.show_add_entry_btn.setFont(QFont("Arial", 22, QFont.Weight.Bold))
-        self.show_add_entry_btn.clicked.connect(self.show_transaction_dialog)
-        self.add_transaction_shortcut = QShortcut(QKeySequence("F1"), self)
-        self.add_transaction_shortcut.activated.connect(self.show_transaction_dialog)
-        buttons_row.addWidget(self.show_add_entry_btn)
 
-        # --- Export PDF Button (icon only)
-        self.export_pdf_btn = QPushButton()
-        self.export_pdf_btn.setToolTip("Export Transactions PDF")
-        self.export_pdf_btn.setFixedSize(40, 40)
-        self.export_pdf_btn.setStyleSheet("background:rgba(251,112,14,0.10); color:white; border: 2px solid #f27329;")
-        pdf_icon = QIcon.fromTheme("document-save")
-        if not pdf_icon.isNull():
-            self.export_pdf_btn.setIcon(pdf_icon)
-            self.export_pdf_btn.setIconSize(QSizeF(24, 24).toSize())
-            self.export_pdf_btn.setText("")
-        else:
-            self.export_pdf_btn.setText("\U0001F4BE")  # Floppy disk emoji as fallback
-        self.export_pdf_btn.clicked.connect(self.export_transactions_pdf)
-        buttons_row.addWidget(self.export_pdf_btn)
+    def show_transaction_dialog(self):
+        idx = self.trans_vendor_combo.currentIndex()
+        if idx == -1:
+            QMessageBox.warning(self, "No vendor", "Please select a vendor.")
+            return
+        vendor_id = self.trans_vendor_combo.itemData(idx)
+        vendor_name = self.trans_vendor_combo.currentText()
+
+        # Step 1: Transaction type popup
+        type_dialog = TransactionTypeDialog(self)
+        if not type_dialog.exec():
+            return
+        ttype = type_dialog.selected_type
+        if not ttype:
+            return
 
-        buttons_row.addStretch(1)
-        self.trans_layout.addLayout(buttons_row)
+        # Step 2: Show the context-aware dialog
+        dlg = TransactionEntryDialog(self, vendor_id, vendor_name, ttype=ttype)
+        if dlg.exec():
+            ttype, date_iso, amt, invoice_no, due_iso, note, payment_mode, bank_name, cheque_due = dlg.get_values()
+            amount = parse_amount(amt)
+            if amount <= 0:
+                QMessageBox.warning(self, "Invalid", "Amount must be greater than zero.")
+                return
+            conn = get_conn()
+            try:
+                _, cheque_created = add_vendor_transaction(
+                    conn, vendor_id, ttype, date_iso, amount, note, due_iso, invoice_no, payment_mode, bank_name, cheque_due
+                )
+            except ValueError as e:
+                conn.close()
+                QMessageBox.warning(self, "Cannot Save", str(e))
+                return
+            conn.commit()
+            conn.close()
+            if cheque_created:
+                self.chequeCreated.emit()   # <-- ensure Cheque tab refreshes
+            self.refresh_transactions_table()
 
-        # Vendor Transactions Table
-        self.trans_layout.addSpacing(6)
-        self.trans_layout.addWidget(QLabel("Vendor Transactions:"))
-        self.trans_table = QTableWidget()
-        self.trans_table.setColumnCount(8)
-        self.trans_table.setHorizontalHeaderLabels([
-            'Date', 'Invoice No.', 'Type', 'Debit (AED)', 'Credit (AED)', 'Due Date',
-            'Payment Mode', 'Note'
-        ])
-        self.trans_table.setColumnWidth(0, 110)     # Date
-        self.trans_table.setColumnWidth(1, 90)      # Invoice No.
-        self.trans_table.setColumnWidth(2, 100)     # Type
-        self.trans_table.setColumnWidth(3, 100)     # Debit (AED)
-        self.trans_table.setColumnWidth(4, 100)     # Credit (AED)
-        self.trans_table.setColumnWidth(5, 115)     # Due Date
-        self.trans_table.setColumnWidth(6, 130)     # Payment Mode
-        self.trans_table.setColumnWidth(7, 200)     # Note
-        header = self.trans_table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
-        header.setSectionResizeMode(7, QHeaderView.ResizeMode.Stretch)  # Only let Note stretch
-        self.trans_table.setAlternatingRowColors(True)
-        self.trans_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.trans_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.trans_table.customContextMenuRequested.connect(self.show_transaction_context_menu)
-        self.trans_table.doubleClicked.connect(self.handle_transaction_double_click)
-        self.trans_layout.addWidget(self.trans_table)
-        self.tabs.addTab(self.trans_tab, "Transactions")
+            # Refresh the Daily Tab and Dashboard reliably
+            if self.daily_tab is not None:
+                self.daily_tab.load_data()
+                if hasattr(self.daily_tab, "dashboard_tab") and self.daily_tab.dashboard_tab is not None:
+                    self.daily_tab.dashboard_tab.refresh()
 
-        # --------- OVERVIEW TAB -------------
-        self.overview_tab = QWidget()
-        self.overview_layout = QVBoxLayout(self.overview_tab)
-        self.overview_layout.setContentsMargins(0, 0, 0, 0)
-        # Filter row
-        overview_filter_row = QHBoxLayout()
-        overview_filter_row.setContentsMargins(0, 0, 0, 0)
-        overview_filter_row.setSpacing(10)
-        overview_filter_row.addWidget(QLabel("Vendor:"))
-        self.overview_vendor_search = QLineEdit()
-        self.overview_vendor_search.setPlaceholderText("Search vendor...")
-        overview_filter_row.addWidget(self.overview_vendor_search)
-        overview_filter_row.addWidget(QLabel("From:"))
-        self.overview_date_from = QDateEdit()
-        self.overview_date_from.setDisplayFormat("dd-MM-yyyy")
-        self.overview_date_from.setCalendarPopup(True)
-        today = QDate.currentDate()
-        first_of_month = QDate(today.year(), today.month(), 1)
-        self.overview_date_from.setDate(first_of_month)
-        overview_filter_row.addWidget(self.overview_date_from)
-        overview_filter_row.addWidget(QLabel("To:"))
-        self.overview_date_to = QDateEdit()
-        self.overview_date_to.setDisplayFormat("dd-MM-yyyy")
-        self.overview_date_to.setCalendarPopup(True)
-        self.overview_date_to.setDate(today)
-        overview_filter_row.addWidget(self.overview_date_to)
-        self.overview_date_from.dateChanged.connect(self.refresh_overview_table)
-        self.overview_date_to.dateChanged.connect(self.refresh_overview_table)
-        self.overview_date_to.setMinimumWidth(120)
-        self.overview_date_from.setMinimumWidth(120) 
-        self.overview_cheque_only_btn = QPushButton("Cheque Only")
-        self.overview_cheque_only_btn.setCheckable(True)
-        self.overview_cheque_only_btn.setChecked(False)
-        self.overview_cheque_only_btn.setStyleSheet(DARK_STYLESHEET)
-        
-        overview_filter_row.addWidget(self.overview_cheque_only_btn)
-        self.overview_cheque_only_btn.toggled.connect(self.refresh_overview_table)
-        overview_filter_row.addStretch()
-        self.overview_layout.addLayout(overview_filter_row)
+    def add_transaction_from_dialog(self, dlg, vendor_id):
+        ttype = dlg.trans_type_combo.currentText().lower()
+        amount = parse_amount(dlg.trans_amount_input.text())
+        note = dlg.trans_note_input.text()
+        due_date_iso = dlg.trans_due_date.date().toString("yyyy-MM-dd")
+        net_terms = ""
+        if dlg.net_30.isChecked():
+            net_terms = "NET 30"
+        elif dlg.net_60.isChecked():
+            net_terms = "NET 60"
+        elif dlg.net_90.isChecked():
+            net_terms = "NET 90"
+        payment_mode = dlg.trans_payment_mode.currentText()
+        invoice_no = dlg.trans_invoice_input.text().strip()
+        entry_date_iso = dlg.trans_entry_date.date().toString("yyyy-MM-dd")
+        conn = get_conn()
+        try:
+            check_open_period(conn, entry_date_iso)
+        except ValueError as e:
+            conn.close()
+            QMessageBox.warning(self, "Cannot Save", str(e))
+            return
+        c = conn.cursor()
+        c.execute('''INSERT INTO vendor_transactions
+            (vendor_id, date, type, amount, note, due_date, invoice_no, payment_mode, net_terms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (vendor_id, entry_date_iso, ttype, amount, note,
+                due_date_iso if ttype == "purchase" else None,
+                invoice_no,
+                payment_mode if ttype == "payment" else None,
+                net_terms if ttype == "purchase" else None)
+        )
+        vendor_trans_id = c.lastrowid
+        if ttype == "payment":
+            cat_id = get_expense_category_id(conn, "Vendors", create=False)
+            if cat_id:
+                c.execute("SELECT name FROM vendors WHERE id=?", (vendor_id,))
+                vrow = c.fetchone()
+                vendor_name = vrow[0] if vrow else ""
+                descr = vendor_name
+                c.execute('''
+                    INSERT INTO daily_expense (date, amount, category_id, description, notes, vendor_transaction_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (entry_date_iso, amount, cat_id, descr, f"Paid via {payment_mode or 'Other'}", vendor_trans_id))
+        conn.commit()
+        conn.close()
+    
+    def export_transactions_pdf(self):
+        idx = self.trans_vendor_combo.currentIndex()
+        if idx < 0:
+            QMessageBox.warning(self, "No Vendor Selected", "Please select a vendor to export transactions.")
+            return
+        vendor_id = self.trans_vendor_combo.itemData(idx)
+        vendor_name = self.trans_vendor_combo.currentText()
 
-        self.overview_table = QTableWidget()
-        self.overview_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.overview_table.setColumnCount(9)
-        self.overview_table.setHorizontalHeaderLabels([
-            'Date', 'Invoice No.', 'Vendor', 'Type', 'Debit (AED)', 'Credit (AED)', 'Due Date', 'Payment Mode', 'Notes'
-        ])
-        self.overview_table.setShowGrid(True)
-        self.overview_table.setGridStyle(Qt.PenStyle.SolidLine)
-        self.overview_table.setAlternatingRowColors(False)
-        self.overview_table.verticalHeader().setVisible(True)
-        overview_header = self.overview_table.horizontalHeader()
-        overview_header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.overview_layout.addWidget(self.overview_table)
+        as_of_iso = self.as_of_date.date().toString("yyyy-MM-dd")
+        conn = get_conn()
+        opening_balance, rows = fetch_vendor_statement(conn, vendor_id)
+        as_of = None
+        if as_of_iso < date.today().isoformat():
+            try:
+                as_of = (as_of_iso, vendor_balance_as_of(conn, vendor_id, as_of_iso))
+            except ValueError as e:
+                conn.close()
+                QMessageBox.warning(self, "Export", str(e))
+                return
+        conn.close()
+        data_rows, balance = build_vendor_statement_rows(opening_balance, rows)
+        table = vendor_statement_table(vendor_name, opening_balance, balance, data_rows, as_of)
+        table.preview(self, "Vendor Transactions Print Preview")
 
-        overview_totals_row = QHBoxLayout()
-        overview_totals_row.setContentsMargins(0, 0, 0, 0)
-        overview_totals_row.setSpacing(24)
-        self.lbl_total_purchases = QLabel("Total Purchases: 0.00 AED")
-        self.lbl_total_purchases.setStyleSheet("font-weight:bold;color:#43a047;")
-        self.lbl_total_payments = QLabel("Total Payments: 0.00 AED")
-        self.lbl_total_payments.setStyleSheet("font-weight:bold;color:#e53935;")
-        self.lbl_current_balance = QLabel("Current Balance: 0.00 AED")
-        self.lbl_current_balance.setStyleSheet("font-weight:bold;color:#fbc02d;")
-        overview_totals_row.addWidget(self.lbl_total_purchases)
-        overview_totals_row.addWidget(self.lbl_total_payments)
-        overview_totals_row.addWidget(self.lbl_current_balance)
-        overview_totals_row.addStretch()
-        self.overview_layout.addLayout(overview_totals_row)
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Vendor Transactions PDF", "VendorTransactions.pdf", "PDF Files (*.pdf)")
+        if not file_path:
+            return
+        table.write_pdf(file_path)
+        QMessageBox.information(self, "Export PDF", f"PDF exported:\n{file_path}")
 
-        self.tabs.addTab(self.overview_tab, "Overview")
+    def show_transaction_context_menu(self, pos: QPoint):
+        index = self.trans_table.indexAt(pos)
+        if not index.isValid():
+            return
+        row = index.row()
+        idx = self.trans_vendor_combo.currentIndex()
+        if idx == -1:
+            return
+        vendor_id = self.trans_vendor_combo.itemData(idx)
+        trans_id = self.get_transaction_id_from_row(row, vendor_id)
+        if trans_id is None:
+            return
+        menu = QMenu(self)
+        edit_action = menu.addAction("Edit Transaction")
+        delete_action = menu.addAction("Delete Transaction")
+        action = menu.exec(self.trans_table.viewport().mapToGlobal(pos))
+        if action == edit_action:
+            self.edit_transaction(row, trans_id, vendor_id)
+        elif action == delete_action:
+            self.delete_transaction(trans_id)
 
-        # Connect filter events for Overview tab
-        self.overview_vendor_search.textChanged.connect(self.refresh_overview_table)
-        self.overview_date_from.dateChanged.connect(self.refresh_overview_table)
-        self.overview_date_to.dateChanged.connect(self.refresh_overview_table)
-       
+    def handle_transaction_double_click(self, index):
+        row = index.row()
+        idx = self.trans_vendor_combo.currentIndex()
+        if idx == -1:
+            return
+        vendor_id = self.trans_vendor_combo.itemData(idx)
+        trans_id = self.get_transaction_id_from_row(row, vendor_id)
+        if trans_id is not None:
+            self.edit_transaction(row, trans_id, vendor_id)
 
-        # --- Manage Vendors Tab (unchanged) ---
-        self.vendor_manage_tab = QWidget()
-        self.vendor_manage_layout = QVBoxLayout()
-        self.vendor_manage_layout.setContentsMargins(0, 0, 0, 0) 
-        self.vendor_manage_tab.setLayout(self.vendor_manage_layout)
-        filter_row2 = QHBoxLayout()
-        filter_row2.addWidget(QLabel("Search Vendor:"))
-        self.vendor_search_input = QLineEdit()
-        self.vendor_search_input.setPlaceholderText("Type at least 2 letters of vendor name...")
-        self.vendor_search_input.textChanged.connect(self.filter_vendor_table)
-        filter_row2.addWidget(self.vendor_search_input)
-        filter_row2.addStretch()
-        self.vendor_manage_layout.addLayout(filter_row2)
+    def get_transaction_id_from_row(self, row, vendor_id):
+        item = self.trans_table.item(row, 0)
+        return item.data(Qt.ItemDataRole.UserRole) if item is not None else None
 
-        # Total Account Payable label
-        self.total_payable_label = QLabel("Total Account Payable: 0.00 AED")
-        self.total_payable_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.total_payable_label.setStyleSheet(
-            "font-size:16px; font-weight:bold; color:#43a047; margin:0 0px 0px 0;"
-        )
-        self.vendor_manage_layout.addWidget(self.total_payable_label)
+    def edit_transaction(self, row, trans_id, vendor_id):
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute('''SELECT date, type, amount, due_date, note, invoice_no, payment_mode, net_terms
+                    FROM vendor_transactions WHERE id=?''', (trans_id,))
+        tr = c.fetchone()
+        if not tr:
+            conn.close()
+            return
+        try:
+            check_open_period(conn, tr[0])
+        except ValueError as e:
+            conn.close()
+            QMessageBox.information(self, "Closed Year", str(e))
+            return
+        vendor_name = self.trans_vendor_combo.currentText()
+        # --- Fetch cheque info ---
+        c.execute("SELECT bank_name, due_date FROM cheques WHERE vendor_transaction_id=?", (trans_id,))
+        cheque_info = c.fetchone()
+        if cheque_info:
+            bank_name, cheque_due = cheque_info
+        else:
+            bank_name, cheque_due = None, None
+        tr_with_cheque = tr + (bank_name, cheque_due)
+        dlg = TransactionEntryDialog(self, vendor_id, vendor_name, ttype=tr[1], edit_mode=True, trans_id=trans_id, init_data=tr_with_cheque)
+        if dlg.exec():
+            ttype, date_iso, amt, invoice_no, due_iso, note, payment_mode, bank_name, cheque_due = dlg.get_values()
+            amount = parse_amount(amt)
+            if amount <= 0:
+                QMessageBox.warning(self, "Invalid", "Amount must be greater than zero.")
+                return
+            try:
+                check_open_period(conn, date_iso)
+            except ValueError as e:
+                conn.close()
+                QMessageBox.warning(self, "Cannot Save", str(e))
+                return
+            # Update vendor_transactions as before
+            if ttype == "purchase":
+                c.execute('''UPDATE vendor_transactions
+                    SET date=?, type=?, amount=?, note=?, due_date=?, invoice_no=?
+                    WHERE id=?''',
+                    (date_iso, ttype, amount, note, due_iso, invoice_no, trans_id)
+                )
+                # Cheque logic unchanged...
+                if bank_name:
+                    c.execute("SELECT id FROM cheques WHERE vendor_transaction_id=?", (trans_id,))
+                    cheque_row = c.fetchone()
+                    if cheque_row:
+                        c.execute('''
+                            UPDATE cheques
+                            SET cheque_date=?, company_name=?, bank_name=?, due_date=?, amount=?
+                            WHERE vendor_transaction_id=?
+                        ''', (date_iso, vendor_name, bank_name, cheque_due, amount, trans_id))
+                    else:
+                        c.execute('''
+                            INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid, vendor_transaction_id)
+                            VALUES (?, ?, ?, ?, ?, 0, ?)
+                        ''', (date_iso, vendor_name, bank_name, cheque_due, amount, trans_id))
+                else:
+                    c.execute('DELETE FROM cheques WHERE vendor_transaction_id=?', (trans_id,))
+                self.chequeCreated.emit()
 
-        self.vendor_table = QTableWidget()
-        self.vendor_table.setColumnCount(4)
-        self.vendor_table.setHorizontalHeaderLabels([
-            "Vendor Name", "Contact", "Opening Balance (AED)", "Current Balance (AED)"
-        ])
-        self.vendor_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.vendor_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.vendor_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.vendor_table.setAlternatingRowColors(True)
-        self.vendor_manage_layout.addWidget(QLabel("Vendors:"))
-        self.vendor_manage_layout.addWidget(self.vendor_table)
-        button_row = QHBoxLayout()
-        self.add_vendor_btn = QPushButton("Add Vendor")
-        self.add_vendor_btn.clicked.connect(self.show_add_vendor_dialog)
-        self.edit_vendor_btn = QPushButton("Edit Vendor")
-        self.edit_vendor_btn.clicked.connect(self.show_edit_vendor_dialog)
-        self.delete_vendor_btn = QPushButton("Delete Vendor")
-        self.delete_vendor_btn.clicked.connect(self.delete_vendor)
-        button_row.addWidget(self.add_vendor_btn)
-        button_row.addWidget(self.edit_vendor_btn)
-        button_row.addWidget(self.delete_vendor_btn)
-        self.vendor_manage_layout.addLayout(button_row)
-        style = self.style()
-        transactions_icon = style.standardIcon(QStyle.StandardPixmap.SP_FileDialogListView)
-        overview_icon = style.standardIcon(QStyle.StandardPixmap.SP_ComputerIcon)
-        manage_icon = style.standardIcon(QStyle.StandardPixmap.SP_DirIcon)
-        self.tabs.addTab(self.trans_tab, transactions_icon, "Transactions")
-        self.tabs.addTab(self.overview_tab, overview_icon, "Overview")
-        self.tabs.addTab(self.vendor_manage_tab, manage_icon, "Manage Vendors")
-        self.tabs.currentChanged.connect(self._on_tab_changed)
+            elif ttype == "payment":
+                c.execute('''UPDATE vendor_transactions
+                    SET date=?, type=?, amount=?, note=?, invoice_no=?, payment_mode=?
+                    WHERE id=?''',
+                    (date_iso, ttype, amount, note, invoice_no, payment_mode, trans_id)
+                )
+                # Update the mirrored daily_expense entry
+                new_notes = f"Paid via {payment_mode}" if payment_mode else ""
+                c.execute(
+                    '''UPDATE daily_expense
+                       SET date=?, amount=?, notes=?
+                       WHERE vendor_transaction_id=?''',
+                    (date_iso, amount, new_notes, trans_id)
+                )
+            elif ttype == "return":
+                c.execute('''UPDATE vendor_transactions
+                    SET date=?, type=?, amount=?, note=?
+                    WHERE id=?''',
+                    (date_iso, ttype, amount, note, trans_id)
+                )
+            conn.commit()
+            conn.close()
+            self.refresh_transactions_table()
+            self.refresh_overview_table()
 
-        # --- Now, after all widgets are created, call refresh_vendor_combo ---
-        self.refresh_vendor_combo()
+            if self.daily_tab is not None:
+                self.daily_tab.load_data()
+                if hasattr(self.daily_tab, "dashboard_tab") and self.daily_tab.dashboard_tab is not None:
+                    self.daily_tab.dashboard_tab.refresh()
 
+    def delete_transaction(self, trans_id):
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("SELECT type, date FROM vendor_transactions WHERE id=?", (trans_id,))
+        tr = c.fetchone()
+        tr_type = tr[0] if tr else None
+        if tr:
+            try:
+                check_open_period(conn, tr[1])
+            except ValueError as e:
+                conn.close()
+                QMessageBox.information(self, "Closed Year", str(e))
+                return
 
-    def _on_tab_changed(self, index):
-        if self.tabs.tabText(index) == "Overview":
-            self.refresh_overview_table()
+        reply = QMessageBox.question(
+            self, "Confirm Delete",
+            "Delete this vendor transaction?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            conn.close()
+            return
 
-        # Data Loading
-        self.refresh_vendor_combo()
-        self.refresh_vendor_table()
+        # the purchase's cheque and the payment's daily_expense entry go with it
+        # (trg_vendor_transactions_cascade_delete)
+        c.execute('DELETE FROM vendor_transactions WHERE id=?', (trans_id,))
+        conn.commit()
+        conn.close()
+        self.chequeCreated.emit()
         self.refresh_transactions_table()
+        self.refresh_overview_table()
+        self.cashflowChanged.emit()
 
-    def refresh_overview_vendor_combo(self):
-        self.overview_vendor_combo.blockSignals(True)
-        self.overview_vendor_combo.clear()
-        self.overview_vendor_combo.addItem("All", None)
-        for vid, name, *_ in self.vendors:
-            self.overview_vendor_combo.addItem(name, vid)
-        self.overview_vendor_combo.blockSignals(False)
+    # --- Vendor Management Tab Methods ---
 
-    def refresh_overview_table(self):
-        vendor_search = self.overview_vendor_search.text().strip().lower()
-        date_from = self.overview_date_from.date().toString("yyyy-MM-dd")
-        date_to = self.overview_date_to.date().toString("yyyy-MM-dd")
-        cheque_only = self.overview_cheque_only_btn.isChecked()
+    def ensure_opening_balance_column(self):
         conn = get_conn()
         c = conn.cursor()
-        query = """
-            SELECT vt.date, vt.invoice_no, v.name, vt.type, vt.amount, vt.due_date, vt.payment_mode, vt.note, vt.vendor_id
-            FROM vendor_transactions vt
-            LEFT JOIN vendors v ON vt.vendor_id = v.id
-            WHERE vt.date BETWEEN ? AND ?
-        """
-        params = [date_from, date_to]
-        if vendor_search:
-            query += " AND lower(v.name) LIKE ?"
-            params.append(f"%{vendor_search}%")
-        if cheque_only:
-            query += " AND vt.payment_mode = 'Cheque'"
-        query += " ORDER BY vt.date DESC, vt.id DESC"
-        c.execute(query, params)
-        rows = c.fetchall()
-        self.overview_table.setRowCount(len(rows))
-        total_purchase = 0.0
-        total_payment = 0.0
-        for i, (date_str, invoice_no, vendor_name, ttype, amt, due, payment_mode, note, vendor_id) in enumerate(rows):
-            ttype_display = ttype.capitalize() if ttype else ""
-            debit = credit = ""
-            if ttype == "purchase":
-                debit = f"{amt:.2f}"
-                total_purchase += amt
-            elif ttype in ("payment", "return"):
-                credit = f"{amt:.2f}"
-                total_payment += amt
-            row_values = [
-                to_ddmmyyyy(date_str),
-                invoice_no or "",
-                vendor_name or "",
-                ttype_display,
-                debit,
-                credit,
-                to_ddmmyyyy(due) if due else "",
-                payment_mode or "",
-                note or ""
-            ]
-            for col, value in enumerate(row_values):
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                if col == 8:
-                    item.setForeground(QColor("#aaa"))
-                self.overview_table.setItem(i, col, item)
-            self.overview_table.setRowHeight(i, 30)
-
-        # --- Total Purchases & Payments
-        self.lbl_total_purchases.setText(f"Total Purchases: {total_purchase:.2f} AED")
-        self.lbl_total_payments.setText(f"Total Payments: {total_payment:.2f} AED")
+        c.execute("PRAGMA table_info(vendors)")
+        cols = [row[1] for row in c.fetchall()]
+        if "opening_balance" not in cols:
+            c.execute("ALTER TABLE vendors ADD COLUMN opening_balance INTEGER DEFAULT 0")
+            conn.commit()
+        conn.close()
 
-        # --- Current Balance: TOTAL ACCOUNT PAYABLE (including opening balance) ---
-        # Show sum of positive balances (payable) of all vendors that match the filter
-        c.execute("SELECT id, name, opening_balance FROM vendors")
-        vendor_rows = c.fetchall()
-        total_account_payable = 0.0
-        for vid, vname, opening_balance in vendor_rows:
-            # Filter by search if any
-            if vendor_search and vendor_search not in vname.lower():
-                continue
-            c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='purchase'", (vid,))
-            purchases = c.fetchone()[0] or 0
-            c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='payment'", (vid,))
-            payments = c.fetchone()[0] or 0
-            c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='return'", (vid,))
-            returns = c.fetchone()[0] or 0
-            current_balance = opening_balance + purchases - payments - returns
-            if current_balance > 0:
-                total_account_payable += current_balance
+    def ensure_due_date_column(self):
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("PRAGMA table_info(vendor_transactions)")
+        cols = [row[1] for row in c.fetchall()]
+        if "due_date" not in cols:
+            c.execute("ALTER TABLE vendor_transactions ADD COLUMN due_date TEXT")
+            conn.commit()
         conn.close()
-        self.lbl_current_balance.setText(f"Current Balance: {total_account_payable:.2f} AED")
 
     def ensure_invoice_payment_columns(self):
         conn = get_conn()
@@ -3399,1204 +7348,1914 @@ class VendorsTab(QWidget):
         conn.commit()
         conn.close()
 
-    def filter_trans_vendor_combo(self):
-        self.refresh_vendor_combo()
-
-    def refresh_vendor_combo(self):
-        filter_text = self.trans_vendor_search.text().strip().lower()
-        self.trans_vendor_combo.blockSignals(True)
-        self.trans_vendor_combo.clear()
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, name FROM vendors ORDER BY name COLLATE NOCASE ASC")
-        vendor_combo_data = c.fetchall()
-        items = []
-        for vid, name in vendor_combo_data:
-            if not filter_text or filter_text in name.lower():
-                items.append((vid, name))
-        for vid, name in items:
-            self.trans_vendor_combo.addItem(name, vid)
-        conn.close()
-        self.trans_vendor_combo.blockSignals(False)
-        # Only call refresh_transactions_table if there is at least one vendor
-        if self.trans_vendor_combo.count() > 0:
-            self.refresh_transactions_table()
-        else:
-            self.trans_table.setRowCount(0)
-            self.current_balance_label.setText("Current Balance: 0.00 AED")
-            self.update_total_payable_label()
-
     def refresh_vendor_table(self):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, name, contact, opening_balance FROM vendors ORDER BY name COLLATE NOCASE ASC")
-        self.vendors = c.fetchall()
-        conn.close()
+        self.vendor_index.refresh()
+        self.vendors = self.vendor_index.vendors
         self.filter_vendor_table()
         self.update_total_payable_label()
 
     def filter_vendor_table(self):
-        search = self.vendor_search_input.text().strip().lower()
-        self.filtered_vendors = []
-        for vendor in self.vendors:
-            vid, name, contact, opening_balance = vendor
-            if (len(search) < 2) or (search in name.lower()):
-                self.filtered_vendors.append(vendor)
+        search = self.vendor_search_input.text().strip()
+        positions = self.vendor_index.search(search if len(search) >= 2 else "")
+        self.filtered_vendors = [self.vendor_index.vendors[pos] for pos in positions]
         self.vendor_table.setRowCount(len(self.filtered_vendors))
-        for row, (vid, name, contact, opening_balance) in enumerate(self.filtered_vendors):
-            current_balance = self.get_current_balance(vid, opening_balance)
+        for row, vendor in enumerate(self.filtered_vendors):
+            name, contact, opening_balance, current_balance = vendor.name, vendor.contact, vendor.opening_balance, vendor.balance
             item_name = QTableWidgetItem(name)
-            item_name.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 0, item_name)
-            item_contact = QTableWidgetItem(contact)
-            item_contact.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 1, item_contact)
-            item_opening = QTableWidgetItem(f"{opening_balance:.2f}")
-            item_opening.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 2, item_opening)
-            item_current = QTableWidgetItem(f"{current_balance:.2f}")
-            item_current.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 3, item_current)
-        self.update_total_payable_label()
-
-    def update_total_payable_label(self):
-        # Sum current balance of ALL vendors, not just filtered
-        total_payable = 0.0
-        for vid, name, contact, opening_balance in self.vendors:
-            current_balance = self.get_current_balance(vid, opening_balance)
-            if current_balance > 0:
-                total_payable += current_balance
-        self.total_payable_label.setText(f"Total Account Payable: {total_payable:.2f} AED")
-
-    def get_current_balance(self, vendor_id, opening_balance):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='purchase'", (vendor_id,))
-        purchases = c.fetchone()[0] or 0
-        c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='payment'", (vendor_id,))
-        payments = c.fetchone()[0] or 0
-        c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='return'", (vendor_id,))
-        returns = c.fetchone()[0] or 0
-        conn.close()
-        return opening_balance + purchases - payments - returns
-
-    def refresh_transactions_table(self):
-        idx = self.trans_vendor_combo.currentIndex()
-        if idx == -1 or self.trans_vendor_combo.count() == 0:
-            self.trans_table.setRowCount(0)
-            self.current_balance_label.setText("Current Balance: 0.00 AED")
-            self.update_total_payable_label()
-            return
-        vendor_id = self.trans_vendor_combo.itemData(idx)
-        if vendor_id is None:
-            self.trans_table.setRowCount(0)
-            self.current_balance_label.setText("Current Balance: 0.00 AED")
-            self.update_total_payable_label()
-            return
-
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT opening_balance FROM vendors WHERE id=?", (vendor_id,))
-        opening_balance_row = c.fetchone()
-        opening_balance = opening_balance_row[0] if opening_balance_row else 0.0
-        c.execute('''
-            SELECT date, invoice_no, type, amount, due_date, payment_mode, note
-            FROM vendor_transactions
-            WHERE vendor_id=?
-            ORDER BY date ASC, id ASC
-        ''', (vendor_id,))
-        rows = c.fetchall()
-        conn.close()
-        self.trans_table.setRowCount(len(rows))
-        balance = opening_balance
-        for i, (date_str, invoice_no, ttype, amt, due, payment_mode, note) in enumerate(rows):
-            ttype_display = ttype.capitalize() if ttype else ""
-            debit = credit = ""
-            if ttype == "purchase":
-                debit = f"{amt:.2f}"
-                balance += amt
-            elif ttype in ("payment", "return"):
-                credit = f"{amt:.2f}"
-                balance -= amt
-
-            purchase_date = date_str
-            due_date = due
-            # If purchase and due date are the same, hide due date in table
-            due_date_display = ""
-            if due and purchase_date != due:
-                due_date_display = to_ddmmyyyy(due)
-
-            row_values = [
-                to_ddmmyyyy(date_str),            # 0 Date
-                invoice_no or "",                 # 1 Invoice No.
-                ttype_display,                    # 2 Type
-                debit,                            # 3 Debit (AED)
-                credit,                           # 4 Credit (AED)
-                due_date_display,
-                payment_mode or '',               # 6 Payment Mode
-                note or ''                        # 7 Note
-            ]
-            for col, value in enumerate(row_values):
-                item = QTableWidgetItem(value)
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                # Dim the Notes column (index 7)
-                if col == 7:
-                    item.setForeground(QColor("#aaa"))  # Dimmed/gray color for notes
-                self.trans_table.setItem(i, col, item)
-
-            self.trans_table.setRowHeight(i, 30)
-        self.current_balance_label.setText(f"Current Balance: {balance:.2f} AED")
-        self.update_total_payable_label()
-
-
+            item_name.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.vendor_table.setItem(row, 0, item_name)
+            item_contact = QTableWidgetItem(contact)
+            item_contact.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.vendor_table.setItem(row, 1, item_contact)
+            item_opening = QTableWidgetItem(fmt_money(opening_balance))
+            item_opening.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.vendor_table.setItem(row, 2, item_opening)
+            item_current = QTableWidgetItem(fmt_money(current_balance))
+            item_current.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.vendor_table.setItem(row, 3, item_current)
 
-    def show_transaction_dialog(self):
-        idx = self.trans_vendor_combo.currentIndex()
-        if idx == -1:
-            QMessageBox.warning(self, "No vendor", "Please select a vendor.")
-            return
-        vendor_id = self.trans_vendor_combo.itemData(idx)
-        vendor_name = self.trans_vendor_combo.currentText()
+    def show_add_vendor_dialog(self):
+        dialog = VendorDialog(self, "Add Vendor")
+        if dialog.exec():
+            name, contact, opening_balance = dialog.get_values()
+            if not name:
+                QMessageBox.warning(self, "Missing Name", "Vendor name is required.")
+                return
+            conn = get_conn()
+            c = conn.cursor()
+            try:
+                c.execute("INSERT INTO vendors (name, contact, opening_balance) VALUES (?, ?, ?)", (name, contact, opening_balance))
+                conn.commit()
+            except Exception:
+                QMessageBox.warning(self, "Exists", "Vendor already exists.")
+            conn.close()
+            self.refresh_vendor_table()
+            self.refresh_vendor_combo()
+            self.refresh_overview_table()
 
-        # Step 1: Transaction type popup
-        type_dialog = TransactionTypeDialog(self)
-        if not type_dialog.exec():
-            return
-        ttype = type_dialog.selected_type
-        if not ttype:
+    def show_edit_vendor_dialog(self):
+        selected = self.vendor_table.currentRow()
+        if selected < 0 or selected >= len(self.filtered_vendors):
+            QMessageBox.warning(self, "Select Vendor", "Please select a vendor to edit.")
             return
-
-        # Step 2: Show the context-aware dialog
-        dlg = TransactionEntryDialog(self, vendor_id, vendor_name, ttype=ttype)
-        if dlg.exec():
-            ttype, date_iso, amt, invoice_no, due_iso, note, payment_mode, bank_name, cheque_due = dlg.get_values()
-            amount = parse_amount(amt)
-            if amount <= 0:
-                QMessageBox.warning(self, "Invalid", "Amount must be greater than zero.")
+        vendor = self.filtered_vendors[selected]
+        vid, name, contact, opening_balance = vendor.id, vendor.name, vendor.contact, vendor.opening_balance
+        dialog = VendorDialog(self, "Edit Vendor", name, contact, opening_balance)
+        if dialog.exec():
+            new_name, new_contact, new_balance = dialog.get_values()
+            if not new_name:
+                QMessageBox.warning(self, "Missing Name", "Vendor name is required.")
                 return
             conn = get_conn()
             c = conn.cursor()
-            if ttype == "purchase":
-                c.execute('''INSERT INTO vendor_transactions
-                    (vendor_id, date, type, amount, note, due_date, invoice_no)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                    (vendor_id, date_iso, ttype, amount, note, due_iso, invoice_no)
-                )
-                vendor_transaction_id = c.lastrowid  # <- get the new purchase's ID
-                if bank_name:
-                    # Prevent duplicate cheque for this purchase
-                    c.execute('''SELECT 1 FROM cheques WHERE vendor_transaction_id=?''', (vendor_transaction_id,))
-                    if not c.fetchone():
-                        c.execute('''INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid, vendor_transaction_id)
-                                    VALUES (?, ?, ?, ?, ?, 0, ?)''',
-                                (date_iso, vendor_name, bank_name, cheque_due, amount, vendor_transaction_id))
-                    self.chequeCreated.emit()   # <-- ensure Cheque tab refreshes
-                    
-            elif ttype == "payment":
-                c.execute('''INSERT INTO vendor_transactions
-                    (vendor_id, date, type, amount, note, invoice_no, payment_mode)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                    (vendor_id, date_iso, ttype, amount, note, invoice_no, payment_mode)
-                )
-                # --------- DAILY EXPENSE LOGIC (always record payment as expense) ----------
-                # Compose notes: "Paid via (Mode of Payment)"
-                mode_label = payment_mode.strip() if payment_mode else "Other"
-                expense_note = f"Paid via {mode_label}"
-                # Get or create Vendors category
-                c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-                cat = c.fetchone()
-                if cat:
-                    cat_id = cat[0]
-                else:
-                    c.execute("INSERT INTO expense_categories (name) VALUES ('Vendors')")
-                    cat_id = c.lastrowid
-                # Avoid duplicates: check if similar expense already exists
-                c.execute('''SELECT id FROM daily_expense
-                            WHERE date=? AND amount=? AND category_id=? AND description=? AND notes=?''',
-                        (date_iso, amount, cat_id, vendor_name, expense_note))
-                if not c.fetchone():
-                    c.execute(
-                        '''INSERT INTO daily_expense (date, amount, category_id, description, notes)
-                        VALUES (?, ?, ?, ?, ?)''',
-                        (date_iso, amount, cat_id, vendor_name, expense_note)
-                    )
-            elif ttype == "return":
-                c.execute('''INSERT INTO vendor_transactions
-                    (vendor_id, date, type, amount, note)
-                    VALUES (?, ?, ?, ?, ?)''',
-                    (vendor_id, date_iso, ttype, amount, note)
+            try:
+                c.execute(
+                    "UPDATE vendors SET name=?, contact=?, opening_balance=? WHERE id=?",
+                    (new_name, new_contact, new_balance, vid)
                 )
+                conn.commit()
+            except Exception:
+                QMessageBox.warning(self, "Exists", "Vendor already exists.")
+            conn.close()
+            self.refresh_vendor_table()
+            self.refresh_vendor_combo()
+
+    def delete_vendor(self):
+        selected = self.vendor_table.currentRow()
+        if selected < 0 or selected >= len(self.filtered_vendors):
+            return
+        vendor = self.filtered_vendors[selected]
+        vid, name = vendor.id, vendor.name
+        reply = QMessageBox.question(
+            self, "Confirm",
+            f"Delete vendor '{name}'? This will also remove associated transactions and their cheques. "
+            "Payments already made stay in the cashflow.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            conn = get_conn()
+            # transactions and cheques go with the vendor; payments are unlinked, not deleted
+            # (trg_vendors_cascade_delete)
+            conn.execute("DELETE FROM vendors WHERE id=?", (vid,))
             conn.commit()
             conn.close()
+            self.refresh_vendor_table()
+            self.refresh_vendor_combo()
             self.refresh_transactions_table()
+            self.refresh_overview_table()
+            self.chequeCreated.emit()
+            self.cashflowChanged.emit()
+    
+def days_remaining(due_iso):
+    try:
+        due = datetime.strptime(due_iso, "%Y-%m-%d")
+        now = datetime.now()
+        return (due.date() - now.date()).days
+    except Exception:
+        return None
+        
+  
+class ChequeDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Add Cheque")
+        self.setMinimumWidth(400)
+        layout = QFormLayout(self)
+        self.cheque_date = QDateEdit()
+        self.cheque_date.setDisplayFormat("dd-MM-yyyy")
+        self.cheque_date.setCalendarPopup(True)
+        self.cheque_date.setDate(QDate.currentDate())
+        layout.addRow("Issue Date:", self.cheque_date)
 
-            # Refresh the Daily Tab and Dashboard reliably
-            if self.daily_tab is not None:
-                self.daily_tab.load_data()
-                if hasattr(self.daily_tab, "dashboard_tab") and self.daily_tab.dashboard_tab is not None:
-                    self.daily_tab.dashboard_tab.refresh()
+        # Vendor ComboBox for Company Name
+        self.company_name = QComboBox()
+        self.company_name.setEditable(True)
+        self.company_name.addItems(get_vendor_names())
+        self.company_name.setPlaceholderText("Select or type vendor name")
+        layout.addRow("Company Name:", self.company_name)
 
-    def add_transaction_from_dialog(self, dlg, vendor_id):
-        ttype = dlg.trans_type_combo.currentText().lower()
-        amount = parse_amount(dlg.trans_amount_input.text())
-        note = dlg.trans_note_input.text()
-        due_date_iso = dlg.trans_due_date.date().toString("yyyy-MM-dd")
-        net_terms = ""
-        if dlg.net_30.isChecked():
-            net_terms = "NET 30"
-        elif dlg.net_60.isChecked():
-            net_terms = "NET 60"
-        elif dlg.net_90.isChecked():
-            net_terms = "NET 90"
-        payment_mode = dlg.trans_payment_mode.currentText()
-        invoice_no = dlg.trans_invoice_input.text().strip()
-        entry_date_iso = dlg.trans_entry_date.date().toString("yyyy-MM-dd")
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute('''INSERT INTO vendor_transactions
-            (vendor_id, date, type, amount, note, due_date, invoice_no, payment_mode, net_terms)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-            (vendor_id, entry_date_iso, ttype, amount, note,
-                due_date_iso if ttype == "purchase" else None,
-                invoice_no,
-                payment_mode if ttype == "payment" else None,
-                net_terms if ttype == "purchase" else None)
+        self.bank_name = QLineEdit()
+        self.bank_name.setPlaceholderText("Bank Name")
+        layout.addRow("Bank Name:", self.bank_name)
+
+        self.due_date = QDateEdit()
+        self.due_date.setDisplayFormat("dd-MM-yyyy")
+        self.due_date.setCalendarPopup(True)
+        self.due_date.setDate(QDate.currentDate())
+        layout.addRow("Due Date:", self.due_date)
+
+        self.amount = QLineEdit()
+        self.amount.setPlaceholderText("Amount")
+        layout.addRow("Amount (AED):", self.amount)
+
+        btn_row = QHBoxLayout()
+        self.save_btn = QPushButton("Save")
+        self.save_btn.clicked.connect(self.accept)
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.reject)
+        btn_row.addWidget(self.save_btn)
+        btn_row.addWidget(self.cancel_btn)
+        layout.addRow(btn_row)
+
+    def get_values(self):
+        cheque_iso = self.cheque_date.date().toString("yyyy-MM-dd")
+        due_iso = self.due_date.date().toString("yyyy-MM-dd")
+        return (
+            cheque_iso,
+            self.company_name.currentText().strip(),
+            self.bank_name.text().strip(),
+            due_iso,
+            self.amount.text().strip()
         )
-        vendor_trans_id = c.lastrowid
-        if ttype == "payment":
-            c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-            cat_row = c.fetchone()
-            if cat_row:
-                cat_id = cat_row[0]
-                c.execute("SELECT name FROM vendors WHERE id=?", (vendor_id,))
-                vrow = c.fetchone()
-                vendor_name = vrow[0] if vrow else ""
-                descr = vendor_name
-                c.execute('''
-                    INSERT INTO daily_expense (date, amount, category_id, description, vendor_transaction_id)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (entry_date_iso, amount, cat_id, descr, vendor_trans_id))
-        conn.commit()
-        conn.close()
-    
-    def export_transactions_pdf(self):
-        idx = self.trans_vendor_combo.currentIndex()
-        if idx < 0:
-            QMessageBox.warning(self, "No Vendor Selected", "Please select a vendor to export transactions.")
-            return
-        vendor_id = self.trans_vendor_combo.itemData(idx)
-        vendor_name = self.trans_vendor_combo.currentText()
 
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT opening_balance FROM vendors WHERE id=?", (vendor_id,))
-        ob_row = c.fetchone()
-        opening_balance = ob_row[0] if ob_row else 0.0
+class ChequesTab(QWidget):
+    chequePaid = pyqtSignal()  # <--- Signal to notify when a cheque is paid
+    chequesChanged = pyqtSignal()
 
-        c.execute('''
-            SELECT date, type, amount, due_date
-            FROM vendor_transactions
-            WHERE vendor_id=?
-            ORDER BY date ASC, id ASC
-        ''', (vendor_id,))
-        rows = c.fetchall()
-        conn.close()
+    def __init__(self):
+        super().__init__()
+        self.layout = QVBoxLayout(self)
+        # ... rest of __init__ setup as before ...
 
-        # Prepare rows with running balance
-        data_rows = []
-        balance = opening_balance
-        # Insert opening balance as first row
-        data_rows.append({
-            "date": "",
-            "type": "Opening Balance",
-            "debit": f"{opening_balance:.2f}" if opening_balance > 0 else "",
-            "credit": f"{-opening_balance:.2f}" if opening_balance < 0 else "",
-            "balance": f"{balance:.2f}",
-            "due": ""
-        })
-        for date_str, ttype, amt, due in rows:
-            debit = credit = ""
-            if ttype == "purchase":
-                debit = f"{amt:.2f}"
-                balance += amt
-            elif ttype in ("payment", "return"):
-                credit = f"{amt:.2f}"
-                balance -= amt
-            data_rows.append({
-                "date": to_ddmmyyyy(date_str),
-                "type": ttype.capitalize(),
-                "debit": debit,
-                "credit": credit,
-                "balance": f"{balance:.2f}",
-                "due": to_ddmmyyyy(due) if due else ""
-            })
-
-            # New HTML (uploaded)
-        html = f"""
-        <!DOCTYPE html>
-        <html lang='en'>
-        <head>
-            <meta charset='UTF-8'>
-            <title>Vendor Transactions Report</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    background: #fff;
-                    font-size: 11px;
-                    margin: 30px 12px 40px 12px;
-                }}
-                h2 {{
-                    text-align: center;
-                    color: #fb700e;
-                    font-size: 25px;
-                    margin-bottom: 10px;
-                }}
-                h3 {{
-                    margin-bottom: 8px;
-                    font-size: 15px;
-                    text-align: center;
-                }}
-                .summary {{
-                display: flex;
-                flex-direction: row;
-                justify-content: space-between;
-                align-items: baseline;
-                font-size: 15px;
-                margin: 0 auto 18px auto;
-                max-width: 600px;
-                gap: 30px;
-            }}
-            .summary-col {{
-                display: flex;
-                flex-direction: row;
-                align-items: baseline;
-                white-space: nowrap;
-            }}
-            .summary-col b {{
-                margin-right: 4px;
-            }}
-            .amount {{
-                font-weight: bold;
-                margin-right: 4px;
-                min-width: 64px;
-                text-align: right;
-                display: inline-block;
-            }}
-            .aed {{
-                font-size: 12px;
-                margin-left: 2px;
-                color: #333;
-            }}
-                table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    background: white;
-                    font-size: 13px;
-                    margin-top: 10px;
-                }}
-                th, td {{
-                    border: 1px solid #ccc;
-                    padding: 8px 7px;
-                    text-align: left;
-                    color: #232627;
-                }}
-                th {{
-                    background-color: #232627;
-                    color: #fff;
-                    font-size: 13px;
-                    text-align: center;
-                }}
-                td:first-child, th:first-child {{
-                    text-align: left;
-                }}
-                tr.opening-balance td {{
-                    background: #ffe0b2 !important;
-                    font-weight: bold;
-                }}
-                tr:nth-child(even):not(.opening-balance) {{
-                    background-color: #fafafa;
-                }}
-                tfoot td {{
-                    border-top: 2px solid #232627;
-                    font-weight: bold;
-                    background: #f5f5f5;
-                }}
-                .footer {{
-                    margin-top: 45px;
-                    font-size: 12px;
-                    color: #888;
-                    text-align: right;
-                }}
-                .signature-section {{
-                    margin-top: 45px;
-                    font-size: 13px;
-                }}
-                .signature-line {{
-                    width: 200px;
-                    border-bottom: 1px solid #888;
-                    margin: 32px 0 2px 0;
-                }}
-                @media print {{
-                    body {{
-                        margin: 0;
-                        background: #fff;
-                    }}
-                    .footer, .signature-section {{
-                        page-break-inside: avoid;
-                    }}
-                    table, tr, td, th {{
-                        page-break-inside: avoid;
-                    }}
-                }}
-            </style>
-        </head>
-        <body>
-
-            <h2>Vendor Transactions Report</h2>
-            <h3>Vendor: <span style='color:#e53935'>{vendor_name}</span></h3>
-
-            <div class="summary">
-            <div class="summary-col">
-                <b>Opening Balance:</b>
-                <span class="amount">{opening_balance:,.2f}</span>
-                <span class="aed">AED</span>
-            </div>
-            <div class="summary-col">
-                <b>Current Balance:</b>
-                <span class="amount">{balance:,.2f}</span>
-                <span class="aed">AED</span>
-            </div>
-        </div>
+        btn_row = QHBoxLayout()
+        self.add_btn = QPushButton("Add Cheque")
+        self.add_btn.clicked.connect(self.show_add_dialog)
+        btn_row.addWidget(self.add_btn)
+        btn_row.addStretch()
+        self.layout.addLayout(btn_row)
 
-            <table>
-                <thead>
-                    <tr>
-                        <th>Date</th>
-                        <th>Type</th>
-                        <th>Debit (AED)</th>
-                        <th>Credit (AED)</th>
-                        <th>Balance (AED)</th>
-                        <th>Due Date</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
+        self.add_shortcut = QShortcut(QKeySequence("F1"), self)
+        self.add_shortcut.activated.connect(self.show_add_dialog)
+        self.add_btn.setToolTip("Shortcut: F1")
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels([
+            "Issue Date", "Company", "Bank", "Due Date", "Amount (AED)", "Days Remaining", "ID"
+        ])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setColumnHidden(6, True)
+        self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_context_menu)
+        self.layout.addWidget(self.table)
 
-        # Opening balance row
-        if data_rows:
-            opening = data_rows[0]
-            html += f"""
-                <tr class="opening-balance">
-                    <td>{opening['date']}</td>
-                    <td>{opening['type']}</td>
-                    <td>{opening['debit']}</td>
-                    <td>{opening['credit']}</td>
-                    <td>{opening['balance']}</td>
-                    <td>{opening['due']}</td>
-                </tr>
-            """
-        # All transaction rows
-        for row in data_rows[1:]:
-            html += f"""
-                <tr>
-                    <td>{row['date']}</td>
-                    <td>{row['type']}</td>
-                    <td>{row['debit']}</td>
-                    <td>{row['credit']}</td>
-                    <td>{row['balance']}</td>
-                    <td>{row['due']}</td>
-                </tr>
-            """
+        self.remaining_label = QLabel("")
+        remaining_font = QFont()
+        remaining_font.setPointSize(15)
+        remaining_font.setBold(True)
+        self.remaining_label.setFont(remaining_font)
+        self.remaining_label.setAlignment(Qt.AlignmentFlag.AlignRight)
+        self.remaining_label.setStyleSheet("color:#43a047; margin:8px 12px 0 0;")
+        self.layout.addWidget(self.remaining_label)
 
-        html += """
-                </tbody>
-            </table>
-
-            <div class="signature-section">
-                <div style="float:left;">
-                    <div class="signature-line"></div>
-                    <div>Prepared By</div>
-                </div>
-                <div style="float:right;">
-                    <div class="signature-line"></div>
-                    <div>Approved By</div>
-                </div>
-                <div style="clear:both;"></div>
-            </div>
+        self.ensure_db()
+        self.refresh()
 
-            <div class="footer">
-                Generated on: {generated_date}
-            </div>
+    def ensure_db(self):
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS cheques (
+                id INTEGER PRIMARY KEY,
+                cheque_date TEXT,
+                company_name TEXT,
+                bank_name TEXT,
+                due_date TEXT,
+                amount INTEGER,
+                is_paid INTEGER DEFAULT 0
+            )
+        ''')
+        try:
+            c.execute("ALTER TABLE cheques ADD COLUMN is_paid INTEGER DEFAULT 0")
+        except Exception:
+            pass  # Already exists
+        conn.commit()
+        conn.close()
 
-        </body>
-        </html>
-        """.format(generated_date=datetime.now().strftime("%d-%m-%Y %H:%M"))
-
-       # 1. Preview dialog with QWebEngineView
-        preview_dialog = QDialog(self)
-        preview_dialog.setWindowTitle("Vendor Transactions Print Preview")
-        preview_dialog.resize(1200, 900)
-        layout = QVBoxLayout(preview_dialog)
-        view = QWebEngineView(preview_dialog)
-        layout.addWidget(view)
-        btn_pdf = QPushButton("Print")
-        btn_pdf.setEnabled(False)
-        layout.addWidget(btn_pdf)
-        preview_dialog.setLayout(layout)
-
-        def on_html_loaded(ok):
-            btn_pdf.setEnabled(ok)
-        view.loadFinished.connect(on_html_loaded)
-        view.setHtml(html)
-
-        def on_html_loaded(ok):
-            btn_pdf.setEnabled(ok)
-        view.loadFinished.connect(on_html_loaded)
-        view.setHtml(html)
-
-        # Now print directly (open print dialog)
-        def handle_print():
-            file_dialog = QFileDialog()
-            file_path, _ = file_dialog.getSaveFileName(self, "Save Vendor Transactions PDF", "VendorTransactions.pdf", "PDF Files (*.pdf)")
-            if not file_path:
+    def show_add_dialog(self):
+        dialog = ChequeDialog(self)
+        if dialog.exec():
+            cheque_iso, company, bank, due_iso, amount = dialog.get_values()
+            amt = parse_amount(amount)
+            if amt <= 0 or not company or not bank:
+                QMessageBox.warning(self, "Error", "Please enter valid data.")
                 return
-
-            page_layout = QPageLayout(
-                QPageSize(QPageSize.PageSizeId.A4),
-                QPageLayout.Orientation.Portrait,
-                QMarginsF(30, 30, 30, 30)  # margins in mm
+            conn = get_conn()
+            c = conn.cursor()
+            c.execute(
+                "INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid) VALUES (?, ?, ?, ?, ?, 0)",
+                (cheque_iso, company, bank, due_iso, amt)
             )
+            conn.commit()
+            conn.close()
+            self.refresh()
+            self.chequesChanged.emit()
+
+    def refresh(self):
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("SELECT id, cheque_date, company_name, bank_name, due_date, amount, is_paid FROM cheques ORDER BY due_date ASC")
+        rows = c.fetchall()
+        conn.close()
 
-            view.page().printToPdf(file_path, page_layout)
-            QMessageBox.information(self, "Export PDF", f"PDF exported:\n{file_path}")
+        # cheque id -> ChequeRow, used for in-place day updates
+        self.cheque_rows = {}
+        self.table.setRowCount(len(rows))
+        for i, (cid, cdate, company, bank, due, amt, is_paid) in enumerate(rows):
+            self.table.setItem(i, 0, self._center_item(to_ddmmyyyy(cdate)))
+            self.table.setItem(i, 1, self._center_item(company))
+            self.table.setItem(i, 2, self._center_item(bank))
+            self.table.setItem(i, 3, self._center_item(to_ddmmyyyy(due)))
+            self.table.setItem(i, 4, self._center_item(fmt_money(amt)))
+            self.cheque_rows[cid] = ChequeRow(i, due, amt, is_paid)
+            self._set_days_cell(i, due, is_paid)
+            self.table.setItem(i, 6, QTableWidgetItem(str(cid)))
+            self.table.setRowHeight(i, 34)
+        self.table.setColumnHidden(6, True)
+        self._update_remaining_label()
+
+    def _set_days_cell(self, row, due, is_paid):
+        days = days_remaining(due)
+        days_item = QTableWidgetItem()
+        days_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        days_item.setFont(self._bold_font())
+        if is_paid:
+            days_item.setText("Paid")
+            days_item.setForeground(Qt.GlobalColor.green)
+        elif days is None:
+            days_item.setText("-")
+            days_item.setForeground(Qt.GlobalColor.gray)
+        elif days > 10:
+            days_item.setText(f"{days} days")
+            days_item.setForeground(Qt.GlobalColor.green)
+        elif 0 <= days <= 10:
+            days_item.setText(f"{days} days")
+            days_item.setForeground(Qt.GlobalColor.yellow)
+        else:
+            days_item.setText(f"Overdue by {-days} days")
+            days_item.setForeground(Qt.GlobalColor.red)
+        self.table.setItem(row, 5, days_item)
+
+    def _update_remaining_label(self):
+        # Only sum up cheques that are not paid and not overdue
+        total_due = 0
+        for _, due, amt, is_paid in self.cheque_rows.values():
+            days = days_remaining(due)
+            if not is_paid and days is not None and days >= 0:
+                total_due += amt
+        self.remaining_label.setText(f"Total Remaining Cheques Due: {fmt_money(total_due)} AED")
+
+    def refresh_days(self):
+        """Recomputes the Days Remaining column in place after the date changes, without re-querying."""
+        for row, due, _, is_paid in self.cheque_rows.values():
+            if not is_paid:
+                self._set_days_cell(row, due, is_paid)
+        self._update_remaining_label()
+
+    def update_cheque_row(self, cheque_id):
+        entry = self.cheque_rows.get(cheque_id)
+        if entry:
+            row, due, _, is_paid = entry
+            self._set_days_cell(row, due, is_paid)
 
-        btn_pdf.clicked.connect(handle_print)
+    def _bold_font(self):
+        font = self.table.font()
+        font.setBold(True)
+        font.setPointSize(13)
+        return font
 
-        preview_dialog.exec()
+    def _center_item(self, text):
+        item = QTableWidgetItem(text)
+        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+        return item
 
-    def show_transaction_context_menu(self, pos: QPoint):
-        index = self.trans_table.indexAt(pos)
+    def show_context_menu(self, pos: QPoint):
+        index = self.table.indexAt(pos)
         if not index.isValid():
             return
         row = index.row()
-        idx = self.trans_vendor_combo.currentIndex()
-        if idx == -1:
-            return
-        vendor_id = self.trans_vendor_combo.itemData(idx)
-        trans_id = self.get_transaction_id_from_row(row, vendor_id)
-        if trans_id is None:
-            return
-        menu = QMenu(self)
-        edit_action = menu.addAction("Edit Transaction")
-        delete_action = menu.addAction("Delete Transaction")
-        action = menu.exec(self.trans_table.viewport().mapToGlobal(pos))
-        if action == edit_action:
-            self.edit_transaction(row, trans_id, vendor_id)
-        elif action == delete_action:
-            self.delete_transaction(trans_id)
+        cheque_id = int(self.table.item(row, 6).text())
+        is_paid = self.table.item(row, 5).text().strip().lower() == "paid"
 
-    def handle_transaction_double_click(self, index):
-        row = index.row()
-        idx = self.trans_vendor_combo.currentIndex()
-        if idx == -1:
-            return
-        vendor_id = self.trans_vendor_combo.itemData(idx)
-        trans_id = self.get_transaction_id_from_row(row, vendor_id)
-        if trans_id is not None:
-            self.edit_transaction(row, trans_id, vendor_id)
+        menu = QMenu(self)
+        if not is_paid:
+            mark_paid_action = menu.addAction("Mark as Paid")
+        delete_action = menu.addAction("Delete Cheque")
+        action = menu.exec(self.table.viewport().mapToGlobal(pos))
+        if action:
+            if not is_paid and action == mark_paid_action:
+                self.mark_cheque_paid(cheque_id)
+            elif action == delete_action:
+                self.delete_cheque(cheque_id)
 
-    def get_transaction_id_from_row(self, row, vendor_id):
-        date_str = self.trans_table.item(row, 0).text()         # Date
-        invoice_no = self.trans_table.item(row, 1).text()       # Invoice No.
-        ttype = self.trans_table.item(row, 2).text().lower()    # Type
-        debit = self.trans_table.item(row, 3).text()            # Debit (AED)
-        credit = self.trans_table.item(row, 4).text()           # Credit (AED)
-        # No NET Terms column anymore
-        amount = 0.0
-        if debit:
-            amount = parse_amount(debit)
-        elif credit:
-            amount = parse_amount(credit)
-        try:
-            dt = datetime.strptime(date_str, "%d-%m-%Y")
-            date_iso = dt.strftime("%Y-%m-%d")
-        except Exception:
-            date_iso = date_str
+    def mark_cheque_paid(self, cheque_id):
         conn = get_conn()
-        c = conn.cursor()
-        c.execute('''SELECT id FROM vendor_transactions
-                    WHERE vendor_id=? AND date=? AND type=? AND amount=? AND (invoice_no IS ? OR invoice_no=?)''',
-                (vendor_id, date_iso, ttype, amount, invoice_no, invoice_no))
-        row = c.fetchone()
+        pay_cheque(conn, cheque_id)
+        conn.commit()
         conn.close()
-        return row[0] if row else None
-
-    def edit_transaction(self, row, trans_id, vendor_id):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute('''SELECT date, type, amount, due_date, note, invoice_no, payment_mode, net_terms
-                    FROM vendor_transactions WHERE id=?''', (trans_id,))
-        tr = c.fetchone()
-        if not tr:
-            conn.close()
-            return
-        vendor_name = self.trans_vendor_combo.currentText()
-        # --- Fetch cheque info ---
-        c.execute("SELECT bank_name, due_date FROM cheques WHERE vendor_transaction_id=?", (trans_id,))
-        cheque_info = c.fetchone()
-        if cheque_info:
-            bank_name, cheque_due = cheque_info
-        else:
-            bank_name, cheque_due = None, None
-        tr_with_cheque = tr + (bank_name, cheque_due)
-        dlg = TransactionEntryDialog(self, vendor_id, vendor_name, ttype=tr[1], edit_mode=True, trans_id=trans_id, init_data=tr_with_cheque)
-        if dlg.exec():
-            ttype, date_iso, amt, invoice_no, due_iso, note, payment_mode, bank_name, cheque_due = dlg.get_values()
-            amount = parse_amount(amt)
-            if amount <= 0:
-                QMessageBox.warning(self, "Invalid", "Amount must be greater than zero.")
-                return
-            # --------- PATCH STARTS HERE ---------
-            old_date, old_type, old_amount, *_ = tr
-            old_payment_mode = tr[6] if len(tr) > 6 else None
-            # Update vendor_transactions as before
-            if ttype == "purchase":
-                c.execute('''UPDATE vendor_transactions
-                    SET date=?, type=?, amount=?, note=?, due_date=?, invoice_no=?
-                    WHERE id=?''',
-                    (date_iso, ttype, amount, note, due_iso, invoice_no, trans_id)
-                )
-                # Cheque logic unchanged...
-                if bank_name:
-                    c.execute("SELECT id FROM cheques WHERE vendor_transaction_id=?", (trans_id,))
-                    cheque_row = c.fetchone()
-                    if cheque_row:
-                        c.execute('''
-                            UPDATE cheques
-                            SET cheque_date=?, company_name=?, bank_name=?, due_date=?, amount=?
-                            WHERE vendor_transaction_id=?
-                        ''', (date_iso, vendor_name, bank_name, cheque_due, amount, trans_id))
-                    else:
-                        c.execute('''
-                            INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid, vendor_transaction_id)
-                            VALUES (?, ?, ?, ?, ?, 0, ?)
-                        ''', (date_iso, vendor_name, bank_name, cheque_due, amount, trans_id))
-                else:
-                    c.execute('DELETE FROM cheques WHERE vendor_transaction_id=?', (trans_id,))
-                self.chequeCreated.emit()
+        self.refresh()
+        self.chequePaid.emit()
+        self.chequesChanged.emit()
 
-            elif ttype == "payment":
-                c.execute('''UPDATE vendor_transactions
-                    SET date=?, type=?, amount=?, note=?, invoice_no=?, payment_mode=?
-                    WHERE id=?''',
-                    (date_iso, ttype, amount, note, invoice_no, payment_mode, trans_id)
-                )
-                # --- PATCH: Update daily_expense entry ---
-                c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-                cat_row = c.fetchone()
-                if cat_row:
-                    cat_id = cat_row[0]
-                    # Find the old daily_expense record for this vendor transaction
-                    c.execute(
-                        '''SELECT id FROM daily_expense
-                           WHERE category_id=? AND description=? AND notes=? AND date=? AND amount=?''',
-                        (cat_id, vendor_name, f"Paid via {old_payment_mode}" if old_payment_mode else "", old_date, old_amount)
-                    )
-                    exp_row = c.fetchone()
-                    if exp_row:
-                        exp_id = exp_row[0]
-                        new_notes = f"Paid via {payment_mode}" if payment_mode else ""
-                        c.execute(
-                            '''UPDATE daily_expense
-                               SET date=?, amount=?, notes=?
-                               WHERE id=?''',
-                            (date_iso, amount, new_notes, exp_id)
-                        )
-            elif ttype == "return":
-                c.execute('''UPDATE vendor_transactions
-                    SET date=?, type=?, amount=?, note=?
-                    WHERE id=?''',
-                    (date_iso, ttype, amount, note, trans_id)
-                )
+    def delete_cheque(self, cheque_id):
+        reply = QMessageBox.question(self, "Confirm Delete", "Are you sure you want to delete this cheque?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            conn = get_conn()
+            c = conn.cursor()
+            c.execute("DELETE FROM cheques WHERE id=?", (cheque_id,))
             conn.commit()
             conn.close()
-            self.refresh_transactions_table()
-            self.refresh_overview_table()
+            self.refresh()
+            self.chequesChanged.emit()
 
-            if self.daily_tab is not None:
-                self.daily_tab.load_data()
-                if hasattr(self.daily_tab, "dashboard_tab") and self.daily_tab.dashboard_tab is not None:
-                    self.daily_tab.dashboard_tab.refresh()
+# --- Due-date scheduler (cheque due dates and document expiries) ---
+CHEQUE_ALERT_DAYS = 10
+DOCUMENT_ALERT_DAYS = 30
 
-    def delete_transaction(self, trans_id):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT type, vendor_id, date, amount, payment_mode FROM vendor_transactions WHERE id=?", (trans_id,))
-        tr = c.fetchone()
-        tr_type = tr[0] if tr else None
-        vendor_id = tr[1] if tr else None
-        date = tr[2] if tr else None
-        amount = tr[3] if tr else None
-        payment_mode = tr[4] if tr else None
+class DueDateScheduler(QObject):
+    """
+    Keeps a min-heap of the dates on which an unpaid cheque or a document
+    changes status (enters its alert window, falls due, expires). A timer wakes
+    up after midnight (and at least hourly), pops only the entries that are due
+    and reports those items, so the tabs can update just the affected rows.
+    """
+    itemChanged = pyqtSignal(str, object)  # ("cheque", cheque id) or ("document", (description, category, expiry))
+    dayChanged = pyqtSignal()
+    notify = pyqtSignal(str, str)
 
-        reply = QMessageBox.question(
-            self, "Confirm Delete",
-            "Delete this vendor transaction?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
-        if reply != QMessageBox.StandardButton.Yes:
-            conn.close()
-            return
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.heap = []
+        self.today = date.today()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.process_due)
+
+    def start(self):
+        self.rebuild()
+        self.announce_pending()
+        self.schedule_next()
+
+    def rebuild(self):
+        today = date.today()
+        heap = []
+        conn = get_conn()
+        rows = conn.execute(
+            "SELECT id, company_name, due_date, amount FROM cheques WHERE is_paid=0 AND due_date >= ?",
+            (today.isoformat(),)
+        ).fetchall()
+        conn.close()
+        for cid, company, due_iso, amount in rows:
+            try:
+                due = date.fromisoformat(due_iso)
+            except (TypeError, ValueError):
+                continue
+            label = f"Cheque to {company} ({fmt_money(amount, True)} AED)"
+            for when, text in (
+                (due - timedelta(days=CHEQUE_ALERT_DAYS), f"{label} is due in {CHEQUE_ALERT_DAYS} days"),
+                (due, f"{label} is due today"),
+                (due + timedelta(days=1), f"{label} is overdue"),
+            ):
+                if when > today:
+                    heap.append((when, len(heap), "cheque", cid, text))
+        for doc in load_documents_from_db():
+            try:
+                expiry = datetime.strptime(doc["expiry_date"], "%d/%m/%Y").date()
+            except ValueError:
+                continue
+            key = (doc["description"], doc["category"], doc["expiry_date"])
+            for when, text in (
+                (expiry - timedelta(days=DOCUMENT_ALERT_DAYS), f"{doc['description']} expires on {doc['expiry_date']}"),
+                (expiry + timedelta(days=1), f"{doc['description']} has expired"),
+            ):
+                if when > today:
+                    heap.append((when, len(heap), "document", key, text))
+        heapq.heapify(heap)
+        self.heap = heap
+
+    def announce_pending(self):
+        today = date.today()
+        conn = get_conn()
+        overdue, due_soon = conn.execute("""
+            SELECT COALESCE(SUM(due_date < :today), 0), COALESCE(SUM(due_date >= :today), 0)
+            FROM cheques WHERE is_paid=0 AND due_date <= :soon
+        """, {"today": today.isoformat(), "soon": (today + timedelta(days=CHEQUE_ALERT_DAYS)).isoformat()}).fetchone()
+        conn.close()
+        expiring = 0
+        for doc in load_documents_from_db():
+            try:
+                expiry = datetime.strptime(doc["expiry_date"], "%d/%m/%Y").date()
+            except ValueError:
+                continue
+            if (expiry - today).days <= DOCUMENT_ALERT_DAYS:
+                expiring += 1
+        parts = []
+        if overdue:
+            parts.append(f"{overdue} overdue cheque(s)")
+        if due_soon:
+            parts.append(f"{due_soon} cheque(s) due within {CHEQUE_ALERT_DAYS} days")
+        if expiring:
+            parts.append(f"{expiring} document(s) expired or expiring soon")
+        if parts:
+            self.notify.emit("Upcoming due dates", ", ".join(parts))
+
+    def process_due(self):
+        today = date.today()
+        if today != self.today:
+            self.today = today
+            self.dayChanged.emit()
+        messages = []
+        while self.heap and self.heap[0][0] <= today:
+            _, _, kind, key, text = heapq.heappop(self.heap)
+            self.itemChanged.emit(kind, key)
+            messages.append(text)
+        if messages:
+            self.notify.emit("Due date reminder", "\n".join(messages))
+        self.schedule_next()
+
+    def schedule_next(self):
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        msecs = int((midnight - now).total_seconds() * 1000) + 1000
+        self.timer.start(min(msecs, 3600 * 1000))
+
+# --- Batch report runner (month-end reports and vendor statements) ---
+_batch_conn = None
+_batch_app = None
+
+def render_html_to_pdf(html, file_path):
+    writer = QPdfWriter(file_path)
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    writer.setPageMargins(QMarginsF(10, 10, 10, 10), QPageLayout.Unit.Millimeter)
+    doc = QTextDocument()
+    doc.setHtml(html)
+    doc.print(writer)
+
+def safe_file_name(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text or "").strip("_") or "unnamed"
+
+def month_range(first, last):
+    """Yields (year, month) from first to last inclusive; both are (year, month) tuples."""
+    year, month = first
+    while (year, month) <= tuple(last):
+        yield year, month
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+def _batch_worker_init(db_path):
+    # Runs once in every pool process: each worker gets its own read-only connection
+    global _batch_conn, _batch_app
+    _batch_app = QGuiApplication.instance() or QGuiApplication(["nbs-batch", "-platform", "offscreen"])
+    _batch_conn = get_readonly_conn(db_path)
+
+def _batch_report_job(job, out_dir, logo_html):
+    started = time.perf_counter()
+    result = dict(job)
+    try:
+        if job["kind"] == "monthly":
+            year, month = job["year"], job["month"]
+            report = fetch_monthly_report(_batch_conn, month, year)
+            html = build_monthly_report_html(report, month, year, logo_html)
+            file_name = f"MonthlyReport_{year}-{month:02}.pdf"
+            result["rows"] = len(report["rows"])
+        else:
+            opening_balance, rows = fetch_vendor_statement(_batch_conn, job["vendor_id"])
+            data_rows, balance = build_vendor_statement_rows(opening_balance, rows)
+            html = build_vendor_statement_html(job["vendor_name"], opening_balance, balance, data_rows)
+            file_name = f"VendorStatement_{job['vendor_id']}_{safe_file_name(job['vendor_name'])}.pdf"
+            result["rows"] = len(rows)
+            result["closing_balance"] = fmt_money(balance)
+        render_html_to_pdf(html, os.path.join(out_dir, file_name))
+        result["file"] = file_name
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_batch_reports(db_path, out_dir, months=(), vendor_ids=None, workers=None, progress=None):
+    """
+    Exports one monthly report per (year, month) and one statement per vendor
+    across a process pool, then writes manifest.json into out_dir.
+    vendor_ids=None exports every vendor; an empty list exports none.
+    """
+    db_path = os.path.abspath(db_path)
+    os.makedirs(out_dir, exist_ok=True)
+    conn = get_readonly_conn(db_path)
+    vendors = conn.execute("SELECT id, name FROM vendors ORDER BY name COLLATE NOCASE ASC").fetchall()
+    conn.close()
+    if vendor_ids is not None:
+        wanted = set(vendor_ids)
+        vendors = [(vid, name) for vid, name in vendors if vid in wanted]
+
+    jobs = [{"kind": "monthly", "year": y, "month": m} for y, m in months]
+    jobs += [{"kind": "vendor", "vendor_id": vid, "vendor_name": name} for vid, name in vendors]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    logo_html = get_logo_html()
+
+    started = time.perf_counter()
+    results = []
+    if jobs:
+        # spawn keeps the workers clean of the parent's Qt state on every platform
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_batch_worker_init, initargs=(db_path,)) as pool:
+            futures = [pool.submit(_batch_report_job, job, out_dir, logo_html) for job in jobs]
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if progress:
+                    progress(done, len(jobs))
+    results.sort(key=lambda r: (r["kind"], r.get("year", 0), r.get("month", 0), r.get("vendor_name", "")))
+
+    manifest = {
+        "generated_on": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "database": db_path,
+        "output_dir": os.path.abspath(out_dir),
+        "workers": workers,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "jobs": results,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def parse_year_month(text):
+    try:
+        dt = datetime.strptime(text, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {text!r}")
+    return dt.year, dt.month
+
+def batch_reports_cli(argv):
+    parser = argparse.ArgumentParser(
+        prog="NBS --batch-reports",
+        description="Export monthly reports and vendor statements to PDF in parallel."
+    )
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    parser.add_argument("--out", required=True, help="output directory for the PDFs and manifest.json")
+    parser.add_argument("--from", dest="month_from", type=parse_year_month, help="first month, YYYY-MM")
+    parser.add_argument("--to", dest="month_to", type=parse_year_month, help="last month, YYYY-MM (default: --from)")
+    parser.add_argument("--vendor", action="append", default=[], help="vendor name to export (repeatable)")
+    parser.add_argument("--all-vendors", action="store_true", help="export a statement for every vendor")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    months = []
+    if args.month_from:
+        months = list(month_range(args.month_from, args.month_to or args.month_from))
+    vendor_ids = []
+    if args.all_vendors:
+        vendor_ids = None
+    elif args.vendor:
+        conn = get_readonly_conn(args.db)
+        by_name = {name.lower(): vid for vid, name in conn.execute("SELECT id, name FROM vendors")}
+        conn.close()
+        missing = [v for v in args.vendor if v.lower() not in by_name]
+        if missing:
+            parser.error("unknown vendor(s): " + ", ".join(missing))
+        vendor_ids = [by_name[v.lower()] for v in args.vendor]
+    if not months and vendor_ids == []:
+        parser.error("nothing to export: give --from/--to and/or --vendor/--all-vendors")
+
+    manifest = run_batch_reports(
+        args.db, args.out, months, vendor_ids, args.workers,
+        progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True)
+    )
+    print(f"\n{manifest['ok']} exported, {manifest['failed']} failed in {manifest['elapsed_seconds']:.1f}s")
+    for r in manifest["jobs"]:
+        if r["status"] != "ok":
+            print(f"  {r['kind']}: {r.get('vendor_name') or '%d-%02d' % (r['year'], r['month'])}: {r['error']}")
+    return 0 if manifest["failed"] == 0 else 1
+
+# --- Branch consolidation ---
+CONSOLIDATION_COLUMNS = (
+    ("income", "Income"), ("expense", "Expense"), ("net", "Net"), ("capital", "Capital"),
+    ("payable", "A/P"), ("salaries", "Salaries"), ("advances", "Advances"), ("deductions", "Deductions"),
+)
 
-        # --- Cheque deletion for purchase ---
-        if tr_type == "purchase":
-            c.execute("DELETE FROM cheques WHERE vendor_transaction_id=?", (trans_id,))
-            self.chequeCreated.emit()
+def scan_branch(db_path, date_from, date_to):
+    """
+    Cashflow and payroll totals over [date_from, date_to] and accounts payable
+    as of date_to for one branch file, in fils. Closed years are read from the
+    branch's archives. Any variant's database works: missing tables or columns
+    count as zero and are listed under "missing", and files from before the
+    fils migration (user_version 0, REAL AED) are scaled in the queries.
+    """
+    result = {"branch": os.path.splitext(os.path.basename(db_path))[0], "path": db_path, "missing": []}
+    result.update((key, 0) for key, _ in CONSOLIDATION_COLUMNS)
+    try:
+        conn = get_readonly_conn(db_path)
+    except sqlite3.Error as e:
+        result["error"] = str(e)
+        return result
+    try:
+        schema = {}
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table'"):
+            schema[name] = {info[1] for info in conn.execute(f"PRAGMA table_info('{name}')")}
+        result["legacy_units"] = conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION_FILS
+
+        def money(col):
+            if result["legacy_units"]:
+                return f"CAST(ROUND(COALESCE({col}, 0) * {MONEY_SCALE}) AS INTEGER)"
+            return f"COALESCE({col}, 0)"
+
+        def usable(table, *columns):
+            if table not in schema:
+                result["missing"].append(table)
+                return False
+            absent = [f"{table}.{col}" for col in columns if col not in schema[table]]
+            result["missing"].extend(absent)
+            return not absent
+
+        parts = [
+            f"SELECT '{key}', SUM({money('amount')}) "
+            f"FROM {ledger_source(conn, table, ('date', 'amount'), date_from, date_to)} WHERE date BETWEEN ? AND ?"
+            for key, table in (("income", "daily_income"), ("expense", "daily_expense"), ("capital", "daily_capital"))
+            if usable(table, "date", "amount")
+        ]
+        if parts:
+            rows = conn.execute(" UNION ALL ".join(parts), (date_from, date_to) * len(parts)).fetchall()
+            result.update((key, total or 0) for key, total in rows)
+        result["net"] = result["income"] - result["expense"]
+
+        if usable("employee_payroll", "date", "type", "debit", "credit"):
+            payroll_src = ledger_source(conn, "employee_payroll", ("date", "type", "debit", "credit"), date_from, date_to)
+            salaries, advances, deductions = conn.execute(f"""
+                SELECT COALESCE(SUM(CASE WHEN type = 'Salary Payment' THEN {money('debit')} END), 0),
+                       COALESCE(SUM(CASE WHEN type = 'Advance' THEN {money('debit')} END), 0),
+                       COALESCE(SUM(CASE WHEN type = 'Deduction' THEN {money('credit')} END), 0)
+                FROM {payroll_src} WHERE date BETWEEN ? AND ?
+            """, (date_from, date_to)).fetchone()
+            result.update(salaries=salaries, advances=advances, deductions=deductions)
+
+        if usable("vendors", "id") and usable("vendor_transactions", "vendor_id", "date", "type", "amount"):
+            opening = money("v.opening_balance") if "opening_balance" in schema["vendors"] else "0"
+            vt_src, carried = "vendor_transactions", ""
+            closed = get_closed_through(conn)
+            if closed is not None and date_to <= f"{closed}-12-31":
+                # as in vendor_balance_as_of: the first archive holding date_to, without the live carry-forward of its year
+                year = conn.execute("SELECT MIN(year) FROM main.fiscal_archives WHERE year >= ?",
+                                    (int(date_to[:4]),)).fetchone()[0]
+                vt_src = ledger_source(conn, "vendor_transactions", ("vendor_id", "date", "type", "amount"),
+                                       f"{year}-12-31", f"{year}-12-31")
+                carried = f"AND NOT (vt.type = 'carry_forward' AND vt.date = '{year}-12-31')"
+            result["payable"] = conn.execute(f"""
+                SELECT COALESCE(SUM(MAX(balance, 0)), 0) FROM (
+                    SELECT {opening} + COALESCE(SUM(CASE vt.type WHEN 'purchase' THEN {money('vt.amount')}
+                                                     WHEN 'payment' THEN -{money('vt.amount')}
+                                                     WHEN 'return' THEN -{money('vt.amount')}
+                                                     WHEN 'carry_forward' THEN {money('vt.amount')} ELSE 0 END), 0) AS balance
+                    FROM vendors v LEFT JOIN {vt_src} vt ON vt.vendor_id = v.id AND vt.date <= ? {carried}
+                    GROUP BY v.id
+                )
+            """, (date_to,)).fetchone()[0]
+    except (sqlite3.Error, ValueError) as e:
+        result["error"] = str(e)
+    finally:
+        conn.close()
+    return result
 
-        # --- Delete from daily_expense for payment ---
-        if tr_type == "payment":
-            # Get vendor name
-            c.execute("SELECT name FROM vendors WHERE id=?", (vendor_id,))
-            vrow = c.fetchone()
-            vendor_name = vrow[0] if vrow else ""
-            # Get Vendors expense category ID
-            c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-            cat = c.fetchone()
-            cat_id = cat[0] if cat else None
-            if cat_id:
-                # Compose notes as in your insert/update logic
-                notes = f"Paid via {payment_mode}" if payment_mode else ""
-                c.execute('''DELETE FROM daily_expense
-                             WHERE date=? AND amount=? AND category_id=? AND description=? AND notes=?''',
-                          (date, amount, cat_id, vendor_name, notes))
+def consolidate_branches(db_paths, date_from, date_to):
+    """
+    Scans every branch on its own worker thread (sqlite releases the GIL while
+    it runs a query) and returns (per-branch results, consolidated totals);
+    branches that failed to open are left out of the totals.
+    """
+    with ThreadPoolExecutor(max_workers=max(len(db_paths), 1), thread_name_prefix="branch-scan") as pool:
+        results = list(pool.map(lambda path: scan_branch(path, date_from, date_to), db_paths))
+    total = {key: sum(r[key] for r in results if "error" not in r) for key, _ in CONSOLIDATION_COLUMNS}
+    return results, total
+
+def consolidate_cli(argv):
+    parser = argparse.ArgumentParser(
+        prog="NBS --consolidate",
+        description="Consolidated cashflow, A/P and payroll totals across branch databases."
+    )
+    parser.add_argument("--branch", action="append", required=True, help="branch database file (repeatable)")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                        default=date.today().replace(month=1, day=1), help="first day, YYYY-MM-DD (default: 1 January)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=date.today(),
+                        help="last day, YYYY-MM-DD (default: today)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results, total = consolidate_branches(args.branch, args.date_from.isoformat(), args.date_to.isoformat())
+    if args.json:
+        print(json.dumps({"from": args.date_from.isoformat(), "to": args.date_to.isoformat(),
+                          "branches": results, "total": total}, indent=2))
+    else:
+        header = ["Branch"] + [label for _, label in CONSOLIDATION_COLUMNS]
+        lines = [header]
+        for r in results:
+            if "error" in r:
+                lines.append([r["branch"], f"error: {r['error']}"])
+            else:
+                lines.append([r["branch"]] + [fmt_money(r[key], grouping=True) for key, _ in CONSOLIDATION_COLUMNS])
+        lines.append(["Consolidated"] + [fmt_money(total[key], grouping=True) for key, _ in CONSOLIDATION_COLUMNS])
+        widths = [max(len(line[i]) for line in lines if i < len(line)) for i in range(len(header))]
+        for line in lines:
+            print("  ".join(cell.rjust(widths[i]) if i else cell.ljust(widths[i]) for i, cell in enumerate(line)))
+        for r in results:
+            if r.get("missing"):
+                print(f"{r['branch']}: no {', '.join(r['missing'])} (counted as zero)")
+    return 0 if all("error" not in r for r in results) else 1
+
+# --- Bank reconciliation ---
+RECON_DATE_TOLERANCE = 3  # days between the bank date and the ledger date
+RECON_CHEQUE_TOLERANCE = 7  # cheques clear within a few days of their due date
+BANK_DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%d-%b-%Y", "%d %b %Y", "%d/%m/%y")
+BANK_COLUMN_NAMES = {
+    "date": ("date", "transaction date", "txn date", "posting date", "value date"),
+    "description": ("description", "details", "transaction details", "narration", "particulars", "remarks"),
+    "reference": ("reference", "ref", "ref no", "reference no", "cheque no", "cheque number", "chq no"),
+    "amount": ("amount", "amount (aed)", "amount aed"),
+    "debit": ("debit", "debit amount", "withdrawal", "withdrawals", "money out", "dr"),
+    "credit": ("credit", "credit amount", "deposit", "deposits", "money in", "cr"),
+}
+RECON_TABLE_LABELS = {
+    "daily_expense": "Expense", "vendor_transactions": "Vendor Payment", "cheques": "Cheque",
+    "daily_income": "Income", "daily_capital": "Capital",
+}
 
-        c.execute('DELETE FROM vendor_transactions WHERE id=?', (trans_id,))
-        conn.commit()
-        conn.close()
-        self.refresh_transactions_table()
+def ensure_bank_reconciliation(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bank_statements (
+            id INTEGER PRIMARY KEY,
+            file_name TEXT,
+            file_hash TEXT UNIQUE,
+            imported_at TEXT,
+            date_from TEXT,
+            date_to TEXT
+        )
+    """)
+    # amount is signed fils (negative = money out); match_* point at the ledger row the line settles
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bank_lines (
+            id INTEGER PRIMARY KEY,
+            statement_id INTEGER NOT NULL,
+            line_no INTEGER,
+            date TEXT,
+            description TEXT,
+            reference TEXT,
+            amount INTEGER NOT NULL,
+            match_table TEXT,
+            match_id INTEGER,
+            match_kind TEXT,
+            FOREIGN KEY(statement_id) REFERENCES bank_statements(id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bank_lines_statement ON bank_lines (statement_id, date)")
+    # a ledger entry can settle only one bank line
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_bank_lines_match ON bank_lines (match_table, match_id) "
+                 "WHERE match_table IS NOT NULL")
+    conn.commit()
 
-        # Refresh daily cashflow and dashboard
-        if self.daily_tab is not None:
-            self.daily_tab.load_data()
-            if hasattr(self.daily_tab, "dashboard_tab") and self.daily_tab.dashboard_tab is not None:
-                self.daily_tab.dashboard_tab.refresh()
+def parse_bank_date(text):
+    for fmt in BANK_DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date '{text}'")
+
+def parse_bank_amount(text):
+    """Bank amount text to signed fils: accepts thousands separators, (1.00) and trailing DR/CR."""
+    text = text.strip().replace("AED", "").replace(" ", "")
+    sign = 1
+    if text.startswith("(") and text.endswith(")"):
+        text, sign = text[1:-1], -1
+    if text.upper().endswith("DR"):
+        text, sign = text[:-2], -1
+    elif text.upper().endswith("CR"):
+        text = text[:-2]
+    try:
+        return sign * to_fils(text)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"unrecognised amount '{text}'") from None
+
+def _bank_columns(header):
+    names = [re.sub(r"\s+", " ", cell).strip().strip(".:").lower() for cell in header]
+    columns = {}
+    for key, aliases in BANK_COLUMN_NAMES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[key] = names.index(alias)
+                break
+    if "date" in columns and ("amount" in columns or "debit" in columns or "credit" in columns):
+        return columns
+    return None
+
+def parse_bank_statement(path):
+    """
+    Reads a bank statement CSV into [(date_iso, description, reference, signed fils)].
+    The header row is found among the first lines (banks put account details
+    above it); either one signed amount column or debit/credit columns work.
+    Rows without a date (opening/closing balance lines) are skipped.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.reader(f))
+    for header_at, row in enumerate(rows[:25]):
+        columns = _bank_columns(row)
+        if columns:
+            break
+    else:
+        raise ValueError("No header row with a date and an amount (or debit/credit) column was found.")
+
+    def cell(row, key):
+        i = columns.get(key)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    lines = []
+    for line_no, row in enumerate(rows[header_at + 1:], start=header_at + 2):
+        date_text = cell(row, "date")
+        if not date_text:
+            continue
+        try:
+            date_iso = parse_bank_date(date_text)
+            if "amount" in columns:
+                amount = parse_bank_amount(cell(row, "amount") or "0")
+            else:
+                amount = abs(parse_bank_amount(cell(row, "credit") or "0")) - abs(parse_bank_amount(cell(row, "debit") or "0"))
+        except ValueError as e:
+            raise ValueError(f"Line {line_no}: {e}") from None
+        if amount:
+            lines.append((date_iso, cell(row, "description"), cell(row, "reference"), amount))
+    return lines
+
+def import_bank_statement(conn, path):
+    """Stores a statement and its lines; returns (statement id, line count). The caller commits."""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    if conn.execute("SELECT 1 FROM bank_statements WHERE file_hash=?", (digest,)).fetchone():
+        raise ValueError(f"{os.path.basename(path)} has already been imported.")
+    lines = parse_bank_statement(path)
+    if not lines:
+        raise ValueError(f"{os.path.basename(path)} contains no transactions.")
+    dates = [line[0] for line in lines]
+    statement_id = conn.execute(
+        "INSERT INTO bank_statements (file_name, file_hash, imported_at, date_from, date_to) VALUES (?, ?, ?, ?, ?)",
+        (os.path.basename(path), digest, datetime.now().isoformat(timespec="seconds"), min(dates), max(dates))
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO bank_lines (statement_id, line_no, date, description, reference, amount) VALUES (?, ?, ?, ?, ?, ?)",
+        [(statement_id, n, *line) for n, line in enumerate(lines, start=1)]
+    )
+    return statement_id, len(lines)
+
+def reconciliation_candidates(conn, date_from, date_to, include_matched=False):
+    """
+    Ledger entries that can appear on the bank statement, as (table, id, date,
+    signed fils, description): expenses (vendor payments are taken from
+    vendor_transactions instead of their mirrored expense), non-cash vendor
+    payments, cheques on their due date (the "Paid via Cheque" payment is the
+    same money), income and capital, closed years included (so `conn` must not
+    be inside a transaction). Already matched entries are left out unless
+    include_matched.
+    """
+    expense_src = ledger_source(conn, "daily_expense", ("id", "date", "amount", "description", "vendor_transaction_id"),
+                                date_from, date_to)
+    vendor_src = ledger_source(conn, "vendor_transactions", ("id", "vendor_id", "date", "type", "amount", "note", "payment_mode"),
+                               date_from, date_to)
+    income_src = ledger_source(conn, "daily_income", ("id", "date", "amount", "description"), date_from, date_to)
+    capital_src = ledger_source(conn, "daily_capital", ("id", "date", "amount", "description", "category"), date_from, date_to)
+    rows = conn.execute(f"""
+        SELECT 'daily_expense', id, date, -amount, COALESCE(description, '')
+        FROM {expense_src} WHERE date BETWEEN ? AND ? AND vendor_transaction_id IS NULL
+        UNION ALL
+        SELECT 'vendor_transactions', t.id, t.date, -t.amount, COALESCE(v.name, '') || COALESCE(' - ' || NULLIF(t.note, ''), '')
+        FROM {vendor_src} t LEFT JOIN vendors v ON v.id = t.vendor_id
+        WHERE t.type = 'payment' AND COALESCE(t.payment_mode, '') NOT IN ('Cash', 'Cheque') AND t.date BETWEEN ? AND ?
+        UNION ALL
+        SELECT 'cheques', id, due_date, -amount, 'Cheque to ' || COALESCE(company_name, '')
+        FROM cheques WHERE due_date BETWEEN ? AND ?
+        UNION ALL
+        SELECT 'daily_income', id, date, amount, COALESCE(description, '')
+        FROM {income_src} WHERE date BETWEEN ? AND ?
+        UNION ALL
+        SELECT 'daily_capital', id, date, amount, COALESCE(description, category, '')
+        FROM {capital_src} WHERE date BETWEEN ? AND ?
+    """, (date_from, date_to) * 5).fetchall()
+    if include_matched:
+        return rows
+    matched = set(conn.execute("SELECT match_table, match_id FROM bank_lines WHERE match_table IS NOT NULL").fetchall())
+    return [row for row in rows if (row[0], row[1]) not in matched]
+
+def reconcile_statement(conn, statement_id, tolerance=RECON_DATE_TOLERANCE, cheque_tolerance=RECON_CHEQUE_TOLERANCE):
+    """
+    Auto-matches the statement's open lines and returns how many were matched.
+    Ledger entries are hashed by signed amount into buckets sorted by date, so
+    each line only looks at same-amount entries inside its date window
+    (bisect), taking the closest date. Exact-date matches are settled first so
+    they are not taken by a neighbouring day's line. `conn` must not be inside
+    a transaction (see reconciliation_candidates); the caller commits.
+    """
+    lines = conn.execute(
+        "SELECT id, date, amount FROM bank_lines WHERE statement_id=? AND match_table IS NULL ORDER BY date, id",
+        (statement_id,)
+    ).fetchall()
+    if not lines:
+        return 0
+    span = max(tolerance, cheque_tolerance)
+    first = date.fromisoformat(lines[0][1]) - timedelta(days=span)
+    last = date.fromisoformat(lines[-1][1]) + timedelta(days=span)
+    buckets = {}
+    for table, entry_id, entry_date, amount, _ in reconciliation_candidates(conn, first.isoformat(), last.isoformat()):
+        try:
+            day = date.fromisoformat(entry_date).toordinal()
+        except (TypeError, ValueError):
+            continue
+        buckets.setdefault(amount, []).append((day, table, entry_id))
+    for bucket in buckets.values():
+        bucket.sort()
+
+    used = set()
+    matches = {}
+    for exact in (True, False):
+        for line_id, line_date, amount in lines:
+            bucket = buckets.get(amount)
+            if not bucket or line_id in matches:
+                continue
+            day = date.fromisoformat(line_date).toordinal()
+            best = None
+            i = bisect.bisect_left(bucket, (day - span,))
+            while i < len(bucket) and bucket[i][0] <= day + span:
+                entry_day, table, entry_id = bucket[i]
+                i += 1
+                diff = abs(entry_day - day)
+                limit = 0 if exact else (cheque_tolerance if table == "cheques" else tolerance)
+                if diff <= limit and (table, entry_id) not in used and (best is None or diff < best[0]):
+                    best = (diff, table, entry_id)
+            if best:
+                used.add(best[1:])
+                matches[line_id] = best[1:]
+    conn.executemany(
+        "UPDATE bank_lines SET match_table=?, match_id=?, match_kind='auto' WHERE id=?",
+        [(table, entry_id, line_id) for line_id, (table, entry_id) in matches.items()]
+    )
+    return len(matches)
+
+def match_bank_line(conn, line_id, table, entry_id):
+    """Manually pairs a bank line with a ledger entry. The caller commits."""
+    if table not in RECON_TABLE_LABELS:
+        raise ValueError(f"Unknown ledger table: {table}")
+    try:
+        conn.execute("UPDATE bank_lines SET match_table=?, match_id=?, match_kind='manual' WHERE id=?",
+                     (table, entry_id, line_id))
+    except sqlite3.IntegrityError:
+        raise ValueError("That ledger entry is already matched to another bank line.") from None
 
-    # --- Vendor Management Tab Methods ---
+def unmatch_bank_line(conn, line_id):
+    conn.execute("UPDATE bank_lines SET match_table=NULL, match_id=NULL, match_kind=NULL WHERE id=?", (line_id,))
 
-    def ensure_opening_balance_column(self):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("PRAGMA table_info(vendors)")
-        cols = [row[1] for row in c.fetchall()]
-        if "opening_balance" not in cols:
-            c.execute("ALTER TABLE vendors ADD COLUMN opening_balance REAL DEFAULT 0")
+def reconciliation_report(conn, statement_id, tolerance=RECON_DATE_TOLERANCE):
+    """
+    {"statement", "lines", "unmatched_ledger", "matched", "unmatched_bank"} for one
+    statement. Each line carries its match (or None); unmatched ledger entries
+    are those dated within the statement period (widened by `tolerance` days)
+    that no bank line settles.
+    """
+    row = conn.execute("SELECT id, file_name, date_from, date_to FROM bank_statements WHERE id=?", (statement_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown statement: {statement_id}")
+    statement = dict(zip(("id", "file_name", "date_from", "date_to"), row))
+    first = (date.fromisoformat(row[2]) - timedelta(days=tolerance)).isoformat()
+    last = (date.fromisoformat(row[3]) + timedelta(days=max(tolerance, RECON_CHEQUE_TOLERANCE))).isoformat()
+    entries = {(r[0], r[1]): r for r in reconciliation_candidates(conn, first, last, include_matched=True)}
+    lines = []
+    for line_id, line_date, description, reference, amount, table, entry_id, kind in conn.execute(
+        "SELECT id, date, description, reference, amount, match_table, match_id, match_kind "
+        "FROM bank_lines WHERE statement_id=? ORDER BY date, line_no", (statement_id,)
+    ):
+        match = None
+        if table:
+            entry = entries.get((table, entry_id))
+            match = {"table": table, "id": entry_id, "kind": kind,
+                     "date": entry[2] if entry else None, "description": entry[4] if entry else ""}
+        lines.append({"id": line_id, "date": line_date, "description": description, "reference": reference,
+                      "amount": amount, "match": match})
+    matched = set(conn.execute("SELECT match_table, match_id FROM bank_lines WHERE match_table IS NOT NULL").fetchall())
+    unmatched_ledger = [
+        {"table": t, "id": i, "date": d, "amount": a, "description": desc}
+        for t, i, d, a, desc in sorted(entries.values(), key=lambda r: (r[2] or "", r[0], r[1]))
+        if (t, i) not in matched
+    ]
+    matched_count = sum(1 for line in lines if line["match"])
+    return {"statement": statement, "lines": lines, "unmatched_ledger": unmatched_ledger,
+            "matched": matched_count, "unmatched_bank": len(lines) - matched_count}
+
+def reconcile_cli(argv):
+    parser = argparse.ArgumentParser(
+        prog="NBS --reconcile",
+        description="Import a bank statement CSV and match its lines to expenses, vendor payments, cheques and income."
+    )
+    parser.add_argument("statement", nargs="?", help="bank statement CSV to import (omit to re-run --id)")
+    parser.add_argument("--id", type=int, help="re-reconcile an imported statement")
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    parser.add_argument("--tolerance", type=int, default=RECON_DATE_TOLERANCE, help="date window in days (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+    if not args.statement and args.id is None:
+        parser.error("give a statement file or --id")
+
+    conn = sqlite3.connect(args.db)
+    try:
+        ensure_bank_reconciliation(conn)
+        statement_id = args.id
+        if args.statement:
+            try:
+                statement_id, count = import_bank_statement(conn, args.statement)
+            except (OSError, ValueError) as e:
+                print(f"Could not import {args.statement}: {e}", file=sys.stderr)
+                return 1
             conn.commit()
-        conn.close()
-
-    def ensure_due_date_column(self):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("PRAGMA table_info(vendor_transactions)")
-        cols = [row[1] for row in c.fetchall()]
-        if "due_date" not in cols:
-            c.execute("ALTER TABLE vendor_transactions ADD COLUMN due_date TEXT")
+            if not args.json:
+                print(f"Imported {count} lines as statement {statement_id}")
+        try:
+            started = time.perf_counter()
+            newly = reconcile_statement(conn, statement_id, args.tolerance)
+            elapsed = time.perf_counter() - started
             conn.commit()
+            report = reconciliation_report(conn, statement_id, args.tolerance)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    finally:
         conn.close()
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{newly} lines matched in {elapsed:.3f}s; {report['matched']} of {len(report['lines'])} lines reconciled")
+    unmatched = [line for line in report["lines"] if not line["match"]]
+    if unmatched:
+        print("\nUnmatched bank lines:")
+        for line in unmatched:
+            print(f"  {to_ddmmyyyy(line['date'])}  {fmt_money(line['amount'], True):>14}  {line['description']}")
+    if report["unmatched_ledger"]:
+        print("\nUnmatched ledger entries:")
+        for entry in report["unmatched_ledger"]:
+            print(f"  {to_ddmmyyyy(entry['date'])}  {fmt_money(entry['amount'], True):>14}  "
+                  f"{RECON_TABLE_LABELS[entry['table']]}: {entry['description']}")
+    return 0
+
+# --- Ledger service (--serve): one process owns the database for several terminals ---
+SERVICE_PORT = 8765
+SERVICE_READERS = 4
+SERVICE_WRITE_BATCH = 50
+SERVICE_MAX_BODY = 1 << 20
+
+class LedgerWriter(threading.Thread):
+    """
+    The service's only writer. Jobs queue up while a batch is being written;
+    each batch is one transaction, with a savepoint per job so a rejected job
+    is rolled back on its own and the rest of the batch still commits.
+    """
 
-    def ensure_invoice_payment_columns(self):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("PRAGMA table_info(vendor_transactions)")
-        cols = [row[1] for row in c.fetchall()]
-        if "invoice_no" not in cols:
-            c.execute("ALTER TABLE vendor_transactions ADD COLUMN invoice_no TEXT")
-        if "payment_mode" not in cols:
-            c.execute("ALTER TABLE vendor_transactions ADD COLUMN payment_mode TEXT")
-        if "net_terms" not in cols:
-            c.execute("ALTER TABLE vendor_transactions ADD COLUMN net_terms TEXT")
-        conn.commit()
-        conn.close()
-
-    def refresh_vendor_table(self):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, name, contact, opening_balance FROM vendors ORDER BY name COLLATE NOCASE ASC")
-        self.vendors = c.fetchall()
-        conn.close()
-        self.filter_vendor_table()
+    def __init__(self, db_path):
+        super().__init__(name="ledger-writer", daemon=True)
+        self.db_path = db_path
+        self.jobs = queue.Queue()
 
-    def filter_vendor_table(self):
-        search = self.vendor_search_input.text().strip().lower()
-        self.filtered_vendors = []
-        for vendor in self.vendors:
-            vid, name, contact, opening_balance = vendor
-            if (len(search) < 2) or (search in name.lower()):
-                self.filtered_vendors.append(vendor)
-        self.vendor_table.setRowCount(len(self.filtered_vendors))
-        for row, (vid, name, contact, opening_balance) in enumerate(self.filtered_vendors):
-            current_balance = self.get_current_balance(vid, opening_balance)
-            item_name = QTableWidgetItem(name)
-            item_name.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 0, item_name)
-            item_contact = QTableWidgetItem(contact)
-            item_contact.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 1, item_contact)
-            item_opening = QTableWidgetItem(f"{opening_balance:.2f}")
-            item_opening.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 2, item_opening)
-            item_current = QTableWidgetItem(f"{current_balance:.2f}")
-            item_current.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.vendor_table.setItem(row, 3, item_current)
+    def submit(self, fn, *args):
+        future = Future()
+        self.jobs.put((fn, args, future))
+        return future
 
-    def get_current_balance(self, vendor_id, opening_balance):
-        conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='purchase'", (vendor_id,))
-        purchases = c.fetchone()[0] or 0
-        c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='payment'", (vendor_id,))
-        payments = c.fetchone()[0] or 0
-        c.execute("SELECT COALESCE(SUM(amount),0) FROM vendor_transactions WHERE vendor_id=? AND type='return'", (vendor_id,))
-        returns = c.fetchone()[0] or 0
-        conn.close()
-        return opening_balance + purchases - payments - returns
+    def stop(self):
+        self.jobs.put(None)
+        self.join()
 
-    def show_add_vendor_dialog(self):
-        dialog = VendorDialog(self, "Add Vendor")
-        if dialog.exec():
-            name, contact, opening_balance = dialog.get_values()
-            if not name:
-                QMessageBox.warning(self, "Missing Name", "Vendor name is required.")
-                return
-            conn = get_conn()
-            c = conn.cursor()
+    def write_batch(self, conn, batch):
+        results = []
+        try:
+            invoice_source(conn)  # attaches the archives the duplicate-invoice check reads, before the transaction
+        except ValueError:
+            pass  # a missing archive is reported by the job that reads it
+        conn.execute("BEGIN IMMEDIATE")
+        for fn, args, future in batch:
+            conn.execute("SAVEPOINT job")
             try:
-                c.execute("INSERT INTO vendors (name, contact, opening_balance) VALUES (?, ?, ?)", (name, contact, opening_balance))
-                conn.commit()
-            except Exception:
-                QMessageBox.warning(self, "Exists", "Vendor already exists.")
-            conn.close()
-            self.refresh_vendor_table()
-            self.refresh_vendor_combo()
-            self.refresh_overview_table()
-
-    def show_edit_vendor_dialog(self):
-        selected = self.vendor_table.currentRow()
-        if selected < 0 or selected >= len(self.filtered_vendors):
-            QMessageBox.warning(self, "Select Vendor", "Please select a vendor to edit.")
-            return
-        vid, name, contact, opening_balance = self.filtered_vendors[selected]
-        dialog = VendorDialog(self, "Edit Vendor", name, contact, opening_balance)
-        if dialog.exec():
-            new_name, new_contact, new_balance = dialog.get_values()
-            if not new_name:
-                QMessageBox.warning(self, "Missing Name", "Vendor name is required.")
-                return
-            conn = get_conn()
-            c = conn.cursor()
+                results.append((future, fn(conn, *args), None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO job")
+                results.append((future, None, e))
+            conn.execute("RELEASE job")
+        conn.execute("COMMIT")
+        return results
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT * 1000)}")
+        running = True
+        while running:
+            job = self.jobs.get()
+            if job is None:
+                break
+            batch = [job]
+            while len(batch) < SERVICE_WRITE_BATCH:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    running = False
+                    break
+                batch.append(job)
             try:
-                c.execute(
-                    "UPDATE vendors SET name=?, contact=?, opening_balance=? WHERE id=?",
-                    (new_name, new_contact, new_balance, vid)
-                )
-                conn.commit()
-            except Exception:
-                QMessageBox.warning(self, "Exists", "Vendor already exists.")
-            conn.close()
-            self.refresh_vendor_table()
-            self.refresh_vendor_combo()
+                results = self.write_batch(conn, batch)
+            except sqlite3.Error as e:
+                # locked past the busy timeout, or the commit failed: fail this batch and keep serving
+                try:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                error = ServiceError(503, f"database error: {e}")
+                results = [(future, None, error) for _, _, future in batch]
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        conn.close()
 
-    def delete_vendor(self):
-        selected = self.vendor_table.currentRow()
-        if selected < 0 or selected >= len(self.filtered_vendors):
-            return
-        vid, name, *_ = self.filtered_vendors[selected]
-        reply = QMessageBox.question(self, "Confirm", f"Delete vendor '{name}'? This will also remove associated transactions.", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("DELETE FROM vendor_transactions WHERE vendor_id=?", (vid,))
-            c.execute("DELETE FROM vendors WHERE id=?", (vid,))
-            conn.commit()
-            conn.close()
-            self.refresh_vendor_table()
-            self.refresh_vendor_combo()
-    
-def days_remaining(due_iso):
-    try:
-        due = datetime.strptime(due_iso, "%Y-%m-%d")
-        now = datetime.now()
-        return (due.date() - now.date()).days
-    except Exception:
-        return None
-        
-  
-class ChequeDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Add Cheque")
-        self.setMinimumWidth(400)
-        layout = QFormLayout(self)
-        self.cheque_date = QDateEdit()
-        self.cheque_date.setDisplayFormat("dd-MM-yyyy")
-        self.cheque_date.setCalendarPopup(True)
-        self.cheque_date.setDate(QDate.currentDate())
-        layout.addRow("Issue Date:", self.cheque_date)
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
 
-        # Vendor ComboBox for Company Name
-        self.company_name = QComboBox()
-        self.company_name.setEditable(True)
-        self.company_name.addItems(get_vendor_names())
-        self.company_name.setPlaceholderText("Select or type vendor name")
-        layout.addRow("Company Name:", self.company_name)
+def _service_amount(value):
+    try:
+        amount = to_fils(value)
+    except (InvalidOperation, ValueError, TypeError):
+        amount = 0
+    if amount <= 0:
+        raise ServiceError(400, "amount must be greater than zero")
+    return amount
+
+def _service_date(value):
+    try:
+        return date.fromisoformat(value or date.today().isoformat()).isoformat()
+    except (TypeError, ValueError):
+        raise ServiceError(400, f"expected a YYYY-MM-DD date, got {value!r}")
+
+def _service_category_id(conn, table, name):
+    row = conn.execute(f"SELECT id FROM {table} WHERE lower(name)=?", ((name or "").lower(),)).fetchone()
+    if row is None:
+        raise ServiceError(400, f"unknown category: {name!r}")
+    return row[0]
+
+def service_read_changes(conn, since):
+    rows = conn.execute(
+        "SELECT DISTINCT table_name FROM change_log WHERE seq > ? ORDER BY table_name", (since,)
+    ).fetchall()
+    return {"seq": get_change_seq(conn), "tables": [row[0] for row in rows]}
+
+def service_read_cashflow(conn, date_iso):
+    rows = conn.execute("""
+        SELECT 'Income', di.id, ic.name, di.description, di.amount, di.notes
+        FROM daily_income di LEFT JOIN income_categories ic ON di.category_id = ic.id WHERE di.date = ?
+        UNION ALL
+        SELECT 'Expense', de.id, ec.name, de.description, de.amount, de.notes
+        FROM daily_expense de LEFT JOIN expense_categories ec ON de.category_id = ec.id WHERE de.date = ?
+        UNION ALL
+        SELECT 'Capital', dc.id, dc.category, dc.description, dc.amount, dc.notes
+        FROM daily_capital dc WHERE dc.date = ?
+    """, (date_iso, date_iso, date_iso)).fetchall()
+    return {"date": date_iso, "entries": [
+        {"type": typ, "id": eid, "category": cat, "description": desc, "amount": fmt_money(amount), "notes": notes}
+        for typ, eid, cat, desc, amount, notes in rows
+    ]}
+
+def service_read_vendors(conn):
+    rows = conn.execute(f"""
+        SELECT v.id, v.name, v.contact,
+               COALESCE(v.opening_balance, 0) + COALESCE(SUM({VENDOR_SIGNED_AMOUNT_SQL}), 0)
+        FROM vendors v LEFT JOIN vendor_transactions vt ON vt.vendor_id = v.id
+        GROUP BY v.id ORDER BY v.name COLLATE NOCASE
+    """).fetchall()
+    return {"vendors": [{"id": vid, "name": name, "contact": contact, "balance": fmt_money(balance)}
+                        for vid, name, contact, balance in rows]}
+
+def service_read_vendor_transactions(conn, vendor_id):
+    if conn.execute("SELECT 1 FROM vendors WHERE id=?", (vendor_id,)).fetchone() is None:
+        raise ServiceError(404, f"no vendor with id {vendor_id}")
+    opening_balance, rows = fetch_vendor_statement(conn, vendor_id)
+    return {"vendor_id": vendor_id, "opening_balance": fmt_money(opening_balance), "transactions": [
+        {"date": d, "type": t, "amount": fmt_money(amount), "due_date": due, "balance": fmt_money(balance)}
+        for d, t, amount, due, balance in rows
+    ]}
+
+def service_read_cheques(conn, open_only):
+    rows = conn.execute(f"""
+        SELECT id, cheque_date, company_name, bank_name, due_date, amount, is_paid FROM cheques
+        {"WHERE is_paid = 0" if open_only else ""} ORDER BY due_date
+    """).fetchall()
+    return {"cheques": [
+        {"id": cid, "cheque_date": cdate, "company_name": company, "bank_name": bank, "due_date": due,
+         "amount": fmt_money(amount), "is_paid": bool(paid)}
+        for cid, cdate, company, bank, due, amount, paid in rows
+    ]}
+
+def service_write_cashflow(conn, body):
+    entry_type = (body.get("type") or "").title()
+    category_id = None
+    if entry_type == "Income":
+        category_id = _service_category_id(conn, "income_categories", body.get("category"))
+    elif entry_type == "Expense":
+        category_id = _service_category_id(conn, "expense_categories", body.get("category"))
+    try:
+        entry_id = add_cashflow_entry(
+            conn, entry_type, _service_date(body.get("date")), _service_amount(body.get("amount")),
+            category_id, body.get("description", ""), body.get("notes", "")
+        )
+    except ValueError as e:
+        raise ServiceError(409, str(e))
+    return {"type": entry_type, "id": entry_id}
+
+def service_write_vendor_transaction(conn, vendor_id, body):
+    if (body.get("type") or "").lower() == "purchase" and not body.get("allow_duplicate"):
+        duplicates = find_duplicate_invoices(conn, vendor_id, body.get("invoice_no"))
+        if duplicates:
+            raise ServiceError(409, f"invoice {body.get('invoice_no')} was already entered on "
+                                    f"{', '.join(d for _, d, _ in duplicates)}; resend with allow_duplicate to save it again")
+    try:
+        trans_id, cheque_created = add_vendor_transaction(
+            conn, vendor_id, (body.get("type") or "").lower(), _service_date(body.get("date")),
+            _service_amount(body.get("amount")), body.get("note", ""), body.get("due_date"),
+            body.get("invoice_no", ""), body.get("payment_mode"), body.get("bank_name"), body.get("cheque_due")
+        )
+    except ValueError as e:
+        raise ServiceError(400, str(e))
+    return {"id": trans_id, "cheque_created": cheque_created}
+
+def service_write_cheque_paid(conn, cheque_id):
+    row = conn.execute("SELECT is_paid FROM cheques WHERE id=?", (cheque_id,)).fetchone()
+    if row is None:
+        raise ServiceError(404, f"no cheque with id {cheque_id}")
+    if row[0]:
+        raise ServiceError(409, f"cheque {cheque_id} is already paid")
+    return {"id": cheque_id, "payment_id": pay_cheque(conn, cheque_id)}
+
+class LedgerService:
+    """
+    Small JSON-over-HTTP service for the shop's LAN. Reads run on a pool of
+    read-only connections, writes go through the single LedgerWriter. Clients
+    poll GET /api/changes?since=SEQ to learn which tables to reload.
+
+        GET  /api/changes?since=SEQ
+        GET  /api/cashflow?date=YYYY-MM-DD          POST /api/cashflow
+        GET  /api/vendors                           GET  /api/vendors/ID/transactions
+        POST /api/vendors/ID/transactions
+        GET  /api/cheques[?open=1]                  POST /api/cheques/ID/paid
+    """
 
-        self.bank_name = QLineEdit()
-        self.bank_name.setPlaceholderText("Bank Name")
-        layout.addRow("Bank Name:", self.bank_name)
+    def __init__(self, db_path, token=None, readers=SERVICE_READERS):
+        self.db_path = os.path.abspath(db_path)
+        self.token = token
+        self.writer = LedgerWriter(self.db_path)
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="ledger-reader")
+        self._local = threading.local()
+
+    def _read(self, fn, *args):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = get_readonly_conn(self.db_path)
+        return fn(conn, *args)
+
+    async def dispatch(self, method, path, query, body):
+        loop = asyncio.get_running_loop()
+        parts = [p for p in path.split("/") if p]
+        if parts[:1] != ["api"]:
+            raise ServiceError(404, "not found")
+        parts = parts[1:]
+
+        def read(fn, *args):
+            return loop.run_in_executor(self.readers, self._read, fn, *args)
+
+        def write(fn, *args):
+            return asyncio.wrap_future(self.writer.submit(fn, *args))
+
+        def object_id(text):
+            if not text.isdigit():
+                raise ServiceError(404, "not found")
+            return int(text)
+
+        if method == "GET":
+            if parts == ["changes"]:
+                since = query.get("since", ["0"])[0]
+                return await read(service_read_changes, int(since) if since.isdigit() else 0)
+            if parts == ["cashflow"]:
+                return await read(service_read_cashflow, _service_date(query.get("date", [None])[0]))
+            if parts == ["vendors"]:
+                return await read(service_read_vendors)
+            if len(parts) == 3 and parts[0] == "vendors" and parts[2] == "transactions":
+                return await read(service_read_vendor_transactions, object_id(parts[1]))
+            if parts == ["cheques"]:
+                return await read(service_read_cheques, query.get("open", ["0"])[0] == "1")
+        elif method == "POST":
+            if parts == ["cashflow"]:
+                return await write(service_write_cashflow, body)
+            if len(parts) == 3 and parts[0] == "vendors" and parts[2] == "transactions":
+                return await write(service_write_vendor_transaction, object_id(parts[1]), body)
+            if len(parts) == 3 and parts[0] == "cheques" and parts[2] == "paid":
+                return await write(service_write_cheque_paid, object_id(parts[1]))
+        raise ServiceError(404, "not found")
+
+    async def handle(self, reader, writer):
+        status, payload = 200, None
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) != 3:
+                raise ServiceError(400, "bad request")
+            method, target, _ = request_line
+            if self.token and headers.get("x-nbs-token") != self.token:
+                raise ServiceError(401, "missing or wrong X-NBS-Token")
+            length = int(headers.get("content-length") or 0)
+            if length > SERVICE_MAX_BODY:
+                raise ServiceError(413, "request body too large")
+            body = {}
+            if length:
+                try:
+                    body = json.loads(await reader.readexactly(length))
+                except ValueError:
+                    raise ServiceError(400, "body must be JSON")
+                if not isinstance(body, dict):
+                    raise ServiceError(400, "body must be a JSON object")
+            url = urlsplit(target)
+            payload = await self.dispatch(method, url.path, parse_qs(url.query), body)
+        except ServiceError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": str(e)}
+        except sqlite3.Error as e:
+            status, payload = 503, {"error": f"database error: {e}"}
+        data = json.dumps(payload).encode("utf-8")
+        reasons = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+                   409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"}
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, 'Error')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host, port, ready=None):
+        self.writer.start()
+        server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.writer.stop()
+            self.readers.shutdown()
+
+def serve_cli(argv):
+    global DB_NAME
+    parser = argparse.ArgumentParser(
+        prog="NBS --serve",
+        description="Serve the cashflow, vendor and cheque operations to other terminals on the local network."
+    )
+    parser.add_argument("--db", default=DB_NAME, help="database file (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on; 0.0.0.0 for the whole LAN (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="port (default: %(default)s)")
+    parser.add_argument("--token", default=os.environ.get("NBS_SERVICE_TOKEN"),
+                        help="shared secret clients send as X-NBS-Token (default: $NBS_SERVICE_TOKEN)")
+    parser.add_argument("--readers", type=int, default=SERVICE_READERS, help="read connections (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    DB_NAME = args.db
+    init_db()
+    # WAL lets the readers run alongside the writer; it needs the file on a local
+    # disk, which holds here because only this process opens it
+    conn = sqlite3.connect(args.db, timeout=SQLITE_BUSY_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    service = LedgerService(args.db, args.token, args.readers)
+    try:
+        asyncio.run(service.serve(
+            args.host, args.port,
+            ready=lambda server: print(f"Serving {args.db} on http://{args.host}:{args.port}/api", flush=True)
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # back to a single self-contained file for the desktop app and file-copy backups
+        conn = sqlite3.connect(args.db, timeout=SQLITE_BUSY_TIMEOUT)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+    return 0
 
-        self.due_date = QDateEdit()
-        self.due_date.setDisplayFormat("dd-MM-yyyy")
-        self.due_date.setCalendarPopup(True)
-        self.due_date.setDate(QDate.currentDate())
-        layout.addRow("Due Date:", self.due_date)
+class BatchReportThread(QThread):
+    progress = pyqtSignal(int, int)
+    finished_batch = pyqtSignal(dict)
 
-        self.amount = QLineEdit()
-        self.amount.setPlaceholderText("Amount")
-        layout.addRow("Amount (AED):", self.amount)
+    def __init__(self, db_path, out_dir, months, vendor_ids, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.out_dir = out_dir
+        self.months = months
+        self.vendor_ids = vendor_ids
 
-        btn_row = QHBoxLayout()
-        self.save_btn = QPushButton("Save")
-        self.save_btn.clicked.connect(self.accept)
-        self.cancel_btn = QPushButton("Cancel")
-        self.cancel_btn.clicked.connect(self.reject)
-        btn_row.addWidget(self.save_btn)
-        btn_row.addWidget(self.cancel_btn)
-        layout.addRow(btn_row)
+    def run(self):
+        try:
+            manifest = run_batch_reports(self.db_path, self.out_dir, self.months, self.vendor_ids,
+                                         progress=self.progress.emit)
+        except Exception as e:
+            manifest = {"error": str(e), "jobs": [], "ok": 0, "failed": 0}
+        self.finished_batch.emit(manifest)
 
-    def get_values(self):
-        cheque_iso = self.cheque_date.date().toString("yyyy-MM-dd")
-        due_iso = self.due_date.date().toString("yyyy-MM-dd")
-        return (
-            cheque_iso,
-            self.company_name.currentText().strip(),
-            self.bank_name.text().strip(),
-            due_iso,
-            self.amount.text().strip()
-        )
+class BatchReportDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Batch Export Reports")
+        self.setMinimumWidth(520)
+        self.setStyleSheet(DIALOG_STYLESHEET)
+        self.thread = None
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
 
-class ChequesTab(QWidget):
-    chequePaid = pyqtSignal()  # <--- Signal to notify when a cheque is paid
+        today = QDate.currentDate()
+        self.monthly_checkbox = QCheckBox("Monthly financial reports")
+        self.monthly_checkbox.setChecked(True)
+        form.addRow(self.monthly_checkbox)
+        self.from_month, self.from_year = self._month_year_combos(today.month(), today.year())
+        self.to_month, self.to_year = self._month_year_combos(today.month(), today.year())
+        from_row = QHBoxLayout()
+        from_row.addWidget(self.from_month)
+        from_row.addWidget(self.from_year)
+        to_row = QHBoxLayout()
+        to_row.addWidget(self.to_month)
+        to_row.addWidget(self.to_year)
+        form.addRow("From:", from_row)
+        form.addRow("To:", to_row)
+
+        self.all_vendors_checkbox = QCheckBox("Statements for all vendors")
+        self.all_vendors_checkbox.setChecked(True)
+        self.all_vendors_checkbox.toggled.connect(self.toggle_vendor_list)
+        form.addRow(self.all_vendors_checkbox)
+        self.vendor_list = QListWidget()
+        self.vendor_list.setMinimumHeight(160)
+        with get_conn() as conn:
+            for vid, name in conn.execute("SELECT id, name FROM vendors ORDER BY name COLLATE NOCASE ASC"):
+                item = QListWidgetItem(name)
+                item.setData(Qt.ItemDataRole.UserRole, vid)
+                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                item.setCheckState(Qt.CheckState.Unchecked)
+                self.vendor_list.addItem(item)
+        self.vendor_list.setEnabled(False)
+        form.addRow(self.vendor_list)
+
+        out_row = QHBoxLayout()
+        self.out_dir_edit = QLineEdit(os.path.join(os.path.expanduser("~"), "NationalBicyclesReports"))
+        browse_btn = QPushButton("Browse")
+        browse_btn.clicked.connect(self.browse_out_dir)
+        out_row.addWidget(self.out_dir_edit)
+        out_row.addWidget(browse_btn)
+        form.addRow("Save to:", out_row)
+        layout.addLayout(form)
 
-    def __init__(self):
-        super().__init__()
-        self.layout = QVBoxLayout(self)
-        # ... rest of __init__ setup as before ...
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
 
         btn_row = QHBoxLayout()
-        self.add_btn = QPushButton("Add Cheque")
-        self.add_btn.clicked.connect(self.show_add_dialog)
-        btn_row.addWidget(self.add_btn)
         btn_row.addStretch()
-        self.layout.addLayout(btn_row)
+        self.run_btn = QPushButton("Export")
+        self.run_btn.clicked.connect(self.start_batch)
+        self.close_btn = QPushButton("Close")
+        self.close_btn.clicked.connect(self.reject)
+        btn_row.addWidget(self.run_btn)
+        btn_row.addWidget(self.close_btn)
+        layout.addLayout(btn_row)
+
+    def _month_year_combos(self, month, year):
+        month_combo = QComboBox()
+        for m in range(1, 13):
+            month_combo.addItem(QDate(2000, m, 1).toString("MMMM"), m)
+        month_combo.setCurrentIndex(month - 1)
+        year_combo = QComboBox()
+        for y in range(QDate.currentDate().year(), 1999, -1):
+            year_combo.addItem(str(y), y)
+        year_combo.setCurrentText(str(year))
+        return month_combo, year_combo
+
+    def toggle_vendor_list(self, all_vendors):
+        self.vendor_list.setEnabled(not all_vendors)
+
+    def browse_out_dir(self):
+        path = QFileDialog.getExistingDirectory(self, "Select Output Folder", self.out_dir_edit.text())
+        if path:
+            self.out_dir_edit.setText(path)
+
+    def start_batch(self):
+        months = []
+        if self.monthly_checkbox.isChecked():
+            first = (self.from_year.currentData(), self.from_month.currentData())
+            last = (self.to_year.currentData(), self.to_month.currentData())
+            if first > last:
+                QMessageBox.warning(self, "Invalid Range", "The 'From' month must not be after the 'To' month.")
+                return
+            months = list(month_range(first, last))
+        if self.all_vendors_checkbox.isChecked():
+            vendor_ids = None
+        else:
+            vendor_ids = [
+                self.vendor_list.item(i).data(Qt.ItemDataRole.UserRole)
+                for i in range(self.vendor_list.count())
+                if self.vendor_list.item(i).checkState() == Qt.CheckState.Checked
+            ]
+        if not months and vendor_ids == []:
+            QMessageBox.warning(self, "Nothing Selected", "Select monthly reports and/or vendors to export.")
+            return
+        out_dir = self.out_dir_edit.text().strip()
+        if not out_dir:
+            QMessageBox.warning(self, "Output Folder", "Please choose an output folder.")
+            return
+
+        self.run_btn.setEnabled(False)
+        self.status_label.setText("Starting workers...")
+        self.thread = BatchReportThread(DB_NAME, out_dir, months, vendor_ids, self)
+        self.thread.progress.connect(self.on_progress)
+        self.thread.finished_batch.connect(self.on_finished)
+        self.thread.start()
+
+    def on_progress(self, done, total):
+        self.status_label.setText(f"Exported {done} of {total}...")
+
+    def on_finished(self, manifest):
+        self.run_btn.setEnabled(True)
+        if manifest.get("error"):
+            self.status_label.setText("")
+            QMessageBox.critical(self, "Batch Export", f"Batch export failed:\n{manifest['error']}")
+            return
+        self.status_label.setText(
+            f"{manifest['ok']} exported, {manifest['failed']} failed in {manifest['elapsed_seconds']:.1f}s"
+        )
+        QMessageBox.information(
+            self, "Batch Export",
+            f"{manifest['ok']} PDF(s) written to:\n{manifest['output_dir']}\n\n"
+            f"Summary: {os.path.join(manifest['output_dir'], 'manifest.json')}"
+        )
 
-        self.add_shortcut = QShortcut(QKeySequence("F1"), self)
-        self.add_shortcut.activated.connect(self.show_add_dialog)
-        self.add_btn.setToolTip("Shortcut: F1")
+    def reject(self):
+        if self.thread is not None and self.thread.isRunning():
+            QMessageBox.information(self, "Batch Export", "Please wait for the export to finish.")
+            return
+        super().reject()
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Issue Date", "Company", "Bank", "Due Date", "Amount (AED)", "Days Remaining", "ID"
-        ])
+class ConsolidationDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Consolidate Branches")
+        self.setMinimumSize(900, 520)
+        self.setStyleSheet(DIALOG_STYLESHEET)
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Branch databases (this one is always included):"))
+        self.branch_list = QListWidget()
+        self.branch_list.setMaximumHeight(130)
+        self.branch_list.addItem(os.path.abspath(DB_NAME))
+        with get_conn() as conn:
+            saved = json.loads(get_app_meta(conn, "consolidation_branches", "[]"))
+        for path in saved:
+            if os.path.abspath(path) != os.path.abspath(DB_NAME):
+                self.branch_list.addItem(path)
+        layout.addWidget(self.branch_list)
+        list_row = QHBoxLayout()
+        add_btn = QPushButton("Add Branch...")
+        add_btn.clicked.connect(self.add_branch)
+        remove_btn = QPushButton("Remove")
+        remove_btn.clicked.connect(self.remove_branch)
+        list_row.addWidget(add_btn)
+        list_row.addWidget(remove_btn)
+        list_row.addStretch()
+        layout.addLayout(list_row)
+
+        range_row = QHBoxLayout()
+        today = QDate.currentDate()
+        self.from_date = QDateEdit(QDate(today.year(), 1, 1))
+        self.to_date = QDateEdit(today)
+        for edit in (self.from_date, self.to_date):
+            edit.setDisplayFormat("dd-MM-yyyy")
+            edit.setCalendarPopup(True)
+        range_row.addWidget(QLabel("From:"))
+        range_row.addWidget(self.from_date)
+        range_row.addWidget(QLabel("To:"))
+        range_row.addWidget(self.to_date)
+        range_row.addStretch()
+        self.run_btn = QPushButton("Consolidate")
+        self.run_btn.clicked.connect(self.run)
+        range_row.addWidget(self.run_btn)
+        layout.addLayout(range_row)
+
+        self.table = QTableWidget(0, len(CONSOLIDATION_COLUMNS) + 1)
+        self.table.setHorizontalHeaderLabels(["Branch"] + [label for _, label in CONSOLIDATION_COLUMNS])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setColumnHidden(6, True)
-        self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.table.customContextMenuRequested.connect(self.show_context_menu)
-        self.layout.addWidget(self.table)
+        layout.addWidget(self.table)
+        self.notes_label = QLabel("")
+        self.notes_label.setWordWrap(True)
+        layout.addWidget(self.notes_label)
 
-        self.remaining_label = QLabel("")
-        remaining_font = QFont()
-        remaining_font.setPointSize(15)
-        remaining_font.setBold(True)
-        self.remaining_label.setFont(remaining_font)
-        self.remaining_label.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.remaining_label.setStyleSheet("color:#43a047; margin:8px 12px 0 0;")
-        self.layout.addWidget(self.remaining_label)
+    def branch_paths(self):
+        return [self.branch_list.item(i).text() for i in range(self.branch_list.count())]
 
-        self.ensure_db()
-        self.refresh()
+    def save_branches(self):
+        with get_conn() as conn:
+            set_app_meta(conn, "consolidation_branches", json.dumps(self.branch_paths()[1:]))
+
+    def add_branch(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Add Branch Database", "", "Database Files (*.db)")
+        existing = {os.path.abspath(p) for p in self.branch_paths()}
+        for path in paths:
+            if os.path.abspath(path) not in existing:
+                self.branch_list.addItem(path)
+        self.save_branches()
+
+    def remove_branch(self):
+        row = self.branch_list.currentRow()
+        if row > 0:
+            self.branch_list.takeItem(row)
+            self.save_branches()
+
+    def run(self):
+        date_from = self.from_date.date().toString("yyyy-MM-dd")
+        date_to = self.to_date.date().toString("yyyy-MM-dd")
+        if date_from > date_to:
+            QMessageBox.warning(self, "Invalid Range", "The 'From' date must not be after the 'To' date.")
+            return
+        results, total = consolidate_branches(self.branch_paths(), date_from, date_to)
+        self.table.setRowCount(0)
+        notes = []
+        for r in results + [dict(total, branch="Consolidated")]:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(r["branch"]))
+            if "error" in r:
+                self.table.setItem(row, 1, QTableWidgetItem(f"Could not read: {r['error']}"))
+                self.table.setSpan(row, 1, 1, len(CONSOLIDATION_COLUMNS))
+                continue
+            for col, (key, _) in enumerate(CONSOLIDATION_COLUMNS, start=1):
+                item = QTableWidgetItem(fmt_money(r[key], grouping=True))
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+            if r.get("missing"):
+                notes.append(f"{r['branch']}: no {', '.join(r['missing'])} (counted as zero)")
+        font = QFont()
+        font.setBold(True)
+        last = self.table.rowCount() - 1
+        for col in range(self.table.columnCount()):
+            self.table.item(last, col).setFont(font)
+        self.notes_label.setText("\n".join(notes))
 
-    def ensure_db(self):
+class BankReconciliationDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Bank Reconciliation")
+        self.setMinimumSize(1100, 620)
+        self.setStyleSheet(DIALOG_STYLESHEET)
+        self.report = None
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Statement:"))
+        self.statement_combo = QComboBox()
+        self.statement_combo.setMinimumWidth(360)
+        self.statement_combo.currentIndexChanged.connect(self.load_report)
+        top.addWidget(self.statement_combo)
+        import_btn = QPushButton("Import Statement...")
+        import_btn.clicked.connect(self.import_statement)
+        top.addWidget(import_btn)
+        auto_btn = QPushButton("Auto Match")
+        auto_btn.clicked.connect(self.auto_match)
+        top.addWidget(auto_btn)
+        top.addStretch()
+        layout.addLayout(top)
+
+        tables = QHBoxLayout()
+        left = QVBoxLayout()
+        left.addWidget(QLabel("Bank statement lines"))
+        self.bank_table = QTableWidget(0, 4)
+        self.bank_table.setHorizontalHeaderLabels(["Date", "Description", "Amount", "Matched To"])
+        right = QVBoxLayout()
+        right.addWidget(QLabel("Unmatched ledger entries"))
+        self.ledger_table = QTableWidget(0, 4)
+        self.ledger_table.setHorizontalHeaderLabels(["Date", "Type", "Description", "Amount"])
+        for table, box in ((self.bank_table, left), (self.ledger_table, right)):
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+            table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+            table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+            box.addWidget(table)
+        tables.addLayout(left, 3)
+        tables.addLayout(right, 2)
+        layout.addLayout(tables)
+
+        bottom = QHBoxLayout()
+        self.summary_label = QLabel("")
+        bottom.addWidget(self.summary_label)
+        bottom.addStretch()
+        match_btn = QPushButton("Match Selected")
+        match_btn.clicked.connect(self.match_selected)
+        unmatch_btn = QPushButton("Unmatch")
+        unmatch_btn.clicked.connect(self.unmatch_selected)
+        bottom.addWidget(match_btn)
+        bottom.addWidget(unmatch_btn)
+        layout.addLayout(bottom)
+        self.load_statements()
+
+    def load_statements(self, select_id=None):
+        self.statement_combo.blockSignals(True)
+        self.statement_combo.clear()
         conn = get_conn()
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS cheques (
-                id INTEGER PRIMARY KEY,
-                cheque_date TEXT,
-                company_name TEXT,
-                bank_name TEXT,
-                due_date TEXT,
-                amount REAL,
-                is_paid INTEGER DEFAULT 0
-            )
-        ''')
-        try:
-            c.execute("ALTER TABLE cheques ADD COLUMN is_paid INTEGER DEFAULT 0")
-        except Exception:
-            pass  # Already exists
-        conn.commit()
+        rows = conn.execute("SELECT id, file_name, date_from, date_to FROM bank_statements ORDER BY date_from DESC, id DESC").fetchall()
         conn.close()
+        for sid, name, date_from, date_to in rows:
+            self.statement_combo.addItem(f"{name}  ({to_ddmmyyyy(date_from)} - {to_ddmmyyyy(date_to)})", sid)
+        if select_id is not None:
+            self.statement_combo.setCurrentIndex(max(0, self.statement_combo.findData(select_id)))
+        self.statement_combo.blockSignals(False)
+        self.load_report()
+
+    def load_report(self):
+        statement_id = self.statement_combo.currentData()
+        self.bank_table.setRowCount(0)
+        self.ledger_table.setRowCount(0)
+        if statement_id is None:
+            self.report = None
+            self.summary_label.setText("Import a bank statement (CSV) to start.")
+            return
+        conn = get_conn()
+        try:
+            self.report = reconciliation_report(conn, statement_id)
+        except MissingArchiveError as e:
+            self.report = None
+            self.summary_label.setText(str(e))
+            return
+        finally:
+            conn.close()
+        lines = self.report["lines"]
+        self.bank_table.setRowCount(len(lines))
+        for row, line in enumerate(lines):
+            match = line["match"]
+            matched_to = ""
+            if match:
+                matched_to = f"{RECON_TABLE_LABELS.get(match['table'], match['table'])}: {match['description']}"
+                if match["date"]:
+                    matched_to += f" ({to_ddmmyyyy(match['date'])})"
+            cells = [to_ddmmyyyy(line["date"]), line["description"] or line["reference"] or "",
+                     fmt_money(line["amount"], True), matched_to]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if col == 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                if not match:
+                    item.setForeground(QColor("#e53935"))
+                self.bank_table.setItem(row, col, item)
+        entries = self.report["unmatched_ledger"]
+        self.ledger_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            cells = [to_ddmmyyyy(entry["date"]), RECON_TABLE_LABELS[entry["table"]], entry["description"],
+                     fmt_money(entry["amount"], True)]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if col == 3:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.ledger_table.setItem(row, col, item)
+        self.summary_label.setText(
+            f"{self.report['matched']} of {len(lines)} bank lines matched; "
+            f"{self.report['unmatched_bank']} bank lines and {len(entries)} ledger entries unmatched."
+        )
 
-    def show_add_dialog(self):
-        dialog = ChequeDialog(self)
-        if dialog.exec():
-            cheque_iso, company, bank, due_iso, amount = dialog.get_values()
-            amt = parse_amount(amount)
-            if amt <= 0 or not company or not bank:
-                QMessageBox.warning(self, "Error", "Please enter valid data.")
-                return
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute(
-                "INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid) VALUES (?, ?, ?, ?, ?, 0)",
-                (cheque_iso, company, bank, due_iso, amt)
-            )
+    def import_statement(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Bank Statement", "", "CSV Files (*.csv)")
+        if not path:
+            return
+        conn = get_conn()
+        try:
+            statement_id, _ = import_bank_statement(conn, path)
+            # committed first: matching may attach closed-year archives, which cannot happen mid-transaction
             conn.commit()
+        except (OSError, ValueError) as e:
+            conn.rollback()
             conn.close()
-            self.refresh()
+            QMessageBox.warning(self, "Import Statement", str(e))
+            return
+        try:
+            reconcile_statement(conn, statement_id)
+            conn.commit()
+        except ValueError as e:
+            QMessageBox.warning(self, "Import Statement", str(e))
+        finally:
+            conn.close()
+        self.load_statements(statement_id)
 
-    def refresh(self):
+    def auto_match(self):
+        statement_id = self.statement_combo.currentData()
+        if statement_id is None:
+            return
         conn = get_conn()
-        c = conn.cursor()
-        c.execute("SELECT id, cheque_date, company_name, bank_name, due_date, amount, is_paid FROM cheques ORDER BY due_date ASC")
-        rows = c.fetchall()
-        conn.close()
-
-        total_due = 0.0
-        self.table.setRowCount(len(rows))
-        for i, (cid, cdate, company, bank, due, amt, is_paid) in enumerate(rows):
-            self.table.setItem(i, 0, self._center_item(to_ddmmyyyy(cdate)))
-            self.table.setItem(i, 1, self._center_item(company))
-            self.table.setItem(i, 2, self._center_item(bank))
-            self.table.setItem(i, 3, self._center_item(to_ddmmyyyy(due)))
-            self.table.setItem(i, 4, self._center_item(f"{amt:.2f}"))
-
-            days = days_remaining(due)
-            days_item = QTableWidgetItem()
-            days_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            days_item.setFont(self._bold_font())
-            if is_paid:
-                days_item.setText("Paid")
-                days_item.setForeground(Qt.GlobalColor.green)
-            else:
-                if days is None:
-                    days_item.setText("-")
-                    days_item.setForeground(Qt.GlobalColor.gray)
-                elif days > 10:
-                    days_item.setText(f"{days} days")
-                    days_item.setForeground(Qt.GlobalColor.green)
-                elif 0 <= days <= 10:
-                    days_item.setText(f"{days} days")
-                    days_item.setForeground(Qt.GlobalColor.yellow)
-                else:
-                    days_item.setText(f"Overdue by {-days} days")
-                    days_item.setForeground(Qt.GlobalColor.red)
-                # Only sum up cheques that are not paid and not overdue
-                if days is not None and days >= 0:
-                    total_due += float(amt)
-            self.table.setItem(i, 5, days_item)
-            self.table.setItem(i, 6, QTableWidgetItem(str(cid)))
-            self.table.setRowHeight(i, 34)
-        self.table.setColumnHidden(6, True)
-
-        self.remaining_label.setText(f"Total Remaining Cheques Due: {total_due:.2f} AED")
-
-    def _bold_font(self):
-        font = self.table.font()
-        font.setBold(True)
-        font.setPointSize(13)
-        return font
-
-    def _center_item(self, text):
-        item = QTableWidgetItem(text)
-        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        return item
-
-    def show_context_menu(self, pos: QPoint):
-        index = self.table.indexAt(pos)
-        if not index.isValid():
+        try:
+            reconcile_statement(conn, statement_id)
+            conn.commit()
+        except ValueError as e:
+            QMessageBox.warning(self, "Auto Match", str(e))
             return
-        row = index.row()
-        cheque_id = int(self.table.item(row, 6).text())
-        is_paid = self.table.item(row, 5).text().strip().lower() == "paid"
+        finally:
+            conn.close()
+        self.load_report()
 
-        menu = QMenu(self)
-        if not is_paid:
-            mark_paid_action = menu.addAction("Mark as Paid")
-        delete_action = menu.addAction("Delete Cheque")
-        action = menu.exec(self.table.viewport().mapToGlobal(pos))
-        if action:
-            if not is_paid and action == mark_paid_action:
-                self.mark_cheque_paid(cheque_id)
-            elif action == delete_action:
-                self.delete_cheque(cheque_id)
+    def match_selected(self):
+        bank_row, ledger_row = self.bank_table.currentRow(), self.ledger_table.currentRow()
+        if self.report is None or bank_row < 0 or ledger_row < 0:
+            QMessageBox.information(self, "Match", "Select a bank line and a ledger entry to match.")
+            return
+        line = self.report["lines"][bank_row]
+        entry = self.report["unmatched_ledger"][ledger_row]
+        if line["match"]:
+            QMessageBox.information(self, "Match", "That bank line is already matched; unmatch it first.")
+            return
+        if line["amount"] != entry["amount"] and QMessageBox.question(
+            self, "Match", f"The amounts differ ({fmt_money(line['amount'], True)} vs "
+                           f"{fmt_money(entry['amount'], True)}). Match anyway?"
+        ) != QMessageBox.StandardButton.Yes:
+            return
+        conn = get_conn()
+        try:
+            match_bank_line(conn, line["id"], entry["table"], entry["id"])
+            conn.commit()
+        except ValueError as e:
+            QMessageBox.warning(self, "Match", str(e))
+        finally:
+            conn.close()
+        self.load_report()
 
-    def mark_cheque_paid(self, cheque_id):
+    def unmatch_selected(self):
+        row = self.bank_table.currentRow()
+        if self.report is None or row < 0 or not self.report["lines"][row]["match"]:
+            return
         conn = get_conn()
-        c = conn.cursor()
-        c.execute("UPDATE cheques SET is_paid=1 WHERE id=?", (cheque_id,))
-        c.execute("SELECT company_name, amount FROM cheques WHERE id=?", (cheque_id,))
-        row = c.fetchone()
-        if row:
-            vendor_name, amount = row
-            # Find vendor ID
-            c.execute("SELECT id FROM vendors WHERE name = ?", (vendor_name,))
-            vrow = c.fetchone()
-            if vrow:
-                vendor_id = vrow[0]
-                today_iso = date.today().isoformat()
-                # Insert payment into vendor_transactions with note "Paid via Cheque"
-                c.execute(
-                    '''INSERT INTO vendor_transactions
-                    (vendor_id, date, type, amount, note, due_date, invoice_no, payment_mode, net_terms)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                    (vendor_id, today_iso, "payment", float(amount), "Paid via Cheque", None, None, "Cheque", None)
-                )
-                vendor_trans_id = c.lastrowid
-                # Insert into daily_expense as well, with notes "Paid via Cheque"
-                c.execute("SELECT id FROM expense_categories WHERE name='Vendors'")
-                cat_row = c.fetchone()
-                if cat_row:
-                    cat_id = cat_row[0]
-                else:
-                    c.execute("INSERT INTO expense_categories (name) VALUES ('Vendors')")
-                    cat_id = c.lastrowid
-                descr = vendor_name
-                # Check if already exists to prevent duplicate (optional)
-                c.execute("""
-                    SELECT 1 FROM daily_expense WHERE date=? AND amount=? AND category_id=? AND description=? AND vendor_transaction_id=?
-                """, (today_iso, amount, cat_id, descr, vendor_trans_id))
-                if not c.fetchone():
-                    c.execute(
-                        '''INSERT INTO daily_expense (date, amount, category_id, description, notes, vendor_transaction_id)
-                        VALUES (?, ?, ?, ?, ?, ?)''',
-                        (today_iso, amount, cat_id, descr, "Paid via Cheque", vendor_trans_id)
-                    )
+        unmatch_bank_line(conn, self.report["lines"][row]["id"])
         conn.commit()
         conn.close()
-        self.refresh()
-        self.chequePaid.emit()
-
-    def delete_cheque(self, cheque_id):
-        reply = QMessageBox.question(self, "Confirm Delete", "Are you sure you want to delete this cheque?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            conn = get_conn()
-            c = conn.cursor()
-            c.execute("DELETE FROM cheques WHERE id=?", (cheque_id,))
-            conn.commit()
-            conn.close()
-            self.refresh()
+        self.load_report()
 
 class SettingsTab(QWidget):
     def __init__(self):
@@ -4717,6 +9376,16 @@ class SettingsTab(QWidget):
         self.import_btn = QPushButton("Import Data")
         self.import_btn.clicked.connect(self.import_database)
         backup_row.addWidget(self.import_btn)
+        self.export_changes_btn = QPushButton("Export Changes")
+        self.export_changes_btn.clicked.connect(self.export_changes)
+        backup_row.addWidget(self.export_changes_btn)
+        self.apply_changes_btn = QPushButton("Apply Changes")
+        self.apply_changes_btn.clicked.connect(self.apply_changes)
+        backup_row.addWidget(self.apply_changes_btn)
+        self.close_year_btn = QPushButton("Close Fiscal Year")
+        self.close_year_btn.setToolTip("Move finished years into archive files to keep the live database small")
+        self.close_year_btn.clicked.connect(self.close_fiscal_year)
+        backup_row.addWidget(self.close_year_btn)
         backup_row.addStretch()
         backup_vbox.addLayout(backup_row)
         backup_vbox.addWidget(QLabel("Backups are created automatically on open and close.\nManual backup will create a timestamped copy in your Documents."))
@@ -4742,6 +9411,27 @@ class SettingsTab(QWidget):
         self.monthly_report_btn.setStyleSheet("font-size:16px; font-weight:600; background:#fb700e; color:white; border-radius:7px; padding:12px 18px;")
         self.monthly_report_btn.clicked.connect(self._monthly_report_btn_clicked)
         reports_layout.addWidget(self.monthly_report_btn)
+
+        self.batch_report_btn = QPushButton("Batch Export Reports")
+        self.batch_report_btn.setFixedWidth(250)
+        self.batch_report_btn.setStyleSheet("font-size:16px; font-weight:600; background:#26292A; color:white; border-radius:7px; padding:12px 18px;")
+        self.batch_report_btn.setToolTip("Month-end reports and vendor statements in one go")
+        self.batch_report_btn.clicked.connect(self._batch_report_btn_clicked)
+        reports_layout.addWidget(self.batch_report_btn)
+
+        self.consolidate_btn = QPushButton("Consolidate Branches")
+        self.consolidate_btn.setFixedWidth(250)
+        self.consolidate_btn.setStyleSheet("font-size:16px; font-weight:600; background:#26292A; color:white; border-radius:7px; padding:12px 18px;")
+        self.consolidate_btn.setToolTip("Cashflow, A/P and payroll totals across branch databases")
+        self.consolidate_btn.clicked.connect(lambda: ConsolidationDialog(self).exec())
+        reports_layout.addWidget(self.consolidate_btn)
+
+        self.reconcile_btn = QPushButton("Bank Reconciliation")
+        self.reconcile_btn.setFixedWidth(250)
+        self.reconcile_btn.setStyleSheet("font-size:16px; font-weight:600; background:#26292A; color:white; border-radius:7px; padding:12px 18px;")
+        self.reconcile_btn.setToolTip("Match a bank statement against expenses, vendor payments, cheques and income")
+        self.reconcile_btn.clicked.connect(lambda: BankReconciliationDialog(self).exec())
+        reports_layout.addWidget(self.reconcile_btn)
         reports_layout.addStretch()
         self.stack.addWidget(reports_page)
 
@@ -4780,289 +9470,37 @@ class SettingsTab(QWidget):
             year = year_combo.currentData()
             self.show_monthly_report_export_pdf(month, year)
 
+    def _batch_report_btn_clicked(self):
+        BatchReportDialog(self).exec()
+
     def show_monthly_report_export_pdf(self, month, year):
-        q_month = f"{month:02}"
-        q_year = str(year)
         conn = get_conn()
-        c = conn.cursor()
-        c.execute("""
-            SELECT DISTINCT date FROM (
-                SELECT date FROM daily_income
-                UNION
-                SELECT date FROM daily_expense
-            ) WHERE strftime('%m', date)=? AND strftime('%Y', date)=?
-            ORDER BY date
-        """, (q_month, q_year))
-        days = [row[0] for row in c.fetchall()]
-        rows = []
-        total_sales = 0
-        total_services = 0
-        total_income = 0
-        total_expenses = 0
-        total_balance = 0
-
-        for day in days:
-            c.execute("""
-                SELECT SUM(amount) FROM daily_income di
-                LEFT JOIN income_categories ic ON di.category_id=ic.id
-                WHERE di.date=? AND ic.name='Sales'
-            """, (day,))
-            sales = c.fetchone()[0] or 0
-            c.execute("""
-                SELECT SUM(amount) FROM daily_income di
-                LEFT JOIN income_categories ic ON di.category_id=ic.id
-                WHERE di.date=? AND ic.name='Services'
-            """, (day,))
-            services = c.fetchone()[0] or 0
-            daily_income = sales + services
-            c.execute("SELECT SUM(amount) FROM daily_expense WHERE date=?", (day,))
-            expenses = c.fetchone()[0] or 0
-            balance = daily_income - expenses
-            rows.append((to_ddmmyyyy(day), sales, services, daily_income, expenses, balance))
-            total_sales += sales
-            total_services += services
-            total_income += daily_income
-            total_expenses += expenses
-            total_balance += balance
-
-        c.execute("""
-            SELECT COALESCE(SUM(amount),0) FROM daily_capital
-            WHERE strftime('%m', date)=? AND strftime('%Y', date)=? AND category='Additional Capital'
-        """, (q_month, q_year))
-        additional_capital = c.fetchone()[0] or 0
-        available_cash = total_income - total_expenses + additional_capital
-        profit_percent = (total_balance / total_income * 100) if total_income else 0
-        conn.close()
-
-        # Prepare logo as base64 if available
-        logo_path = os.path.join(os.path.expanduser("~"), ".national_bicycles_logo.png")
-        logo_html = ""
-        if os.path.exists(logo_path):
-            with open(logo_path, "rb") as f:
-                logo_data = base64.b64encode(f.read()).decode("utf-8")
-                logo_html = f"<img class='logo' src='data:image/png;base64,{logo_data}'/>"
-        month_title = QDate(year, month, 1).toString('MMMM yyyy')
-
-        # --- Modern PDF Style HTML ---
-        html = f"""
-    <html>
-    <head>
-    <style>
-    body {{
-        font-family: 'Segoe UI', 'Arial', sans-serif;
-        background: #f6f7fa;
-        color: #232627;
-        margin: 0;
-        padding: 0;
-    }}
-    .wrapper {{
-        max-width: 950px;
-        margin: 28px auto;
-        background: #fff;
-        border-radius: 18px;
-        box-shadow: 0 8px 30px rgba(0,0,0,0.10);
-        padding: 12px 36px 15px 36px;
-    }}
-    .header {{
-        display: flex;
-        align-items: center;
-        border-bottom: 4px solid #fb700e;
-        padding-bottom: 10px;
-    }}
-    .logo {{
-        height: 78px;
-        margin-right: 28px;
-    }}
-    .title-section {{
-        flex: 1;
-        text-align: right;
-    }}
-    h1 {{
-        margin: 0;
-        font-size: 22px;
-        font-weight: 800;
-        color: #fb700e;
-        letter-spacing: 1px;
-    }}
-    h2 {{
-        margin: 6px 0 0 0;
-        font-size: 17px;
-        color: #1e88e5;
-        font-weight: 700;
-    }}
-    .report-table {{
-        width: 100%;
-        border-collapse: separate;
-        border-spacing: 0;
-        margin: 20px 0 20px 0;
-        background: #fff;
-        border-radius: 5px;
-        overflow: hidden;
-        box-shadow: 0 2px 10px rgba(255,112,14,0.04);
-    }}
-    .report-table th {{
-        background: #fb700e;
-        color: #fff;
-        font-size: 12px;
-        font-weight: 700;
-        padding: 6px 0;
-        border: none;
-    }}
-    .report-table td {{
-        font-size: 12px;
-        padding: 4px 0;
-        border: none;
-        text-align: center;
-        transition: background 0.2s;
-    }}
-    .report-table tr:nth-child(odd) td {{
-        background: #faf8f4;
-    }}
-    .report-table tr.total-row td {{
-        background: #ffe0b2;
-        color: #1d2a3a;
-        font-weight: 700;
-        font-size: 14px;
-        border-top: 3px solid #fb700e;
-    }}
-    .summary-box {{
-        display: flex;
-        justify-content: space-between;
-        gap: 20px;
-        margin: 20px 0 0 0;
-    }}
-    .summary-item {{
-        flex: 1 1 0;
-        background: #f7fafe;
-        border-radius: 5px;
-        padding: 10px 5px 5px 10px;
-        box-shadow: 0 1px 6px rgba(30,136,229,0.04);
-        text-align: center;
-        border-left: 7px solid #fb700e;
-    }}
-    .summary-item.blue {{ border-left-color: #1976d2; }}
-    .summary-item.green {{ border-left-color: #43a047; }}
-    .summary-item.orange {{ border-left-color: #fb700e; }}
-    .summary-title {{
-        font-size: 15px;
-        color: #777;
-        font-weight: 700;
-        margin-bottom: 4px;
-        letter-spacing: 0.5px;
-    }}
-    .summary-value {{
-        font-size: 17px;
-        font-weight: bold;
-        color: #232627;
-    }}
-    .summary-value.green {{ color: #43a047; }}
-    .summary-value.orange {{ color: #fb700e; }}
-    .summary-value.blue {{ color: #1976d2; }}
-    .summary-value.red {{ color: #e53935; }}
-    .footer {{
-        margin-top: 20px;
-        text-align: right;
-        color: #888;
-        font-size: 13px;
-    }}
-    @media print {{
-        body, .wrapper {{ box-shadow:none; background: #fff; }}
-    }}
-    </style>
-    </head>
-    <body>
-    <div class="wrapper">
-        <div class="header">
-            {logo_html if logo_html else ''}
-            <div class="title-section">
-                <h1>Monthly Financial Report</h1>
-                <h2>{month_title}</h2>
-            </div>
-        </div>
-        <table class="report-table">
-            <tr>
-                <th>Date</th>
-                <th>Sales</th>
-                <th>Service</th>
-                <th>Total Income</th>
-                <th>Expenses</th>
-                <th>Balance</th>
-            </tr>
-        """
-
-        for d, sales, services, income, expenses, balance in rows:
-            bal_class = "red" if balance < 0 else "green"
-            html += f"""
-            <tr>
-                <td>{d}</td>
-                <td>{sales:,.2f}</td>
-                <td>{services:,.2f}</td>
-                <td>{income:,.2f}</td>
-                <td>{expenses:,.2f}</td>
-                <td class="summary-value {bal_class}">{balance:,.2f}</td>
-            </tr>
-            """
-        total_bal_class = "red" if total_balance < 0 else "green"
-        html += f"""
-            <tr class="total-row">
-                <td>TOTAL</td>
-                <td>{total_sales:,.2f}</td>
-                <td>{total_services:,.2f}</td>
-                <td>{total_income:,.2f}</td>
-                <td>{total_expenses:,.2f}</td>
-                <td class="summary-value {total_bal_class}">{total_balance:,.2f}</td>
-            </tr>
-        </table>
-        <div class="summary-box">
-            <div class="summary-item green">
-                <div class="summary-title">Available Cash in Hand</div>
-                <div class="summary-value green">{available_cash:,.2f} AED</div>
-            </div>
-            <div class="summary-item blue">
-                <div class="summary-title">Additional Capital</div>
-                <div class="summary-value blue">{additional_capital:,.2f} AED</div>
-            </div>
-            <div class="summary-item orange">
-                <div class="summary-title">Profit %</div>
-                <div class="summary-value orange">{profit_percent:,.2f} %</div>
-            </div>
-        </div>
-        <div class="footer">
-            Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M')}
-        </div>
-    </div>
-    </body>
-    </html>
-    """    
+        try:
+            report = fetch_monthly_report(conn, month, year)
+        except MissingArchiveError as e:
+            QMessageBox.warning(self, "Monthly Report", str(e))
+            return
+        finally:
+            conn.close()
 
         # Go directly to export PDF dialog
         file_path, _ = QFileDialog.getSaveFileName(self, "Export Monthly Report PDF", f"MonthlyReport_{year}-{month:02}.pdf", "PDF Files (*.pdf)")
         if not file_path:
             return
-        view = QWebEngineView()
-        loop = QEventLoop()
-
-        view.setHtml(html)
-
-        def on_html_loaded(ok):
-            if ok:
-                # Use the correct overload: just the file path!
-                view.page().printToPdf(file_path)
-                QMessageBox.information(self, "Export PDF", f"PDF exported:\n{file_path}")
-                loop.quit()
-            else:
-                QMessageBox.critical(self, "Export PDF", "Failed to render HTML for PDF export.")
-                loop.quit()
-
-        view.loadFinished.connect(on_html_loaded)
-        loop.exec()
+        try:
+            monthly_report_table(report, month, year, logo=get_logo_image()).write_pdf(file_path)
+        except (OSError, RuntimeError) as e:
+            QMessageBox.critical(self, "Export PDF", f"Failed to export PDF:\n{e}")
+            return
+        QMessageBox.information(self, "Export PDF", f"PDF exported:\n{file_path}")
 
     # Logo methods
     def upload_logo(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Logo Image", "", "Image Files (*.png *.jpg *.jpeg *.bmp)")
         if file_path:
-            logo_dest = os.path.join(os.path.expanduser("~"), ".national_bicycles_logo.png")
+            logo_dest = LOGO_PATH
             shutil.copyfile(file_path, logo_dest)
+            invalidate_logo_cache()
             self.set_logo(logo_dest)
             mw = self.parent()
             while mw is not None and not isinstance(mw, QMainWindow):
@@ -5087,22 +9525,112 @@ class SettingsTab(QWidget):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_file = os.path.join(backup_dir, f"backup_{timestamp}.db")
         shutil.copyfile(src, backup_file)
+        missing = copy_archive_files(src, backup_dir)
         QMessageBox.information(self, "Backup", f"Database backup created:\n{backup_file}")
+        if missing:
+            QMessageBox.warning(self, "Backup", "These closed-year archives were not found and are not in the backup:\n"
+                                + "\n".join(missing))
 
     def export_database(self):
         save_path, _ = QFileDialog.getSaveFileName(self, "Export Database As", "NationalBicyclesExport.db", "Database Files (*.db)")
         if save_path:
             shutil.copyfile(DB_NAME, save_path)
+            missing = copy_archive_files(DB_NAME, os.path.dirname(os.path.abspath(save_path)))
             QMessageBox.information(self, "Export", f"Database exported to:\n{save_path}")
+            if missing:
+                QMessageBox.warning(self, "Export", "These closed-year archives were not found and were not exported:\n"
+                                    + "\n".join(missing))
 
     def import_database(self):
         open_path, _ = QFileDialog.getOpenFileName(self, "Import Database", "", "Database Files (*.db)")
         if open_path:
             self.backup_database()
             shutil.copyfile(open_path, DB_NAME)
+            missing = copy_archive_files(open_path, os.path.dirname(os.path.abspath(DB_NAME)))
+            if missing:
+                QMessageBox.warning(self, "Import", "These closed-year archives were not found next to the imported "
+                                    "database; put them beside it and import again to read those years:\n"
+                                    + "\n".join(missing))
             QMessageBox.information(self, "Import", "Database imported and app will restart.")
             os.execl(sys.executable, sys.executable, *sys.argv)
 
+    def close_fiscal_year(self):
+        conn = get_conn()
+        closed = get_closed_through(conn)
+        conn.close()
+        last_year = date.today().year - 1
+        if closed is not None and closed >= last_year:
+            QMessageBox.information(self, "Close Fiscal Year", f"All years up to {closed} are already closed.")
+            return
+        year, ok = QInputDialog.getInt(
+            self, "Close Fiscal Year", "Close all years up to and including:",
+            last_year, (closed or 1999) + 1, last_year
+        )
+        if not ok:
+            return
+        reply = QMessageBox.question(
+            self, "Close Fiscal Year",
+            f"Entries dated up to 31-12-{year} will move to yearly archive files next to the database "
+            "and can no longer be edited. Vendor and employee balances carry forward.\n\n"
+            "A backup is taken first. Continue?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self.backup_database()
+        try:
+            results = close_fiscal_years(DB_NAME, year)
+        except (ValueError, sqlite3.Error) as e:
+            QMessageBox.critical(self, "Close Fiscal Year", f"Could not close {year}:\n{e}")
+            return
+        summary = "\n".join(f"{r['year']}: {r['rows']} entries -> {os.path.basename(r['file'])}" for r in results)
+        QMessageBox.information(self, "Close Fiscal Year", f"{summary}\n\nThe app will restart.")
+        os.execl(sys.executable, sys.executable, *sys.argv)
+
+    def export_changes(self):
+        conn = get_conn()
+        last_export = int(get_app_meta(conn, "delta_export_seq", 0))
+        conn.close()
+        since, ok = QInputDialog.getInt(
+            self, "Export Changes", "Export changes after sequence number (0 = everything):", last_export, 0
+        )
+        if not ok:
+            return
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Changes As", f"NationalBicyclesChanges_{timestamp}.json.gz", "Delta Packs (*.json.gz)"
+        )
+        if not save_path:
+            return
+        conn = get_conn()
+        try:
+            until, count = export_delta_pack(conn, save_path, since)
+        except ValueError as e:
+            conn.close()
+            QMessageBox.warning(self, "Export Changes", str(e))
+            return
+        set_app_meta(conn, "delta_export_seq", until)
+        prune_change_log(conn)
+        conn.commit()
+        conn.close()
+        QMessageBox.information(self, "Export Changes", f"{count} changes exported to:\n{save_path}")
+
+    def apply_changes(self):
+        open_path, _ = QFileDialog.getOpenFileName(self, "Apply Changes", "", "Delta Packs (*.json.gz)")
+        if not open_path:
+            return
+        self.backup_database()
+        conn = get_conn()
+        try:
+            count = apply_delta_pack(conn, open_path)
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            QMessageBox.warning(self, "Apply Changes", f"Could not apply the changes:\n{e}")
+            return
+        finally:
+            conn.close()
+        QMessageBox.information(self, "Apply Changes", f"{count} changes applied and app will restart.")
+        os.execl(sys.executable, sys.executable, *sys.argv)
+
 class TransactionTypeDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -5168,33 +9696,73 @@ class MainWindow(QMainWindow):
         self.cheques_tab.chequePaid.connect(self.daily.load_data)
         self.cheques_tab.chequePaid.connect(self.vendors.refresh_overview_table)
         self.vendors.chequeCreated.connect(self.cheques_tab.refresh)
+        self.vendors.cashflowChanged.connect(self.daily.load_data)
+        self.vendors.cashflowChanged.connect(self.dashboard.refresh)
         self.tabs.currentChanged.connect(self.on_tab_changed)
 
+        self.tray_icon = None
+        self.scheduler = DueDateScheduler(self)
+        self.scheduler.itemChanged.connect(self.on_due_item_changed)
+        self.scheduler.dayChanged.connect(self.cheques_tab.refresh_days)
+        self.scheduler.notify.connect(self.show_due_notification)
+        self.cheques_tab.chequesChanged.connect(self.scheduler.rebuild)
+        self.vendors.chequeCreated.connect(self.scheduler.rebuild)
+        self.documents_tab.documentsChanged.connect(self.scheduler.rebuild)
+        self.scheduler.start()
+
         self.do_auto_backup("open")
 
     
 
     def do_auto_backup(self, event):
-        src = DB_NAME
         backup_dir = os.path.join(os.path.expanduser("~"), "NationalBicyclesBackups")
-        os.makedirs(backup_dir, exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = os.path.join(backup_dir, f"auto_{event}_{timestamp}.db")
         try:
-            shutil.copyfile(src, backup_file)
+            write_auto_backup(DB_NAME, backup_dir, event)
         except Exception:
             pass
 
     def closeEvent(self, event):
+        if _receipt_spooler is not None:
+            _receipt_spooler.stop()
         self.do_auto_backup("close")
         super().closeEvent(event)
 
     def on_tab_changed(self, idx):
         tab = self.tabs.widget(idx)
         if tab == self.cheques_tab:
-            self.cheques_tab.refresh()
+            # rows are kept current by the scheduler; only catch up on a missed day change
+            self.cheques_tab.refresh_days()
+        elif tab == self.dashboard:
+            # cheques, vendor bills and payroll change on other tabs; re-reads only what changed
+            self.dashboard.refresh_projection()
+
+    def on_due_item_changed(self, kind, key):
+        if kind == "cheque":
+            self.cheques_tab.update_cheque_row(key)
+        else:
+            self.documents_tab.update_document_row(key)
+
+    def show_due_notification(self, title, message):
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray_icon is None:
+                self.tray_icon = QSystemTrayIcon(self.windowIcon(), self)
+                self.tray_icon.show()
+            self.tray_icon.showMessage(title, message, QSystemTrayIcon.MessageIcon.Information, 10000)
+        self.statusBar().showMessage(f"{title}: {message.replace(chr(10), '; ')}")
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch-reports":
+        sys.exit(batch_reports_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--delta":
+        sys.exit(delta_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        sys.exit(serve_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--consolidate":
+        sys.exit(consolidate_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--close-year":
+        sys.exit(close_year_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--reconcile":
+        sys.exit(reconcile_cli(sys.argv[2:]))
     app = QApplication(sys.argv)
     # Set global app icon EARLY
     icon_path = os.path.join(os.path.expanduser("~"), ".national_bicycles_logo.ico")
@@ -5206,4 +9774,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # a frozen (PyInstaller) build re-runs this file in every spawned batch worker
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
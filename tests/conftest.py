@@ -0,0 +1,37 @@
+import importlib.util
+import os
+import sqlite3
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "NBS DONE-1.py")
+
+
+@pytest.fixture(scope="session")
+def nbs():
+    """The app module; its file name has a space in it, so it is loaded by path."""
+    if "nbs_app" not in sys.modules:
+        spec = importlib.util.spec_from_file_location("nbs_app", APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["nbs_app"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["nbs_app"]
+
+
+@pytest.fixture
+def db(nbs, tmp_path, monkeypatch):
+    """A fresh, initialised ledger in a temporary directory, set as the app's DB_NAME."""
+    path = str(tmp_path / "ledger.db")
+    monkeypatch.setattr(nbs, "DB_NAME", path)
+    nbs.init_db()
+    return path
+
+
+@pytest.fixture
+def conn(db):
+    conn = sqlite3.connect(db)
+    yield conn
+    conn.close()
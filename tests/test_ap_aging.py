@@ -0,0 +1,59 @@
+def add_vendor(conn, name, opening=0):
+    return conn.execute("INSERT INTO vendors (name, opening_balance) VALUES (?, ?)", (name, opening)).lastrowid
+
+
+def test_payments_settle_the_oldest_items_first(nbs, conn):
+    vendor_id = add_vendor(conn, "Giant", 10000)
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-02-01", 50000, due_iso="2026-03-01")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-03-20", 30000, due_iso="2026-04-20")
+    nbs.add_vendor_transaction(conn, vendor_id, "payment", "2026-03-25", 20000, payment_mode="Bank Transfer")
+    conn.commit()
+    assert nbs.fetch_ap_aging(conn, "2026-04-15") == {vendor_id: [30000, 0, 40000, 0, 0]}
+
+
+def test_credit_opening_balance_reduces_the_first_purchase(nbs, conn):
+    vendor_id = add_vendor(conn, "Merida", -5000)
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-03-01", 8000, due_iso="2026-04-05")
+    conn.commit()
+    assert nbs.fetch_ap_aging(conn, "2026-04-15") == {vendor_id: [0, 3000, 0, 0, 0]}
+
+
+def test_settled_vendors_are_left_out(nbs, conn):
+    vendor_id = add_vendor(conn, "Trek")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-03-01", 8000, due_iso="2026-03-10")
+    nbs.add_vendor_transaction(conn, vendor_id, "return", "2026-03-02", 8000)
+    conn.commit()
+    assert nbs.fetch_ap_aging(conn, "2026-04-15") == {}
+
+
+def test_cached_result_follows_new_transactions(nbs, conn):
+    vendor_id = add_vendor(conn, "Giant")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-03-01", 8000, due_iso="2026-03-10")
+    conn.commit()
+    assert nbs.ap_aging_totals(nbs.fetch_ap_aging(conn, "2026-04-15")) == [0, 0, 8000, 0, 0]
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-04-01", 1000, due_iso="2026-05-01")
+    conn.commit()
+    assert nbs.ap_aging_totals(nbs.fetch_ap_aging(conn, "2026-04-15")) == [1000, 0, 8000, 0, 0]
+
+
+def test_aging_survives_a_year_close(nbs, db, conn):
+    vendor_id = add_vendor(conn, "Giant", 10000)
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2024-11-01", 50000, due_iso="2025-01-15")
+    nbs.add_vendor_transaction(conn, vendor_id, "payment", "2024-12-01", 20000, payment_mode="Bank Transfer")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2025-02-01", 7000, due_iso="2025-03-01")
+    conn.commit()
+    before = nbs.fetch_ap_aging(conn, "2025-03-20")
+    nbs.close_fiscal_years(db, 2024)
+    assert nbs.fetch_ap_aging(conn, "2025-03-20") == before == {vendor_id: [0, 7000, 0, 40000, 0]}
+
+
+def test_as_of_date_leaves_out_later_payments_and_purchases(nbs, conn):
+    vendor_id = add_vendor(conn, "Giant")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-01-05", 50000, due_iso="2026-01-31")
+    nbs.add_vendor_transaction(conn, vendor_id, "payment", "2026-06-01", 50000, payment_mode="Bank Transfer")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-07-01", 9000, due_iso="2026-07-31")
+    conn.commit()
+    aging = nbs.fetch_ap_aging(conn, "2026-03-01")
+    assert aging == {vendor_id: [0, 50000, 0, 0, 0]}
+    assert sum(aging[vendor_id]) == nbs.vendor_balance_as_of(conn, vendor_id, "2026-03-01")
+    assert nbs.fetch_ap_aging(conn, "2026-08-15") == {vendor_id: [0, 9000, 0, 0, 0]}
@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+
+import pytest
+
+TODAY = date(2026, 2, 10)
+
+
+def add_employee(conn, name, salary, last_paid=None):
+    employee_id = conn.execute("INSERT INTO employees (name, salary) VALUES (?, ?)", (name, salary)).lastrowid
+    if last_paid:
+        conn.execute(
+            "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) "
+            "VALUES (?, ?, 'Salary Payment', ?, ?, 0, 0, '')",
+            (employee_id, last_paid, salary, salary)
+        )
+    conn.commit()
+    return employee_id
+
+
+def add_cheque(conn, due_iso, amount, company="Giant"):
+    conn.execute(
+        "INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid) "
+        "VALUES (?, ?, 'ENBD', ?, ?, 0)", (TODAY.isoformat(), company, due_iso, amount)
+    )
+    conn.commit()
+
+
+def paydays(nbs, conn, name):
+    until = TODAY + timedelta(days=nbs.CASH_PROJECTION_DAYS)
+    return [when.isoformat() for when, _, label in sorted(nbs.projection_payroll_events(conn, TODAY, until))
+            if label == f"Salary - {name}"]
+
+
+def test_month_day_clamps_and_rolls_over(nbs):
+    assert nbs.month_day(2026, 2, 31) == date(2026, 2, 28)
+    assert nbs.month_day(2024, 2, 31) == date(2024, 2, 29)
+    assert nbs.month_day(2026, 13, 5) == date(2027, 1, 5)
+    assert nbs.month_day(2026, 4, 31) == date(2026, 4, 30)
+
+
+def test_payroll_paydays(nbs, conn):
+    add_employee(conn, "Never", 100)
+    add_employee(conn, "Mid", 100, last_paid="2026-01-15")
+    add_employee(conn, "Done", 100, last_paid="2026-02-05")
+    add_employee(conn, "Late", 100, last_paid="2026-01-05")
+    add_employee(conn, "ShortMonth", 100, last_paid="2025-11-30")
+    add_employee(conn, "Unpaid", 0)
+    # no payment yet: month end, clamped to each month's length
+    assert paydays(nbs, conn, "Never") == ["2026-02-28", "2026-03-31", "2026-04-30"]
+    assert paydays(nbs, conn, "Mid") == ["2026-02-15", "2026-03-15", "2026-04-15"]
+    # already paid this month: the next salary is next month's
+    assert paydays(nbs, conn, "Done") == ["2026-03-05", "2026-04-05", "2026-05-05"]
+    # this month's payday has passed unpaid: it is due today
+    assert paydays(nbs, conn, "Late") == ["2026-02-10", "2026-03-05", "2026-04-05", "2026-05-05"]
+    # paid on the 30th of a 30-day month: still month end, not the 30th
+    assert paydays(nbs, conn, "ShortMonth") == ["2026-02-28", "2026-03-31", "2026-04-30"]
+    assert paydays(nbs, conn, "Unpaid") == []
+
+
+def test_paid_on_the_last_day_of_this_month_moves_to_next_month_end(nbs, conn):
+    add_employee(conn, "Early", 100, last_paid="2026-02-28")
+    until = date(2026, 4, 30)
+    assert [e[0].isoformat() for e in nbs.projection_payroll_events(conn, TODAY, until)] == ["2026-03-31", "2026-04-30"]
+
+
+@pytest.fixture
+def projection(nbs, conn):
+    # 70.00 taken every day of the run-rate window, plus capital from long ago
+    window = [(TODAY - timedelta(days=d)).isoformat() for d in range(1, nbs.CASH_RUN_RATE_DAYS + 1)]
+    conn.executemany("INSERT INTO daily_income (date, amount) VALUES (?, 7000)", [(d,) for d in window])
+    conn.execute("INSERT INTO daily_capital (date, amount, category) VALUES ('2025-01-01', 50000, 'Additional Capital')")
+    conn.commit()
+    add_cheque(conn, (TODAY + timedelta(days=5)).isoformat(), 100000)
+    return nbs.CashProjection(days=30)
+
+
+def test_lowest_balance_is_a_running_minimum(nbs, conn, projection):
+    projection.refresh(conn, TODAY)
+    opening = 50000 + 7000 * nbs.CASH_RUN_RATE_DAYS
+    assert projection.opening == opening
+    assert projection.run_rate == [7000] * 7
+    assert projection.balance_on(4) == opening + 4 * 7000
+    assert projection.balance_on(5) == opening + 5 * 7000 - 100000
+    assert projection.lowest_balance(3) == (opening, TODAY)
+    assert projection.lowest_balance(10) == (opening - 65000, TODAY + timedelta(days=5))
+    assert projection.lowest_balance() == projection.lowest_balance(999) == (opening - 65000, TODAY + timedelta(days=5))
+    for n in range(projection.days + 1):
+        assert projection.lowest_balance(n)[0] == min(projection.balances[:n + 1])
+
+
+def test_overdue_cheque_is_due_today(nbs, conn, projection):
+    add_cheque(conn, "2026-01-01", 2500, company="Trek")
+    projection.refresh(conn, TODAY)
+    assert projection.upcoming(1)[0][:3] == (TODAY, -2500, "Cheque to Trek")
+    assert projection.lowest_balance(0)[0] == projection.opening - 2500
+
+
+def test_refresh_reloads_only_the_changed_sources(nbs, conn, projection):
+    assert projection.refresh(conn, TODAY) == list(nbs.CashProjection.SOURCES)
+    assert projection.refresh(conn, TODAY) == []
+
+    add_cheque(conn, (TODAY + timedelta(days=20)).isoformat(), 1000)
+    assert projection.refresh(conn, TODAY) == ["cheques", "payables"]
+    assert len(projection.events) == 2
+
+    add_employee(conn, "Amal", 300000)
+    assert projection.refresh(conn, TODAY) == ["payroll"]
+    assert (date(2026, 2, 28), -300000, "Salary - Amal") in projection.events
+
+    conn.execute("INSERT INTO daily_capital (date, amount, category) VALUES (?, 1000, 'Additional Capital')",
+                 (TODAY.isoformat(),))
+    conn.commit()
+    before = projection.balance_on(0)
+    assert projection.refresh(conn, TODAY) == ["cash"]
+    assert projection.balance_on(0) == before + 1000
+
+    # a new day starts over
+    assert projection.refresh(conn, TODAY + timedelta(days=1)) == list(nbs.CashProjection.SOURCES)
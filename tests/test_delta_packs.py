@@ -0,0 +1,123 @@
+import sqlite3
+
+import pytest
+
+LEDGER = ("daily_income", "daily_expense", "daily_capital", "vendor_transactions", "employee_payroll", "vendors")
+
+
+@pytest.fixture
+def replica(nbs, db, tmp_path, monkeypatch):
+    """A second, separately initialised copy (its own node id) to apply packs to."""
+    path = str(tmp_path / "branch" / "ledger.db")
+    (tmp_path / "branch").mkdir()
+    monkeypatch.setattr(nbs, "DB_NAME", path)
+    nbs.init_db()
+    monkeypatch.setattr(nbs, "DB_NAME", db)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def snapshot(conn):
+    return {table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall() for table in LEDGER}
+
+
+def add_vendor(conn, name):
+    return conn.execute("INSERT INTO vendors (name) VALUES (?)", (name,)).lastrowid
+
+
+def test_export_apply_round_trip(nbs, conn, replica, tmp_path):
+    vendor_id = add_vendor(conn, "Shimano")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-02-01", 120000, invoice_no="A1")
+    payment, _ = nbs.add_vendor_transaction(conn, vendor_id, "payment", "2026-02-10", 20000, payment_mode="Cash")
+    income = nbs.add_cashflow_entry(conn, "Capital", "2026-02-11", 5000)
+    conn.commit()
+    conn.execute("UPDATE daily_capital SET amount=6000 WHERE id=?", (income,))
+    conn.execute("DELETE FROM vendor_transactions WHERE id=?", (payment,))
+    conn.commit()
+    pack = str(tmp_path / "changes.json.gz")
+    until, count = nbs.export_delta_pack(conn, pack)
+    assert until == nbs.get_change_seq(conn) and count > 0
+
+    assert nbs.apply_delta_pack(replica, pack) == count
+    assert snapshot(replica) == snapshot(conn)
+    assert nbs.apply_delta_pack(replica, pack) == 0
+
+
+def test_applied_changes_are_not_logged_on_the_copy(nbs, conn, replica, tmp_path):
+    before = nbs.get_change_seq(replica)
+    nbs.add_cashflow_entry(conn, "Capital", "2026-02-11", 5000)
+    conn.commit()
+    pack = str(tmp_path / "changes.json.gz")
+    nbs.export_delta_pack(conn, pack)
+    nbs.apply_delta_pack(replica, pack)
+    assert nbs.get_change_seq(replica) == before
+
+
+def test_packs_must_be_applied_in_order(nbs, conn, replica, tmp_path):
+    nbs.add_cashflow_entry(conn, "Capital", "2026-02-11", 5000)
+    conn.commit()
+    first = str(tmp_path / "first.json.gz")
+    until, _ = nbs.export_delta_pack(conn, first)
+    nbs.add_cashflow_entry(conn, "Capital", "2026-02-12", 7000)
+    conn.commit()
+    second = str(tmp_path / "second.json.gz")
+    nbs.export_delta_pack(conn, second, until)
+    with pytest.raises(ValueError, match="Apply the earlier packs first"):
+        nbs.apply_delta_pack(replica, second)
+    nbs.apply_delta_pack(replica, first)
+    nbs.apply_delta_pack(replica, second)
+    assert snapshot(replica) == snapshot(conn)
+
+
+def test_year_close_travels_as_one_change(nbs, db, conn, replica, tmp_path):
+    vendor_id = add_vendor(conn, "Shimano")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2024-05-01", 120000, due_iso="2024-06-01")
+    nbs.add_cashflow_entry(conn, "Capital", "2024-05-02", 5000)
+    conn.commit()
+    first = str(tmp_path / "first.json.gz")
+    since, _ = nbs.export_delta_pack(conn, first)
+    nbs.apply_delta_pack(replica, first)
+
+    nbs.close_fiscal_years(db, 2024)
+    nbs.add_cashflow_entry(conn, "Capital", "2025-01-05", 700)
+    conn.commit()
+    ops = conn.execute("SELECT op, COUNT(*) FROM change_log WHERE seq > ? GROUP BY op", (since,)).fetchall()
+    assert dict(ops) == {"C": 1, "I": 1}
+
+    second = str(tmp_path / "second.json.gz")
+    nbs.export_delta_pack(conn, second, since)
+    assert nbs.apply_delta_pack(replica, second) == 2
+    assert nbs.get_closed_through(replica) == 2024
+    assert snapshot(replica) == snapshot(conn)
+    archived = sqlite3.connect(str(tmp_path / "branch" / "ledger_2024.db"))
+    assert archived.execute("SELECT COUNT(*) FROM vendor_transactions").fetchone()[0] == 1
+    archived.close()
+
+
+def test_exported_rows_are_pruned(nbs, conn, tmp_path):
+    nbs.add_cashflow_entry(conn, "Capital", "2026-02-11", 5000)
+    conn.commit()
+    until, _ = nbs.export_delta_pack(conn, str(tmp_path / "changes.json.gz"))
+    nbs.set_app_meta(conn, "delta_export_seq", until)
+    nbs.set_app_meta(conn, "backup_seq", until)
+    assert nbs.prune_change_log(conn) == until
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] == 0
+    assert nbs.get_change_seq(conn) == until
+    with pytest.raises(ValueError, match="pruned"):
+        nbs.export_delta_pack(conn, str(tmp_path / "again.json.gz"), 0)
+    nbs.add_cashflow_entry(conn, "Capital", "2026-02-12", 5000)
+    conn.commit()
+    assert nbs.get_change_seq(conn) == until + 1
+
+
+def test_pruning_waits_for_the_auto_backup(nbs, conn, tmp_path):
+    nbs.add_cashflow_entry(conn, "Capital", "2026-02-11", 5000)
+    conn.commit()
+    until, _ = nbs.export_delta_pack(conn, str(tmp_path / "changes.json.gz"))
+    nbs.set_app_meta(conn, "delta_export_seq", until)
+    nbs.set_app_meta(conn, "backup_seq", until - 1)
+    nbs.prune_change_log(conn)
+    conn.commit()
+    assert conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0] == until
@@ -0,0 +1,55 @@
+def add_vendor(conn, name):
+    return conn.execute("INSERT INTO vendors (name, opening_balance) VALUES (?, 0)", (name,)).lastrowid
+
+
+def purchase(nbs, conn, vendor_id, day, amount, invoice_no):
+    trans_id, _ = nbs.add_vendor_transaction(conn, vendor_id, "purchase", day, amount, invoice_no=invoice_no)
+    return trans_id
+
+
+def test_find_matches_the_invoice_number_loosely(nbs, conn):
+    giant = add_vendor(conn, "Giant")
+    trek = add_vendor(conn, "Trek")
+    first = purchase(nbs, conn, giant, "2026-03-05", 1000, "inv-7")
+    second = purchase(nbs, conn, giant, "2026-03-01", 2000, " INV-7 ")
+    purchase(nbs, conn, trek, "2026-03-01", 3000, "INV-7")
+    purchase(nbs, conn, giant, "2026-03-01", 4000, "INV-8")
+    nbs.add_vendor_transaction(conn, giant, "return", "2026-03-06", 500, invoice_no="INV-7")
+    conn.commit()
+    assert nbs.find_duplicate_invoices(conn, giant, "Inv-7") == [(second, "2026-03-01", 2000), (first, "2026-03-05", 1000)]
+    assert nbs.find_duplicate_invoices(conn, giant, "inv-7", exclude_id=second) == [(first, "2026-03-05", 1000)]
+    assert nbs.find_duplicate_invoices(conn, giant, "  ") == []
+    assert nbs.find_duplicate_invoices(conn, giant, "INV-9") == []
+
+
+def test_scan_groups_repeated_invoices_per_vendor(nbs, conn):
+    giant = add_vendor(conn, "Giant")
+    trek = add_vendor(conn, "Trek")
+    a = purchase(nbs, conn, giant, "2026-03-05", 1000, "inv-7")
+    b = purchase(nbs, conn, giant, "2026-03-01", 2000, "INV-7")
+    c = purchase(nbs, conn, trek, "2026-02-01", 300, "T1")
+    d = purchase(nbs, conn, trek, "2026-02-01", 300, "T1")
+    purchase(nbs, conn, trek, "2026-02-02", 300, "T2")
+    purchase(nbs, conn, trek, "2026-02-02", 300, "")
+    purchase(nbs, conn, trek, "2026-02-03", 300, "")
+    conn.commit()
+    found = nbs.scan_duplicate_invoices(conn)
+    assert [(d_["vendor"], d_["invoice_no"].upper(), d_["count"], d_["total"]) for d_ in found] == [
+        ("Giant", "INV-7", 2, 3000), ("Trek", "T1", 2, 600)
+    ]
+    assert found[0]["entries"] == [(b, "2026-03-01", 2000), (a, "2026-03-05", 1000)]
+    assert found[1]["entries"] == [(c, "2026-02-01", 300), (d, "2026-02-01", 300)]
+
+
+def test_closed_years_are_checked_too(nbs, db, conn):
+    giant = add_vendor(conn, "Giant")
+    old = purchase(nbs, conn, giant, "2024-06-01", 1000, "INV-1")
+    nbs.add_vendor_transaction(conn, giant, "payment", "2024-07-01", 1000, payment_mode="Cash")
+    conn.commit()
+    nbs.close_fiscal_years(db, 2024)
+    assert conn.execute("SELECT COUNT(*) FROM vendor_transactions WHERE id=?", (old,)).fetchone()[0] == 0
+    assert nbs.find_duplicate_invoices(conn, giant, "inv-1") == [(old, "2024-06-01", 1000)]
+    new = purchase(nbs, conn, giant, "2025-02-01", 1500, "INV-1")
+    conn.commit()
+    found = nbs.scan_duplicate_invoices(conn)
+    assert [(d["count"], d["entries"]) for d in found] == [(2, [(old, "2024-06-01", 1000), (new, "2025-02-01", 1500)])]
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def ledger(nbs, conn):
+    """Two years of vendor, cashflow and payroll activity; returns (vendor id, employee id)."""
+    vendor_id = conn.execute("INSERT INTO vendors (name, opening_balance) VALUES ('Giant', 10000)").lastrowid
+    employee_id = conn.execute("INSERT INTO employees (name, salary) VALUES ('Amal', 300000)").lastrowid
+    for year in (2023, 2024):
+        for month in (3, 7, 11):
+            day = f"{year}-{month:02}-15"
+            nbs.add_vendor_transaction(conn, vendor_id, "purchase", day, 40000 + month, due_iso=f"{year}-{month + 1:02}-15")
+            nbs.add_vendor_transaction(conn, vendor_id, "payment", f"{year}-{month:02}-20", 30000, payment_mode="Cash")
+            nbs.add_cashflow_entry(conn, "Capital", day, 1000 * month)
+        conn.execute(
+            "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) "
+            "VALUES (?, ?, 'Advance', 20000, 20000, 0, 0, '')", (employee_id, f"{year}-05-01")
+        )
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2025-02-01", 5000, due_iso="2025-03-01")
+    conn.commit()
+    return vendor_id, employee_id
+
+
+AS_OF = ("2023-03-15", "2023-06-30", "2023-12-31", "2024-07-20", "2024-12-31", "2025-02-01")
+
+
+def balances(nbs, conn, vendor_id):
+    return [nbs.vendor_balance_as_of(conn, vendor_id, day) for day in AS_OF]
+
+
+def test_close_moves_rows_and_carries_balances_forward(nbs, db, conn, ledger):
+    vendor_id, employee_id = ledger
+    live_before = conn.execute("SELECT COUNT(*) FROM vendor_transactions").fetchone()[0]
+    results = nbs.close_fiscal_years(db, 2023)
+    assert [r["year"] for r in results] == [2023]
+    archive = sqlite3.connect(results[0]["file"])
+    assert archive.execute("SELECT COUNT(*) FROM vendor_transactions").fetchone()[0] == 6
+    assert archive.execute("SELECT COUNT(*) FROM daily_capital").fetchone()[0] == 3
+    archive.close()
+    assert conn.execute("SELECT COUNT(*) FROM vendor_transactions WHERE date <= '2023-12-31' "
+                        "AND type <> 'carry_forward'").fetchone()[0] == 0
+    carried = conn.execute("SELECT SUM(amount) FROM vendor_transactions WHERE type='carry_forward'").fetchone()[0]
+    assert carried == sum(40000 + month - 30000 for month in (3, 7, 11))
+    assert conn.execute("SELECT COUNT(*) FROM vendor_transactions").fetchone()[0] < live_before
+    loan = {row[0]: row[3] for row in nbs.payroll_run_defaults(conn, "2025-01-31")}
+    assert loan[employee_id] == 40000
+
+
+def test_balances_as_of_earlier_dates_survive_closing(nbs, db, conn, ledger):
+    vendor_id, _ = ledger
+    before = balances(nbs, conn, vendor_id)
+    report = nbs.fetch_monthly_report(conn, 7, 2023)
+    cash = nbs.cash_position(conn, "2025-01-31")
+    nbs.close_fiscal_years(db, 2023)
+    assert balances(nbs, conn, vendor_id) == before
+    nbs.close_fiscal_years(db, 2024)
+    assert balances(nbs, conn, vendor_id) == before
+    assert nbs.fetch_monthly_report(conn, 7, 2023) == report
+    assert nbs.cash_position(conn, "2025-01-31") == cash
+
+
+def test_closed_years_refuse_writes(nbs, db, conn, ledger):
+    nbs.close_fiscal_years(db, 2023)
+    with pytest.raises(ValueError, match="closed"):
+        nbs.add_cashflow_entry(conn, "Capital", "2023-08-01", 100)
+    with pytest.raises(ValueError, match="closed"):
+        nbs.add_vendor_transaction(conn, ledger[0], "purchase", "2023-12-31", 100)
+    nbs.add_cashflow_entry(conn, "Capital", "2024-01-01", 100)
+
+
+def test_only_ended_and_open_years_can_be_closed(nbs, db, ledger):
+    with pytest.raises(ValueError, match="already ended"):
+        nbs.close_fiscal_years(db, date.today().year)
+    nbs.close_fiscal_years(db, 2023)
+    with pytest.raises(ValueError, match="already closed"):
+        nbs.close_fiscal_years(db, 2023)
+
+
+def test_missing_archive_is_reported(nbs, db, conn, ledger):
+    results = nbs.close_fiscal_years(db, 2023)
+    os.rename(results[0]["file"], results[0]["file"] + ".moved")
+    with pytest.raises(nbs.MissingArchiveError) as error:
+        nbs.vendor_balance_as_of(conn, ledger[0], "2023-06-30")
+    assert error.value.year == 2023
+    source = nbs.ledger_source(conn, "daily_capital", ("date", "amount"), "2023-01-01", "2024-12-31", skip_missing=True)
+    assert source == "daily_capital"
+
+
+def test_archives_travel_with_copies(nbs, db, conn, ledger, tmp_path):
+    nbs.close_fiscal_years(db, 2023)
+    target = tmp_path / "copy"
+    target.mkdir()
+    assert nbs.copy_archive_files(db, str(target)) == []
+    assert sorted(os.listdir(target)) == ["ledger_2023.db"]
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+
+def add_vendor(conn, name):
+    vendor_id = conn.execute("INSERT INTO vendors (name, opening_balance) VALUES (?, 0)", (name,)).lastrowid
+    conn.commit()
+    return vendor_id
+
+
+def writer_conn(db):
+    return sqlite3.connect(db, isolation_level=None)
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_a_failing_job_is_rolled_back_on_its_own(nbs, db, conn):
+    def insert(c, amount):
+        return c.execute("INSERT INTO daily_capital (date, amount, category) VALUES ('2026-03-01', ?, 'x')",
+                         (amount,)).lastrowid
+
+    def insert_then_fail(c):
+        insert(c, 999)
+        raise nbs.ServiceError(400, "rejected")
+
+    writer = nbs.LedgerWriter(db)
+    wconn = writer_conn(db)
+    results = writer.write_batch(wconn, [(insert, (100,), "a"), (insert_then_fail, (), "b"), (insert, (200,), "c")])
+    wconn.close()
+    assert [(future, error is None) for future, _, error in results] == [("a", True), ("b", False), ("c", True)]
+    assert results[1][2].status == 400
+    assert conn.execute("SELECT amount FROM daily_capital ORDER BY id").fetchall() == [(100,), (200,)]
+
+
+def test_duplicate_invoice_is_a_conflict_unless_allowed(nbs, db, conn):
+    vendor_id = add_vendor(conn, "Giant")
+    wconn = writer_conn(db)
+    body = {"type": "purchase", "date": "2026-03-01", "amount": "120.50", "invoice_no": "inv-7"}
+    assert nbs.service_write_vendor_transaction(wconn, vendor_id, body)["cheque_created"] is False
+    with pytest.raises(nbs.ServiceError) as excinfo:
+        nbs.service_write_vendor_transaction(wconn, vendor_id, dict(body, invoice_no=" INV-7 "))
+    assert excinfo.value.status == 409
+    nbs.service_write_vendor_transaction(wconn, vendor_id, dict(body, allow_duplicate=True))
+    wconn.close()
+    assert conn.execute("SELECT SUM(amount) FROM vendor_transactions").fetchone()[0] == 24100
+
+
+def test_bad_amounts_dates_and_categories_are_rejected(nbs, db):
+    wconn = writer_conn(db)
+    for body in ({"type": "Capital", "amount": "0"},
+                 {"type": "Capital", "amount": "5", "date": "01-03-2026"},
+                 {"type": "Expense", "amount": "5", "category": "No Such Category"}):
+        with pytest.raises(nbs.ServiceError) as excinfo:
+            nbs.service_write_cashflow(wconn, body)
+        assert excinfo.value.status == 400
+    wconn.close()
+
+
+def test_second_sales_entry_on_a_date_is_a_conflict(nbs, db):
+    wconn = writer_conn(db)
+    body = {"type": "income", "category": "sales", "date": "2026-03-01", "amount": "1500"}
+    nbs.service_write_cashflow(wconn, body)
+    with pytest.raises(nbs.ServiceError) as excinfo:
+        nbs.service_write_cashflow(wconn, body)
+    assert excinfo.value.status == 409
+    wconn.close()
+
+
+def test_cheque_paid_twice_or_missing(nbs, db, conn):
+    cheque_id = conn.execute(
+        "INSERT INTO cheques (cheque_date, company_name, bank_name, due_date, amount, is_paid) "
+        "VALUES ('2026-03-01', 'Giant', 'ENBD', '2026-04-01', 5000, 0)"
+    ).lastrowid
+    conn.commit()
+    wconn = writer_conn(db)
+    assert nbs.service_write_cheque_paid(wconn, cheque_id)["id"] == cheque_id
+    for bad_id, status in ((cheque_id, 409), (cheque_id + 1, 404)):
+        with pytest.raises(nbs.ServiceError) as excinfo:
+            nbs.service_write_cheque_paid(wconn, bad_id)
+        assert excinfo.value.status == status
+    wconn.close()
+
+
+def test_locked_database_fails_the_batch_with_503_and_the_writer_keeps_serving(nbs, db, conn, monkeypatch):
+    monkeypatch.setattr(nbs, "SQLITE_BUSY_TIMEOUT", 0.05)
+    writer = nbs.LedgerWriter(db)
+    writer.start()
+    try:
+        locker = sqlite3.connect(db, isolation_level=None)
+        locker.execute("BEGIN IMMEDIATE")
+        body = {"type": "Capital", "date": "2026-03-01", "amount": "10"}
+        futures = [writer.submit(nbs.service_write_cashflow, body) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(nbs.ServiceError) as excinfo:
+                future.result(timeout=10)
+            assert excinfo.value.status == 503
+        locker.execute("ROLLBACK")
+        locker.close()
+        assert writer.submit(nbs.service_write_cashflow, body).result(timeout=10)["type"] == "Capital"
+    finally:
+        writer.stop()
+    assert count(conn, "daily_capital") == 1
+
+
+def request(service, method, path, body=None, token=None):
+    """Runs one HTTP request against the service on a loopback port; returns (status, payload)."""
+    async def go():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            data = json.dumps(body).encode() if body is not None else b""
+            headers = f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n"
+            if token:
+                headers += f"X-NBS-Token: {token}\r\n"
+            writer.write(headers.encode() + b"\r\n" + data)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        head, _, payload = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(payload)
+    return asyncio.run(go())
+
+
+@pytest.fixture
+def service(nbs, db):
+    service = nbs.LedgerService(db, token="s3cret", readers=1)
+    service.writer.start()
+    yield service
+    service.writer.stop()
+    service.readers.shutdown()
+
+
+def test_service_requires_the_token(service):
+    assert request(service, "GET", "/api/vendors")[0] == 401
+    assert request(service, "GET", "/api/vendors", token="wrong")[0] == 401
+    assert request(service, "GET", "/api/vendors", token="s3cret") == (200, {"vendors": []})
+
+
+def test_service_routes_writes_through_the_writer(nbs, service, conn):
+    vendor_id = add_vendor(conn, "Giant")
+    path = f"/api/vendors/{vendor_id}/transactions"
+    body = {"type": "purchase", "date": "2026-03-01", "amount": "75", "invoice_no": "A1"}
+    status, payload = request(service, "POST", path, body, token="s3cret")
+    assert status == 200 and payload["cheque_created"] is False
+    status, payload = request(service, "POST", path, body, token="s3cret")
+    assert status == 409 and "A1" in payload["error"]
+    assert request(service, "POST", "/api/cheques/99/paid", token="s3cret")[0] == 404
+    assert request(service, "GET", "/api/vendors/abc/transactions", token="s3cret")[0] == 404
+    assert request(service, "GET", "/api/nothing", token="s3cret")[0] == 404
+    status, payload = request(service, "GET", "/api/vendors", token="s3cret")
+    assert payload["vendors"][0]["balance"] == nbs.fmt_money(7500)
@@ -0,0 +1,59 @@
+import sqlite3
+
+
+def legacy_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE daily_expense (id INTEGER PRIMARY KEY, date TEXT, amount REAL, category_id INTEGER,
+                                    description TEXT, vendor_transaction_id INTEGER, notes TEXT);
+        CREATE TABLE vendors (id INTEGER PRIMARY KEY, name TEXT UNIQUE, contact TEXT, opening_balance REAL DEFAULT 0);
+        CREATE TABLE employee_payroll (id INTEGER PRIMARY KEY, employee_id INTEGER, date TEXT, type TEXT,
+                                       amount REAL, debit REAL, credit REAL, balance REAL, notes TEXT);
+        INSERT INTO daily_expense VALUES (1, '2023-05-01', 12.345, NULL, 'tea', NULL, ''),
+                                         (2, '2023-05-02', 0.1, NULL, 'pen', NULL, '');
+        INSERT INTO vendors VALUES (1, 'Giant', '', 1500.5);
+        INSERT INTO employee_payroll VALUES (1, 1, '2023-05-31', 'Advance', 250.75, 250.75, 0, 250.75, '');
+    """)
+    conn.commit()
+    return conn
+
+
+def column_types(conn, table):
+    return {info[1]: info[2] for info in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_real_amounts_become_integer_fils(nbs, tmp_path):
+    conn = legacy_db(str(tmp_path / "old.db"))
+    nbs.migrate_money_to_fils(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == nbs.SCHEMA_VERSION_FILS
+    assert column_types(conn, "daily_expense")["amount"] == "INTEGER"
+    assert column_types(conn, "vendors")["opening_balance"] == "INTEGER"
+    assert {col: kind for col, kind in column_types(conn, "employee_payroll").items()
+            if col in ("amount", "debit", "credit", "balance")} == dict.fromkeys(
+        ("amount", "debit", "credit", "balance"), "INTEGER")
+    assert conn.execute("SELECT id, amount, description FROM daily_expense ORDER BY id").fetchall() == [
+        (1, 1235, "tea"), (2, 10, "pen")]
+    assert conn.execute("SELECT opening_balance FROM vendors").fetchone()[0] == 150050
+    assert conn.execute("SELECT amount, debit, credit, balance FROM employee_payroll").fetchone() == (
+        25075, 25075, 0, 25075)
+    assert all(isinstance(row[0], int) for row in conn.execute("SELECT amount FROM daily_expense"))
+    conn.close()
+
+
+def test_migration_runs_only_once(nbs, tmp_path):
+    conn = legacy_db(str(tmp_path / "old.db"))
+    nbs.migrate_money_to_fils(conn)
+    nbs.migrate_money_to_fils(conn)
+    assert conn.execute("SELECT amount FROM daily_expense WHERE id=1").fetchone()[0] == 1235
+    conn.close()
+
+
+def test_init_db_upgrades_a_legacy_file(nbs, tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    legacy_db(path).close()
+    monkeypatch.setattr(nbs, "DB_NAME", path)
+    nbs.init_db()
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT amount FROM daily_expense WHERE id=1").fetchone()[0] == 1235
+    assert nbs.fmt_money(conn.execute("SELECT SUM(amount) FROM daily_expense").fetchone()[0]) == "12.45"
+    conn.close()
@@ -0,0 +1,112 @@
+import pytest
+
+
+def add_employee(conn, name, salary, advance=0):
+    employee_id = conn.execute("INSERT INTO employees (name, salary) VALUES (?, ?)", (name, salary)).lastrowid
+    if advance:
+        conn.execute(
+            "INSERT INTO employee_payroll (employee_id, date, type, amount, debit, credit, balance, notes) "
+            "VALUES (?, '2026-01-10', 'Advance', ?, ?, 0, ?, '')",
+            (employee_id, advance, advance, advance)
+        )
+    conn.commit()
+    return employee_id
+
+
+def test_defaults_suggest_loan_recovery_up_to_one_salary(nbs, conn):
+    small = add_employee(conn, "Amal", 300000, advance=50000)
+    large = add_employee(conn, "Bilal", 200000, advance=500000)
+    defaults = {row[0]: row for row in nbs.payroll_run_defaults(conn, "2026-02-28")}
+    assert defaults[small][3:] == (50000, 50000, None)
+    assert defaults[large][3:] == (500000, 200000, None)
+
+
+def test_run_posts_salary_deduction_and_cashflow(nbs, conn):
+    employee_id = add_employee(conn, "Amal", 300000, advance=50000)
+    assert nbs.run_payroll(conn, "2026-02-28", [(employee_id, "Amal", 250000, 50000)], "February") == 1
+    conn.commit()
+    rows = conn.execute(
+        "SELECT type, amount, debit, credit, balance FROM employee_payroll WHERE date='2026-02-28' ORDER BY id"
+    ).fetchall()
+    assert rows == [("Salary Payment", 250000, 250000, 0, 50000), ("Deduction", 50000, 0, 50000, 0)]
+    assert conn.execute(
+        "SELECT amount, description FROM daily_expense WHERE payroll_id IS NOT NULL"
+    ).fetchall() == [(250000, "Amal")]
+    defaults = {row[0]: row for row in nbs.payroll_run_defaults(conn, "2026-02-01")}
+    assert defaults[employee_id][3] == 0
+    assert defaults[employee_id][5] == "2026-02-28"
+
+
+def test_salary_fully_taken_by_loan_still_marks_the_month_paid(nbs, conn):
+    employee_id = add_employee(conn, "Bilal", 200000, advance=500000)
+    nbs.run_payroll(conn, "2026-02-28", [(employee_id, "Bilal", 0, 200000)])
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM daily_expense").fetchone()[0] == 0
+    assert nbs.payroll_run_defaults(conn, "2026-02-28")[0][5] == "2026-02-28"
+
+
+def test_lines_with_nothing_to_pay_are_skipped(nbs, conn):
+    employee_id = add_employee(conn, "Amal", 300000)
+    assert nbs.run_payroll(conn, "2026-02-28", [(employee_id, "Amal", 0, 0)]) == 0
+    assert conn.execute("SELECT COUNT(*) FROM employee_payroll").fetchone()[0] == 0
+
+
+def test_run_in_a_closed_year_is_refused(nbs, db, conn):
+    employee_id = add_employee(conn, "Amal", 300000)
+    conn.execute("INSERT INTO daily_income (date, amount) VALUES ('2024-06-01', 100)")
+    conn.commit()
+    nbs.close_fiscal_years(db, 2024)
+    with pytest.raises(ValueError, match="closed"):
+        nbs.run_payroll(conn, "2024-12-31", [(employee_id, "Amal", 300000, 0)])
+
+
+def test_payroll_line_checks_the_amounts(nbs):
+    assert nbs.payroll_line(1, "Amal", 300000, 50000, 80000) == (1, "Amal", 250000, 50000)
+    with pytest.raises(ValueError, match="zero or positive"):
+        nbs.payroll_line(1, "Amal", -1, 0, 0)
+    with pytest.raises(ValueError, match="more than the salary"):
+        nbs.payroll_line(1, "Amal", 300000, 300001, 500000)
+    with pytest.raises(ValueError, match="loan balance"):
+        nbs.payroll_line(1, "Amal", 300000, 50000, 20000)
+
+
+def payroll_records(nbs, conn, employee_id):
+    return (
+        conn.execute("SELECT type, amount, debit, credit, balance FROM employee_payroll "
+                     "WHERE employee_id=? AND date='2026-02-28' ORDER BY id", (employee_id,)).fetchall(),
+        conn.execute("SELECT amount, notes FROM daily_expense WHERE description=?",
+                     (conn.execute("SELECT name FROM employees WHERE id=?", (employee_id,)).fetchone()[0],)).fetchall(),
+        conn.execute(f"SELECT {nbs.EMPLOYEE_LOAN_SQL} FROM employee_payroll p WHERE p.employee_id=?", (employee_id,)).fetchone()[0],
+    )
+
+
+def test_single_employee_salary_is_posted_like_a_run(nbs, db, conn, monkeypatch):
+    from PyQt6.QtCore import QDate
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    by_run = add_employee(conn, "Amal", 300000, advance=50000)
+    by_dialog = add_employee(conn, "Bilal", 300000, advance=50000)
+    nbs.run_payroll(conn, "2026-02-28", [nbs.payroll_line(by_run, "Amal", 300000, 50000, 50000)])
+    conn.commit()
+
+    def fill_and_accept(dialog):
+        dialog.date_edit.setDate(QDate(2026, 2, 28))
+        dialog.salary_amount_edit.setText("3000")
+        dialog.deduction_amount_edit.setText("500")
+        return nbs.QDialog.DialogCode.Accepted
+
+    monkeypatch.setattr(nbs.QDialog, "exec", fill_and_accept)
+    monkeypatch.setattr(nbs.QMessageBox, "information", lambda *args: None)
+    warnings = []
+    monkeypatch.setattr(nbs.QMessageBox, "warning", lambda *args: warnings.append(args[2]))
+    tab = nbs.PayrollTab()
+    tab.employee_combo.setCurrentText("Bilal")
+    tab.show_transaction_dialog("Salary Payment")
+    assert warnings == []
+    run_rows, run_cash, run_loan = payroll_records(nbs, conn, by_run)
+    dialog_rows, dialog_cash, dialog_loan = payroll_records(nbs, conn, by_dialog)
+    assert dialog_rows == run_rows == [("Salary Payment", 250000, 250000, 0, 50000), ("Deduction", 50000, 0, 50000, 0)]
+    assert dialog_cash == run_cash == [(250000, "Payroll - Salary Payment")]
+    assert dialog_loan == run_loan == 0
+    tab.deleteLater()
+    app.processEvents()
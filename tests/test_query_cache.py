@@ -0,0 +1,96 @@
+import sqlite3
+
+SQL = "SELECT COALESCE(SUM(amount), 0) FROM daily_income WHERE date >= ?"
+
+
+def add_income(conn, amount, day="2026-03-01"):
+    conn.execute("INSERT INTO daily_income (date, amount) VALUES (?, ?)", (day, amount))
+    conn.commit()
+
+
+def total(cache, conn, since="2026-01-01"):
+    return cache.scalar(conn, SQL, (since,), ("daily_income",))
+
+
+def test_repeat_reads_are_hits(nbs, conn):
+    cache = nbs.QueryCache()
+    add_income(conn, 500)
+    assert total(cache, conn) == total(cache, conn) == 500
+    assert (cache.hits, cache.misses) == (1, 1)
+    # params are part of the key
+    assert total(cache, conn, "2026-06-01") == 0
+    assert cache.misses == 2
+
+
+def test_writes_to_a_tagged_table_invalidate(nbs, db, conn):
+    cache = nbs.QueryCache()
+    add_income(conn, 500)
+    assert total(cache, conn) == 500
+    other = sqlite3.connect(db)
+    add_income(other, 250)
+    other.close()
+    assert total(cache, conn) == 750
+    conn.execute("UPDATE daily_income SET amount = 100 WHERE amount = 250")
+    conn.commit()
+    assert total(cache, conn) == 600
+    conn.execute("DELETE FROM daily_income WHERE amount = 100")
+    conn.commit()
+    assert total(cache, conn) == 500
+    assert cache.hits == 0
+
+
+def test_writes_to_other_tables_keep_the_entry(nbs, conn):
+    cache = nbs.QueryCache()
+    add_income(conn, 500)
+    total(cache, conn)
+    conn.execute("INSERT INTO daily_expense (date, amount) VALUES ('2026-03-01', 10)")
+    conn.commit()
+    total(cache, conn)
+    assert cache.hits == 1
+
+
+def test_invalidate_marks_tables_stale_or_empties_the_cache(nbs, conn):
+    cache = nbs.QueryCache()
+    add_income(conn, 500)
+    total(cache, conn)
+    cache.invalidate("daily_expense")
+    total(cache, conn)
+    assert cache.hits == 1
+    cache.invalidate("daily_income")
+    total(cache, conn)
+    assert cache.hits == 1
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(nbs, conn):
+    cache = nbs.QueryCache(capacity=2)
+    for since in ("2026-01-01", "2026-02-01", "2026-01-01", "2026-03-01"):
+        total(cache, conn, since)
+    assert cache.stats()["evictions"] == 1
+    total(cache, conn, "2026-01-01")  # kept: it was used after 2026-02-01
+    assert cache.hits == 2
+    total(cache, conn, "2026-02-01")
+    assert cache.misses == 4
+
+
+def test_untagged_and_in_memory_queries_are_not_cached(nbs, conn):
+    cache = nbs.QueryCache()
+    cache.fetchall(conn, SQL, ("2026-01-01",))
+    memory = sqlite3.connect(":memory:")
+    memory.execute("CREATE TABLE daily_income (date TEXT, amount INTEGER)")
+    cache.fetchall(memory, SQL, ("2026-01-01",), ("daily_income",))
+    memory.close()
+    assert cache.stats()["entries"] == 0
+
+
+def test_database_without_table_versions_is_not_cached(nbs, tmp_path):
+    cache = nbs.QueryCache()
+    legacy = sqlite3.connect(str(tmp_path / "legacy.db"))
+    legacy.execute("CREATE TABLE daily_income (date TEXT, amount INTEGER)")
+    legacy.execute("INSERT INTO daily_income VALUES ('2026-03-01', 5)")
+    assert total(cache, legacy) == 5
+    legacy.execute("INSERT INTO daily_income VALUES ('2026-03-02', 5)")
+    assert total(cache, legacy) == 10
+    legacy.close()
+    assert cache.stats()["entries"] == 0
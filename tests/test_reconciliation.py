@@ -0,0 +1,96 @@
+import csv
+
+import pytest
+
+
+def write_statement(tmp_path, rows, name="statement.csv"):
+    path = tmp_path / name
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Account 0123 Statement"])
+        writer.writerow(["Date", "Description", "Reference", "Debit", "Credit"])
+        writer.writerows(rows)
+    return str(path)
+
+
+def import_and_reconcile(nbs, conn, path):
+    statement_id, _ = nbs.import_bank_statement(conn, path)
+    conn.commit()
+    matched = nbs.reconcile_statement(conn, statement_id)
+    conn.commit()
+    return statement_id, matched
+
+
+def test_parse_bank_statement_debit_credit_columns(nbs, tmp_path):
+    path = write_statement(tmp_path, [
+        ("05/03/2026", "POS Shop", "", "1,250.50", ""),
+        ("06/03/2026", "Transfer in", "TRX9", "", "300.00"),
+        ("", "Closing balance", "", "", ""),
+    ])
+    assert nbs.parse_bank_statement(path) == [
+        ("2026-03-05", "POS Shop", "", -125050),
+        ("2026-03-06", "Transfer in", "TRX9", 30000),
+    ]
+
+
+def test_reconcile_matches_within_tolerance_and_prefers_exact_date(nbs, conn, tmp_path):
+    category = nbs.get_expense_category_id(conn, "Rent")
+    near = nbs.add_cashflow_entry(conn, "Expense", "2026-03-09", 50000, category, "rent")
+    exact = nbs.add_cashflow_entry(conn, "Expense", "2026-03-10", 50000, category, "rent")
+    conn.commit()
+    path = write_statement(tmp_path, [
+        ("10/03/2026", "Rent March", "", "500.00", ""),
+        ("11/03/2026", "Rent extra", "", "500.00", ""),
+    ])
+    statement_id, matched = import_and_reconcile(nbs, conn, path)
+    assert matched == 2
+    report = nbs.reconciliation_report(conn, statement_id)
+    assert [line["match"]["id"] for line in report["lines"]] == [exact, near]
+    assert report["unmatched_bank"] == 0
+
+
+def test_reconcile_leaves_lines_outside_the_window(nbs, conn, tmp_path):
+    category = nbs.get_expense_category_id(conn, "Rent")
+    nbs.add_cashflow_entry(conn, "Expense", "2026-03-01", 50000, category, "rent")
+    conn.commit()
+    path = write_statement(tmp_path, [("20/03/2026", "Rent", "", "500.00", "")])
+    statement_id, matched = import_and_reconcile(nbs, conn, path)
+    assert matched == 0
+    report = nbs.reconciliation_report(conn, statement_id)
+    assert report["lines"][0]["match"] is None
+
+
+def test_manual_match_is_unique_per_entry(nbs, conn, tmp_path):
+    category = nbs.get_expense_category_id(conn, "Rent")
+    entry = nbs.add_cashflow_entry(conn, "Expense", "2026-03-10", 50000, category, "rent")
+    conn.commit()
+    path = write_statement(tmp_path, [
+        ("10/03/2026", "Rent", "", "500.00", ""),
+        ("10/03/2026", "Rent again", "", "500.00", ""),
+    ])
+    statement_id, matched = import_and_reconcile(nbs, conn, path)
+    assert matched == 1
+    open_line = conn.execute("SELECT id FROM bank_lines WHERE match_table IS NULL").fetchone()[0]
+    with pytest.raises(ValueError):
+        nbs.match_bank_line(conn, open_line, "daily_expense", entry)
+
+
+def test_reimporting_the_same_file_is_refused(nbs, conn, tmp_path):
+    path = write_statement(tmp_path, [("10/03/2026", "Rent", "", "500.00", "")])
+    nbs.import_bank_statement(conn, path)
+    conn.commit()
+    with pytest.raises(ValueError, match="already been imported"):
+        nbs.import_bank_statement(conn, path)
+
+
+def test_reconcile_reads_closed_years(nbs, db, conn, tmp_path):
+    category = nbs.get_expense_category_id(conn, "Rent")
+    entry = nbs.add_cashflow_entry(conn, "Expense", "2024-12-30", 50000, category, "rent")
+    conn.commit()
+    nbs.close_fiscal_years(db, 2024)
+    path = write_statement(tmp_path, [("31/12/2024", "Rent", "", "500.00", "")])
+    statement_id, matched = import_and_reconcile(nbs, conn, path)
+    assert matched == 1
+    report = nbs.reconciliation_report(conn, statement_id)
+    assert report["lines"][0]["match"]["id"] == entry
+    assert report["lines"][0]["match"]["date"] == "2024-12-30"
@@ -0,0 +1,107 @@
+import pytest
+
+
+def add_vendor(conn, name, opening=0):
+    return conn.execute("INSERT INTO vendors (name, opening_balance) VALUES (?, ?)", (name, opening)).lastrowid
+
+
+def plain_balance(nbs, conn, vendor_id, as_of_iso):
+    row = conn.execute(
+        f"SELECT COALESCE(SUM({nbs.VENDOR_SIGNED_AMOUNT_SQL}), 0) FROM vendor_transactions WHERE vendor_id=? AND date <= ?",
+        (vendor_id, as_of_iso)
+    ).fetchone()
+    return nbs.get_vendor_opening_balance(conn, vendor_id) + row[0]
+
+
+AS_OF_DATES = ("2026-01-31", "2026-02-14", "2026-03-01", "2026-03-31", "2026-05-20")
+
+
+@pytest.fixture
+def vendor(nbs, conn):
+    vendor_id = add_vendor(conn, "Giant", 1000)
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-01-10", 50000, due_iso="2026-02-10")
+    nbs.add_vendor_transaction(conn, vendor_id, "payment", "2026-02-05", 20000, payment_mode="Bank Transfer")
+    nbs.add_vendor_transaction(conn, vendor_id, "purchase", "2026-03-15", 30000, due_iso="2026-04-15")
+    nbs.add_vendor_transaction(conn, vendor_id, "return", "2026-04-02", 4000)
+    conn.commit()
+    return vendor_id
+
+
+def assert_balances(nbs, conn, vendor_id):
+    for as_of in AS_OF_DATES:
+        assert nbs.vendor_balance_as_of(conn, vendor_id, as_of) == plain_balance(nbs, conn, vendor_id, as_of), as_of
+
+
+def checkpoint_periods(conn, vendor_id):
+    return [row[0] for row in conn.execute(
+        "SELECT period FROM vendor_balance_checkpoints WHERE vendor_id=? ORDER BY period", (vendor_id,))]
+
+
+def test_checkpoints_are_built_on_first_lookup(nbs, conn, vendor):
+    assert checkpoint_periods(conn, vendor) == []
+    assert nbs.vendor_balance_as_of(conn, vendor, "2026-03-31") == 1000 + 50000 - 20000 + 30000
+    assert checkpoint_periods(conn, vendor) == ["2026-01", "2026-02", "2026-03", "2026-04"]
+    assert_balances(nbs, conn, vendor)
+
+
+def test_backdated_insert_drops_later_checkpoints(nbs, conn, vendor):
+    assert_balances(nbs, conn, vendor)
+    nbs.add_vendor_transaction(conn, vendor, "purchase", "2026-02-20", 7000, due_iso="2026-03-20")
+    conn.commit()
+    assert checkpoint_periods(conn, vendor) == ["2026-01"]
+    assert_balances(nbs, conn, vendor)
+
+
+def test_edit_and_delete_drop_later_checkpoints(nbs, conn, vendor):
+    assert_balances(nbs, conn, vendor)
+    conn.execute("UPDATE vendor_transactions SET amount = 25000 WHERE vendor_id=? AND type='payment'", (vendor,))
+    conn.commit()
+    assert checkpoint_periods(conn, vendor) == ["2026-01"]
+    assert_balances(nbs, conn, vendor)
+    conn.execute("DELETE FROM vendor_transactions WHERE vendor_id=? AND date='2026-01-10'", (vendor,))
+    conn.commit()
+    assert checkpoint_periods(conn, vendor) == []
+    assert_balances(nbs, conn, vendor)
+
+
+def test_redate_drops_checkpoints_from_the_earlier_month(nbs, conn, vendor):
+    assert_balances(nbs, conn, vendor)
+    # moved later: the old month is the earlier one
+    conn.execute("UPDATE vendor_transactions SET date='2026-04-10' WHERE vendor_id=? AND type='payment'", (vendor,))
+    conn.commit()
+    assert checkpoint_periods(conn, vendor) == ["2026-01"]
+    assert_balances(nbs, conn, vendor)
+    # and moved back again: the new month is the earlier one
+    conn.execute("UPDATE vendor_transactions SET date='2026-01-20' WHERE vendor_id=? AND type='payment'", (vendor,))
+    conn.commit()
+    assert checkpoint_periods(conn, vendor) == []
+    assert_balances(nbs, conn, vendor)
+
+
+def test_lookup_leaves_the_callers_transaction_open(nbs, conn, vendor):
+    other = add_vendor(conn, "Trek")
+    assert conn.in_transaction
+    assert nbs.vendor_balance_as_of(conn, vendor, "2026-03-31") == plain_balance(nbs, conn, vendor, "2026-03-31")
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM vendors WHERE id=?", (other,)).fetchone()[0] == 0
+    assert checkpoint_periods(conn, vendor) == []
+
+
+def test_lookup_uses_checkpoints_inside_a_transaction(nbs, conn, vendor):
+    assert_balances(nbs, conn, vendor)
+    nbs.add_vendor_transaction(conn, vendor, "purchase", "2026-05-02", 9000, due_iso="2026-06-02")
+    assert conn.in_transaction
+    assert_balances(nbs, conn, vendor)
+    conn.rollback()
+    assert_balances(nbs, conn, vendor)
+
+
+def test_readonly_connection_reads_without_writing(nbs, db, conn, vendor):
+    ro = nbs.get_readonly_conn(db)
+    try:
+        assert nbs.is_readonly_conn(ro) and not nbs.is_readonly_conn(conn)
+        assert_balances(nbs, ro, vendor)
+    finally:
+        ro.close()
+    assert checkpoint_periods(conn, vendor) == []
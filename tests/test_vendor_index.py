@@ -0,0 +1,67 @@
+NAMES = ["Al Futtaim Motors", "Giant Bicycles", "giant parts", "Trek", "Merida", "Shimano ME", "Bike Hub", "AL"]
+
+
+def add_vendors(conn, names=NAMES):
+    ids = {}
+    for i, name in enumerate(names):
+        ids[name] = conn.execute("INSERT INTO vendors (name, contact, opening_balance) VALUES (?, '', ?)",
+                                 (name, i * 100)).lastrowid
+    conn.commit()
+    return ids
+
+
+def naive_search(index, text):
+    text = text.strip().lower()
+    return [pos for pos, vendor in enumerate(index.vendors) if text in vendor.name.lower()]
+
+
+def test_vendors_are_sorted_by_name(nbs, conn):
+    add_vendors(conn)
+    index = nbs.VendorIndex()
+    assert index.refresh(conn) is True
+    assert [v.name for v in index.vendors] == sorted(NAMES, key=str.lower)
+
+
+def test_search_matches_a_plain_substring_scan(nbs, conn):
+    add_vendors(conn)
+    index = nbs.VendorIndex()
+    index.refresh(conn)
+    for text in ("", " ", "a", "al", "AL ", "gia", "GIANT", "ant bi", "e", "me", "ike h", "zzz", "giant bicycles x"):
+        assert index.search(text) == naive_search(index, text), text
+    assert [index.vendors[pos].name for pos in index.search("giant")] == ["Giant Bicycles", "giant parts"]
+
+
+def test_balances_and_total_payable(nbs, conn):
+    ids = add_vendors(conn, ["Giant", "Trek", "Merida"])
+    nbs.add_vendor_transaction(conn, ids["Giant"], "purchase", "2026-03-01", 5000)
+    nbs.add_vendor_transaction(conn, ids["Merida"], "payment", "2026-03-02", 900, payment_mode="Cash")
+    conn.commit()
+    index = nbs.VendorIndex()
+    index.refresh(conn)
+    assert index.balances == {ids["Giant"]: 5000, ids["Trek"]: 100, ids["Merida"]: -700}
+    assert index.total_payable == 5100
+
+
+def test_refresh_reloads_only_after_vendor_changes(nbs, conn):
+    ids = add_vendors(conn, ["Giant"])
+    index = nbs.VendorIndex()
+    assert index.refresh(conn) is True
+    assert index.refresh(conn) is False
+    conn.execute("INSERT INTO daily_income (date, amount) VALUES ('2026-03-01', 10)")
+    conn.commit()
+    assert index.refresh(conn) is False
+    nbs.add_vendor_transaction(conn, ids["Giant"], "purchase", "2026-03-01", 700)
+    conn.commit()
+    assert index.refresh(conn) is True
+    assert index.balances[ids["Giant"]] == 700
+    conn.execute("UPDATE vendors SET name = 'Giant Bicycles' WHERE id = ?", (ids["Giant"],))
+    conn.commit()
+    assert index.refresh(conn) is True
+    assert index.search("bicy") == [0]
+
+
+def test_refresh_without_a_connection_opens_its_own(nbs, db, conn):
+    add_vendors(conn, ["Giant"])
+    index = nbs.VendorIndex()
+    assert index.refresh() is True
+    assert [v.name for v in index.vendors] == ["Giant"]
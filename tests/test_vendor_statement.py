@@ -0,0 +1,47 @@
+def make_vendor(nbs, conn, opening=0, count=7):
+    vendor_id = conn.execute("INSERT INTO vendors (name, opening_balance) VALUES ('Giant', ?)", (opening,)).lastrowid
+    for day in range(1, count + 1):
+        ttype = "payment" if day % 3 == 0 else "purchase"
+        # two rows on the same date, so the (date, id) cursor has to break ties
+        nbs.add_vendor_transaction(conn, vendor_id, ttype, f"2026-03-{(day + 1) // 2:02}", day * 1000,
+                                   payment_mode="Cash" if ttype == "payment" else None)
+    conn.commit()
+    return vendor_id
+
+
+def test_pages_walk_back_to_the_first_row(nbs, conn):
+    vendor_id = make_vendor(nbs, conn, opening=50000)
+    pages, before = [], None
+    while True:
+        page = nbs.fetch_vendor_statement_page(conn, vendor_id, before, page_size=3)
+        pages.insert(0, page)
+        before = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert [len(page["rows"]) for page in pages] == [1, 3, 3]
+    rows = [row for page in pages for row in page["rows"]]
+    full = conn.execute(
+        "SELECT id FROM vendor_transactions WHERE vendor_id=? ORDER BY date, id", (vendor_id,)
+    ).fetchall()
+    assert [row[0] for row in rows] == [row[0] for row in full]
+    assert pages[0]["carried_forward"] == 50000
+
+
+def test_running_balance_continues_across_pages(nbs, conn):
+    vendor_id = make_vendor(nbs, conn, opening=50000)
+    latest = nbs.fetch_vendor_statement_page(conn, vendor_id, page_size=3)
+    earlier = nbs.fetch_vendor_statement_page(conn, vendor_id, latest["cursor"], page_size=3)
+    assert earlier["closing_balance"] == latest["carried_forward"]
+    balance = 50000
+    for day in range(1, 8):
+        balance += -day * 1000 if day % 3 == 0 else day * 1000
+    assert latest["closing_balance"] == balance == nbs.vendor_balance_as_of(conn, vendor_id, "2026-03-31")
+    assert latest["rows"][-1][8] == balance
+
+
+def test_vendor_without_rows(nbs, conn):
+    vendor_id = conn.execute("INSERT INTO vendors (name, opening_balance) VALUES ('Merida', 1200)").lastrowid
+    conn.commit()
+    page = nbs.fetch_vendor_statement_page(conn, vendor_id)
+    assert page["rows"] == [] and not page["has_more"]
+    assert page["carried_forward"] == page["closing_balance"] == 1200